@@ -2,15 +2,12 @@
 Agente de estandarización de artículos.
 Arquitectura limpia: el agente solo orquesta, la lógica está en services/ y tools/.
 """
-from langchain.agents import create_agent
-from langchain_core.agents import AgentAction, AgentFinish
-from typing import Union, List
+from functools import lru_cache
 
 from app.prompts.chatbot_solicitud_articulos_prompts import SOLICITUD_ARTICULO_AGENT_SYSTEM_PROMPT
-from app.tools.chatbot_articulo_tools import ARTICULO_TOOLS
 
-
-def get_estandarizacion_agent():
+@lru_cache(maxsize=4)
+def get_estandarizacion_agent(modelo: str):
     """
     Crea un agente para estandarización de artículos.
     
@@ -19,12 +16,22 @@ def get_estandarizacion_agent():
     - Llamar a las herramientas apropiadas
     - NO contiene lógica de negocio (está en services/)
     
+    Se compila una vez por proceso (el grafo no guarda estado entre
+    invocaciones) y se precalienta al arrancar (ver startup_profile).
+    El modelo lo decide el router según config/ruteo_modelos.yaml y el
+    presupuesto (ver services/ruteo_modelos.py): un agente compilado por modelo.
+    
     Returns:
         Agente compilado
     """
+    # Imports diferidos: langchain.agents y las tools cargan langchain/anthropic completos
+    from langchain.agents import create_agent
+    from app.tools.chatbot_articulo_tools import ARTICULO_TOOLS
+    from app.services.llm_utils import crear_modelo_chat
+
     # Usamos la sintaxis moderna con create_agent documentada en docs/core-components/Agents.md
     agent = create_agent(
-        model="claude-3-haiku-20240307",
+        model=crear_modelo_chat(modelo),
         tools=ARTICULO_TOOLS,
         system_prompt=SOLICITUD_ARTICULO_AGENT_SYSTEM_PROMPT
     )
@@ -1,40 +1,238 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_anthropic import ChatAnthropic
-from langchain_core.output_parsers import StrOutputParser
+import asyncio
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.schemas.chatbot_solicitud_articulos_schemas import DocumentoAnalizado
+from app.services.chatbot_solicitud_articulos.categorias_service import (
+    CATEGORIA_KEYWORDS,
+    inferir_categoria,
+    obtener_config,
+    obtener_reglas_categoria,
+)
+from app.services.document_cache import document_cache, version_analisis
+from app.services.document_selection import (
+    DEFAULT_TOKEN_BUDGET,
+    SELECTION_VERSION,
+    dividir_en_chunks,
+    estimar_tokens,
+    seleccionar_contenido,
+)
+from app.services.llm_utils import construir_run_config, crear_modelo_chat, llm_limiter
 
 # Usamos un modelo rápido y barato para esta tarea de extracción pura
-llm_analyst = ChatAnthropic(model="claude-3-haiku-20240307", temperature=0)
+ANALYSIS_MODEL = "claude-3-haiku-20240307"
+
+
+@lru_cache(maxsize=1)
+def obtener_llm_analyst():
+    """Cliente del analista, creado en el primer uso (o en el warm-up), no al importar."""
+    return crear_modelo_chat(ANALYSIS_MODEL, temperature=0)
+
+
+@lru_cache(maxsize=8)
+def _cadena(template: str, estructurada: bool = False):
+    """prompt | haiku, con salida de texto o DocumentoAnalizado (una cadena por plantilla)."""
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = obtener_llm_analyst()
+    salida = llm.with_structured_output(DocumentoAnalizado) if estructurada else llm | StrOutputParser()
+    return ChatPromptTemplate.from_template(template) | salida
+
+# Presupuesto de tokens por llamada al LLM (tamaño de cada fragmento)
+TOKEN_BUDGET = DEFAULT_TOKEN_BUDGET
+
+# Presupuesto total de tokens de entrada por documento (suma de todos los fragmentos).
+# Acota el costo de manuales largos: por sobre esto se descarta lo menos denso.
+TOTAL_TOKEN_BUDGET = int(os.getenv("DOCUMENT_TOTAL_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET * 4)))
 
 ANALYSIS_PROMPT = """
 Eres un ANALISTA TÉCNICO experto en suministros industriales.
-Tu tarea es leer el siguiente contenido extraído de un documento (ficha técnica, cotización, manual) 
+Tu tarea es leer el siguiente contenido extraído de un documento (ficha técnica, cotización, manual)
 y extraer ÚNICAMENTE las especificaciones técnicas relevantes para catalogar un artículo.
-
-# OBJETIVO
-Generar un resumen CONCISO y ESTRUCTURADO de los atributos técnicos.
 Ignora: términos legales, direcciones, teléfonos, marketing, introducciones.
 
-# FORMATO DE SALIDA
+# CATEGORÍAS CANDIDATAS Y SUS CAMPOS (campo* = requerido; [valores estándar])
+{esquema}
+
+# REGLAS
+- `categoria`: el ID de UNA categoría candidata, o null si ninguna aplica.
+- `campos`: SOLO los nombres de campo de esa categoría. Usa el valor estándar equivalente
+  cuando exista (traduce términos en inglés: Check -> VALVULA CHECK). No inventes valores.
+- `especificaciones`: otros atributos útiles como "Atributo: Valor".
+
+# TEXTO DEL DOCUMENTO:
+{text}
+"""
+
+MAP_PROMPT = """
+Eres un ANALISTA TÉCNICO experto en suministros industriales.
+Lees el FRAGMENTO {indice} de {total} de un documento largo (manual, cotización con varios productos).
+Extrae ÚNICAMENTE las especificaciones técnicas presentes en este fragmento.
+Si el fragmento no contiene especificaciones, responde solo: SIN ESPECIFICACIONES.
+
+# FORMATO DE SALIDA (una sección por producto detectado)
 Producto: [Nombre principal]
-Categoría Sugerida: [EPP, FERRETERIA, HERRAMIENTAS, etc]
 Especificaciones:
 - [Atributo]: [Valor]
-- [Atributo]: [Valor]
 
-# TEXTO DEL DOCUMENTO:
+# FRAGMENTO:
+{text}
+"""
+
+REDUCE_PROMPT = """
+Eres un ANALISTA TÉCNICO experto en suministros industriales.
+Recibes los resúmenes parciales de los fragmentos de un mismo documento.
+Fusiónalos en UN análisis final: elimina duplicados, resuelve valores repetidos
+y conserva todas las especificaciones distintas. Si hay varios productos, el principal
+va en `producto`/`campos` y los demás en `otros_productos`.
+
+# CATEGORÍAS CANDIDATAS Y SUS CAMPOS (campo* = requerido; [valores estándar])
+{esquema}
+
+# REGLAS
+- `categoria`: el ID de UNA categoría candidata, o null si ninguna aplica.
+- `campos`: SOLO los nombres de campo de esa categoría. Usa el valor estándar equivalente
+  cuando exista. No inventes valores.
+
+# RESÚMENES PARCIALES:
 {text}
 """
 
-def analyze_document_content(text: str) -> str:
+# Máximo de valores estándar listados por campo en el esquema del prompt
+MAX_VALORES_ESQUEMA = 15
+
+
+def construir_esquema_candidatas(texto: str) -> str:
     """
-    Analiza texto crudo y retorna un resumen técnico estructurado
-    usando un modelo ligero (Haiku) para ahorrar costos.
+    Arma la sección de categorías candidatas del prompt. La inferencia local por
+    keywords (sin LLM) acota el esquema a 1-3 categorías para no enviar el YAML completo.
     """
-    # Si el texto es muy largo, lo recortamos (aprox 2000 tokens de palabras)
-    # para evitar errores de contexto y gastos innecesarios.
-    truncated_text = text[:8000] 
-    
-    prompt = ChatPromptTemplate.from_template(ANALYSIS_PROMPT)
-    chain = prompt | llm_analyst | StrOutputParser()
-    
-    return chain.invoke({"text": truncated_text})
+    inferencia = inferir_categoria(texto)
+    candidatas = []
+    if inferencia.categoria_inferida:
+        candidatas.append(inferencia.categoria_inferida)
+        candidatas += [alt["categoria"] for alt in inferencia.alternativas]
+
+    lineas = []
+    for cat_id in candidatas:
+        reglas = obtener_reglas_categoria(cat_id)
+        if not reglas:
+            continue
+        campos = []
+        for campo, conf in reglas.get("campos", {}).items():
+            marca = "*" if conf.get("requerido") else ""
+            valores = conf.get("valores_estandar") or []
+            detalle = f" [{', '.join(map(str, valores[:MAX_VALORES_ESQUEMA]))}]" if valores else ""
+            campos.append(f"{campo}{marca}{detalle}")
+        lineas.append(f"- {cat_id}: " + "; ".join(campos))
+
+    if not lineas:
+        # Sin pistas locales: solo los IDs (barato) para que el modelo elija
+        lineas.append("- Sin inferencia local. IDs válidos: " + ", ".join(CATEGORIA_KEYWORDS.keys()))
+    return "\n".join(lineas)
+
+
+def formatear_resumen(documento: DocumentoAnalizado) -> str:
+    """Resumen legible (formato histórico) a partir del análisis estructurado."""
+    lineas = [f"Producto: {documento.producto}"]
+    if documento.categoria:
+        lineas.append(f"Categoría Sugerida: {documento.categoria}")
+    specs = [f"- {campo}: {valor}" for campo, valor in documento.campos.items()]
+    specs += [f"- {spec}" for spec in documento.especificaciones]
+    if specs:
+        lineas.append("Especificaciones:")
+        lineas += specs
+    if documento.otros_productos:
+        lineas.append("Otros productos: " + ", ".join(documento.otros_productos))
+    return "\n".join(lineas)
+
+
+async def _ainvoke(template: str, variables: dict) -> str:
+    """Invoca una cadena prompt | haiku respetando el limitador global de LLM."""
+    chain = _cadena(template)
+    async with llm_limiter:
+        return await chain.ainvoke(variables, config=construir_run_config())
+
+
+async def _ainvoke_estructurado(template: str, texto: str) -> DocumentoAnalizado:
+    """Igual que _ainvoke pero con salida estructurada DocumentoAnalizado."""
+    chain = _cadena(template, estructurada=True)
+    async with llm_limiter:
+        return await chain.ainvoke(
+            {"text": texto, "esquema": construir_esquema_candidatas(texto)}, config=construir_run_config()
+        )
+
+
+async def analyze_document_long(text: str, economico: bool = False) -> Optional[DocumentoAnalizado]:
+    """
+    Análisis map-reduce para documentos largos.
+
+    1. Selección: se descarta lo menos denso hasta TOTAL_TOKEN_BUDGET (acota el costo).
+    2. Map: el extracto se divide en fragmentos de TOKEN_BUDGET tokens que se
+       resumen en paralelo bajo el limitador global.
+    3. Reduce: los resúmenes parciales se fusionan en un único análisis estructurado.
+
+    Si el extracto cabe en un solo fragmento se hace una sola llamada (sin reduce).
+    Con `economico` (presupuesto soft superado) siempre es una sola llamada
+    sobre el extracto de TOKEN_BUDGET.
+
+    Retorna None si ningún fragmento tiene especificaciones técnicas, incluido
+    el caso en que la selección local no encuentra ninguno (sin llamar al LLM).
+    """
+    seleccion = seleccionar_contenido(text, TOKEN_BUDGET if economico else TOTAL_TOKEN_BUDGET)
+    if not seleccion.strip():
+        return None
+    if economico or estimar_tokens(seleccion) <= TOKEN_BUDGET:
+        return await _ainvoke_estructurado(ANALYSIS_PROMPT, seleccion)
+
+    chunks = dividir_en_chunks(seleccion, TOKEN_BUDGET)
+    parciales: List[str] = await asyncio.gather(*[
+        _ainvoke(MAP_PROMPT, {"indice": i + 1, "total": len(chunks), "text": chunk})
+        for i, chunk in enumerate(chunks)
+    ])
+
+    utiles = [p for p in parciales if "SIN ESPECIFICACIONES" not in p.upper()]
+    if not utiles:
+        return None
+
+    fusion = "\n\n".join(f"--- Fragmento {i + 1} ---\n{p}" for i, p in enumerate(utiles))
+    return await _ainvoke_estructurado(REDUCE_PROMPT, fusion)
+
+
+# Marca en el cache de un documento sin especificaciones (no se vuelve a analizar)
+SIN_ESPECIFICACIONES = {"sin_especificaciones": True}
+
+# Cualquier cambio de prompt, modelo, selección o formato del cache genera una versión nueva
+ANALYSIS_VERSION = version_analisis(
+    ANALYSIS_PROMPT, MAP_PROMPT, REDUCE_PROMPT, ANALYSIS_MODEL, SELECTION_VERSION,
+    str(TOKEN_BUDGET), str(TOTAL_TOKEN_BUDGET), str(DocumentoAnalizado.model_json_schema()),
+    str(SIN_ESPECIFICACIONES), "seleccion-vacia-sin-llm",
+)
+
+
+async def analyze_document_cached(
+    text: str, doc_hash: str, extraction_version: str, economico: bool = False
+) -> Tuple[Optional[DocumentoAnalizado], bool]:
+    """
+    Versión cacheada de analyze_document_long, indexada por el hash del archivo.
+    El análisis depende también de la versión de extracción (el texto de entrada)
+    y de la versión del YAML de estandarización (el esquema del prompt).
+    El análisis económico (sin map-reduce) no se guarda: una subida posterior
+    con presupuesto disponible obtiene el análisis completo.
+
+    Returns:
+        (documento, desde_cache); documento es None si no hay especificaciones
+    """
+    version = f"{extraction_version}-{ANALYSIS_VERSION}-{obtener_config().version}"
+    cacheado: Dict[str, Any] = document_cache.get_resumen(doc_hash, version)
+    if cacheado == SIN_ESPECIFICACIONES:
+        return None, True
+    if cacheado is not None:
+        return DocumentoAnalizado(**cacheado), True
+
+    documento = await analyze_document_long(text, economico=economico)
+    if not economico:
+        document_cache.set_resumen(doc_hash, version, documento.model_dump() if documento else SIN_ESPECIFICACIONES)
+    return documento, False
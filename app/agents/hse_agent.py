@@ -1,19 +1,23 @@
 
-from langchain.agents import create_agent
+from functools import lru_cache
 from app.schemas.hse_schemas import IncidentAnalysisResponse
 from app.prompts.hse_prompts import HSE_5PORQUE_SYSTEM_PROMPT
 
-def get_hse_agent():
+@lru_cache(maxsize=4)
+def get_hse_agent(modelo: str):
     """
     Crea un Agente HSE siguiendo las mejores prácticas de la documentación:
     1. Uso de 'create_agent' para producción.
     2. Salida estructurada nativa (Structured Output) vía 'response_format'.
-    3. Uso de modelo Claude estándar.
+    3. Modelo según config/ruteo_modelos.yaml (lo decide el router).
+    4. Compilado una vez por proceso y modelo (import de langchain diferido).
     """
+    from langchain.agents import create_agent
+    from app.services.llm_utils import crear_modelo_chat
 
     # Creamos el agente
     agent = create_agent(
-        model="claude-3-haiku-20240307", #"claude-sonnet-4-5-20250929",
+        model=crear_modelo_chat(modelo),
         tools=[], 
         system_prompt=HSE_5PORQUE_SYSTEM_PROMPT,
         response_format=IncidentAnalysisResponse
@@ -0,0 +1,380 @@
+"""
+Analítica del historial del chatbot de solicitud de artículos.
+==============================================================
+Recorre en streaming el JSONL activo y sus rotados (.jsonl.gz) en memoria
+acotada y reporta, en JSON para dashboards:
+- turnos hasta completar y tasa de conversaciones completadas (por tipo),
+- uso de opciones (mostradas y elegidas),
+- throughput por hora,
+- patrones de conversación más lentos (latencia por acción / turno).
+
+Un índice de fechas (min/max por archivo y offset del primer registro de cada
+día en los no comprimidos) permite saltar archivos y posicionarse en el día
+inicial de un rango. Se actualiza incrementalmente en cada ejecución.
+
+Uso:
+    python -m app.cli.historial
+    python -m app.cli.historial --desde 2025-01-01 --hasta 2025-02-01
+    python -m app.cli.historial --desde 2025-01-31T08 --top 5 --indent 2 > reporte.json
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.historial import BASE_DIR, HISTORIAL_PATH, archivos_historial
+
+INDICE_PATH = BASE_DIR / "cache" / "historial_indice.json"
+VERSION_INDICE = 1
+
+# Cotas de memoria del análisis
+MAX_CONVERSACIONES_ABIERTAS = 10_000   # conversaciones recordadas para enlazar opciones
+MAX_MUESTRAS_LATENCIA = 2_000          # reservorio por patrón
+MAX_OPCIONES_DISTINTAS = 5_000
+
+
+# --- Lectura ---
+
+def _leer(ruta: Path, offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """(offset, línea) de un archivo; los .gz se leen completos (sin seek)."""
+    if ruta.suffix == ".gz":
+        with gzip.open(ruta, "rb") as f:
+            for linea in f:
+                yield -1, linea
+        return
+    with open(ruta, "rb") as f:
+        f.seek(offset)
+        pos = offset
+        for linea in f:
+            yield pos, linea
+            pos += len(linea)
+
+
+def _registro(linea: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        registro = json.loads(linea)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return registro if isinstance(registro, dict) and isinstance(registro.get("timestamp"), str) else None
+
+
+# --- Índice de fechas ---
+
+def _firma(ruta: Path) -> Dict[str, Any]:
+    st = ruta.stat()
+    return {"tam": st.st_size, "mtime": st.st_mtime, "inodo": st.st_ino}
+
+
+def _indexar(ruta: Path, previa: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Entrada de índice de un archivo. Un .jsonl que solo creció (mismo inodo)
+    se indexa desde el tamaño anterior; si no, desde el inicio.
+    """
+    firma = _firma(ruta)
+    comprimido = ruta.suffix == ".gz"
+    incremental = (
+        previa is not None and not comprimido
+        and previa.get("inodo") == firma["inodo"] and previa.get("tam", 0) <= firma["tam"]
+    )
+    entrada = dict(previa) if incremental else {"desde": None, "hasta": None, "lineas": 0, "dias": {}}
+    inicio = previa["tam"] if incremental else 0
+    for offset, linea in _leer(ruta, inicio):
+        registro = _registro(linea)
+        if registro is None:
+            continue
+        ts = registro["timestamp"]
+        entrada["lineas"] += 1
+        entrada["desde"] = min(entrada["desde"] or ts, ts)
+        entrada["hasta"] = max(entrada["hasta"] or ts, ts)
+        if not comprimido:
+            entrada["dias"].setdefault(ts[:10], offset)
+    entrada.update(firma)
+    return entrada
+
+
+def actualizar_indice(archivos: List[Path], ruta_indice: Path) -> Dict[str, Dict[str, Any]]:
+    """Índice {nombre de archivo: entrada}, recalculando solo los archivos que cambiaron."""
+    try:
+        previo = json.loads(ruta_indice.read_text(encoding="utf-8"))
+        previo = previo["archivos"] if previo.get("version") == VERSION_INDICE else {}
+    except (OSError, ValueError, KeyError):
+        previo = {}
+
+    indice = {}
+    for ruta in archivos:
+        entrada = previo.get(ruta.name)
+        firma = _firma(ruta)
+        if entrada is None or any(entrada.get(k) != v for k, v in firma.items()):
+            entrada = _indexar(ruta, entrada)
+        indice[ruta.name] = entrada
+
+    try:
+        ruta_indice.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ruta_indice.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": VERSION_INDICE, "archivos": indice}), encoding="utf-8")
+        os.replace(tmp, ruta_indice)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el índice {ruta_indice}: {e}", file=sys.stderr)
+    return indice
+
+
+def _offset_inicial(entrada: Dict[str, Any], desde: Optional[str]) -> int:
+    """Offset del primer registro del día `desde` (o del primer día posterior) en un .jsonl."""
+    if not desde:
+        return 0
+    posteriores = [offset for dia, offset in (entrada.get("dias") or {}).items() if dia >= desde[:10]]
+    return min(posteriores) if posteriores else entrada.get("tam", 0)
+
+
+# --- Agregación ---
+
+def _percentil(ordenados: List[float], p: float) -> Optional[float]:
+    if not ordenados:
+        return None
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+
+def _percentil_histograma(histograma: Counter, p: float) -> Optional[int]:
+    total = sum(histograma.values())
+    acumulado = 0
+    for valor in sorted(histograma):
+        acumulado += histograma[valor]
+        if acumulado >= total * p:
+            return valor
+    return None
+
+
+def _bucket_turno(turno: int) -> str:
+    return str(turno) if turno <= 3 else ("4-5" if turno <= 5 else "6+")
+
+
+class Analitica:
+    """Acumuladores del reporte; memoria acotada sin importar el tamaño del historial."""
+
+    def __init__(self, semilla: int = 0):
+        self.turnos = 0
+        self.primer: Optional[str] = None
+        self.ultimo: Optional[str] = None
+        self.iniciadas = 0
+        self.completadas = 0
+        self.turnos_hasta_completar: Counter = Counter()
+        self.por_tipo: Dict[str, Counter] = defaultdict(Counter)
+        self.con_opciones = 0
+        self.total_opciones = 0
+        self.respuestas_a_opciones = 0
+        self.opciones_elegidas = 0
+        self.opciones_mostradas: Counter = Counter()
+        self.opciones_elegidas_top: Counter = Counter()
+        self.por_hora: Counter = Counter()
+        self.latencias: Dict[Tuple[str, str, str], List[float]] = defaultdict(list)
+        self.vistos: Counter = Counter()
+        # conversación -> opciones mostradas en su último turno
+        self._abiertas: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._azar = random.Random(semilla)
+
+    @staticmethod
+    def _turno(registro: Dict[str, Any]) -> int:
+        if isinstance(registro.get("turno"), int):
+            return registro["turno"]
+        # Registros anteriores a `turno`: se deduce del contexto
+        contexto = registro.get("contexto_previo") or []
+        return 1 + sum(1 for m in contexto if isinstance(m, dict) and m.get("rol") == "usuario")
+
+    @staticmethod
+    def _conversacion(registro: Dict[str, Any]) -> str:
+        if registro.get("sesion_id"):
+            return str(registro["sesion_id"])
+        # Sin sesión: la conversación se identifica por su primer mensaje
+        contexto = registro.get("contexto_previo") or []
+        primero = next((m.get("contenido") for m in contexto if isinstance(m, dict) and m.get("rol") == "usuario"), None)
+        return str(primero if primero is not None else registro.get("usuario"))
+
+    def agregar(self, registro: Dict[str, Any]) -> None:
+        ts = registro["timestamp"]
+        self.turnos += 1
+        self.primer = min(self.primer or ts, ts)
+        self.ultimo = max(self.ultimo or ts, ts)
+        self.por_hora[ts[:13]] += 1
+
+        turno = self._turno(registro)
+        if turno == 1:
+            self.iniciadas += 1
+        completado = registro.get("estado_final") == "listo"
+        if completado:
+            self.completadas += 1
+            self.turnos_hasta_completar[turno] += 1
+            tipo = registro.get("tipo") or "sin_tipo"
+            self.por_tipo[tipo]["completadas"] += 1
+            self.por_tipo[tipo]["turnos"] += turno
+
+        # Opciones: ¿el mensaje del usuario eligió una de las del turno anterior?
+        conversacion = self._conversacion(registro)
+        anteriores = self._abiertas.pop(conversacion, None)
+        if anteriores:
+            self.respuestas_a_opciones += 1
+            usuario = str(registro.get("usuario", "")).strip().lower()
+            elegida = next((o for o in anteriores if str(o).strip().lower() == usuario), None)
+            if elegida is not None:
+                self.opciones_elegidas += 1
+                self._contar(self.opciones_elegidas_top, str(elegida))
+        opciones = registro.get("opciones_mostradas") or []
+        if opciones:
+            self.con_opciones += 1
+            self.total_opciones += len(opciones)
+            for opcion in opciones:
+                self._contar(self.opciones_mostradas, str(opcion))
+        if opciones and not completado:
+            self._abiertas[conversacion] = opciones
+            if len(self._abiertas) > MAX_CONVERSACIONES_ABIERTAS:
+                self._abiertas.popitem(last=False)
+
+        if isinstance(registro.get("duracion_ms"), (int, float)):
+            patron = (
+                str(registro.get("accion_sugerida") or "?"),
+                "con_opciones" if opciones else "texto",
+                _bucket_turno(turno),
+            )
+            self._muestrear(patron, float(registro["duracion_ms"]))
+
+    @staticmethod
+    def _contar(contador: Counter, clave: str) -> None:
+        contador[clave] += 1
+        if len(contador) > MAX_OPCIONES_DISTINTAS:
+            # Se conservan las más frecuentes (aproximado, como un top-k)
+            for clave_rara, _ in contador.most_common()[MAX_OPCIONES_DISTINTAS // 2:]:
+                del contador[clave_rara]
+
+    def _muestrear(self, patron: Tuple[str, str, str], valor: float) -> None:
+        """Reservoir sampling por patrón: percentiles con memoria acotada."""
+        self.vistos[patron] += 1
+        muestras = self.latencias[patron]
+        if len(muestras) < MAX_MUESTRAS_LATENCIA:
+            muestras.append(valor)
+        else:
+            i = self._azar.randrange(self.vistos[patron])
+            if i < MAX_MUESTRAS_LATENCIA:
+                muestras[i] = valor
+
+    def reporte(self, top: int) -> Dict[str, Any]:
+        completadas = sum(self.turnos_hasta_completar.values())
+        horas_activas = len(self.por_hora) or 1
+        pico = max(self.por_hora.items(), key=lambda t: t[1], default=(None, 0))
+        por_hora_del_dia = Counter()
+        for hora, n in self.por_hora.items():
+            por_hora_del_dia[hora[11:13]] += n
+
+        patrones = []
+        for (accion, opciones, turno), muestras in self.latencias.items():
+            ordenadas = sorted(muestras)
+            patrones.append({
+                "accion_sugerida": accion,
+                "respuesta": opciones,
+                "turno": turno,
+                "turnos": self.vistos[(accion, opciones, turno)],
+                "promedio_ms": round(sum(ordenadas) / len(ordenadas), 1),
+                "p50_ms": _percentil(ordenadas, 0.5),
+                "p95_ms": _percentil(ordenadas, 0.95),
+                "max_ms": ordenadas[-1],
+            })
+        patrones.sort(key=lambda p: -p["p95_ms"])
+
+        return {
+            "turnos": self.turnos,
+            "primer_registro": self.primer,
+            "ultimo_registro": self.ultimo,
+            "conversaciones": {
+                "iniciadas": self.iniciadas,
+                "completadas": self.completadas,
+                "tasa_completado": round(self.completadas / self.iniciadas, 4) if self.iniciadas else None,
+                "turnos_hasta_completar": {
+                    "promedio": round(sum(t * n for t, n in self.turnos_hasta_completar.items()) / completadas, 2)
+                    if completadas else None,
+                    "p50": _percentil_histograma(self.turnos_hasta_completar, 0.5),
+                    "p90": _percentil_histograma(self.turnos_hasta_completar, 0.9),
+                    "distribucion": {str(t): n for t, n in sorted(self.turnos_hasta_completar.items())},
+                },
+                "por_tipo": {
+                    tipo: {"completadas": c["completadas"], "turnos_promedio": round(c["turnos"] / c["completadas"], 2)}
+                    for tipo, c in sorted(self.por_tipo.items(), key=lambda t: -t[1]["completadas"])
+                },
+            },
+            "opciones": {
+                "turnos_con_opciones": self.con_opciones,
+                "tasa_turnos_con_opciones": round(self.con_opciones / self.turnos, 4) if self.turnos else None,
+                "promedio_opciones": round(self.total_opciones / self.con_opciones, 2) if self.con_opciones else None,
+                "respuestas_a_opciones": self.respuestas_a_opciones,
+                "tasa_eleccion": round(self.opciones_elegidas / self.respuestas_a_opciones, 4)
+                if self.respuestas_a_opciones else None,
+                "mas_mostradas": dict(self.opciones_mostradas.most_common(top)),
+                "mas_elegidas": dict(self.opciones_elegidas_top.most_common(top)),
+            },
+            "throughput": {
+                "por_hora": dict(sorted(self.por_hora.items())),
+                "por_hora_del_dia": dict(sorted(por_hora_del_dia.items())),
+                "pico": {"hora": pico[0], "turnos": pico[1]},
+                "promedio_por_hora_activa": round(self.turnos / horas_activas, 2),
+            },
+            "patrones_lentos": patrones[:top],
+        }
+
+
+def analizar(
+    ruta: Path, desde: Optional[str] = None, hasta: Optional[str] = None, top: int = 10,
+    ruta_indice: Path = INDICE_PATH,
+) -> Dict[str, Any]:
+    """Reporte del historial en [desde, hasta) (prefijos ISO: '2025-01-31', '2025-01-31T08')."""
+    archivos = archivos_historial(ruta)
+    indice = actualizar_indice(archivos, ruta_indice)
+    analitica = Analitica()
+    leidos, invalidas = [], 0
+    for archivo in archivos:
+        entrada = indice[archivo.name]
+        # El índice descarta archivos fuera del rango sin abrirlos
+        fuera = entrada["lineas"] == 0 or (desde and entrada["hasta"] < desde) or (hasta and entrada["desde"] >= hasta)
+        leidos.append({"archivo": archivo.name, "registros": entrada["lineas"], "leido": not fuera})
+        if fuera:
+            continue
+        offset = 0 if archivo.suffix == ".gz" else _offset_inicial(entrada, desde)
+        for _, linea in _leer(archivo, offset):
+            registro = _registro(linea)
+            if registro is None:
+                invalidas += 1
+                continue
+            ts = registro["timestamp"]
+            if (desde and ts < desde) or (hasta and ts >= hasta):
+                continue
+            analitica.agregar(registro)
+    return {
+        "rango": {"desde": desde, "hasta": hasta},
+        "archivos": leidos,
+        "lineas_invalidas": invalidas,
+        **analitica.reporte(top),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archivo", type=Path, default=HISTORIAL_PATH, help="JSONL activo (los rotados se buscan junto a él)")
+    parser.add_argument("--desde", help="inicio del rango, prefijo ISO incluido (ej: 2025-01-31)")
+    parser.add_argument("--hasta", help="fin del rango, prefijo ISO excluido")
+    parser.add_argument("--top", type=int, default=10, help="cantidad de patrones y opciones a listar")
+    parser.add_argument("--indice", type=Path, default=INDICE_PATH, help="archivo del índice de fechas")
+    parser.add_argument("--indent", type=int, default=None, help="indentación del JSON")
+    args = parser.parse_args(argv)
+
+    if not archivos_historial(args.archivo):
+        print(f"No existe el historial: {args.archivo}", file=sys.stderr)
+        return 1
+
+    reporte = analizar(args.archivo, args.desde, args.hasta, args.top, args.indice)
+    print(json.dumps(reporte, ensure_ascii=False, indent=args.indent))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Ruta crítica de los traces más lentos (spans exportados por app/services/tracing.py).
+=====================================================================================
+Para cada trace muestra en qué se fue el tiempo del request sobre la ruta
+crítica: el modelo (por modelo), cada tool (Defontana, etc.) y el tiempo propio
+del agente / HTTP, más el detalle de tramos en orden.
+
+Uso:
+    python -m app.cli.trazas                       # 5 traces más lentos
+    python -m app.cli.trazas --top 10 --ruta estandarizar
+    python -m app.cli.trazas --json > lentos.json
+"""
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+from app.services.escritor_jsonl import archivos_jsonl
+from app.services.tracing import TRACE_EXPORT_PATH, agrupar_por_trace, desglose_ruta_critica, leer_spans, ruta_critica
+
+
+def _raiz(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ids = {s["spanId"] for s in spans}
+    raices = [s for s in spans if s.get("parentSpanId") not in ids] or spans
+    return min(raices, key=lambda s: (s["startTimeUnixNano"], -(s.get("endTimeUnixNano") or 0)))
+
+
+def _ms(span: Dict[str, Any]) -> float:
+    return ((span.get("endTimeUnixNano") or span["startTimeUnixNano"]) - span["startTimeUnixNano"]) / 1e6
+
+
+def analizar(traces: Dict[str, List[Dict[str, Any]]], top: int, ruta: str = "") -> List[Dict[str, Any]]:
+    """Los `top` traces más lentos (por duración de la raíz) con su ruta crítica."""
+    candidatos = []
+    for trace_id, spans in traces.items():
+        raiz = _raiz(spans)
+        if ruta and ruta not in raiz.get("name", ""):
+            continue
+        candidatos.append((_ms(raiz), trace_id, raiz, spans))
+    candidatos.sort(key=lambda c: -c[0])
+
+    resultado = []
+    for duracion, trace_id, raiz, spans in candidatos[:top]:
+        tramos = ruta_critica(spans)
+        resultado.append({
+            "trace_id": trace_id,
+            "nombre": raiz.get("name"),
+            "duracion_ms": round(duracion, 1),
+            "spans": dict(Counter(s.get("kind", "?") for s in spans)),
+            "error": any((s.get("status") or {}).get("code") == "ERROR" for s in spans),
+            "desglose_ms": {k: round(v, 1) for k, v in desglose_ruta_critica(spans).items()},
+            "ruta_critica": [
+                {
+                    "offset_ms": round((s["startTimeUnixNano"] - raiz["startTimeUnixNano"]) / 1e6, 1),
+                    "nombre": s.get("name"),
+                    "tipo": s.get("kind"),
+                    "ms": round(ms, 1),
+                }
+                for s, ms in tramos
+            ],
+        })
+    return resultado
+
+
+def imprimir(resultado: List[Dict[str, Any]], detalle: bool) -> None:
+    agregado: Dict[str, float] = defaultdict(float)
+    for trace in resultado:
+        total = trace["duracion_ms"] or 1
+        spans = ", ".join(f"{n} {k}" for k, n in sorted(trace["spans"].items()))
+        marca = "  ❌" if trace["error"] else ""
+        print(f"\ntrace {trace['trace_id'][:16]}  {trace['nombre']}  {trace['duracion_ms']:.0f} ms  ({spans}){marca}")
+        for categoria, ms in trace["desglose_ms"].items():
+            agregado[categoria] += ms
+            print(f"    {categoria:<44} {ms:>9.1f} ms  {ms / total:>5.0%}")
+        if detalle:
+            print("  ruta crítica:")
+            for tramo in trace["ruta_critica"]:
+                print(f"    +{tramo['offset_ms']:>9.1f} ms  {tramo['nombre']:<44} {tramo['ms']:>9.1f} ms")
+
+    if len(resultado) > 1:
+        total = sum(agregado.values()) or 1
+        print(f"\nAGREGADO ({len(resultado)} traces)")
+        for categoria, ms in sorted(agregado.items(), key=lambda t: -t[1]):
+            print(f"    {categoria:<44} {ms:>9.1f} ms  {ms / total:>5.0%}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archivo", type=Path, default=TRACE_EXPORT_PATH, help="JSONL de spans (incluye sus rotados)")
+    parser.add_argument("--top", type=int, default=5, help="cantidad de traces más lentos")
+    parser.add_argument("--ruta", default="", help="filtrar por texto en el nombre del span raíz (ej: estandarizar)")
+    parser.add_argument("--sin-detalle", action="store_true", help="solo el desglose por categoría")
+    parser.add_argument("--json", action="store_true", help="salida JSON")
+    args = parser.parse_args(argv)
+
+    archivos = archivos_jsonl(args.archivo)
+    if not archivos:
+        print(f"No existe el archivo de trazas: {args.archivo}", file=sys.stderr)
+        return 1
+
+    # Activo más rotados (.gz): un trace puede quedar repartido en dos archivos
+    spans = (span for archivo in archivos for span in leer_spans(archivo))
+    resultado = analizar(agrupar_por_trace(spans), args.top, args.ruta)
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    else:
+        imprimir(resultado, detalle=not args.sin_detalle)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
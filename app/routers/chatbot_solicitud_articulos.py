@@ -1,10 +1,24 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
 from app.schemas.chatbot_solicitud_articulos_schemas import ArticuloRequest, ArticuloResponse
 from app.agents.chatbot_solicitud_articulos_agent import get_estandarizacion_agent
-from app.services.document_service import extract_text_from_file
-from app.agents.document_analyst import analyze_document_content
-from langchain_core.messages import HumanMessage, AIMessage
+from app.services.document_service import extract_text_cached, EXTRACTION_VERSION
+from app.services.document_cache import hash_contenido
+from app.services.document_jobs import document_job_runner, document_job_store, ESTADOS_FINALES
+from app.agents.document_analyst import analyze_document_cached, formatear_resumen
+from app.services.chatbot_solicitud_articulos.estandarizacion_service import prellenar_campos
+from app.services.chatbot_solicitud_articulos.categorias_service import obtener_reglas_categoria
+from app.services.costos import HARD, OK, contexto_costo, evaluar_presupuesto
+from app.services.historial import escritor_historial
+from app.services.logging_json import request_id_actual
+from app.services.llm_utils import invocar_agente
+from app.services.metrics import agente_pasos
+from app.services.ruteo_modelos import decidir_modelo, fallos_validacion, registrar_turno, senales_estandarizacion
+from datetime import datetime
 from typing import List
+import asyncio
+import json
+import time
 import uuid
 
 router = APIRouter()
@@ -12,14 +26,66 @@ router = APIRouter()
 # Almacenamiento temporal de conversaciones (en producción usar Redis)
 conversaciones = {}
 
+# Clave de las reglas en config/ruteo_modelos.yaml
+ENDPOINT_ESTANDARIZAR = "/chatbot-solicitud-articulos/estandarizar"
+
+
+def _contexto_prellenado(prellenado: dict) -> str:
+    """
+    Bloque de contexto para el agente con los slots ya resueltos desde un documento,
+    de modo que no vuelva a preguntar lo que ya se conoce.
+    """
+    tipo = prellenado["tipo"]
+    lineas = [
+        "[DATOS PRE-CARGADOS DESDE DOCUMENTO]",
+        f"Categoría confirmada: {tipo}",
+    ]
+    if prellenado["campos"]:
+        lineas.append("Campos ya conocidos (NO volver a preguntarlos):")
+        lineas += [f"- {campo}: {valor}" for campo, valor in prellenado["campos"].items()]
+    if prellenado["campos_faltantes"]:
+        campos_config = (obtener_reglas_categoria(tipo) or {}).get("campos", {})
+        lineas.append("Campos faltantes (preguntar solo estos):")
+        for campo in prellenado["campos_faltantes"]:
+            valores = campos_config.get(campo, {}).get("valores_estandar") or []
+            lineas.append(f"- {campo}" + (f" (opciones: {', '.join(map(str, valores))})" if valores else ""))
+    if prellenado["nombre_propuesto"]:
+        lineas.append(f"Nombre propuesto (todos los campos completos): {prellenado['nombre_propuesto']}")
+    return "\n".join(lineas)
+
+
 @router.post("/estandarizar", response_model=ArticuloResponse)
 async def estandarizar_articulo(request: ArticuloRequest):
     """
     Endpoint principal para estandarizar artículos mediante chat.
     Recibe descripción en lenguaje natural y retorna nombre estandarizado.
     """
+    inicio = time.perf_counter()
+    # El costo de la conversación se acumula por sesion_id (si el cliente lo envía)
+    ctx = contexto_costo()
+    if ctx is not None and request.sesion_id:
+        ctx.sesion = request.sesion_id
+    # Clave de los fallos de validación: sesion_id o la sesión del proxy confiable (ver ruteo_modelos)
+    sesion = ctx.sesion if ctx is not None else request.sesion_id
+    presupuesto = await asyncio.to_thread(evaluar_presupuesto)
+    if presupuesto.nivel == HARD:
+        raise HTTPException(status_code=402, detail=presupuesto.motivo)
+
+    decision = None
     try:
-        agent = get_estandarizacion_agent()
+        # Slots pre-llenados desde un documento: se re-validan contra el YAML
+        # (el cliente pudo editarlos) y se inyectan como contexto antes del mensaje.
+        prellenado = prellenar_campos(request.prellenado.tipo, request.prellenado.campos) if request.prellenado else None
+
+        # Modelo del turno: rutinario salvo que las señales pidan escalar (ver ruteo_modelos.py).
+        # Sobre el presupuesto soft manda el modelo económico (ruta "degradado").
+        senales = senales_estandarizacion(request.mensaje, request.contexto_conversacion, prellenado, sesion)
+        decision = decidir_modelo(ENDPOINT_ESTANDARIZAR, senales, presupuesto=presupuesto)
+        if ctx is not None:
+            ctx.ruta = decision.ruta
+        agent = get_estandarizacion_agent(decision.modelo)
+        # Import diferido: langchain se carga en el warm-up, no al importar el router
+        from langchain_core.messages import AIMessage, HumanMessage
         
         # Construir mensajes del historial si existe
         messages = []
@@ -30,11 +96,20 @@ async def estandarizar_articulo(request: ArticuloRequest):
                 else:
                     messages.append(AIMessage(content=msg.get("contenido", "")))
         
+        if prellenado:
+            messages.append(HumanMessage(content=_contexto_prellenado(prellenado)))
+
         # Agregar mensaje actual
         messages.append(HumanMessage(content=request.mensaje))
         
-        # Invocar al agente
-        result = agent.invoke({"messages": messages})
+        # Invocar al agente (comparte el cupo de LLM con el análisis de documentos).
+        # El turno es síncrono (LLM + tools HTTP): en un hilo para no bloquear el event loop
+        result = await asyncio.to_thread(invocar_agente, agent, {"messages": messages})
+        agente_pasos.observar(
+            sum(isinstance(m, AIMessage) for m in result["messages"][len(messages):]), "estandarizacion"
+        )
+        # Fallos de construir_nombre_estandar de este turno: señal de escalamiento del siguiente
+        fallos_validacion.actualizar(sesion, result["messages"][len(messages):])
         
         # Extraer respuesta estructurada
         last_message = result["messages"][-1]
@@ -112,34 +187,29 @@ async def estandarizar_articulo(request: ArticuloRequest):
              else:
                  response_text = "Por favor selecciona una opción:"
 
+        duracion = time.perf_counter() - inicio
+
         # --- LOGGING ---
-        try:
-            import json
-            from datetime import datetime
-            from pathlib import Path
-
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "usuario": request.mensaje,
-                "contexto_previo": request.contexto_conversacion,
-                "ia_respuesta": response_text,
-                "opciones_mostradas": opciones_sugeridas,
-                "permitir_input": permitir_input,
-                "accion_sugerida": action,
-                "estado_final": "listo" if listo_para_crear else "en_proceso"
-            }
-            
-            # Guardar en logs/historial_chatbot_solicitud_articulos.jsonl
-            log_path = Path("logs/historial_chatbot_solicitud_articulos.jsonl")
-            
-            # Asegurar que el directorio existe (seguridad extra)
-            log_path.parent.mkdir(exist_ok=True)
-            
-            with open(log_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
-                
-        except Exception as e:
-            print(f"Error guardando log: {e}")
+        # Solo se encola: la escritura (lotes, rotación, fsync) va en el hilo del escritor
+        escritor_historial.registrar({
+            "timestamp": datetime.now().isoformat(),
+            "sesion_id": request.sesion_id,
+            "request_id": request_id_actual(),
+            # Turno del usuario en la conversación (1 = primer mensaje)
+            "turno": senales.turno,
+            "duracion_ms": round(duracion * 1000, 1),
+            "modelo": decision.modelo,
+            "ruta": decision.ruta,
+            "motivo_ruta": decision.motivo,
+            "tipo": articulo_identificado.tipo.value if articulo_identificado else None,
+            "usuario": request.mensaje,
+            "contexto_previo": request.contexto_conversacion,
+            "ia_respuesta": response_text,
+            "opciones_mostradas": opciones_sugeridas,
+            "permitir_input": permitir_input,
+            "accion_sugerida": action,
+            "estado_final": "listo" if listo_para_crear else "en_proceso"
+        })
         # ----------------
 
         return ArticuloResponse(
@@ -155,35 +225,144 @@ async def estandarizar_articulo(request: ArticuloRequest):
     except Exception as e:
         print(f"Error en estandarización: {e}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    finally:
+        # Los turnos fallidos también cuentan en la latencia y el costo por ruta
+        if decision is not None:
+            registrar_turno(decision, time.perf_counter() - inicio, ctx.costo_usd if ctx is not None else 0.0)
 
 
-@router.post("/analizar-documento")
-async def analizar_documento(file: UploadFile = File(...)):
+async def _sin_etapa(etapa: str) -> None:
+    pass
+
+
+async def _procesar_documento(content: bytes, filename: str, reportar_etapa=None) -> dict:
     """
-    Recibe un archivo (PDF/TXT), extrae su contenido y genera un resumen técnico 
-    estructurado para ser inyectado en el contexto del chat.
+    Pipeline compartido por el endpoint síncrono y los jobs asíncronos:
+    extracción (cacheada) + análisis con IA (cacheado).
     """
+    reportar_etapa = reportar_etapa or _sin_etapa
+
+    # 1. Extraer texto crudo (cache por SHA-256 del archivo). El parseo es CPU-bound:
+    #    se ejecuta en un hilo para no bloquear el event loop.
+    await reportar_etapa("extrayendo_texto")
+    doc_hash = hash_contenido(content)
     try:
-        # 1. Extraer texto crudo
-        raw_text = await extract_text_from_file(file)
-        
-        if not raw_text or len(raw_text) < 10:
-             raise HTTPException(status_code=400, detail="No se pudo extraer texto legible del archivo.")
+        raw_text = await asyncio.to_thread(extract_text_cached, content, filename, doc_hash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # 2. Analizar con IA especializada (barata/rápida)
-        analysis_summary = analyze_document_content(raw_text)
-        
+    if not raw_text or len(raw_text) < 10:
+         raise HTTPException(status_code=400, detail="No se pudo extraer texto legible del archivo.")
+
+    # 2. Analizar con IA especializada (barata/rápida). Una re-subida no toca el LLM.
+    #    Sobre el presupuesto soft se omite el map-reduce; sobre el hard se rechaza.
+    presupuesto = await asyncio.to_thread(evaluar_presupuesto)
+    if presupuesto.nivel == HARD:
+        raise HTTPException(status_code=402, detail=presupuesto.motivo)
+    await reportar_etapa("analizando")
+    documento, desde_cache = await analyze_document_cached(
+        raw_text, doc_hash, EXTRACTION_VERSION, economico=presupuesto.nivel != OK
+    )
+    if documento is None:
+        # Sin especificaciones: nada que pre-llenar ni que sugerir como mensaje técnico
         return {
-            "filename": file.filename,
-            "resumen_tecnico": analysis_summary,
-            "mensaje_sugerido": f"He adjuntado el documento '{file.filename}'. Aquí están los detalles técnicos detectados:\n\n{analysis_summary}"
+            "filename": filename,
+            "hash": doc_hash,
+            "desde_cache": desde_cache,
+            "sin_especificaciones": True,
+            "resumen_tecnico": "",
+            "analisis": None,
+            "prellenado": None,
+            "mensaje_sugerido": f"He adjuntado el documento '{filename}', pero no se detectaron especificaciones técnicas en él."
         }
+    analysis_summary = formatear_resumen(documento)
+
+    return {
+        "filename": filename,
+        "hash": doc_hash,
+        "desde_cache": desde_cache,
+        "sin_especificaciones": False,
+        "resumen_tecnico": analysis_summary,
+        "analisis": documento.model_dump(),
+        # Slots listos para enviar en ArticuloRequest.prellenado (None si no hay categoría válida)
+        "prellenado": prellenar_campos(documento.categoria, documento.campos),
+        "mensaje_sugerido": f"He adjuntado el documento '{filename}'. Aquí están los detalles técnicos detectados:\n\n{analysis_summary}"
+    }
+
+
+@router.post("/analizar-documento")
+async def analizar_documento(file: UploadFile = File(...)):
+    """
+    Recibe un archivo (PDF/DOCX/XLSX/CSV/TXT), extrae su contenido y genera un resumen técnico 
+    estructurado para ser inyectado en el contexto del chat.
+    """
+    try:
+        content = await file.read()
+        return await _procesar_documento(content, file.filename)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error procesando documento: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analizar-documento/jobs", status_code=202)
+async def crear_job_documento(request: Request, file: UploadFile = File(...)):
+    """
+    Versión asíncrona de /analizar-documento: responde de inmediato con un job_id
+    y procesa el archivo en segundo plano (evita timeouts del proxy de Laravel).
+    Consultar el resultado con GET /analizar-documento/jobs/{job_id}
+    o seguir el progreso vía SSE en /analizar-documento/jobs/{job_id}/eventos.
+    """
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail="El archivo está vacío.")
+
+    job_id = await document_job_runner.enviar(content, file.filename, _procesar_documento)
+    return {
+        "job_id": job_id,
+        "estado": "pendiente",
+        "url_estado": request.url_for("obtener_job_documento", job_id=job_id).path,
+    }
+
+
+@router.get("/analizar-documento/jobs/{job_id}")
+async def obtener_job_documento(job_id: str):
+    """Estado y resultado de un job de análisis de documento."""
+    job = await asyncio.to_thread(document_job_store.obtener, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado o expirado.")
+    return job
+
+
+@router.get("/analizar-documento/jobs/{job_id}/eventos")
+async def eventos_job_documento(job_id: str):
+    """
+    Progreso del job como Server-Sent Events. Emite un evento por cada cambio
+    de etapa y cierra el stream al completar o fallar.
+    """
+    if await asyncio.to_thread(document_job_store.obtener, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado o expirado.")
+
+    async def stream():
+        ultimo = None
+        while True:
+            job = await asyncio.to_thread(document_job_store.obtener, job_id)
+            if job is None:
+                yield "event: error\ndata: {\"error\": \"Job expirado\"}\n\n"
+                return
+            firma = (job["estado"], job["etapa"])
+            if firma != ultimo:
+                ultimo = firma
+                yield f"event: {job['estado']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            if job["estado"] in ESTADOS_FINALES:
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
 @router.post("/validar-duplicado")
 async def validar_duplicado(nombre: str):
     """
@@ -192,7 +371,8 @@ async def validar_duplicado(nombre: str):
     try:
         from app.tools.chatbot_articulo_tools import buscar_articulos_defontana
         
-        resultados = buscar_articulos_defontana.invoke(nombre)
+        # Llamada HTTP síncrona a Defontana: fuera del event loop
+        resultados = await asyncio.to_thread(buscar_articulos_defontana.invoke, nombre)
         
         return {
             "existe_similar": len(resultados) > 0,
@@ -0,0 +1,64 @@
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app.services import costos
+from app.services.costos import AGRUPACIONES, HEADER_PROXY_SECRET, ContextoCosto, evaluar_presupuesto
+
+
+def verificar_proxy(request: Request) -> None:
+    """El gasto de todos los tenants solo se expone al proxy (secreto compartido, ver costos.py)."""
+    if not costos.proxy_confiable(request.headers):
+        raise HTTPException(status_code=403, detail=f"Requiere el header {HEADER_PROXY_SECRET} del proxy")
+
+
+router = APIRouter(dependencies=[Depends(verificar_proxy)])
+
+
+def _timestamp(fecha: Optional[str]) -> Optional[float]:
+    """Fecha ISO (2025-01-31 o 2025-01-31T12:00:00, UTC si no trae zona) a epoch."""
+    if not fecha:
+        return None
+    try:
+        dt = datetime.fromisoformat(fecha)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida: {fecha}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+@router.get("/totales")
+def totales(
+    agrupar: str = Query("tenant", description=f"Agrupación: {', '.join(AGRUPACIONES)}"),
+    tenant: Optional[str] = None,
+    sesion: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    modelo: Optional[str] = None,
+    ruta: Optional[str] = Query(None, description="Ruta del ruteo de modelos: rutinario | escalado"),
+    desde: Optional[str] = Query(None, description="Fecha ISO inicial (incluida)"),
+    hasta: Optional[str] = Query(None, description="Fecha ISO final (excluida)"),
+):
+    """Tokens y costo USD de las llamadas al LLM, agrupados y filtrados."""
+    if agrupar not in AGRUPACIONES:
+        raise HTTPException(status_code=400, detail=f"agrupar debe ser uno de: {', '.join(AGRUPACIONES)}")
+    filas = costos.cost_store.totales(
+        agrupar,
+        tenant=tenant, sesion=sesion, endpoint=endpoint, modelo=modelo, ruta=ruta,
+        desde=_timestamp(desde), hasta=_timestamp(hasta),
+    )
+    return {
+        "agrupar": agrupar,
+        "costo_total_usd": round(sum(f["costo_usd"] for f in filas), 6),
+        "llamadas": sum(f["llamadas"] for f in filas),
+        "grupos": filas,
+    }
+
+
+@router.get("/presupuesto")
+def presupuesto(tenant: str = "sin_tenant", sesion: Optional[str] = None):
+    """Gasto del día del tenant y de la sesión, y el nivel de presupuesto resultante."""
+    estado = evaluar_presupuesto(ContextoCosto(endpoint="/costos/presupuesto", tenant=tenant, sesion=sesion))
+    return {"tenant": tenant, "sesion": sesion, **asdict(estado)}
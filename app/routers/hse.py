@@ -1,17 +1,34 @@
 from fastapi import APIRouter, HTTPException
 from app.schemas.hse_schemas import IncidentRequest, IncidentAnalysisResponse
 from app.agents.hse_agent import get_hse_agent
-from langchain.messages import HumanMessage
-from langchain_core.runnables import RunnableConfig
+from app.services.costos import HARD, contexto_costo, evaluar_presupuesto
+from app.services.llm_utils import invocar_agente
+from app.services.ruteo_modelos import decidir_modelo, registrar_turno
+import asyncio
+import time
 import uuid
 
 router = APIRouter()
 
+# Clave de las reglas en config/ruteo_modelos.yaml
+ENDPOINT_5_PORQUES = "/hse/5-porques"
+
 @router.post("/5-porques", response_model=IncidentAnalysisResponse)
 async def generar_analisis(data: IncidentRequest):
+    inicio = time.perf_counter()
+    # Presupuesto del tenant: hard rechaza, soft usa el modelo económico
+    presupuesto = await asyncio.to_thread(evaluar_presupuesto)
+    if presupuesto.nivel == HARD:
+        raise HTTPException(status_code=402, detail=presupuesto.motivo)
+
+    ctx = contexto_costo()
+    decision = None
     try:
-        # 1. Preparar el agente (Production Ready)
-        agent = get_hse_agent()
+        # 1. Preparar el agente (Production Ready). Modelo según config/ruteo_modelos.yaml y el presupuesto
+        decision = decidir_modelo(ENDPOINT_5_PORQUES, presupuesto=presupuesto)
+        if ctx is not None:
+            ctx.ruta = decision.ruta
+        agent = get_hse_agent(decision.modelo)
         
         # 2. Construir el contexto
         incident_context = f"""
@@ -32,9 +49,10 @@ async def generar_analisis(data: IncidentRequest):
 
         # 4. Invocar al agente
         # Gracias a response_format, el resultado ya viene estructurado en 'structured_response'
-        result = agent.invoke(
-            {"messages": [HumanMessage(content=incident_context)]}
-        )
+        # Import diferido: langchain se carga en el warm-up, no al importar el router
+        from langchain_core.messages import HumanMessage
+        # Turno síncrono del agente: en un hilo para no bloquear el event loop
+        result = await asyncio.to_thread(invocar_agente, agent, {"messages": [HumanMessage(content=incident_context)]})
         
         # 5. Extraer respuesta estructurada (Best Practice: No parsing manual)
         structured_data = result.get("structured_response")
@@ -48,3 +66,6 @@ async def generar_analisis(data: IncidentRequest):
     except Exception as e:
         print(f"Error procesando solicitud: {e}")
         raise HTTPException(status_code=500, detail=f"Error en análisis AI: {str(e)}")
+    finally:
+        if decision is not None:
+            registrar_turno(decision, time.perf_counter() - inicio, ctx.costo_usd if ctx is not None else 0.0)
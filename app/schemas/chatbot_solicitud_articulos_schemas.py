@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict
 from enum import Enum
 
 class TipoArticulo(str, Enum):
@@ -15,10 +15,28 @@ class TipoArticulo(str, Enum):
     EQUIPOS = "EQUIPOS"
     COMPUTACIONAL = 'COMPUTACIONAL'
 
+class PrellenadoArticulo(BaseModel):
+    """Slots ya conocidos del artículo (p.ej. extraídos de un documento adjunto)"""
+    tipo: str = Field(description="Categoría del artículo según el YAML (EPP, WOG, etc.)")
+    campos: Dict[str, str] = Field(default={}, description="Valores normalizados por campo del YAML")
+    campos_faltantes: List[str] = Field(default=[], description="Campos requeridos que aún faltan")
+    nombre_propuesto: Optional[str] = Field(default=None, description="Nombre estándar si los campos están completos")
+    errores: List[str] = Field(default=[], description="Valores descartados por no cumplir el estándar")
+
 class ArticuloRequest(BaseModel):
     """Request del usuario en lenguaje natural"""
     mensaje: str = Field(description="Descripción del artículo que necesita el usuario", min_length=1)
     contexto_conversacion: Optional[List[dict]] = Field(default=None, description="Historial de la conversación")
+    prellenado: Optional[PrellenadoArticulo] = Field(default=None, description="Campos pre-llenados desde /analizar-documento")
+    sesion_id: Optional[str] = Field(default=None, description="ID de la conversación para acumular costo y presupuesto por sesión")
+
+class DocumentoAnalizado(BaseModel):
+    """Salida estructurada del analista de documentos"""
+    producto: str = Field(description="Nombre principal del producto descrito en el documento")
+    categoria: Optional[str] = Field(default=None, description="ID de la categoría sugerida (una de las candidatas) o null")
+    campos: Dict[str, str] = Field(default={}, description="Valores por nombre de campo de la categoría (solo campos listados), en MAYÚSCULAS")
+    especificaciones: List[str] = Field(default=[], description="Otras especificaciones relevantes como 'Atributo: Valor'")
+    otros_productos: List[str] = Field(default=[], description="Nombres de otros productos si el documento describe varios")
 
 class ArticuloIdentificado(BaseModel):
     """Artículo extraído y estandarizado"""
@@ -0,0 +1,119 @@
+"""
+Valor derivado de un archivo de configuración con recarga en caliente.
+
+Reemplaza al `lru_cache(maxsize=1)` de los cargadores de YAML: cada proceso
+(worker) revisa el mtime del archivo como máximo cada `intervalo` segundos y,
+si cambió, lo vuelve a compilar y publica la nueva versión con una sola
+asignación (swap atómico: los lectores ven la versión anterior o la nueva,
+nunca una mezcla). Si la versión nueva no es válida se mantiene la anterior.
+"""
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Generic, NamedTuple, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Cada cuántos segundos se revisa el mtime de los YAML (0 = en cada acceso)
+CONFIG_RELOAD_INTERVAL = float(os.getenv("CONFIG_RELOAD_INTERVAL_SECONDS", "2"))
+
+
+class _Estado(NamedTuple):
+    firma: Optional[Tuple[int, int]]   # (mtime_ns, tamaño) del archivo leído
+    version: str                       # hash del contenido
+    valor: Any
+
+
+def version_contenido(contenido: Optional[bytes]) -> str:
+    """Versión corta de un contenido (hash), estable entre workers."""
+    return hashlib.sha256(contenido).hexdigest()[:12] if contenido is not None else "ausente"
+
+
+def _firma(ruta: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = ruta.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ArchivoRecargable(Generic[T]):
+    """
+    Args:
+        ruta: archivo a vigilar.
+        compilar: (contenido, anterior) -> valor. `anterior` es el valor vigente
+            (o None) para permitir recompilación incremental. Un contenido None
+            indica que el archivo no existe. Debe lanzar excepción si es inválido.
+        intervalo: segundos mínimos entre revisiones del mtime.
+    """
+
+    def __init__(
+        self,
+        ruta: Path,
+        compilar: Callable[[Optional[bytes], Optional[T]], T],
+        intervalo: float = CONFIG_RELOAD_INTERVAL,
+    ):
+        self.ruta = Path(ruta)
+        self.intervalo = intervalo
+        self._compilar = compilar
+        self._estado: Optional[_Estado] = None
+        self._proxima_revision = 0.0
+        self._lock = threading.Lock()
+        self.recargas = 0
+        self.ultimo_error: Optional[str] = None
+
+    @property
+    def version(self) -> str:
+        """Hash del contenido vigente ('' si aún no se carga)."""
+        estado = self._estado
+        return estado.version if estado is not None else ""
+
+    def obtener(self) -> T:
+        """Valor vigente; revisa el archivo si pasó el intervalo."""
+        estado = self._estado
+        if estado is not None and time.monotonic() < self._proxima_revision:
+            return estado.valor
+        return self.revisar()
+
+    def revisar(self, forzar: bool = False) -> T:
+        """Revisa el mtime ahora y recompila si el contenido cambió."""
+        with self._lock:
+            estado = self._estado
+            ahora = time.monotonic()
+            if not forzar and estado is not None and ahora < self._proxima_revision:
+                return estado.valor
+            self._proxima_revision = ahora + self.intervalo
+
+            firma = _firma(self.ruta)
+            if not forzar and estado is not None and firma == estado.firma:
+                return estado.valor
+
+            try:
+                contenido = self.ruta.read_bytes() if firma is not None else None
+            except OSError:
+                contenido = None
+            version = version_contenido(contenido)
+            if estado is not None and version == estado.version:
+                # Mismo contenido (touch, copia idéntica): nada que reconstruir
+                self._estado = estado._replace(firma=firma)
+                return estado.valor
+
+            try:
+                valor = self._compilar(contenido, estado.valor if estado is not None else None)
+            except Exception as e:
+                if estado is None:
+                    raise
+                # Se recuerda la firma para no reintentar hasta el próximo cambio del archivo
+                self._estado = estado._replace(firma=firma)
+                self.ultimo_error = str(e)
+                print(f"⚠️ [CONFIG] Recarga de {self.ruta.name} rechazada, se mantiene la versión {estado.version}: {e}")
+                return estado.valor
+
+            self._estado = _Estado(firma=firma, version=version, valor=valor)
+            self.ultimo_error = None
+            if estado is not None:
+                self.recargas += 1
+                print(f"🔄 [CONFIG] {self.ruta.name} recargado: {estado.version} -> {version}")
+            return valor
@@ -2,12 +2,26 @@
 Servicio de categorías para artículos.
 Centraliza la lógica de categorización e inferencia.
 """
+import asyncio
+import os
 import yaml
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-from functools import lru_cache
 from dataclasses import dataclass
 
+from app.services.archivo_recargable import ArchivoRecargable, version_contenido
+from app.services.chatbot_solicitud_articulos.config_model import (
+    ConfigError,
+    ConfigEstandarizacion,
+    compilar_config,
+)
+from app.services.chatbot_solicitud_articulos.sinonimos_service import expandir_sinonimos, recargar_sinonimos
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+
+# Ruta absoluta: no depende del directorio desde el que se lance el proceso
+CONFIG_PATH = Path(os.getenv("ESTANDARIZACION_CONFIG_PATH") or BASE_DIR / "config" / "estandarizacion_articulos.yaml")
+
 
 @dataclass
 class CategoriaInfo:
@@ -161,14 +175,49 @@ CATEGORIA_KEYWORDS: Dict[str, Dict[str, Any]] = {
 }
 
 
-@lru_cache(maxsize=1)
+def _compilar_yaml(contenido: Optional[bytes], anterior: Optional[ConfigEstandarizacion]) -> ConfigEstandarizacion:
+    if contenido is None:
+        raise ConfigError(f"No se encontró la configuración de estandarización: {CONFIG_PATH}")
+    try:
+        data = yaml.safe_load(contenido)
+    except yaml.YAMLError as e:
+        raise ConfigError(f"YAML inválido en {CONFIG_PATH}: {e}") from e
+    return compilar_config(data, origen=str(CONFIG_PATH), version=version_contenido(contenido), anterior=anterior)
+
+
+# Se recompila sola cuando cambia el archivo (sin reiniciar workers)
+_config: ArchivoRecargable[ConfigEstandarizacion] = ArchivoRecargable(CONFIG_PATH, _compilar_yaml)
+
+
+def obtener_config() -> ConfigEstandarizacion:
+    """Configuración validada y compilada vigente (se recarga si el YAML cambia)."""
+    return _config.obtener()
+
+
 def cargar_config() -> Dict[str, Any]:
-    """Carga la configuración del YAML con cache."""
-    config_path = Path("config/estandarizacion_articulos.yaml")
-    if not config_path.exists():
-        return {}
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    """Configuración del YAML como dict crudo (para mostrar reglas), de la versión vigente."""
+    return obtener_config().crudo
+
+
+def recargar_config() -> ConfigEstandarizacion:
+    """Revisa ahora los YAML de configuración y sinónimos (sin esperar el intervalo)."""
+    recargar_sinonimos()
+    return _config.revisar(forzar=True)
+
+
+async def vigilar_configuracion(intervalo: Optional[float] = None) -> None:
+    """
+    Revisa los YAML en segundo plano para que la recompilación ocurra fuera de
+    las requests. Las requests igual detectan el cambio por su cuenta.
+    """
+    intervalo = intervalo or max(_config.intervalo, 1.0)
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            obtener_config()
+            expandir_sinonimos("")  # Reconstruye el índice de sinónimos si cambió algo
+        except Exception as e:
+            print(f"⚠️ [CONFIG] Error revisando configuración: {e}")
 
 
 def obtener_categorias() -> List[Dict[str, str]]:
@@ -195,7 +244,8 @@ def inferir_categoria(descripcion: str) -> InferenciaResultado:
     Returns:
         InferenciaResultado con la categoría inferida y confianza
     """
-    texto = descripcion.upper()
+    # Los términos en inglés / regionales suman su valor estándar ("gate valve" -> VALVULA COMPUERTA)
+    texto = expandir_sinonimos(descripcion).upper()
     
     # Calcular puntuación por categoría
     scores: Dict[str, Dict[str, Any]] = {}
@@ -0,0 +1,178 @@
+"""
+Modelo tipado y compilado de config/estandarizacion_articulos.yaml.
+
+El YAML se valida contra el esquema y se compila una sola vez (al arrancar) en
+objetos inmutables listos para el camino caliente:
+- `valores_set`: frozenset para validar `lista_cerrada` en O(1),
+- `requeridos`: tupla con los campos obligatorios, en orden,
+- `formatear`: el `formato` pre-parseado a una plantilla `%s` + itemgetter
+  (sin volver a interpretar la plantilla con str.format en cada llamada).
+
+En una recarga (`anterior`), las categorías cuyo YAML no cambió reutilizan su
+objeto compilado: los caches derivados de ellas siguen vigentes.
+"""
+from dataclasses import dataclass, field
+from operator import itemgetter
+from string import Formatter
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+TIPOS_CAMPO = frozenset(["lista_cerrada", "lista_abierta", "texto_libre"])
+
+
+class ConfigError(ValueError):
+    """El YAML de estandarización no cumple el esquema esperado."""
+
+
+@dataclass(frozen=True)
+class CampoConfig:
+    """Reglas compiladas de un campo."""
+    nombre: str
+    requerido: bool
+    tipo: str
+    valores_estandar: Tuple[str, ...]
+    valores_set: frozenset
+    es_lista_cerrada: bool
+    ejemplo: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CategoriaConfig:
+    """Reglas compiladas de una categoría (tipo de artículo)."""
+    id: str
+    formato: str
+    campos: Mapping[str, CampoConfig]
+    # Mismos campos como tupla (nombre, campo): iteración más barata que el mapping
+    campos_orden: Tuple[Tuple[str, CampoConfig], ...]
+    requeridos: Tuple[str, ...]
+    # Plantilla "%s" equivalente al formato y extractor de sus campos, en orden
+    _plantilla: str = field(repr=False, default="")
+    _extraer: Any = field(repr=False, default=None)
+
+    def formatear(self, valores: Mapping[str, str]) -> str:
+        """Equivalente a `formato.format(**valores)` con la plantilla ya parseada."""
+        if self._extraer is None:
+            return self._plantilla
+        return self._plantilla % self._extraer(valores)
+
+
+@dataclass(frozen=True)
+class ConfigEstandarizacion:
+    """Configuración completa compilada."""
+    categorias: Mapping[str, CategoriaConfig]
+    origen: str = ""
+    # Hash del contenido del YAML (identifica la versión en caches derivados)
+    version: str = ""
+    # YAML parseado, para mostrar reglas tal cual (tools, prompt del analista)
+    crudo: Mapping[str, Any] = field(repr=False, default_factory=dict)
+
+    def categoria(self, tipo: str) -> Optional[CategoriaConfig]:
+        return self.categorias.get(tipo)
+
+
+def _compilar_formato(cat_id: str, formato: Any, campos: Mapping[str, Any], errores: List[str]):
+    """Traduce "{a} {b}" a ("%s %s", itemgetter("a", "b")) validando los placeholders."""
+    if not isinstance(formato, str) or not formato.strip():
+        errores.append(f"{cat_id}: 'formato' debe ser un texto no vacío")
+        return "", None
+    plantilla, nombres = [], []
+    try:
+        for literal, campo, spec, conversion in Formatter().parse(formato):
+            plantilla.append(literal.replace("%", "%%"))
+            if campo is None:
+                continue
+            if spec or conversion:
+                errores.append(f"{cat_id}: el formato no admite especificadores ('{{{campo}:{spec}}}')")
+            if campo not in campos:
+                errores.append(f"{cat_id}: el formato usa '{{{campo}}}' que no está en campos")
+            plantilla.append("%s")
+            nombres.append(campo)
+    except ValueError as e:
+        errores.append(f"{cat_id}: formato inválido ({e})")
+        return "", None
+
+    if not nombres:
+        return "".join(plantilla).replace("%%", "%"), None
+    getter = itemgetter(*nombres)
+    # itemgetter con un solo campo retorna el valor, no una tupla
+    extraer = getter if len(nombres) > 1 else (lambda valores: (getter(valores),))
+    return "".join(plantilla), extraer
+
+
+def _compilar_campo(cat_id: str, nombre: str, reglas: Any, errores: List[str]) -> Optional[CampoConfig]:
+    if not isinstance(reglas, dict):
+        errores.append(f"{cat_id}.{nombre}: las reglas deben ser un mapa")
+        return None
+    requerido = reglas.get("requerido", False)
+    tipo = reglas.get("tipo")
+    valores = reglas.get("valores_estandar") or []
+    if not isinstance(requerido, bool):
+        errores.append(f"{cat_id}.{nombre}: 'requerido' debe ser true/false")
+    if tipo not in TIPOS_CAMPO:
+        errores.append(f"{cat_id}.{nombre}: 'tipo' debe ser uno de {sorted(TIPOS_CAMPO)}")
+    if not isinstance(valores, list):
+        errores.append(f"{cat_id}.{nombre}: 'valores_estandar' debe ser una lista")
+        valores = []
+    if tipo == "lista_cerrada" and not valores:
+        errores.append(f"{cat_id}.{nombre}: una lista_cerrada necesita valores_estandar")
+
+    # Los valores se comparan como texto (tallas numéricas incluidas)
+    valores_txt = tuple(str(v) for v in valores)
+    return CampoConfig(
+        nombre=nombre,
+        requerido=bool(requerido),
+        tipo=str(tipo),
+        valores_estandar=valores_txt,
+        valores_set=frozenset(valores_txt),
+        es_lista_cerrada=tipo == "lista_cerrada",
+        ejemplo=reglas.get("ejemplo"),
+    )
+
+
+def compilar_config(
+    data: Any, origen: str = "", version: str = "", anterior: Optional[ConfigEstandarizacion] = None
+) -> ConfigEstandarizacion:
+    """
+    Valida el YAML ya parseado y lo compila. Lanza ConfigError con todos los
+    problemas encontrados (no solo el primero). Con `anterior`, las categorías
+    sin cambios se reutilizan en lugar de recompilarse.
+    """
+    if not isinstance(data, dict) or not data:
+        raise ConfigError(f"Configuración vacía o inválida: {origen or 'YAML'}")
+
+    errores: List[str] = []
+    categorias: Dict[str, CategoriaConfig] = {}
+    for cat_id, cat in data.items():
+        if not isinstance(cat, dict):
+            errores.append(f"{cat_id}: la categoría debe ser un mapa")
+            continue
+        if anterior is not None and anterior.crudo.get(cat_id) == cat and str(cat_id) in anterior.categorias:
+            categorias[str(cat_id)] = anterior.categorias[str(cat_id)]
+            continue
+        campos_raw = cat.get("campos")
+        if not isinstance(campos_raw, dict) or not campos_raw:
+            errores.append(f"{cat_id}: 'campos' debe ser un mapa no vacío")
+            continue
+
+        campos = {}
+        for nombre, reglas in campos_raw.items():
+            campo = _compilar_campo(cat_id, str(nombre), reglas, errores)
+            if campo is not None:
+                campos[str(nombre)] = campo
+        plantilla, extraer = _compilar_formato(cat_id, cat.get("formato"), campos, errores)
+
+        categorias[str(cat_id)] = CategoriaConfig(
+            id=str(cat_id),
+            formato=cat.get("formato") or "",
+            campos=MappingProxyType(campos),
+            campos_orden=tuple(campos.items()),
+            requeridos=tuple(n for n, c in campos.items() if c.requerido),
+            _plantilla=plantilla,
+            _extraer=extraer,
+        )
+
+    if errores:
+        raise ConfigError("Errores en la configuración de estandarización:\n- " + "\n- ".join(errores))
+    return ConfigEstandarizacion(
+        categorias=MappingProxyType(categorias), origen=origen, version=version, crudo=data
+    )
@@ -0,0 +1,213 @@
+"""
+Parser de dimensiones con unidades (diámetros de cañería, fracciones, métrico).
+
+Reconoce como la misma medida `1 1/2`, `1-1/2"`, `1.5 pulg`, `DN40`, `NPS 1.5`
+y `48.3mm` (diámetro exterior de cañería) y las lleva a la forma del YAML:
+`1-1/2"`. Trabaja sobre tokens (número, fracción, unidad, prefijo nominal) en
+lugar de regex sueltas por sufijo, así que cubre combinaciones sin casos
+especiales.
+
+Las tablas nominales siguen ASME B36.10 (NPS / DN / diámetro exterior en mm).
+"""
+import re
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Campos cuyo valor es un diámetro/medida nominal en pulgadas
+CAMPOS_DIMENSION = frozenset(["diametro"])
+
+# DN (mm nominal) -> NPS (pulgadas)
+DN_A_NPS: Dict[int, Fraction] = {
+    6: Fraction(1, 8), 8: Fraction(1, 4), 10: Fraction(3, 8), 15: Fraction(1, 2), 20: Fraction(3, 4),
+    25: Fraction(1), 32: Fraction(5, 4), 40: Fraction(3, 2), 50: Fraction(2), 65: Fraction(5, 2),
+    80: Fraction(3), 90: Fraction(7, 2), 100: Fraction(4), 125: Fraction(5), 150: Fraction(6),
+    200: Fraction(8), 250: Fraction(10), 300: Fraction(12), 350: Fraction(14), 400: Fraction(16),
+    450: Fraction(18), 500: Fraction(20), 600: Fraction(24),
+}
+
+# Diámetro exterior (mm) -> NPS
+DIAMETRO_EXTERIOR_MM: Tuple[Tuple[float, Fraction], ...] = (
+    (10.3, Fraction(1, 8)), (13.7, Fraction(1, 4)), (17.1, Fraction(3, 8)), (21.3, Fraction(1, 2)),
+    (26.7, Fraction(3, 4)), (33.4, Fraction(1)), (42.2, Fraction(5, 4)), (48.3, Fraction(3, 2)),
+    (60.3, Fraction(2)), (73.0, Fraction(5, 2)), (88.9, Fraction(3)), (101.6, Fraction(7, 2)),
+    (114.3, Fraction(4)), (141.3, Fraction(5)), (168.3, Fraction(6)), (219.1, Fraction(8)),
+    (273.0, Fraction(10)), (323.8, Fraction(12)), (355.6, Fraction(14)), (406.4, Fraction(16)),
+)
+
+# Tolerancias de coincidencia en mm
+TOLERANCIA_OD_MM = 0.6
+TOLERANCIA_CONVERSION_MM = 0.2
+
+# Mayor medida en pulgadas aceptada sin unidad explícita ("2" -> 2")
+MAX_PULGADAS_SIN_UNIDAD = 24
+
+MM_POR_PULGADA = 25.4
+
+
+class Token(NamedTuple):
+    tipo: str
+    texto: str
+
+
+_RE_TOKEN = re.compile(r"""
+    (?P<NUM>\d+(?:[.,]\d+)?)
+  | (?P<BARRA>/)
+  | (?P<GUION>-)
+  | (?P<PULG>"|''|”|″|PULGADAS?\b|PULG\b\.?|INCH(?:ES)?\b|IN\b\.?)
+  | (?P<MM>MM\b|MILIMETROS?\b)
+  | (?P<CM>CM\b|CENTIMETROS?\b)
+  | (?P<DN>DN)
+  | (?P<NPS>NPS|NB)
+  | (?P<IGNORAR>\s+|Ø|DIAMETRO\b|DIAM\b\.?|DIA\b\.?|NOMINAL\b)
+  | (?P<OTRO>.)
+""", re.VERBOSE)
+
+
+def tokenizar(texto: str) -> List[Token]:
+    """Tokens significativos de una medida (espacios y rótulos como 'DIAM.' se descartan)."""
+    tokens = []
+    for m in _RE_TOKEN.finditer(texto.upper()):
+        if m.lastgroup != "IGNORAR":
+            tokens.append(Token(m.lastgroup, m.group()))
+    return tokens
+
+
+def _numero(texto: str) -> Fraction:
+    return Fraction(texto.replace(",", "."))
+
+
+def _leer_cantidad(tokens: List[Token], i: int) -> Tuple[Optional[Fraction], int]:
+    """
+    Lee desde tokens[i] un número, fracción o mixto ("1 1/2", "1-1/2", "1.1/2").
+    Retorna (valor, índice siguiente) o (None, i).
+    """
+    def fraccion(j: int) -> Tuple[Optional[Fraction], int]:
+        if (j + 2 < len(tokens) and tokens[j].tipo == "NUM" and tokens[j + 1].tipo == "BARRA"
+                and tokens[j + 2].tipo == "NUM" and tokens[j].texto.isdigit() and tokens[j + 2].texto.isdigit()):
+            denominador = int(tokens[j + 2].texto)
+            if denominador:
+                return Fraction(int(tokens[j].texto), denominador), j + 3
+        return None, j
+
+    if i >= len(tokens) or tokens[i].tipo != "NUM":
+        return None, i
+
+    # Fracción simple: 3/4
+    valor, j = fraccion(i)
+    if valor is not None:
+        return valor, j
+
+    texto = tokens[i].texto
+    # Mixto con punto: "1.1/2" (forma habitual al tipear rápido)
+    if (not texto.isdigit() and i + 2 < len(tokens) and tokens[i + 1].tipo == "BARRA"
+            and tokens[i + 2].texto.isdigit() and int(tokens[i + 2].texto)):
+        entero, numerador = re.split(r"[.,]", texto)
+        resto = Fraction(int(numerador), int(tokens[i + 2].texto))
+        if resto < 1:
+            return int(entero) + resto, i + 3
+        return None, i
+
+    entero = _numero(texto)
+    # Mixto: "1 1/2" o "1-1/2"
+    k = i + 1
+    if k < len(tokens) and tokens[k].tipo == "GUION":
+        k += 1
+    resto, j = fraccion(k)
+    if resto is not None and resto < 1 and entero.denominator == 1:
+        return entero + resto, j
+    return entero, i + 1
+
+
+def _formatear_pulgadas(valor: Fraction) -> Optional[str]:
+    """Fraction -> forma YAML: 3/4", 1", 1-1/2". None si no es fracción de uso común."""
+    if valor <= 0 or valor.denominator not in (1, 2, 4, 8, 16, 32, 64):
+        return None
+    entero, resto = divmod(valor, 1)
+    if not resto:
+        return f'{entero}"'
+    fraccion = f"{resto.numerator}/{resto.denominator}"
+    return f'{entero}-{fraccion}"' if entero else f'{fraccion}"'
+
+
+def _mm_a_pulgadas(mm: float) -> Optional[Fraction]:
+    """
+    DN exacto ("25 mm" suele ser nominal), diámetro exterior de tabla (48.3 mm)
+    o conversión directa a 1/16".
+    """
+    if float(mm).is_integer() and int(mm) in DN_A_NPS:
+        return DN_A_NPS[int(mm)]
+    for od, nps in DIAMETRO_EXTERIOR_MM:
+        if abs(mm - od) <= TOLERANCIA_OD_MM:
+            return nps
+    dieciseisavos = round(mm / MM_POR_PULGADA * 16)
+    if dieciseisavos and abs(dieciseisavos * MM_POR_PULGADA / 16 - mm) <= TOLERANCIA_CONVERSION_MM:
+        return Fraction(dieciseisavos, 16)
+    return None
+
+
+def parsear_dimension(texto: str) -> Optional[Fraction]:
+    """
+    Interpreta el texto completo como UNA medida y la retorna en pulgadas.
+    None si no es una medida reconocible (ej: "1/2 x 2", "SCH40").
+    """
+    tokens = tokenizar(texto)
+    if not tokens:
+        return None
+
+    i = 0
+    prefijo = None
+    if tokens[0].tipo in ("DN", "NPS"):
+        prefijo, i = tokens[0].tipo, 1
+
+    cantidad, i = _leer_cantidad(tokens, i)
+    if cantidad is None:
+        return None
+
+    unidad = None
+    if i < len(tokens) and tokens[i].tipo in ("PULG", "MM", "CM"):
+        unidad, i = tokens[i].tipo, i + 1
+    if i != len(tokens):
+        return None  # Sobran tokens: no es una medida simple
+
+    if prefijo == "DN":
+        if unidad is not None or cantidad.denominator != 1:
+            return None
+        return DN_A_NPS.get(int(cantidad))
+    if unidad == "MM":
+        return _mm_a_pulgadas(float(cantidad))
+    if unidad == "CM":
+        return _mm_a_pulgadas(float(cantidad) * 10)
+    if unidad is None and prefijo is None and cantidad > MAX_PULGADAS_SIN_UNIDAD:
+        return None
+    return cantidad
+
+
+@lru_cache(maxsize=16384)
+def _canonicalizar_memo(texto: str) -> Optional[str]:
+    pulgadas = parsear_dimension(texto)
+    return _formatear_pulgadas(pulgadas) if pulgadas is not None else None
+
+
+def canonicalizar_dimension(texto: str) -> Optional[str]:
+    """
+    Forma canónica YAML de una medida ('1 1/2' -> '1-1/2"', 'DN40' -> '1-1/2"'),
+    o None si el texto no es una medida reconocible.
+    """
+    if not texto or not isinstance(texto, str):
+        return None
+    return _canonicalizar_memo(texto)
+
+
+def canonicalizar_dimensiones_batch(valores: Iterable[str]) -> List[Optional[str]]:
+    """Versión masiva de canonicalizar_dimension (deduplica dentro del lote)."""
+    vistos: Dict[str, Optional[str]] = {}
+    resultado: List[Optional[str]] = []
+    for valor in valores:
+        if not isinstance(valor, str):
+            resultado.append(None)
+            continue
+        if valor not in vistos:
+            vistos[valor] = canonicalizar_dimension(valor)
+        resultado.append(vistos[valor])
+    return resultado
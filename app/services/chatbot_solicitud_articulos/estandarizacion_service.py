@@ -0,0 +1,166 @@
+"""
+Servicio de estandarización de artículos.
+Valida atributos contra la configuración YAML y construye el nombre estándar.
+Lo usan la tool `construir_nombre_estandar` y el pre-llenado desde documentos.
+
+Trabaja sobre la configuración compilada (`obtener_config`): pertenencia a
+listas cerradas con frozensets y plantillas de nombre pre-parseadas.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.chatbot_solicitud_articulos.categorias_service import (
+    obtener_categorias,
+    obtener_config,
+)
+from app.services.chatbot_solicitud_articulos.config_model import CampoConfig
+from app.services.chatbot_solicitud_articulos.dimensiones import CAMPOS_DIMENSION, canonicalizar_dimension
+from app.services.chatbot_solicitud_articulos.fuzzy_matcher import ajustar_a_estandar
+from app.services.chatbot_solicitud_articulos.normalizacion_utils import normalizar_valor
+from app.services.chatbot_solicitud_articulos.sinonimos_service import traducir_valor
+
+
+def normalizar_campo(valor: Any, config_campo: CampoConfig) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Normaliza un valor (las medidas se llevan a la forma del YAML: DN40 -> 1-1/2")
+    y, si no es un valor estándar del campo, lo traduce con la tabla de sinónimos (Check -> VALVULA CHECK) o lo ajusta al más cercano
+    (errores de tipeo, acentos) con la coincidencia difusa.
+
+    Returns:
+        (valor, correccion) donde correccion es None si no hubo ajuste.
+    """
+    campo = config_campo.nombre
+    valor = normalizar_valor(str(valor), campo) if valor else ""
+    if valor and campo in CAMPOS_DIMENSION:
+        medida = canonicalizar_dimension(valor)
+        if medida is not None and medida != valor:
+            return medida, {"original": valor, "valor": medida, "confianza": 1.0}
+    valores_estandar = config_campo.valores_estandar
+    if not valor or valor in config_campo.valores_set:
+        return valor, None
+
+    if valores_estandar:
+        traducido = traducir_valor(valor, valores_estandar)
+        if traducido is not None and traducido != valor:
+            return traducido, {"original": valor, "valor": traducido, "confianza": 1.0}
+
+    coincidencia = ajustar_a_estandar(valor, valores_estandar)
+    if coincidencia is None or coincidencia.valor == valor:
+        return valor, None
+    return coincidencia.valor, {
+        "original": valor,
+        "valor": coincidencia.valor,
+        "confianza": coincidencia.confianza,
+    }
+
+
+def construir_nombre(tipo: str, atributos: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construye el nombre estandarizado basado en el tipo y los atributos extraídos.
+    Valida que los atributos sean correctos según la configuración.
+
+    Args:
+        tipo: El tipo de artículo (EPP, WOG, ASEO, etc.)
+        atributos: Diccionario con los campos extraídos
+
+    Returns:
+        Dict con 'valido', 'nombre' (si es válido), 'errores' (si hay errores)
+        y 'correcciones' (typos ajustados al valor estándar, si los hubo)
+    """
+    config_tipo = obtener_config().categoria(tipo)
+
+    if not config_tipo:
+        categorias = obtener_categorias()
+        tipos_validos = [c["id"] for c in categorias]
+        return {
+            "valido": False,
+            "errores": [f"Tipo '{tipo}' no encontrado. Válidos: {tipos_validos}"]
+        }
+
+    errores = []
+    valores_usados = {}
+    campos_faltantes = []
+    correcciones = {}
+
+    for campo, config_campo in config_tipo.campos_orden:
+        # Normalizar valor y ajustar typos al valor estándar más cercano
+        valor, correccion = normalizar_campo(atributos.get(campo, ""), config_campo)
+        if correccion:
+            correcciones[campo] = correccion
+
+        # Validar campo requerido
+        if config_campo.requerido and not valor:
+            errores.append(f"Campo requerido faltante: '{campo}'")
+            campos_faltantes.append(campo)
+            valores_usados[campo] = f"[{campo.upper()}]"
+            continue
+
+        # Validar contra lista cerrada
+        if valor and config_campo.es_lista_cerrada and valor not in config_campo.valores_set:
+            errores.append(f"'{valor}' no válido para '{campo}'. Permitidos: {list(config_campo.valores_estandar)}")
+
+        valores_usados[campo] = valor if valor else ""
+
+    if errores:
+        resultado = {
+            "valido": False,
+            "errores": errores,
+            "campos_faltantes": campos_faltantes,
+            "nombre_parcial": config_tipo.formatear(valores_usados)
+        }
+    else:
+        try:
+            nombre = " ".join(config_tipo.formatear(valores_usados).split())
+            resultado = {"valido": True, "nombre": nombre}
+        except Exception as e:
+            return {"valido": False, "errores": [f"Error formateando: {str(e)}"]}
+
+    # Informar los ajustes para que el agente los confirme sin preguntar de nuevo
+    if correcciones:
+        resultado["correcciones"] = correcciones
+    return resultado
+
+
+def prellenar_campos(tipo: Optional[str], campos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convierte valores extraídos (p.ej. desde un documento) en slots pre-llenados
+    de la sesión de estandarización: normaliza, descarta campos que no existen
+    en el YAML y calcula qué falta y, si está completo, el nombre propuesto.
+
+    Returns:
+        Dict con tipo, campos, campos_faltantes, nombre_propuesto y errores,
+        o None si el tipo no existe en la configuración.
+    """
+    if not tipo:
+        return None
+    tipo = tipo.strip().upper()
+    config_tipo = obtener_config().categoria(tipo)
+    if not config_tipo:
+        return None
+
+    campos_config = config_tipo.campos
+    normalizados: Dict[str, str] = {}
+    for campo, valor in (campos or {}).items():
+        campo = str(campo).strip().lower()
+        if campo not in campos_config or valor is None:
+            continue
+        valor, _ = normalizar_campo(valor, campos_config[campo])
+        if valor:
+            normalizados[campo] = valor
+
+    resultado = construir_nombre(tipo, normalizados)
+    errores: List[str] = [e for e in resultado.get("errores", []) if not e.startswith("Campo requerido faltante")]
+
+    # Un valor inválido en lista cerrada no se pre-llena: se preguntará con opciones
+    for campo, config_campo in config_tipo.campos_orden:
+        if campo in normalizados and config_campo.es_lista_cerrada:
+            if normalizados[campo] not in config_campo.valores_set:
+                del normalizados[campo]
+
+    faltantes = [campo for campo in config_tipo.requeridos if campo not in normalizados]
+    return {
+        "tipo": tipo,
+        "campos": normalizados,
+        "campos_faltantes": faltantes,
+        "nombre_propuesto": resultado.get("nombre") if resultado.get("valido") else None,
+        "errores": errores,
+    }
@@ -0,0 +1,182 @@
+"""
+Coincidencia difusa de valores contra los `valores_estandar` del YAML.
+
+Absorbe localmente errores de tipeo ("cabritiya", "galbanizado", "canería")
+sin gastar un round trip del LLM para preguntar o corregir. Por cada campo se
+arma (una vez) un índice con:
+- un diccionario exacto sobre la forma plegada (sin acentos, mayúsculas), y
+- un BK-tree con distancia de Levenshtein acotada para los casi-aciertos.
+
+Un valor solo se reemplaza si la confianza supera el umbral y el mejor
+candidato no está empatado con otro distinto.
+"""
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Confianza mínima (1 - distancia / largo) para reemplazar un valor
+CONFIANZA_MINIMA = float(os.getenv("FUZZY_CONFIANZA_MINIMA", "0.8"))
+
+# Valores más cortos que esto solo coinciden de forma exacta (S, M, 1", PVC...)
+LARGO_MINIMO_DIFUSO = 4
+
+_RE_NO_DIGITO = re.compile(r"\D")
+
+
+@dataclass(frozen=True)
+class Coincidencia:
+    """Valor estándar encontrado para un valor ingresado."""
+    valor: str
+    confianza: float
+    distancia: int
+
+
+def plegar(texto: str) -> str:
+    """Forma canónica para comparar: sin acentos ni diacríticos, mayúsculas, espacios simples."""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_marcas = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_marcas.upper().split())
+
+
+def distancia_acotada(a: str, b: str, maximo: int) -> int:
+    """
+    Levenshtein con corte: retorna maximo + 1 apenas la distancia lo supera.
+    Solo evalúa la banda diagonal de ancho 2*maximo+1.
+    """
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if abs(la - lb) > maximo:
+        return maximo + 1
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+
+    fuera = maximo + 1
+    previa = list(range(lb + 1))
+    for i in range(1, la + 1):
+        desde = max(1, i - maximo)
+        hasta = min(lb, i + maximo)
+        actual = [fuera] * (lb + 1)
+        if desde == 1:
+            actual[0] = i
+        ca = a[i - 1]
+        minimo_fila = actual[0] if desde == 1 else fuera
+        for j in range(desde, hasta + 1):
+            costo = 0 if ca == b[j - 1] else 1
+            valor = min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + costo)
+            actual[j] = valor
+            if valor < minimo_fila:
+                minimo_fila = valor
+        if minimo_fila > maximo:
+            return fuera
+        previa = actual
+    return min(previa[lb], fuera)
+
+
+class BKTree:
+    """Árbol BK sobre distancia de Levenshtein (búsqueda por radio)."""
+
+    def __init__(self):
+        # Nodo: (clave, {distancia: nodo_hijo})
+        self._raiz: Optional[Tuple[str, Dict[int, tuple]]] = None
+
+    def agregar(self, clave: str) -> None:
+        if self._raiz is None:
+            self._raiz = (clave, {})
+            return
+        nodo = self._raiz
+        while True:
+            d = distancia_acotada(clave, nodo[0], len(clave) + len(nodo[0]))
+            if d == 0:
+                return
+            hijo = nodo[1].get(d)
+            if hijo is None:
+                nodo[1][d] = (clave, {})
+                return
+            nodo = hijo
+
+    def buscar(self, consulta: str, radio: int) -> List[Tuple[int, str]]:
+        """Claves a distancia <= radio, como (distancia, clave)."""
+        if self._raiz is None:
+            return []
+        encontrados = []
+        pendientes = [self._raiz]
+        while pendientes:
+            clave, hijos = pendientes.pop()
+            # Sin cota: la desigualdad triangular necesita la distancia real
+            d = distancia_acotada(consulta, clave, len(consulta) + len(clave))
+            if d <= radio:
+                encontrados.append((d, clave))
+            for dist_hijo, hijo in hijos.items():
+                if d - radio <= dist_hijo <= d + radio:
+                    pendientes.append(hijo)
+        return encontrados
+
+
+class IndiceDifuso:
+    """Índice de un campo: exacto plegado + BK-tree para casi-aciertos."""
+
+    def __init__(self, valores: Iterable[str]):
+        self._exactos: Dict[str, str] = {}
+        self._arbol = BKTree()
+        for valor in valores:
+            clave = plegar(str(valor))
+            self._exactos.setdefault(clave, str(valor))
+            self._arbol.agregar(clave)
+
+    def buscar(self, valor: str, confianza_minima: float = CONFIANZA_MINIMA) -> Optional[Coincidencia]:
+        clave = plegar(valor)
+        exacto = self._exactos.get(clave)
+        if exacto is not None:
+            return Coincidencia(valor=exacto, confianza=1.0, distancia=0)
+        if len(clave) < LARGO_MINIMO_DIFUSO or confianza_minima >= 1:
+            return None
+
+        # d <= (1 - c) * max(len) y len(candidato) <= len(clave) + d  =>  d <= (1 - c) * len / c
+        radio = int((1 - confianza_minima) * len(clave) / confianza_minima)
+        if radio < 1:
+            return None
+
+        digitos = _RE_NO_DIGITO.sub("", clave)
+        mejores: List[Tuple[float, int, str]] = []
+        for distancia, candidato in self._arbol.buscar(clave, radio):
+            # Nunca corregir medidas: 1/2" y 3/4" están a distancia 2 pero no son un typo
+            if _RE_NO_DIGITO.sub("", candidato) != digitos:
+                continue
+            confianza = 1 - distancia / max(len(clave), len(candidato))
+            if confianza >= confianza_minima:
+                mejores.append((confianza, distancia, candidato))
+        if not mejores:
+            return None
+
+        mejores.sort(key=lambda m: (-m[0], m[1]))
+        confianza, distancia, candidato = mejores[0]
+        if len(mejores) > 1 and mejores[1][0] == confianza:
+            return None  # Ambiguo: mejor preguntar que adivinar
+        return Coincidencia(valor=self._exactos[candidato], confianza=round(confianza, 3), distancia=distancia)
+
+
+@lru_cache(maxsize=512)
+def obtener_indice(valores: Tuple[str, ...]) -> IndiceDifuso:
+    """Índice compartido por tupla de valores estándar (se arma una sola vez)."""
+    return IndiceDifuso(valores)
+
+
+@lru_cache(maxsize=65536)
+def _buscar_memo(valores: Tuple[str, ...], valor: str, confianza_minima: float) -> Optional[Coincidencia]:
+    return obtener_indice(valores).buscar(valor, confianza_minima)
+
+
+def ajustar_a_estandar(
+    valor: str, valores_estandar: Iterable[str], confianza_minima: float = CONFIANZA_MINIMA
+) -> Optional[Coincidencia]:
+    """
+    Busca el valor estándar correspondiente a `valor` (exacto sin acentos o
+    casi-acierto sobre el umbral). None si no hay candidato confiable.
+    """
+    if not valor or not valores_estandar:
+        return None
+    return _buscar_memo(tuple(str(v) for v in valores_estandar), valor, confianza_minima)
@@ -1,9 +1,14 @@
 """
 Utilidades de normalización de texto para artículos.
 Centraliza toda la lógica de limpieza y estandarización de valores.
+
+`normalizar_valor` usa un pipeline precompilado por tipo de campo (regex
+compiladas una sola vez, unidades en una sola pasada) y memoiza los valores
+repetidos. Para procesamiento masivo usar `normalizar_valores_batch`.
 """
 import re
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional
 
 # Mapeo de tallas: valor sucio -> valor estándar
 TALLAS_NORMALIZE: Dict[str, str] = {
@@ -22,10 +27,51 @@ SIN_INFO_VALORES = ["SIN TALLA", "NO APLICA", "N/A", "NINGUNA", "SIN COLOR", "SI
 PREFIJOS_REDUNDANTES = ["MARCA ", "TALLA ", "COLOR ", "MODELO ", "TIPO ", "SIZE ", "T/", "T-", "T."]
 
 
+# Excepciones que SÍ llevan "DE" en el estándar (Izaje principalmente)
+EXCEPCIONES_DE = frozenset(["CABO DE VIDA", "LINEA DE VIDA", "ACEITE DE MOTOR"])
+
+# Sinónimos de conexión -> valor estándar
+CONEXION_NORMALIZE: Dict[str, str] = {
+    **dict.fromkeys(["ROSCA", "ROSCADA", "CON ROSCA", "HILO", "CON HILO"], "ROSCADA NPT"),
+    **dict.fromkeys(["BRIDA", "CON BRIDA", "FLANGE"], "BRIDADA"),
+    **dict.fromkeys(["SOLDAR", "SOLDABLE", "A SOLDAR"], "SOLDADA SW"),
+}
+
+# Tamaño del memo de normalizar_valor (valores distintos recordados)
+MEMO_MAXSIZE = 65536
+
+# --- Patrones precompilados ---
+_RE_PARENTESIS = re.compile(r'^\((.+)\)$')
+_RE_LITROS = re.compile(r'(\d+)\s*(LITROS?|LTS?)\b')
+_RE_KILOS = re.compile(r'(\d+)\s*(KILOS?|KGS?)\b')
+_RE_PULGADAS = re.compile(r'(\d+)\s*(PULGADAS?|PULG\.?)\b')
+_RE_METROS = re.compile(r'(\d+)\s*(METROS?|MTS?)\b')
+_RE_MILIMETROS = re.compile(r'(\d+)\s*(MILIMETROS?)\b')
+_RE_SKU = re.compile(r'\s*SKU\s*\d+')
+_RE_COD = re.compile(r'\s*COD\.?\s*\d+')
+
+# Las cinco reglas de unidades en una sola pasada (cada grupo nombra su sufijo)
+_RE_UNIDADES = re.compile(
+    r'(\d+)\s*(?:(?P<L>LITROS?|LTS?)|(?P<KG>KILOS?|KGS?)|(?P<PULG>PULGADAS?|PULG\.?)'
+    r'|(?P<M>METROS?|MTS?)|(?P<MM>MILIMETROS?))\b'
+)
+_SUFIJO_UNIDAD = {"L": "L", "KG": "KG", "PULG": '"', "M": "M", "MM": "MM"}
+
+# Prefijos redundantes como una sola regex anclada: cada prefijo es opcional y se
+# evalúa una vez en el orden de la lista (misma semántica que el loop original).
+_RE_PREFIJOS = re.compile(
+    "^" + "".join(f"(?:{re.escape(p)}\\s*)?" for p in PREFIJOS_REDUNDANTES)
+)
+
+
+def _reemplazar_unidad(m: "re.Match") -> str:
+    return m.group(1) + _SUFIJO_UNIDAD[m.lastgroup]
+
+
 def normalizar_talla(valor: str) -> str:
     """Normaliza valores de talla a formato estándar."""
     valor = valor.strip().upper()
-    valor = re.sub(r'^\((.+)\)$', r'\1', valor).strip()
+    valor = _RE_PARENTESIS.sub(r'\1', valor).strip()
     return TALLAS_NORMALIZE.get(valor, valor)
 
 
@@ -42,22 +88,22 @@ def formatear_talla_parentesis(valor: str) -> str:
 def normalizar_unidades(texto: str) -> str:
     """Normaliza unidades de medida a formato compacto."""
     # Litros: "20 LITROS", "20 LTS", "20L" -> "20L"
-    texto = re.sub(r'(\d+)\s*(LITROS?|LTS?)\b', r'\1L', texto)
+    texto = _RE_LITROS.sub(r'\1L', texto)
     # Kilogramos: "25 KILOS", "25 KGS", "25KG" -> "25KG"
-    texto = re.sub(r'(\d+)\s*(KILOS?|KGS?)\b', r'\1KG', texto)
+    texto = _RE_KILOS.sub(r'\1KG', texto)
     # Pulgadas: "7 PULGADAS", "7 PULG" -> "7"
-    texto = re.sub(r'(\d+)\s*(PULGADAS?|PULG\.?)\b', r'\1"', texto)
+    texto = _RE_PULGADAS.sub(r'\1"', texto)
     # Metros: "6 METROS", "6 MTS" -> "6M"
-    texto = re.sub(r'(\d+)\s*(METROS?|MTS?)\b', r'\1M', texto)
+    texto = _RE_METROS.sub(r'\1M', texto)
     # Milímetros: "50 MILIMETROS" -> "50MM"
-    texto = re.sub(r'(\d+)\s*(MILIMETROS?)\b', r'\1MM', texto)
+    texto = _RE_MILIMETROS.sub(r'\1MM', texto)
     return texto
 
 
 def limpiar_codigo_sku(texto: str) -> str:
     """Elimina códigos SKU embebidos en el texto."""
-    texto = re.sub(r'\s*SKU\s*\d+', '', texto)
-    texto = re.sub(r'\s*COD\.?\s*\d+', '', texto)
+    texto = _RE_SKU.sub('', texto)
+    texto = _RE_COD.sub('', texto)
     return texto
 
 
@@ -69,6 +115,92 @@ def eliminar_prefijos_redundantes(texto: str) -> str:
     return texto
 
 
+def _normalizar_repuesto(valor: str) -> str:
+    """Mapeos específicos para vehículos."""
+    if valor == "FILTRO":
+        return "FILTRO AIRE"  # Asumir aire si solo dice filtro
+    if "BOMBA" in valor and "AGUA" in valor:
+        return "BOMBA AGUA"
+    if "PASTILLA" in valor:
+        return "PASTILLA FRENO"
+    if "DISCO" in valor and "FRENO" in valor:
+        return "DISCO FRENO"
+    if valor in ("SOLDAR", "SOLDABLE", "A SOLDAR"):
+        return "SOLDADA SW"
+    return valor
+
+
+def _compilar_normalizador(campo: Optional[str]) -> Callable[[str], str]:
+    """
+    Arma el pipeline de normalización para un tipo de campo. Las reglas que no
+    aplican al campo no se evalúan en cada llamada: se resuelven aquí una vez.
+    """
+    es_talla = campo == "talla"
+    if campo == "conexion":
+        regla_campo = lambda v: CONEXION_NORMALIZE.get(v, v)
+    elif campo == "repuesto":
+        regla_campo = _normalizar_repuesto
+    else:
+        regla_campo = None
+
+    sin_info = frozenset(SIN_INFO_VALORES)
+    quitar_prefijos = _RE_PREFIJOS.sub
+    unidades = _RE_UNIDADES.sub
+    sku = _RE_SKU.sub
+    cod = _RE_COD.sub
+
+    def normalizar(valor: str) -> str:
+        # 1. Mayúsculas y prefijos redundantes
+        valor = quitar_prefijos("", valor.strip().upper(), count=1)
+
+        # 2. Tallas
+        if es_talla:
+            valor = normalizar_talla(valor)
+
+        # 3. Valores "sin info"
+        if valor in sin_info:
+            return "(UNICA)" if es_talla else ""
+
+        # 4-5. Unidades (una pasada) y SKUs (solo si hay algo que limpiar)
+        valor = unidades(_reemplazar_unidad, valor)
+        if "SKU" in valor:
+            valor = sku("", valor)
+        if "COD" in valor:
+            valor = cod("", valor)
+
+        # 6. Espacios múltiples
+        valor = " ".join(valor.split())
+
+        # 7. Reglas directas
+        if " DE " in valor and valor not in EXCEPCIONES_DE:
+            valor = " ".join(valor.replace(" DE ", " ").split())
+
+        if regla_campo is not None:
+            valor = regla_campo(valor)
+
+        if es_talla and valor:
+            valor = formatear_talla_parentesis(valor)
+        return valor
+
+    return normalizar
+
+
+_NORMALIZADORES: Dict[Optional[str], Callable[[str], str]] = {}
+
+
+def obtener_normalizador(campo: Optional[str] = None) -> Callable[[str], str]:
+    """Pipeline compilado (y reutilizado) para el campo indicado."""
+    normalizador = _NORMALIZADORES.get(campo)
+    if normalizador is None:
+        normalizador = _NORMALIZADORES[campo] = _compilar_normalizador(campo)
+    return normalizador
+
+
+@lru_cache(maxsize=MEMO_MAXSIZE)
+def _normalizar_memo(valor: str, campo: Optional[str]) -> str:
+    return obtener_normalizador(campo)(valor)
+
+
 def normalizar_valor(valor: str, campo: Optional[str] = None) -> str:
     """
     Normaliza un valor de campo aplicando todas las reglas de limpieza.
@@ -82,58 +214,26 @@ def normalizar_valor(valor: str, campo: Optional[str] = None) -> str:
     """
     if not valor or not isinstance(valor, str):
         return ""
-    
-    valor = valor.strip().upper()
-    
-    # 1. Eliminar prefijos redundantes
-    valor = eliminar_prefijos_redundantes(valor)
-    
-    # 2. Normalización específica de tallas
-    if campo == "talla":
-        valor = normalizar_talla(valor)
-    
-    # 3. Manejar valores "sin info"
-    if valor in SIN_INFO_VALORES:
-        if campo == "talla":
-            return formatear_talla_parentesis("UNICA")
-        return ""
-    
-    # 4. Normalizar unidades
-    valor = normalizar_unidades(valor)
-    
-    # 5. Limpiar SKUs
-    valor = limpiar_codigo_sku(valor)
-    
-    # 6. Limpiar espacios múltiples
-    valor = ' '.join(valor.split())
+    return _normalizar_memo(valor, campo)
 
-    # 7. Reglas directas de normalización por campo (Hard Rules)
-    if " DE " in valor:
-        # Excepciones que SÍ llevan "DE" en el estándar (Izaje principalmente)
-        if valor not in ["CABO DE VIDA", "LINEA DE VIDA", "ACEITE DE MOTOR"]: 
-            # Normalización gramatical general: "FILTRO DE AIRE" -> "FILTRO AIRE"
-            valor = valor.replace(" DE ", " ")
-            valor = ' '.join(valor.split()) # Re-limpiar espacios
 
-    if campo == "conexion":
-        if valor in ["ROSCA", "ROSCADA", "CON ROSCA", "HILO", "CON HILO"]:
-            return "ROSCADA NPT"
-        if valor in ["BRIDA", "CON BRIDA", "FLANGE"]:
-            return "BRIDADA"
-        if valor in ["SOLDAR", "SOLDABLE", "A SOLDAR"]:
-            return "SOLDADA SW"
-
-    if campo == "repuesto":
-        # Mapeos específicos para vehículos
-        if valor == "FILTRO": return "FILTRO AIRE" # Asumir aire si solo dice filtro, o dejar ambiguo? Mejor cuidado.
-        if "BOMBA" in valor and "AGUA" in valor: return "BOMBA AGUA"
-        if "PASTILLA" in valor: return "PASTILLA FRENO"
-        if "DISCO" in valor and "FRENO" in valor: return "DISCO FRENO"
-
-        if valor in ["SOLDAR", "SOLDABLE", "A SOLDAR"]:
-            return "SOLDADA SW"
-
-    if campo == "talla" and valor:
-        valor = formatear_talla_parentesis(valor)
-    
-    return valor
+def normalizar_valores_batch(valores: Iterable[str], campo: Optional[str] = None) -> List[str]:
+    """
+    Normaliza muchos valores de un mismo campo (carga masiva de catálogo).
+    Resuelve el pipeline una sola vez y deduplica dentro del lote.
+
+    Returns:
+        Lista con los valores normalizados, en el mismo orden de entrada.
+    """
+    normalizador = obtener_normalizador(campo)
+    vistos: Dict[str, str] = {}
+    resultado: List[str] = []
+    for valor in valores:
+        if not valor or not isinstance(valor, str):
+            resultado.append("")
+            continue
+        normalizado = vistos.get(valor)
+        if normalizado is None:
+            normalizado = vistos[valor] = normalizador(valor)
+        resultado.append(normalizado)
+    return resultado
@@ -0,0 +1,151 @@
+"""
+Servicio de sinónimos y traducciones (inglés / español regional) a valores estándar.
+
+La tabla vive en config/sinonimos_articulos.yaml y se resuelve localmente, de
+forma determinista: "Check" -> VALVULA CHECK, "Gasket" -> EMPAQUETADURA, sin
+que el LLM tenga que razonar la traducción en cada turno.
+
+Se aplica en dos etapas:
+- Normalización de slots (`traducir_valor`): un valor completo se reemplaza por
+  su valor estándar, prefiriendo el que pertenece a los valores del campo.
+- Extracción desde texto libre (`expandir_sinonimos`): se agregan los términos
+  estándar detectados para que la inferencia por keywords los reconozca.
+"""
+import os
+import re
+import yaml
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.archivo_recargable import ArchivoRecargable
+from app.services.chatbot_solicitud_articulos.fuzzy_matcher import plegar
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+SINONIMOS_PATH = Path(os.getenv("SINONIMOS_CONFIG_PATH") or BASE_DIR / "config" / "sinonimos_articulos.yaml")
+
+
+def _compilar_tabla(contenido: Optional[bytes], anterior: Optional[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    if contenido is None:
+        return {}
+    data = yaml.safe_load(contenido) or {}
+    return {str(valor): [str(a) for a in aliases or []] for valor, aliases in (data.get("sinonimos") or {}).items()}
+
+
+# Se recarga sola cuando cambia el archivo (ver archivo_recargable)
+_tabla: ArchivoRecargable[Dict[str, List[str]]] = ArchivoRecargable(SINONIMOS_PATH, _compilar_tabla)
+
+
+def cargar_sinonimos() -> Dict[str, List[str]]:
+    """Tabla VALOR ESTANDAR -> [alias] vigente (se recarga si el YAML cambia)."""
+    return _tabla.obtener()
+
+
+def recargar_sinonimos() -> Dict[str, List[str]]:
+    """Revisa ahora el YAML de sinónimos (sin esperar el intervalo)."""
+    return _tabla.revisar(forzar=True)
+
+
+def _claves(alias: str) -> Iterable[str]:
+    """Formas de comparación de un alias (normalizar_valor elimina ' DE ')."""
+    clave = plegar(alias)
+    yield clave
+    if " DE " in clave:
+        yield " ".join(clave.replace(" DE ", " ").split())
+
+
+Indice = Tuple[Dict[str, Tuple[str, ...]], Optional["re.Pattern"], frozenset]
+
+# ((versión sinónimos, versión config), índice): se reemplaza completo en cada reconstrucción
+_indice_vigente: Tuple[Tuple[str, str], Optional[Indice]] = (("", ""), None)
+
+
+def _indice() -> Indice:
+    """Índice de la versión vigente de sinónimos + configuración (se reconstruye si cambió alguna)."""
+    global _indice_vigente
+    # Import local: categorias_service usa este módulo en inferir_categoria
+    from app.services.chatbot_solicitud_articulos.categorias_service import obtener_config
+
+    tabla = cargar_sinonimos()
+    config = obtener_config()
+    clave = (_tabla.version, config.version)
+    vigente_clave, vigente = _indice_vigente
+    if vigente is not None and vigente_clave == clave:
+        return vigente
+    indice = _construir_indice(tabla, config)
+    _indice_vigente = (clave, indice)
+    return indice
+
+
+def _construir_indice(tabla: Dict[str, List[str]], config) -> Indice:
+    """
+    Índice compilado: alias plegado -> valores estándar candidatos (en orden de
+    declaración), regex única para texto libre y el conjunto de valores estándar
+    de todas las categorías (para no forzar un valor de otra categoría).
+    """
+    alias_a_valores: Dict[str, List[str]] = {}
+    for valor, aliases in tabla.items():
+        for alias in aliases:
+            for clave in _claves(alias):
+                candidatos = alias_a_valores.setdefault(clave, [])
+                if valor not in candidatos:
+                    candidatos.append(valor)
+
+    estandar_global = frozenset(
+        plegar(v)
+        for categoria in config.categorias.values()
+        for campo in categoria.campos.values()
+        for v in campo.valores_estandar
+    )
+
+    patron = None
+    if alias_a_valores:
+        # Alias más largos primero: "CHECK VALVE" gana sobre "CHECK"
+        alternativas = "|".join(re.escape(a) for a in sorted(alias_a_valores, key=len, reverse=True))
+        patron = re.compile(rf"(?<![A-Z0-9])(?:{alternativas})(?![A-Z0-9])")
+    return {k: tuple(v) for k, v in alias_a_valores.items()}, patron, estandar_global
+
+
+def traducir_valor(valor: str, valores_estandar: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Valor estándar para un alias (valor completo), o None si no es un alias conocido.
+
+    Con `valores_estandar` se elige el candidato que pertenece al campo. Si
+    ninguno pertenece, solo se usa un candidato que no sea valor estándar de
+    otra categoría (un término genérico como EMPAQUETADURA).
+    """
+    if not valor:
+        return None
+    alias_a_valores, _, estandar_global = _indice()
+    candidatos = alias_a_valores.get(plegar(valor))
+    if not candidatos:
+        return None
+    if valores_estandar is None:
+        return candidatos[0]
+
+    del_campo = {plegar(str(v)): str(v) for v in valores_estandar}
+    for candidato in candidatos:
+        if plegar(candidato) in del_campo:
+            return del_campo[plegar(candidato)]
+    for candidato in candidatos:
+        if plegar(candidato) not in estandar_global:
+            return candidato
+    return None
+
+
+def expandir_sinonimos(texto: str) -> str:
+    """
+    Agrega al texto los valores estándar de los alias que contiene
+    ("gate valve 2 pulg" -> "... VALVULA COMPUERTA"). No reemplaza nada:
+    el texto original conserva sus propias keywords.
+    """
+    alias_a_valores, patron, _ = _indice()
+    if not texto or patron is None:
+        return texto
+    encontrados: List[str] = []
+    for alias in patron.findall(plegar(texto)):
+        for valor in alias_a_valores[alias]:
+            if valor not in encontrados:
+                encontrados.append(valor)
+    if not encontrados:
+        return texto
+    return f"{texto} {' '.join(encontrados)}"
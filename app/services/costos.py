@@ -0,0 +1,447 @@
+"""
+Contabilidad de tokens y costo de LLM por sesión, endpoint y tenant, con presupuestos.
+
+Cada llamada al modelo (callback de `llm_callbacks`, vía `construir_run_config`)
+se valoriza con la tabla de config/costos_llm.yaml y se registra en una tabla
+SQLite compartida entre workers. Los inserts van por una cola a un hilo
+escritor (como el historial): el callback nunca espera el lock de SQLite. Las
+lecturas (presupuesto) se hacen con `asyncio.to_thread` desde los routers. El contexto de la llamada (tenant, sesión,
+endpoint, request) viaja en un ContextVar que abre el middleware HTTP.
+
+Presupuestos (por tenant y día, y por sesión):
+- soft: los routers usan el modelo económico y omiten caminos caros,
+- hard: los routers rechazan la request (HTTP 402).
+
+Frontera de confianza: el tenant y la sesión de los headers X-Tenant-ID /
+X-Session-ID solo se aceptan si la request trae X-Proxy-Secret igual a
+PROXY_SECRET (lo agrega el proxy de Laravel, que autentica al usuario). Sin
+el secreto los headers se ignoran y el costo se carga a un bucket por IP del
+cliente (`ip:<host>`): un cliente no puede cambiar de tenant para reiniciar
+su presupuesto ni agotar el de otros. GET /costos/* exige el mismo secreto.
+La sesión del cuerpo (sesion_id del chatbot) sigue siendo del cliente: solo
+acota el presupuesto por sesión; el límite que protege es el del tenant.
+En producción PROXY_SECRET es obligatorio: sin él, todo lo que llega por el
+proxy comparte la IP del proxy.
+"""
+import hmac
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import yaml
+
+from app.services.archivo_recargable import ArchivoRecargable
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+COSTOS_CONFIG_PATH = Path(os.getenv("LLM_COSTOS_CONFIG_PATH") or BASE_DIR / "config" / "costos_llm.yaml")
+DEFAULT_DB_PATH = BASE_DIR / "cache" / "costos_llm.sqlite3"
+
+# Niveles de presupuesto
+OK = "ok"
+SOFT = "soft"
+HARD = "hard"
+
+# Agrupaciones disponibles en los totales
+AGRUPACIONES = {
+    "tenant": "tenant", "sesion": "sesion", "endpoint": "endpoint", "modelo": "modelo", "request": "request_id",
+    "ruta": "ruta",
+}
+
+TIPOS_TOKEN = ("input", "output", "cache_read", "cache_creation")
+
+# Máximo de filas por lote de escritura
+LOTE_ESCRITURA = 256
+
+_INSERT = (
+    "INSERT INTO llm_uso (ts, tenant, sesion, endpoint, request_id, modelo, input, output, "
+    "cache_read, cache_creation, costo_usd, ruta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+# --- Tabla de precios ---
+
+@dataclass(frozen=True)
+class Limites:
+    soft: Optional[float] = None
+    hard: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class TablaCostos:
+    """Precios (USD por millón de tokens) y presupuestos compilados."""
+    precios: Mapping[str, Mapping[str, float]]
+    por_defecto: Mapping[str, float]
+    modelo_economico: Optional[str] = None
+    tenant_diario: Limites = Limites()
+    sesion: Limites = Limites()
+    tenants: Mapping[str, Limites] = field(default_factory=dict)
+
+    def precio(self, modelo: str) -> Mapping[str, float]:
+        return self.precios.get(modelo) or self.por_defecto
+
+
+def _limites(data: Any) -> Limites:
+    data = data or {}
+    return Limites(
+        soft=float(data["soft"]) if data.get("soft") is not None else None,
+        hard=float(data["hard"]) if data.get("hard") is not None else None,
+    )
+
+
+def _precio(data: Any) -> Dict[str, float]:
+    return {tipo: float((data or {}).get(tipo) or 0) for tipo in TIPOS_TOKEN}
+
+
+def _compilar_tabla(contenido: Optional[bytes], anterior: Optional[TablaCostos]) -> TablaCostos:
+    data = yaml.safe_load(contenido) if contenido is not None else {}
+    data = data or {}
+    presupuestos = data.get("presupuestos") or {}
+    return TablaCostos(
+        precios={str(m): _precio(p) for m, p in (data.get("precios") or {}).items()},
+        por_defecto=_precio(data.get("por_defecto")),
+        modelo_economico=presupuestos.get("modelo_economico"),
+        tenant_diario=_limites(presupuestos.get("tenant_diario")),
+        sesion=_limites(presupuestos.get("sesion")),
+        tenants={str(t): _limites(l) for t, l in (presupuestos.get("tenants") or {}).items()},
+    )
+
+
+_tabla: ArchivoRecargable[TablaCostos] = ArchivoRecargable(COSTOS_CONFIG_PATH, _compilar_tabla)
+
+
+def obtener_tabla_costos() -> TablaCostos:
+    return _tabla.obtener()
+
+
+def calcular_costo(modelo: str, uso: Mapping[str, int], tabla: Optional[TablaCostos] = None) -> float:
+    """
+    Costo USD de una llamada. `uso["input"]` incluye los tokens de cache (así lo
+    reporta langchain_anthropic), por eso se descuentan antes de cobrar input.
+    """
+    precio = (tabla or obtener_tabla_costos()).precio(modelo)
+    cache_read = uso.get("cache_read", 0)
+    cache_creation = uso.get("cache_creation", 0)
+    input_sin_cache = max(uso.get("input", 0) - cache_read - cache_creation, 0)
+    return (
+        input_sin_cache * precio["input"]
+        + uso.get("output", 0) * precio["output"]
+        + cache_read * precio["cache_read"]
+        + cache_creation * precio["cache_creation"]
+    ) / 1_000_000
+
+
+# --- Contexto de la request ---
+
+@dataclass
+class ContextoCosto:
+    """A quién se le carga el costo de las llamadas al LLM de esta request."""
+    endpoint: str
+    tenant: str = "sin_tenant"
+    sesion: Optional[str] = None
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # Ruta del ruteo de modelos (rutinario / escalado) que eligió el router
+    ruta: Optional[str] = None
+    # Acumulado de esta request (header X-LLM-Cost-USD)
+    costo_usd: float = 0.0
+    llamadas: int = 0
+
+    @property
+    def sesion_efectiva(self) -> str:
+        # Sin sesión explícita cada request es su propia sesión (ej: un informe 5 porqués)
+        return self.sesion or self.request_id
+
+
+_contexto: ContextVar[Optional[ContextoCosto]] = ContextVar("contexto_costo", default=None)
+
+
+def contexto_costo() -> Optional[ContextoCosto]:
+    return _contexto.get()
+
+
+@contextmanager
+def contexto_request(
+    endpoint: str, tenant: Optional[str] = None, sesion: Optional[str] = None, request_id: Optional[str] = None
+) -> Iterator[ContextoCosto]:
+    ctx = ContextoCosto(endpoint=endpoint, tenant=tenant or "sin_tenant", sesion=sesion or None)
+    if request_id:
+        ctx.request_id = request_id
+    token = _contexto.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _contexto.reset(token)
+
+
+# --- Identidad de la request ---
+
+HEADER_PROXY_SECRET = "X-Proxy-Secret"
+HEADER_TENANT = "X-Tenant-ID"
+HEADER_SESION = "X-Session-ID"
+
+
+def proxy_confiable(headers: Mapping[str, str]) -> bool:
+    """True si la request trae el secreto compartido con el proxy (PROXY_SECRET)."""
+    secreto = os.getenv("PROXY_SECRET", "")
+    recibido = headers.get(HEADER_PROXY_SECRET) or ""
+    return bool(secreto) and hmac.compare_digest(recibido.encode("utf-8"), secreto.encode("utf-8"))
+
+
+def identidad_request(headers: Mapping[str, str], ip_cliente: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(tenant, sesión) a los que se carga el costo. Los headers solo valen si vienen del proxy."""
+    if proxy_confiable(headers):
+        return headers.get(HEADER_TENANT) or "sin_tenant", headers.get(HEADER_SESION) or None
+    return f"ip:{ip_cliente or 'desconocida'}", None
+
+
+# --- Registro persistente ---
+
+class CostStore:
+    """Uso y costo por llamada al LLM (SQLite en modo WAL, compartido entre workers)."""
+
+    def __init__(self, db_path: Optional[Path] = None, max_cola: int = 10_000):
+        self.db_path = Path(db_path or os.getenv("LLM_COSTOS_DB") or DEFAULT_DB_PATH)
+        self._init_lock = threading.Lock()
+        self._inicializado = False
+        self._cola: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=max_cola)
+        self._hilo: Optional[threading.Thread] = None
+        self._hilo_lock = threading.Lock()
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        """Conexión corta por operación: commit al salir y cierre siempre."""
+        if not self._inicializado:
+            self._inicializar()
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _inicializar(self) -> None:
+        with self._init_lock:
+            if self._inicializado:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_uso (
+                        ts REAL NOT NULL,
+                        tenant TEXT NOT NULL,
+                        sesion TEXT NOT NULL,
+                        endpoint TEXT NOT NULL,
+                        request_id TEXT NOT NULL,
+                        modelo TEXT NOT NULL,
+                        input INTEGER NOT NULL,
+                        output INTEGER NOT NULL,
+                        cache_read INTEGER NOT NULL,
+                        cache_creation INTEGER NOT NULL,
+                        costo_usd REAL NOT NULL,
+                        ruta TEXT
+                    )
+                """)
+                # Bases creadas antes del ruteo de modelos
+                columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(llm_uso)")}
+                if "ruta" not in columnas:
+                    conn.execute("ALTER TABLE llm_uso ADD COLUMN ruta TEXT")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_uso_tenant_ts ON llm_uso (tenant, ts)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_uso_sesion ON llm_uso (sesion)")
+                conn.commit()
+            finally:
+                conn.close()
+            self._inicializado = True
+
+    @staticmethod
+    def _fila(ctx: ContextoCosto, modelo: str, uso: Mapping[str, int], costo_usd: float) -> Tuple:
+        return (
+            time.time(), ctx.tenant, ctx.sesion_efectiva, ctx.endpoint, ctx.request_id, modelo,
+            uso.get("input", 0), uso.get("output", 0), uso.get("cache_read", 0),
+            uso.get("cache_creation", 0), costo_usd, ctx.ruta,
+        )
+
+    def registrar(self, ctx: ContextoCosto, modelo: str, uso: Mapping[str, int], costo_usd: float) -> None:
+        """Insert síncrono (scripts y tests). En el servicio se usa `encolar`."""
+        with self._conn() as conn:
+            conn.execute(_INSERT, self._fila(ctx, modelo, uso, costo_usd))
+
+    # --- Escritura en segundo plano ---
+    def encolar(self, ctx: ContextoCosto, modelo: str, uso: Mapping[str, int], costo_usd: float) -> None:
+        """Encola el insert para el hilo escritor. Con la cola llena se inserta en línea (no se pierde el costo)."""
+        if self._hilo is None:
+            self._iniciar_escritor()
+        fila = self._fila(ctx, modelo, uso, costo_usd)
+        try:
+            self._cola.put_nowait(fila)
+        except queue.Full:
+            print("⚠️ [COSTOS] Cola de escritura llena: insert en línea")
+            with self._conn() as conn:
+                conn.execute(_INSERT, fila)
+
+    def _iniciar_escritor(self) -> None:
+        with self._hilo_lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escribir, name="escritor-costos", daemon=True)
+                self._hilo.start()
+
+    def _escribir(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < LOTE_ESCRITURA:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            filas = [f for f in lote if f is not None]
+            try:
+                if filas:
+                    with self._conn() as conn:
+                        conn.executemany(_INSERT, filas)
+            except sqlite3.Error as e:
+                print(f"⚠️ [COSTOS] No se pudieron registrar {len(filas)} usos: {e}")
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+            if None in lote:
+                return
+
+    def vaciar(self) -> None:
+        """Espera a que se escriba todo lo encolado."""
+        if self._hilo is not None:
+            self._cola.join()
+
+    def cerrar(self, timeout: float = 5.0) -> None:
+        """Escribe lo pendiente y detiene el hilo (shutdown del worker)."""
+        hilo = self._hilo
+        if hilo is None:
+            return
+        self._cola.put(None, timeout=timeout)
+        hilo.join(timeout)
+        self._hilo = None
+
+    def gasto(self, tenant: Optional[str] = None, sesion: Optional[str] = None, desde: Optional[float] = None) -> float:
+        filtros, params = self._filtros(tenant=tenant, sesion=sesion, desde=desde)
+        with self._conn() as conn:
+            fila = conn.execute(f"SELECT COALESCE(SUM(costo_usd), 0) FROM llm_uso {filtros}", params).fetchone()
+        return float(fila[0])
+
+    def totales(self, agrupar: str = "tenant", **filtros: Any) -> List[Dict[str, Any]]:
+        """Totales de tokens y costo agrupados por tenant, sesion, endpoint, modelo, request o ruta."""
+        columna = AGRUPACIONES[agrupar]
+        where, params = self._filtros(**filtros)
+        with self._conn() as conn:
+            filas = conn.execute(
+                f"SELECT {columna} AS clave, COUNT(*) AS llamadas, SUM(input) AS input_tokens, "
+                f"SUM(output) AS output_tokens, SUM(cache_read) AS cache_read_tokens, "
+                f"SUM(cache_creation) AS cache_creation_tokens, SUM(costo_usd) AS costo_usd, "
+                f"MIN(ts) AS desde, MAX(ts) AS hasta "
+                f"FROM llm_uso {where} GROUP BY {columna} ORDER BY costo_usd DESC",
+                params,
+            ).fetchall()
+        return [{**dict(f), "costo_usd": round(f["costo_usd"], 6)} for f in filas]
+
+    @staticmethod
+    def _filtros(
+        tenant: Optional[str] = None,
+        sesion: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        modelo: Optional[str] = None,
+        ruta: Optional[str] = None,
+        desde: Optional[float] = None,
+        hasta: Optional[float] = None,
+    ):
+        condiciones, params = [], []
+        igualdades = (
+            ("tenant", tenant), ("sesion", sesion), ("endpoint", endpoint), ("modelo", modelo), ("ruta", ruta),
+        )
+        for columna, valor in igualdades:
+            if valor is not None:
+                condiciones.append(f"{columna} = ?")
+                params.append(valor)
+        if desde is not None:
+            condiciones.append("ts >= ?")
+            params.append(desde)
+        if hasta is not None:
+            condiciones.append("ts < ?")
+            params.append(hasta)
+        return ("WHERE " + " AND ".join(condiciones)) if condiciones else "", params
+
+
+cost_store = CostStore()
+
+
+def registrar_uso(modelo: str, uso: Mapping[str, int], ctx: Optional[ContextoCosto] = None) -> float:
+    """Valoriza y registra una llamada. Sin contexto (scripts, tests) solo retorna el costo."""
+    costo = calcular_costo(modelo, uso)
+    ctx = ctx or contexto_costo()
+    if ctx is not None:
+        ctx.costo_usd += costo
+        ctx.llamadas += 1
+        try:
+            cost_store.encolar(ctx, modelo, uso, costo)
+        except sqlite3.Error as e:
+            print(f"⚠️ [COSTOS] No se pudo registrar el uso: {e}")
+    return costo
+
+
+# --- Presupuestos ---
+
+@dataclass
+class EstadoPresupuesto:
+    nivel: str                      # ok | soft | hard
+    motivo: Optional[str] = None
+    gasto_tenant_hoy: float = 0.0
+    gasto_sesion: float = 0.0
+    modelo_economico: Optional[str] = None
+
+    def modelo(self, solicitado: str) -> str:
+        """Modelo a usar: el económico cuando se superó el presupuesto soft."""
+        if self.nivel != OK and self.modelo_economico:
+            return self.modelo_economico
+        return solicitado
+
+
+def _inicio_dia_utc(ahora: Optional[float] = None) -> float:
+    ahora = time.time() if ahora is None else ahora
+    return ahora - (ahora % 86400)
+
+
+def evaluar_presupuesto(ctx: Optional[ContextoCosto] = None, store: Optional[CostStore] = None) -> EstadoPresupuesto:
+    """
+    Nivel de presupuesto del tenant (hoy) y de la sesión del contexto actual.
+    Lee SQLite (puede esperar el lock): desde código async llamar con
+    `await asyncio.to_thread(evaluar_presupuesto)`.
+    """
+    ctx = ctx or contexto_costo()
+    tabla = obtener_tabla_costos()
+    if ctx is None:
+        return EstadoPresupuesto(nivel=OK, modelo_economico=tabla.modelo_economico)
+    store = store or cost_store
+    limites_tenant = tabla.tenants.get(ctx.tenant) or tabla.tenant_diario
+    gasto_tenant = store.gasto(tenant=ctx.tenant, desde=_inicio_dia_utc())
+    gasto_sesion = store.gasto(sesion=ctx.sesion) if ctx.sesion else 0.0
+
+    nivel, motivo = OK, None
+    for nombre, gasto, limites in (("tenant diario", gasto_tenant, limites_tenant), ("sesión", gasto_sesion, tabla.sesion)):
+        if limites.hard is not None and gasto >= limites.hard:
+            nivel, motivo = HARD, f"presupuesto {nombre} agotado ({gasto:.4f} / {limites.hard} USD)"
+            break
+        if limites.soft is not None and gasto >= limites.soft and nivel == OK:
+            nivel, motivo = SOFT, f"presupuesto {nombre} sobre el límite soft ({gasto:.4f} / {limites.soft} USD)"
+    return EstadoPresupuesto(
+        nivel=nivel,
+        motivo=motivo,
+        gasto_tenant_hoy=round(gasto_tenant, 6),
+        gasto_sesion=round(gasto_sesion, 6),
+        modelo_economico=tabla.modelo_economico,
+    )
@@ -0,0 +1,212 @@
+"""
+Cache content-addressed para la extracción y el análisis de documentos.
+
+Las entradas se indexan por el SHA-256 de los bytes del archivo, de modo que
+la misma ficha técnica subida por distintos usuarios se procesa una sola vez.
+El texto extraído y el resumen técnico se guardan por separado y cada uno
+lleva su propia versión (extractor / prompt + modelo), así un cambio de prompt
+invalida solo los resúmenes y no obliga a volver a parsear los PDFs.
+
+Niveles:
+1. Memoria (LRU por proceso): respuesta en microsegundos.
+2. Disco (compartido entre workers): sobrevive a reinicios. Acotado por edad
+   (DOCUMENT_CACHE_MAX_DIAS) y tamaño (DOCUMENT_CACHE_MAX_MB): una poda en
+   segundo plano, como máximo cada DOCUMENT_CACHE_PODA_SEGUNDOS y disparada
+   por las escrituras, borra lo vencido y luego lo menos usado (mtime; un hit
+   en disco renueva el mtime) hasta quedar bajo el tamaño máximo.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_CACHE_DIR = BASE_DIR / "cache" / "documentos"
+
+MAX_MB = float(os.getenv("DOCUMENT_CACHE_MAX_MB", "1024"))
+MAX_DIAS = float(os.getenv("DOCUMENT_CACHE_MAX_DIAS", "30"))
+PODA_SEGUNDOS = float(os.getenv("DOCUMENT_CACHE_PODA_SEGUNDOS", "3600"))
+
+
+def hash_contenido(content: bytes) -> str:
+    """SHA-256 hexadecimal de los bytes del archivo."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def version_analisis(*partes: str) -> str:
+    """Versión corta derivada de los insumos del análisis (prompt, modelo, etc.)."""
+    h = hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()
+    return h[:12]
+
+
+class DocumentCache:
+    """Cache de dos niveles (memoria + disco) para texto y resúmenes de documentos."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_memoria: int = 256,
+        max_bytes: float = MAX_MB * 1024 * 1024,
+        max_edad_segundos: float = MAX_DIAS * 86400,
+        poda_segundos: float = PODA_SEGUNDOS,
+    ):
+        self.cache_dir = Path(cache_dir or os.getenv("DOCUMENT_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        self.max_memoria = max_memoria
+        self.max_bytes = max_bytes
+        self.max_edad_segundos = max_edad_segundos
+        self.poda_segundos = poda_segundos
+        self._memoria: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._proxima_poda = 0.0   # la primera escritura del proceso poda (arranque)
+        self._podando = False
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def get_texto(self, doc_hash: str, version: str) -> Optional[str]:
+        return self._get("texto", doc_hash, version)
+
+    def set_texto(self, doc_hash: str, version: str, texto: str) -> None:
+        self._set("texto", doc_hash, version, texto)
+
+    def get_resumen(self, doc_hash: str, version: str) -> Optional[Any]:
+        return self._get("resumen", doc_hash, version)
+
+    def set_resumen(self, doc_hash: str, version: str, resumen: Any) -> None:
+        self._set("resumen", doc_hash, version, resumen)
+
+    def limpiar_memoria(self) -> None:
+        with self._lock:
+            self._memoria.clear()
+
+    def podar(self, ahora: Optional[float] = None) -> int:
+        """
+        Borra del disco las entradas más viejas que max_edad_segundos y, si el
+        total sigue sobre max_bytes, las de mtime más antiguo. Retorna cuántas borró.
+        """
+        ahora = time.time() if ahora is None else ahora
+        entradas: List[Tuple[float, int, Path]] = []
+        for ruta in self.cache_dir.glob("*/*/*.json"):
+            try:
+                st = ruta.stat()
+            except OSError:
+                continue
+            entradas.append((st.st_mtime, st.st_size, ruta))
+        entradas.sort()
+
+        total = sum(tam for _, tam, _ in entradas)
+        borradas = 0
+        for mtime, tam, ruta in entradas:
+            vencida = self.max_edad_segundos and ahora - mtime > self.max_edad_segundos
+            if not vencida and (not self.max_bytes or total <= self.max_bytes):
+                break
+            try:
+                ruta.unlink()
+            except OSError:
+                continue
+            total -= tam
+            borradas += 1
+            # Directorios del hash que quedaron vacíos
+            for directorio in (ruta.parent, ruta.parent.parent):
+                try:
+                    directorio.rmdir()
+                except OSError:
+                    break
+        if borradas:
+            print(f"🧹 [CACHE] Poda de documentos: {borradas} entradas borradas ({total / 1024 / 1024:.1f} MB en disco)")
+        return borradas
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _clave(self, tipo: str, doc_hash: str, version: str) -> str:
+        return f"{tipo}:{doc_hash}:{version}"
+
+    def _ruta(self, tipo: str, doc_hash: str, version: str) -> Path:
+        # Fan-out por los 2 primeros caracteres para no saturar un directorio
+        return self.cache_dir / doc_hash[:2] / doc_hash / f"{tipo}-{version}.json"
+
+    def _get(self, tipo: str, doc_hash: str, version: str) -> Optional[Any]:
+        clave = self._clave(tipo, doc_hash, version)
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self.hits += 1
+                return self._memoria[clave]
+
+        ruta = self._ruta(tipo, doc_hash, version)
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                valor = json.load(f)["valor"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        except OSError as e:
+            print(f"Error leyendo cache de documento: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # Renueva el mtime: la poda por tamaño borra primero lo menos usado
+            os.utime(ruta)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            self._recordar(clave, valor)
+        return valor
+
+    def _set(self, tipo: str, doc_hash: str, version: str, valor: Any) -> None:
+        clave = self._clave(tipo, doc_hash, version)
+        with self._lock:
+            self._recordar(clave, valor)
+
+        ruta = self._ruta(tipo, doc_hash, version)
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: otro worker nunca ve un JSON a medio escribir
+            tmp = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"valor": valor, "creado": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp, ruta)
+        except OSError as e:
+            # El cache es una optimización: un fallo de disco no debe romper la request
+            print(f"Error guardando cache de documento: {e}")
+        self._podar_si_corresponde()
+
+    def _podar_si_corresponde(self) -> None:
+        """Lanza la poda en un hilo si pasó el intervalo (el request no recorre el disco)."""
+        with self._lock:
+            ahora = time.monotonic()
+            if self._podando or ahora < self._proxima_poda:
+                return
+            self._podando = True
+            self._proxima_poda = ahora + self.poda_segundos
+        threading.Thread(target=self._podar_en_segundo_plano, name="poda-cache-documentos", daemon=True).start()
+
+    def _podar_en_segundo_plano(self) -> None:
+        try:
+            self.podar()
+        except OSError as e:
+            print(f"Error podando cache de documentos: {e}")
+        finally:
+            with self._lock:
+                self._podando = False
+
+    def _recordar(self, clave: str, valor: Any) -> None:
+        self._memoria[clave] = valor
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+
+# Instancia compartida por el proceso
+document_cache = DocumentCache()
@@ -0,0 +1,327 @@
+"""
+Extractores de texto por formato, detrás de una misma interfaz de iterador.
+
+Cada extractor recibe los bytes del archivo y produce "páginas" de texto de
+forma perezosa (PDF: una por página; planillas y DOCX: bloques de filas o
+párrafos). El consumidor (document_service) corta la iteración apenas se
+alcanza el presupuesto de extracción, por lo que un libro Excel enorme no se
+lee completo ni se materializa en memoria.
+
+El formato se detecta por el contenido (magic bytes / estructura del ZIP) y
+solo como último recurso por la extensión del nombre de archivo. CSV y TXT se
+decodifican línea a línea (`io.TextIOWrapper`) y se rechazan si traen NUL o
+caracteres de control: un binario decodificado como cp1252 no llega al LLM.
+"""
+import csv
+import io
+import re
+import zipfile
+from abc import ABC, abstractmethod
+from typing import IO, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+# Filas / párrafos por "página" en formatos sin paginación propia
+LINEAS_POR_BLOQUE = 50
+
+# Bytes que se inspeccionan para detectar el formato
+_TAM_CABECERA = 2048
+
+# Texto plano: caracteres por "página" y tope de lo que se decodifica por archivo
+CARACTERES_POR_BLOQUE = 4000
+MAX_CARACTERES_TEXTO = 2_000_000
+
+# Controles C0/C1 que no aparecen en texto (se permiten tab, saltos de línea y de página)
+_CONTROL = re.compile("[\x00-\x08\x0e-\x1f\x7f-\x9f]")
+
+_NS_WORD = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class Extractor(ABC):
+    """Interfaz común: detección por contenido + iterador de páginas de texto."""
+
+    nombre = "base"
+
+    @abstractmethod
+    def acepta(self, cabecera: bytes, filename: str, content: bytes) -> bool:
+        """True si el extractor reconoce el formato (por contenido; el nombre solo desempata)."""
+
+    @abstractmethod
+    def iterar(self, content: bytes) -> Iterator[str]:
+        """Páginas de texto, de forma perezosa. Lanza ValueError si el archivo no se puede leer."""
+
+
+def _agrupar(lineas: Iterator[str], tamano: int = LINEAS_POR_BLOQUE) -> Iterator[str]:
+    """Agrupa líneas en bloques de `tamano` sin materializar el documento completo."""
+    bloque: List[str] = []
+    for linea in lineas:
+        if not linea:
+            continue
+        bloque.append(linea)
+        if len(bloque) >= tamano:
+            yield "\n".join(bloque)
+            bloque = []
+    if bloque:
+        yield "\n".join(bloque)
+
+
+def _formatear_fila(encabezados: Optional[List[str]], valores) -> str:
+    """
+    Convierte una fila en texto autodescriptivo ("Columna: valor; ...") para que
+    cada línea conserve su significado al seleccionarla o trocearla por separado.
+    """
+    celdas = []
+    for i, valor in enumerate(valores):
+        if valor is None:
+            continue
+        texto = str(valor).strip()
+        if not texto:
+            continue
+        encabezado = encabezados[i] if encabezados and i < len(encabezados) else ""
+        celdas.append(f"{encabezado}: {texto}" if encabezado else texto)
+    return "; ".join(celdas)
+
+
+def _filas_a_lineas(filas) -> Iterator[str]:
+    """La primera fila no vacía se toma como encabezado de columnas."""
+    encabezados: Optional[List[str]] = None
+    for fila in filas:
+        if encabezados is None:
+            if any(v is not None and str(v).strip() for v in fila):
+                encabezados = [str(v).strip() if v is not None else "" for v in fila]
+            continue
+        yield _formatear_fila(encabezados, fila)
+
+
+def _nombres_zip(content: bytes) -> List[str]:
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            return zf.namelist()
+    except zipfile.BadZipFile:
+        return []
+
+
+class PdfExtractor(Extractor):
+    nombre = "pdf"
+
+    def acepta(self, cabecera, filename, content):
+        return b"%PDF-" in cabecera[:1024]
+
+    def iterar(self, content):
+        from pypdf import PdfReader
+
+        try:
+            reader = PdfReader(io.BytesIO(content))
+            for page in reader.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    yield page_text
+        except Exception as e:
+            raise ValueError(f"Error leyendo PDF: {str(e)}")
+
+
+class XlsxExtractor(Extractor):
+    nombre = "xlsx"
+
+    def acepta(self, cabecera, filename, content):
+        return cabecera.startswith(b"PK\x03\x04") and "xl/workbook.xml" in _nombres_zip(content)
+
+    def iterar(self, content):
+        from openpyxl import load_workbook
+
+        try:
+            # read_only: las filas se leen en streaming desde el XML, memoria plana
+            wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        except Exception as e:
+            raise ValueError(f"Error leyendo planilla Excel: {str(e)}")
+        try:
+            for ws in wb.worksheets:
+                lineas = _filas_a_lineas(ws.iter_rows(values_only=True))
+                for i, bloque in enumerate(_agrupar(lineas)):
+                    yield f"Hoja: {ws.title}\n{bloque}" if i == 0 else bloque
+        finally:
+            wb.close()
+
+
+class DocxExtractor(Extractor):
+    nombre = "docx"
+
+    def acepta(self, cabecera, filename, content):
+        return cabecera.startswith(b"PK\x03\x04") and "word/document.xml" in _nombres_zip(content)
+
+    def iterar(self, content):
+        try:
+            zf = zipfile.ZipFile(io.BytesIO(content))
+            xml = zf.open("word/document.xml")
+        except (zipfile.BadZipFile, KeyError) as e:
+            raise ValueError(f"Error leyendo documento Word: {str(e)}")
+        with zf, xml:
+            yield from _agrupar(self._lineas(xml))
+
+    @staticmethod
+    def _lineas(xml) -> Iterator[str]:
+        """
+        Recorre document.xml con iterparse (streaming). Los párrafos sueltos son
+        una línea; cada fila de tabla se emite como "celda | celda | ...".
+        """
+        en_tabla = 0
+        celdas: List[str] = []
+        parrafos_celda: List[str] = []
+        try:
+            for evento, elem in iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if evento == "start":
+                    if tag == f"{_NS_WORD}tbl":
+                        en_tabla += 1
+                    continue
+
+                if tag == f"{_NS_WORD}p":
+                    texto = "".join(t.text or "" for t in elem.iter(f"{_NS_WORD}t")).strip()
+                    if en_tabla:
+                        if texto:
+                            parrafos_celda.append(texto)
+                    elif texto:
+                        yield texto
+                    elem.clear()
+                elif tag == f"{_NS_WORD}tc":
+                    celdas.append(" ".join(parrafos_celda))
+                    parrafos_celda = []
+                    elem.clear()
+                elif tag == f"{_NS_WORD}tr":
+                    fila = " | ".join(c for c in celdas if c)
+                    celdas = []
+                    elem.clear()
+                    if fila:
+                        yield fila
+                elif tag == f"{_NS_WORD}tbl":
+                    en_tabla -= 1
+                    elem.clear()
+        except Exception as e:
+            raise ValueError(f"Error leyendo documento Word: {str(e)}")
+
+
+def _encoding_texto(muestra: bytes, parcial: bool = False) -> Optional[str]:
+    """
+    Encoding con el que `muestra` es texto (utf-8 o cp1252); None si parece
+    binario (NUL o caracteres de control). Con `parcial` (cabecera recortada)
+    se tolera un carácter UTF-8 cortado al final.
+    """
+    if b"\x00" in muestra:
+        return None
+    recortes = range(4) if parcial else range(1)
+    for encoding in ("utf-8-sig", "cp1252"):
+        for recorte in recortes:
+            try:
+                texto = muestra[:len(muestra) - recorte].decode(encoding)
+            except UnicodeDecodeError:
+                continue
+            return None if _CONTROL.search(texto) else encoding
+    return None
+
+
+def _lineas_texto(content: bytes, encoding: str, formato: str) -> Iterator[str]:
+    """
+    Líneas del archivo decodificadas en streaming (sin copiar el archivo a un
+    str), hasta MAX_CARACTERES_TEXTO. Lanza ValueError si aparece un byte que no
+    es texto más allá de la cabecera.
+    """
+    lector: IO[str] = io.TextIOWrapper(io.BytesIO(content), encoding=encoding, newline="")
+    leidos = 0
+    try:
+        for linea in lector:
+            if _CONTROL.search(linea):
+                raise ValueError(f"Error leyendo {formato}: el archivo contiene datos binarios.")
+            yield linea
+            leidos += len(linea)
+            if leidos >= MAX_CARACTERES_TEXTO:
+                return
+    except UnicodeDecodeError:
+        raise ValueError(f"Error leyendo {formato}: el archivo no es texto válido.")
+    finally:
+        lector.detach()
+
+
+class CsvExtractor(Extractor):
+    nombre = "csv"
+
+    def acepta(self, cabecera, filename, content):
+        encoding = _encoding_texto(cabecera, parcial=True)
+        if encoding is None:
+            return False
+        if filename.endswith((".csv", ".tsv")):
+            return True
+        muestra = cabecera.decode(encoding, errors="ignore")
+        if muestra.count("\n") < 2:
+            return False
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t|")
+        except csv.Error:
+            return False
+        # Exigir columnas consistentes en las primeras líneas para no confundir prosa con CSV
+        lineas = [l for l in muestra.splitlines()[:-1] if l.strip()][:10]
+        columnas = {len(next(csv.reader([l], dialecto))) for l in lineas}
+        return len(columnas) == 1 and columnas.pop() > 1
+
+    def iterar(self, content):
+        encoding = _encoding_texto(content[:_TAM_CABECERA], parcial=True)
+        if encoding is None:
+            raise ValueError("Error leyendo CSV: el archivo no es texto válido.")
+        muestra = content[:_TAM_CABECERA].decode(encoding, errors="ignore")
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t|")
+        except csv.Error:
+            dialecto = csv.excel
+        filas = csv.reader(_lineas_texto(content, encoding, "CSV"), dialecto)
+        yield from _agrupar(_filas_a_lineas(filas))
+
+
+class TxtExtractor(Extractor):
+    nombre = "txt"
+
+    def acepta(self, cabecera, filename, content):
+        return _encoding_texto(cabecera, parcial=True) is not None
+
+    def iterar(self, content):
+        encoding = _encoding_texto(content[:_TAM_CABECERA], parcial=True)
+        if encoding is None:
+            raise ValueError("Error leyendo archivo de texto: codificación no soportada.")
+        # Bloques de ~CARACTERES_POR_BLOQUE cortados en fin de línea: el consumidor corta al agotar el presupuesto
+        bloque: List[str] = []
+        tamano = 0
+        for linea in _lineas_texto(content, encoding, "archivo de texto"):
+            bloque.append(linea)
+            tamano += len(linea)
+            if tamano >= CARACTERES_POR_BLOQUE:
+                yield "".join(bloque).rstrip("\r\n")
+                bloque, tamano = [], 0
+        if bloque:
+            yield "".join(bloque).rstrip("\r\n")
+
+
+# Orden de prioridad: formatos con firma inequívoca primero, texto plano al final
+EXTRACTORES: List[Extractor] = [
+    PdfExtractor(),
+    XlsxExtractor(),
+    DocxExtractor(),
+    CsvExtractor(),
+    TxtExtractor(),
+]
+
+FORMATOS_SOPORTADOS = "PDF, DOCX, XLSX, CSV o TXT"
+
+
+def detectar_extractor(content: bytes, filename: str = "") -> Extractor:
+    """
+    Elige el extractor según el contenido del archivo.
+    Lanza ValueError si ningún extractor reconoce el formato.
+    """
+    cabecera = content[:_TAM_CABECERA]
+    nombre = (filename or "").lower()
+    for extractor in EXTRACTORES:
+        if extractor.acepta(cabecera, nombre, content):
+            return extractor
+    raise ValueError(f"Formato no soportado. Por favor sube archivos {FORMATOS_SOPORTADOS}.")
+
+
+def registrar_extractor(extractor: Extractor, prioridad: int = 0) -> None:
+    """Permite agregar formatos nuevos (p.ej. OCR) sin tocar el pipeline."""
+    EXTRACTORES.insert(prioridad, extractor)
@@ -0,0 +1,241 @@
+"""
+Jobs asíncronos para el análisis de documentos.
+
+El upload responde de inmediato con un `job_id` y el procesamiento (parseo +
+LLM) corre en segundo plano en un pool de workers del proceso. El estado y el
+resultado se guardan en una tabla SQLite pequeña, compartida entre los workers
+de uvicorn, de modo que cualquier worker puede responder el polling.
+
+Los resultados se conservan durante un TTL para que el chat los recupere
+cuando los necesite; los expirados se purgan de forma perezosa.
+
+Mientras un job está en cola o en curso, el worker que lo tiene renueva un
+latido (`latido`) cada `lease / 3` segundos. Si el latido tiene más de
+`lease` segundos, el worker murió (reinicio, deploy, otro contenedor) y el job
+se marca con error al consultarlo. Las operaciones del store son SQLite
+síncrono: desde el event loop se llaman con `asyncio.to_thread`.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Set
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_DB_PATH = BASE_DIR / "cache" / "document_jobs.sqlite3"
+
+# Estados posibles de un job
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+ERROR = "error"
+ESTADOS_FINALES = (COMPLETADO, ERROR)
+
+# Procesador: (content, filename, reportar_etapa) -> resultado serializable a JSON
+Procesador = Callable[[bytes, str, Callable[[str], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class DocumentJobStore:
+    """Tabla persistente de jobs (SQLite en modo WAL, segura entre procesos)."""
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        ttl_segundos: Optional[int] = None,
+        lease_segundos: Optional[float] = None,
+        reloj: Callable[[], float] = time.time,
+    ):
+        self.db_path = Path(db_path or os.getenv("DOCUMENT_JOBS_DB") or DEFAULT_DB_PATH)
+        self.ttl_segundos = ttl_segundos or int(os.getenv("DOCUMENT_JOB_TTL_SECONDS", str(24 * 3600)))
+        self.lease_segundos = lease_segundos or float(os.getenv("DOCUMENT_JOB_LEASE_SECONDS", "30"))
+        self.reloj = reloj
+        self._init_lock = threading.Lock()
+        self._inicializado = False
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        """Conexión corta por operación: commit al salir y cierre siempre."""
+        if not self._inicializado:
+            self._inicializar()
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _inicializar(self) -> None:
+        with self._init_lock:
+            if self._inicializado:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS document_jobs (
+                        id TEXT PRIMARY KEY,
+                        estado TEXT NOT NULL,
+                        etapa TEXT,
+                        filename TEXT,
+                        resultado TEXT,
+                        error TEXT,
+                        latido REAL,
+                        creado REAL NOT NULL,
+                        actualizado REAL NOT NULL,
+                        expira REAL NOT NULL
+                    )
+                """)
+                # Bases creadas cuando la vida del worker se revisaba por pid
+                columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(document_jobs)")}
+                if "latido" not in columnas:
+                    conn.execute("ALTER TABLE document_jobs ADD COLUMN latido REAL")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_document_jobs_expira ON document_jobs (expira)")
+                conn.commit()
+            finally:
+                conn.close()
+            self._inicializado = True
+
+    def crear(self, filename: str) -> str:
+        job_id = uuid.uuid4().hex
+        ahora = self.reloj()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO document_jobs (id, estado, etapa, filename, latido, creado, actualizado, expira) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, PENDIENTE, "en_cola", filename, ahora, ahora, ahora, ahora + self.ttl_segundos),
+            )
+        return job_id
+
+    def latir(self, job_id: str) -> None:
+        """Renueva el lease del job (lo llama el worker que lo procesa)."""
+        with self._conn() as conn:
+            conn.execute("UPDATE document_jobs SET latido = ? WHERE id = ?", (self.reloj(), job_id))
+
+    def actualizar(
+        self,
+        job_id: str,
+        estado: Optional[str] = None,
+        etapa: Optional[str] = None,
+        resultado: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        ahora = self.reloj()
+        campos = {"actualizado": ahora, "latido": ahora}
+        if estado is not None:
+            campos["estado"] = estado
+            if estado in ESTADOS_FINALES:
+                # El TTL cuenta desde que el resultado está disponible
+                campos["expira"] = ahora + self.ttl_segundos
+        if etapa is not None:
+            campos["etapa"] = etapa
+        if resultado is not None:
+            campos["resultado"] = json.dumps(resultado, ensure_ascii=False)
+        if error is not None:
+            campos["error"] = error
+
+        asignaciones = ", ".join(f"{k} = ?" for k in campos)
+        with self._conn() as conn:
+            conn.execute(f"UPDATE document_jobs SET {asignaciones} WHERE id = ?", (*campos.values(), job_id))
+
+    def obtener(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT * FROM document_jobs WHERE id = ? AND expira > ?", (job_id, self.reloj())
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        # Un job en curso sin latido reciente: su worker murió (reinicio/deploy) y nunca terminará
+        latido = job["latido"] or job["actualizado"]
+        if job["estado"] not in ESTADOS_FINALES and self.reloj() - latido > self.lease_segundos:
+            self.actualizar(job_id, estado=ERROR, error="Procesamiento interrumpido. Vuelve a subir el archivo.")
+            return self.obtener(job_id)
+
+        return {
+            "job_id": job["id"],
+            "estado": job["estado"],
+            "etapa": job["etapa"],
+            "filename": job["filename"],
+            "resultado": json.loads(job["resultado"]) if job["resultado"] else None,
+            "error": job["error"],
+            "creado": job["creado"],
+            "actualizado": job["actualizado"],
+            "expira": job["expira"],
+        }
+
+    def purgar_expirados(self) -> int:
+        with self._conn() as conn:
+            cursor = conn.execute("DELETE FROM document_jobs WHERE expira <= ?", (self.reloj(),))
+            return cursor.rowcount
+
+
+class DocumentJobRunner:
+    """Pool de workers asyncio que ejecuta los jobs del proceso actual."""
+
+    def __init__(self, store: DocumentJobStore, workers: Optional[int] = None):
+        self.store = store
+        self.workers = workers or int(os.getenv("DOCUMENT_JOB_WORKERS", "4"))
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._tareas: Set[asyncio.Task] = set()
+
+    async def enviar(self, content: bytes, filename: str, procesador: Procesador) -> str:
+        """Registra el job y lo agenda en el event loop actual. Retorna el job_id."""
+        await asyncio.to_thread(self.store.purgar_expirados)
+        job_id = await asyncio.to_thread(self.store.crear, filename)
+        tarea = asyncio.get_running_loop().create_task(self._ejecutar(job_id, content, filename, procesador))
+        # Mantener referencia para que el GC no cancele la tarea
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        return job_id
+
+    async def _ejecutar(self, job_id: str, content: bytes, filename: str, procesador: Procesador) -> None:
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.workers)
+
+        async def reportar_etapa(etapa: str) -> None:
+            await asyncio.to_thread(self.store.actualizar, job_id, etapa=etapa)
+
+        # El latido corre también mientras el job espera un cupo del pool
+        latido = asyncio.create_task(self._latir(job_id))
+        try:
+            async with self._semaforo:
+                await asyncio.to_thread(self.store.actualizar, job_id, estado=PROCESANDO, etapa="iniciando")
+                try:
+                    resultado = await procesador(content, filename, reportar_etapa)
+                    await asyncio.to_thread(
+                        self.store.actualizar, job_id, estado=COMPLETADO, etapa="listo", resultado=resultado
+                    )
+                except Exception as e:
+                    detalle = getattr(e, "detail", None) or str(e)
+                    print(f"Error en job de documento {job_id}: {detalle}")
+                    await asyncio.to_thread(
+                        self.store.actualizar, job_id, estado=ERROR, etapa="error", error=str(detalle)
+                    )
+        finally:
+            latido.cancel()
+
+    async def _latir(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.store.lease_segundos / 3)
+            try:
+                await asyncio.to_thread(self.store.latir, job_id)
+            except sqlite3.Error as e:
+                print(f"⚠️ [JOBS] No se pudo renovar el latido de {job_id}: {e}")
+
+    async def esperar_pendientes(self) -> None:
+        """Espera a que terminen los jobs en curso (útil en shutdown y tests)."""
+        if self._tareas:
+            await asyncio.gather(*list(self._tareas), return_exceptions=True)
+
+
+# Instancias compartidas por el proceso
+document_job_store = DocumentJobStore()
+document_job_runner = DocumentJobRunner(document_job_store)
@@ -0,0 +1,221 @@
+"""
+Pre-selección local de contenido para el análisis de documentos.
+
+En vez de enviar los primeros N caracteres (portadas, textos legales y
+encabezados repetidos) se arma un extracto con lo que más "huele" a
+especificación técnica, dentro de un presupuesto de tokens:
+
+1. Se eliminan encabezados y pies de página repetidos entre páginas.
+2. Se divide cada página en segmentos (párrafos / bloques de líneas).
+3. Cada segmento se puntúa por densidad de especificaciones: unidades,
+   números, pares "atributo: valor" y keywords de CATEGORIA_KEYWORDS.
+4. Se empaquetan los mejores segmentos en el presupuesto y se devuelven en
+   el orden original del documento (las tablas conservan su lectura).
+
+Todo es local (regex precompiladas), sin llamadas al LLM.
+"""
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Set
+
+from app.services.chatbot_solicitud_articulos.categorias_service import CATEGORIA_KEYWORDS
+
+# Separador de páginas que inserta el extractor (form feed)
+PAGE_BREAK = "\f"
+
+# Aproximación usada en todo el servicio: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+# Presupuesto por defecto equivalente al recorte histórico de 8000 caracteres
+DEFAULT_TOKEN_BUDGET = int(os.getenv("DOCUMENT_TOKEN_BUDGET", "2000"))
+
+# Cambiar cuando cambie el algoritmo para invalidar resúmenes cacheados
+SELECTION_VERSION = "s1"
+
+# Líneas de encabezado/pie candidatas por página (arriba y abajo)
+_LINEAS_BORDE = 3
+# Tamaño máximo de un segmento cuando la página no trae líneas en blanco
+_LINEAS_POR_SEGMENTO = 8
+
+_UNIDADES = (
+    r'MM2|MM|CM|MTS?|KG|GR?|LTS?|ML|PSI|BAR|KPA|MPA|KVA|KW|HP|RPM|HZ|VAC|VDC|V|A|W|AWG|'
+    r'PULG(?:ADAS?)?|IN|"|°C|°F|NPT|BSP|SCH\s?\d+|#|TON|M3|GL|GAL'
+)
+RE_UNIDAD = re.compile(rf'\d(?:[\d.,/\-]*\d)?\s*(?:{_UNIDADES})(?![A-ZÑ])', re.IGNORECASE)
+RE_NUMERO = re.compile(r'\d+(?:[.,/]\d+)?')
+RE_ATRIBUTO_VALOR = re.compile(r'^\s*[A-Za-zÁÉÍÓÚÑáéíóúñ][\wÁÉÍÓÚÑáéíóúñ .()/-]{1,40}\s*[:=]\s*\S', re.MULTILINE)
+RE_DIGITOS = re.compile(r'\d+')
+RE_ESPACIOS = re.compile(r'\s+')
+
+# Señales de texto sin valor técnico (portadas, legales, contacto)
+RE_RUIDO = re.compile(
+    r'\b(?:T[ÉE]RMINOS|CONDICIONES|GARANT[ÍI]A|DERECHOS RESERVADOS|COPYRIGHT|CONFIDENCIAL|'
+    r'RESPONSABILIDAD|TEL[ÉE]FONO|E-?MAIL|WWW\.|HTTPS?://|DIRECCI[ÓO]N|P[ÁA]GINA \d)',
+    re.IGNORECASE,
+)
+
+
+def _compilar_keywords() -> "re.Pattern[str]":
+    keywords: Set[str] = set()
+    for data in CATEGORIA_KEYWORDS.values():
+        keywords.update(k for k in data["keywords"] if len(k) > 2)
+    # Más largas primero para que "DISCO CORTE" gane sobre "DISCO"
+    alternativas = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf'(?<![A-Z0-9])(?:{alternativas})(?![A-Z0-9])', re.IGNORECASE)
+
+
+RE_KEYWORDS = _compilar_keywords()
+
+
+@dataclass
+class Segmento:
+    pagina: int
+    orden: int
+    texto: str
+    puntaje: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return estimar_tokens(self.texto)
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación rápida de tokens sin tokenizer (≈ 4 caracteres por token)."""
+    return max(1, math.ceil(len(texto) / CHARS_PER_TOKEN))
+
+
+def _firma_linea(linea: str) -> str:
+    """Normaliza una línea para comparar encabezados (ignora números de página)."""
+    return RE_ESPACIOS.sub(" ", RE_DIGITOS.sub("#", linea.strip().lower()))
+
+
+def eliminar_encabezados_repetidos(paginas: List[str]) -> List[str]:
+    """
+    Quita líneas que se repiten en el borde superior/inferior de la mayoría
+    de las páginas (logos, razón social, "Página N de M", etc.).
+    """
+    if len(paginas) < 2:
+        return paginas
+
+    conteo: Dict[str, int] = {}
+    for pagina in paginas:
+        lineas = [l for l in pagina.splitlines() if l.strip()]
+        bordes = lineas[:_LINEAS_BORDE] + lineas[-_LINEAS_BORDE:]
+        for firma in {_firma_linea(l) for l in bordes}:
+            conteo[firma] = conteo.get(firma, 0) + 1
+
+    umbral = max(2, math.ceil(len(paginas) / 2))
+    repetidas = {firma for firma, n in conteo.items() if n >= umbral}
+    if not repetidas:
+        return paginas
+
+    limpias = []
+    for pagina in paginas:
+        lineas = pagina.splitlines()
+        limpias.append("\n".join(l for l in lineas if not l.strip() or _firma_linea(l) not in repetidas))
+    return limpias
+
+
+def segmentar(paginas: List[str]) -> List[Segmento]:
+    """Divide las páginas en párrafos; bloques sin líneas en blanco se trocean."""
+    segmentos: List[Segmento] = []
+    orden = 0
+    for num_pagina, pagina in enumerate(paginas):
+        for parrafo in re.split(r'\n\s*\n', pagina):
+            lineas = [l.rstrip() for l in parrafo.splitlines() if l.strip()]
+            for i in range(0, len(lineas), _LINEAS_POR_SEGMENTO):
+                texto = "\n".join(lineas[i:i + _LINEAS_POR_SEGMENTO])
+                if texto:
+                    segmentos.append(Segmento(pagina=num_pagina, orden=orden, texto=texto))
+                    orden += 1
+    return segmentos
+
+
+def puntuar_segmento(texto: str) -> float:
+    """Densidad de especificaciones por token del segmento."""
+    unidades = len(RE_UNIDAD.findall(texto))
+    numeros = len(RE_NUMERO.findall(texto))
+    atributos = len(RE_ATRIBUTO_VALOR.findall(texto))
+    keywords = len(RE_KEYWORDS.findall(texto))
+    ruido = len(RE_RUIDO.findall(texto))
+
+    senal = 3.0 * unidades + 1.0 * numeros + 2.0 * atributos + 3.0 * keywords - 4.0 * ruido
+    return senal / estimar_tokens(texto)
+
+
+def seleccionar_contenido(texto: str, presupuesto_tokens: int = None) -> str:
+    """
+    Retorna el extracto más denso en especificaciones que cabe en el presupuesto.
+
+    Args:
+        texto: Texto extraído (páginas separadas por form feed)
+        presupuesto_tokens: Máximo de tokens a enviar al LLM
+
+    Returns:
+        Texto seleccionado, en orden de lectura original. Vacío si el texto
+        excede el presupuesto y ningún segmento tiene señal de especificaciones
+        (ej: un contrato en prosa): el llamador decide no enviarlo al LLM.
+    """
+    presupuesto = presupuesto_tokens or DEFAULT_TOKEN_BUDGET
+    if estimar_tokens(texto) <= presupuesto:
+        return texto.replace(PAGE_BREAK, "\n")
+
+    paginas = eliminar_encabezados_repetidos(texto.split(PAGE_BREAK))
+    segmentos = segmentar(paginas)
+    if not segmentos:
+        return ""
+
+    for seg in segmentos:
+        seg.puntaje = puntuar_segmento(seg.texto)
+
+    # La densidad de la página refuerza a sus segmentos (tablas de specs contiguas)
+    por_pagina: Dict[int, List[float]] = {}
+    for seg in segmentos:
+        por_pagina.setdefault(seg.pagina, []).append(seg.puntaje)
+    densidad_pagina = {p: sum(v) / len(v) for p, v in por_pagina.items()}
+    for seg in segmentos:
+        seg.puntaje += 0.5 * densidad_pagina[seg.pagina]
+
+    # El primer segmento suele traer el nombre del producto: se conserva si cabe
+    segmentos[0].puntaje = max(segmentos[0].puntaje, max(s.puntaje for s in segmentos))
+
+    elegidos: List[Segmento] = []
+    usados = 0
+    for seg in sorted(segmentos, key=lambda s: (-s.puntaje, s.orden)):
+        if seg.puntaje <= 0:
+            break
+        costo = seg.tokens + 1  # +1 por el salto de línea entre segmentos
+        if usados + costo > presupuesto:
+            continue
+        elegidos.append(seg)
+        usados += costo
+
+    elegidos.sort(key=lambda s: s.orden)
+    return "\n".join(seg.texto for seg in elegidos)
+
+
+def dividir_en_chunks(texto: str, tokens_por_chunk: int) -> List[str]:
+    """
+    Divide el texto en fragmentos de a lo más `tokens_por_chunk` tokens,
+    cortando en saltos de línea (las filas de una tabla no se parten).
+    Una línea que por sí sola excede el tamaño se corta por caracteres.
+    """
+    max_chars = tokens_por_chunk * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    actual: List[str] = []
+    largo = 0
+    for linea in texto.replace(PAGE_BREAK, "\n").splitlines():
+        if not linea.strip():
+            continue
+        piezas = [linea[i:i + max_chars] for i in range(0, len(linea), max_chars)]
+        for pieza in piezas:
+            if actual and largo + len(pieza) + 1 > max_chars:
+                chunks.append("\n".join(actual))
+                actual, largo = [], 0
+            actual.append(pieza)
+            largo += len(pieza) + 1
+    if actual:
+        chunks.append("\n".join(actual))
+    return chunks
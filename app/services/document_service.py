@@ -1,31 +1,65 @@
-import io
-from pypdf import PdfReader
+import os
 from fastapi import UploadFile
 
+from app.services.document_cache import document_cache, hash_contenido
+from app.services.document_extractors import detectar_extractor
+from app.services.document_selection import CHARS_PER_TOKEN, PAGE_BREAK
+
+# Limites de seguridad configurables (antes: corte fijo en 5 paginas).
+# El costo del LLM lo acota DOCUMENT_TOTAL_TOKEN_BUDGET en el analista; aquí solo
+# se limita el trabajo de parseo para no procesar manuales de cientos de páginas.
+MAX_PAGES = int(os.getenv("DOCUMENT_MAX_PAGES", "60"))
+EXTRACTION_TOKEN_BUDGET = int(os.getenv("DOCUMENT_EXTRACTION_TOKEN_BUDGET", "60000"))
+
+# Cambiar cuando cambie la lógica de extracción para invalidar el texto cacheado
+EXTRACTION_VERSION = f"v5-p{MAX_PAGES}-t{EXTRACTION_TOKEN_BUDGET}"
+
+
+def extract_text_from_bytes(content: bytes, filename: str) -> str:
+    """
+    Extrae texto plano de un archivo PDF, DOCX, XLSX, CSV o TXT.
+    El extractor se elige por el contenido (no solo por la extensión) y se
+    consume de forma perezosa hasta agotar el presupuesto de páginas/tokens.
+    Las páginas (o bloques de filas) quedan separadas por PAGE_BREAK para que
+    la etapa de selección pueda detectar encabezados y pies repetidos.
+    Lanza ValueError si el archivo no se puede leer o el formato no está soportado.
+    """
+    extractor = detectar_extractor(content, filename)
+
+    pages = []
+    max_chars = EXTRACTION_TOKEN_BUDGET * CHARS_PER_TOKEN
+    total_chars = 0
+    for page_text in extractor.iterar(content):
+        pages.append(page_text)
+        total_chars += len(page_text)
+        if len(pages) >= MAX_PAGES or total_chars >= max_chars:
+            break
+    return PAGE_BREAK.join(pages)
+
+
+def extract_text_cached(content: bytes, filename: str, doc_hash: str = None) -> str:
+    """
+    Igual que extract_text_from_bytes pero consultando primero el cache
+    content-addressed. Solo se cachean extracciones exitosas.
+    """
+    doc_hash = doc_hash or hash_contenido(content)
+    text = document_cache.get_texto(doc_hash, EXTRACTION_VERSION)
+    if text is not None:
+        return text
+
+    text = extract_text_from_bytes(content, filename)
+    document_cache.set_texto(doc_hash, EXTRACTION_VERSION, text)
+    return text
+
+
 async def extract_text_from_file(file: UploadFile) -> str:
     """
-    Extrae texto plano de un archivo PDF o TXT.
-    Para imágenes o PDFs escaneados requeriría OCR (tesseract), 
+    Extrae texto plano de un archivo (PDF, DOCX, XLSX, CSV o TXT).
+    Para imágenes o PDFs escaneados requeriría OCR (tesseract),
     pero por ahora nos limitamos a texto seleccionable para ahorrar recursos.
     """
     content = await file.read()
-    
-    if file.filename.lower().endswith('.pdf'):
-        try:
-            reader = PdfReader(io.BytesIO(content))
-            text = ""
-            # Limite de seguridad: solo primeras 5 paginas para evitar consumo excesivo
-            max_pages = min(len(reader.pages), 5)
-            for i in range(max_pages):
-                page_text = reader.pages[i].extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            return text
-        except Exception as e:
-            return f"Error leyendo PDF: {str(e)}"
-            
-    elif file.filename.lower().endswith('.txt'):
-        return content.decode('utf-8')
-        
-    else:
-        return "Formato no soportado. Por favor sube archivos PDF o TXT."
+    try:
+        return extract_text_cached(content, file.filename)
+    except ValueError as e:
+        return str(e)
@@ -0,0 +1,242 @@
+"""
+Escritor asíncrono de JSONL con rotación, compresión y retención.
+
+Lo comparten el historial del chatbot (`historial.py`) y el exportador de
+trazas (`tracing.py`). El request solo encola el registro (cola acotada: si
+está llena se descarta y se cuenta, nunca se bloquea el request). Un hilo
+daemon escribe por lotes con una sola llamada `write` en modo append bajo
+`flock`, así las líneas de varios workers no se intercalan, y rota el archivo
+por tamaño o por período comprimiendo el rotado con gzip. Se conservan como
+máximo `max_rotados` archivos rotados: el disco usado queda acotado a
+~(max_rotados + 1) × max_bytes (menos, por la compresión).
+
+Política de fsync:
+- siempre: fsync después de cada lote (no se pierde nada ante un corte de luz),
+- intervalo: como máximo un fsync cada `fsync_intervalo` segundos,
+- nunca: lo decide el sistema operativo.
+"""
+import fcntl
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.metrics import Contador
+
+FSYNC_SIEMPRE = "siempre"
+FSYNC_INTERVALO = "intervalo"
+FSYNC_NUNCA = "nunca"
+
+# Máximo de registros por lote de escritura
+LOTE_ESCRITURA = 256
+
+
+class EscritorJSONL:
+    """
+    Cola acotada + hilo escritor con rotación y compresión del JSONL.
+
+    Args:
+        nombre: etiqueta para logs y nombre del hilo (ej: "historial").
+        metrica: contador opcional con label status (escrito/descartado/error).
+    """
+
+    def __init__(
+        self,
+        ruta: Path,
+        nombre: str = "jsonl",
+        metrica: Optional[Contador] = None,
+        max_cola: int = 10_000,
+        fsync: str = FSYNC_INTERVALO,
+        fsync_intervalo: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        rotacion_segundos: float = 86_400,
+        max_rotados: int = 30,
+    ):
+        if fsync not in (FSYNC_SIEMPRE, FSYNC_INTERVALO, FSYNC_NUNCA):
+            raise ValueError(f"Política de fsync inválida: {fsync}")
+        self.ruta = Path(ruta)
+        self.nombre = nombre
+        self.metrica = metrica
+        self.fsync = fsync
+        self.fsync_intervalo = fsync_intervalo
+        self.max_bytes = max_bytes
+        self.rotacion_segundos = rotacion_segundos
+        self.max_rotados = max_rotados
+        self._cola: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_cola)
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ultimo_fsync = 0.0
+        self.escritos = 0
+        self.descartados = 0
+
+    @property
+    def _etiqueta(self) -> str:
+        return self.nombre.upper()
+
+    def _contar(self, estado: str, cantidad: int = 1) -> None:
+        if self.metrica is not None:
+            self.metrica.inc(estado, valor=cantidad)
+
+    # --- Camino del request ---
+    def registrar(self, entrada: Dict[str, Any]) -> bool:
+        """Encola un registro. Retorna False si la cola está llena (el registro se descarta)."""
+        if self._hilo is None:
+            self._iniciar()
+        linea = json.dumps(entrada, ensure_ascii=False, default=str) + "\n"
+        try:
+            self._cola.put_nowait(linea)
+            return True
+        except queue.Full:
+            self.descartados += 1
+            self._contar("descartado")
+            if self.descartados == 1 or self.descartados % 1000 == 0:
+                print(f"⚠️ [{self._etiqueta}] Cola llena: {self.descartados} registros descartados")
+            return False
+
+    def _iniciar(self) -> None:
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escribir, name=f"escritor-{self.nombre}", daemon=True)
+                self._hilo.start()
+
+    # --- Hilo escritor ---
+    def _escribir(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < LOTE_ESCRITURA:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            fin = None in lote
+            lineas = [l for l in lote if l is not None]
+            if lineas:
+                try:
+                    # Al cerrar se fuerza el fsync (salvo política "nunca")
+                    self._escribir_lote(lineas, forzar_fsync=fin)
+                    self.escritos += len(lineas)
+                    self._contar("escrito", len(lineas))
+                except OSError as e:
+                    self._contar("error", len(lineas))
+                    print(f"⚠️ [{self._etiqueta}] No se pudieron escribir {len(lineas)} registros: {e}")
+            if fin:
+                return
+
+    def _escribir_lote(self, lineas: List[str], forzar_fsync: bool = False) -> None:
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        datos = "".join(lineas).encode("utf-8")
+        rotado = None
+        fd = self._abrir_bloqueado()
+        try:
+            if self._debe_rotar(fd, len(datos)):
+                rotado = self._rotar()
+                os.close(fd)
+                fd = self._abrir_bloqueado()
+            os.write(fd, datos)
+            ahora = time.monotonic()
+            if self.fsync == FSYNC_SIEMPRE or (
+                self.fsync == FSYNC_INTERVALO
+                and (forzar_fsync or ahora - self._ultimo_fsync >= self.fsync_intervalo)
+            ):
+                os.fsync(fd)
+                self._ultimo_fsync = ahora
+        finally:
+            os.close(fd)
+        # La compresión queda fuera del lock: los demás workers ya escriben en el archivo nuevo
+        if rotado is not None:
+            self._comprimir(rotado)
+            self._limpiar_rotados()
+
+    def _abrir_bloqueado(self) -> int:
+        """
+        Abre el archivo activo con lock exclusivo. El lock es por archivo y
+        serializa rotación y escritura entre workers; si otro worker lo rotó
+        mientras se esperaba el lock, se reabre el archivo nuevo.
+        """
+        while True:
+            fd = os.open(self.ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.ruta).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _debe_rotar(self, fd: int, pendientes: int) -> bool:
+        st = os.fstat(fd)
+        if st.st_size == 0:
+            return False
+        if self.max_bytes and st.st_size + pendientes > self.max_bytes:
+            return True
+        # Por período: la última escritura fue en un período anterior (ej: ayer)
+        if self.rotacion_segundos:
+            return int(st.st_mtime // self.rotacion_segundos) != int(time.time() // self.rotacion_segundos)
+        return False
+
+    def _rotar(self) -> Path:
+        """
+        Renombra el archivo activo a <nombre>.<AAAAMMDD-HHMMSS-µs de la última
+        escritura>.jsonl: el nombre ordena cronológicamente (ver `rotados`).
+        """
+        sello = datetime.fromtimestamp(self.ruta.stat().st_mtime).strftime("%Y%m%d-%H%M%S-%f")
+        destino = self.ruta.with_name(f"{self.ruta.stem}.{sello}{self.ruta.suffix}")
+        n = 1
+        while destino.exists() or destino.with_name(destino.name + ".gz").exists():
+            destino = self.ruta.with_name(f"{self.ruta.stem}.{sello}-{n}{self.ruta.suffix}")
+            n += 1
+        os.replace(self.ruta, destino)
+        return destino
+
+    def _comprimir(self, ruta: Path) -> None:
+        try:
+            with open(ruta, "rb") as origen, gzip.open(str(ruta) + ".gz.tmp", "wb") as destino:
+                shutil.copyfileobj(origen, destino)
+            os.replace(str(ruta) + ".gz.tmp", str(ruta) + ".gz")
+            ruta.unlink()
+        except OSError as e:
+            print(f"⚠️ [{self._etiqueta}] No se pudo comprimir {ruta.name}: {e}")
+
+    def rotados(self) -> List[Path]:
+        return archivos_rotados(self.ruta)
+
+    def _limpiar_rotados(self) -> None:
+        if not self.max_rotados:
+            return
+        for viejo in self.rotados()[:-self.max_rotados]:
+            try:
+                viejo.unlink()
+            except OSError:
+                pass
+
+    def cerrar(self, timeout: float = 5.0) -> None:
+        """Escribe lo pendiente y detiene el hilo (shutdown del worker)."""
+        hilo = self._hilo
+        if hilo is None:
+            return
+        try:
+            self._cola.put(None, timeout=timeout)
+        except queue.Full:
+            print(f"⚠️ [{self._etiqueta}] Cola llena al cerrar: pueden perderse registros")
+            return
+        hilo.join(timeout)
+        self._hilo = None
+
+
+def archivos_rotados(ruta: Path) -> List[Path]:
+    """Archivos rotados (comprimidos o no) de `ruta`, del más antiguo al más reciente."""
+    ruta = Path(ruta)
+    patron = f"{ruta.stem}.*{ruta.suffix}*"
+    return sorted(p for p in ruta.parent.glob(patron) if not p.name.endswith(".tmp"))
+
+
+def archivos_jsonl(ruta: Path) -> List[Path]:
+    """Rotados más el archivo activo, en orden cronológico."""
+    ruta = Path(ruta)
+    return archivos_rotados(ruta) + ([ruta] if ruta.exists() else [])
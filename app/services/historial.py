@@ -0,0 +1,61 @@
+"""
+Escritor asíncrono del historial JSONL del chatbot (una línea por turno).
+
+El request solo encola el registro; la escritura por lotes, la rotación por
+tamaño o período (comprimida con gzip) y la retención de rotados las hace
+`escritor_jsonl.EscritorJSONL`, compartido con el exportador de trazas.
+
+Política de fsync (HISTORIAL_FSYNC):
+- siempre: fsync después de cada lote (no se pierde nada ante un corte de luz),
+- intervalo: como máximo un fsync cada HISTORIAL_FSYNC_INTERVALO_SEGUNDOS,
+- nunca: lo decide el sistema operativo.
+
+Análisis del historial (incluye los rotados): `python -m app.cli.historial`.
+"""
+import os
+from pathlib import Path
+from typing import List
+
+from app.services.escritor_jsonl import (  # noqa: F401 (re-exportados)
+    FSYNC_INTERVALO,
+    FSYNC_NUNCA,
+    FSYNC_SIEMPRE,
+    EscritorJSONL,
+    archivos_jsonl,
+    archivos_rotados,
+)
+from app.services.metrics import registro
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+HISTORIAL_PATH = Path(
+    os.getenv("HISTORIAL_CHATBOT_PATH") or BASE_DIR / "logs" / "historial_chatbot_solicitud_articulos.jsonl"
+)
+
+historial_registros = registro.contador(
+    "chat_history_records_total", "Registros del historial del chatbot por resultado (escrito/descartado/error)",
+    ("status",),
+)
+
+
+class EscritorHistorial(EscritorJSONL):
+    """Escritor del historial del chatbot (ver `escritor_jsonl.EscritorJSONL`)."""
+
+    def __init__(self, ruta: Path, **opciones):
+        super().__init__(ruta, nombre="historial", metrica=historial_registros, **opciones)
+
+
+def archivos_historial(ruta: Path) -> List[Path]:
+    """Rotados más el archivo activo, en orden cronológico."""
+    return archivos_jsonl(ruta)
+
+
+escritor_historial = EscritorHistorial(
+    HISTORIAL_PATH,
+    max_cola=int(os.getenv("HISTORIAL_MAX_COLA", "10000")),
+    fsync=os.getenv("HISTORIAL_FSYNC", FSYNC_INTERVALO),
+    fsync_intervalo=float(os.getenv("HISTORIAL_FSYNC_INTERVALO_SEGUNDOS", "1")),
+    max_bytes=int(os.getenv("HISTORIAL_MAX_MB", "50")) * 1024 * 1024,
+    rotacion_segundos=float(os.getenv("HISTORIAL_ROTACION_SEGUNDOS", "86400")),
+    max_rotados=int(os.getenv("HISTORIAL_MAX_ROTADOS", "30")),
+)
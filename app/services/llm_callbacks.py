@@ -0,0 +1,244 @@
+"""
+Callbacks de LangChain para observabilidad y costo de LLM y tools.
+
+Se pasan por `RunnableConfig` (ver `llm_utils.construir_run_config`) y se
+propagan a todas las llamadas internas del agente: cada llamada al modelo y
+cada tool queda medida sin tocar el código de las tools.
+"""
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.services import metrics
+from app.services.costos import ContextoCosto, contexto_costo, registrar_uso
+from app.services.tracing import Span, trazador
+
+# Largo máximo del input de una tool guardado en su span
+MAX_INPUT_TOOL = 200
+
+
+def _modelo(metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+    """Nombre del modelo desde la metadata de LangChain (ls_model_name) o los invocation_params."""
+    if metadata and metadata.get("ls_model_name"):
+        return str(metadata["ls_model_name"])
+    params = kwargs.get("invocation_params") or {}
+    return str(params.get("model") or params.get("model_name") or "desconocido")
+
+
+def uso_de_tokens(respuesta: LLMResult) -> Dict[str, int]:
+    """Tokens de una respuesta: input, output, cache_read y cache_creation (los que vengan)."""
+    uso: Dict[str, int] = {}
+    for generaciones in respuesta.generations:
+        for generacion in generaciones:
+            mensaje = getattr(generacion, "message", None)
+            usage = getattr(mensaje, "usage_metadata", None) if mensaje is not None else None
+            if not usage:
+                continue
+            uso["input"] = uso.get("input", 0) + int(usage.get("input_tokens") or 0)
+            uso["output"] = uso.get("output", 0) + int(usage.get("output_tokens") or 0)
+            detalle = usage.get("input_token_details") or {}
+            # input_tokens ya incluye los tokens de cache (langchain_anthropic los suma)
+            cache_read = int(detalle.get("cache_read") or 0)
+            # Con TTL explícito, Anthropic reporta la escritura separada en 5m / 1h
+            cache_creation = int(detalle.get("cache_creation") or 0) or sum(
+                int(detalle.get(k) or 0) for k in ("ephemeral_5m_input_tokens", "ephemeral_1h_input_tokens")
+            )
+            if cache_read:
+                uso["cache_read"] = uso.get("cache_read", 0) + cache_read
+            if cache_creation:
+                uso["cache_creation"] = uso.get("cache_creation", 0) + cache_creation
+    return uso
+
+
+class MetricasCallbackHandler(BaseCallbackHandler):
+    """Registra latencia, errores y tokens por modelo, y llamadas/latencia por tool."""
+
+    # Sin executor: el trabajo por evento es mínimo
+    run_inline = True
+
+    def __init__(self):
+        # run_id -> (inicio, modelo o tool)
+        self._en_curso: Dict[UUID, tuple] = {}
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._en_curso[run_id] = (time.perf_counter(), _modelo(metadata, kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._en_curso[run_id] = (time.perf_counter(), _modelo(metadata, kwargs))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        inicio = self._en_curso.pop(run_id, None)
+        if inicio is None:
+            return
+        t0, modelo = inicio
+        metrics.llm_duracion.observar(time.perf_counter() - t0, modelo)
+        metrics.llm_llamadas.inc(modelo, "ok")
+        for tipo, cantidad in uso_de_tokens(response).items():
+            metrics.llm_tokens.inc(modelo, tipo, valor=cantidad)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        inicio = self._en_curso.pop(run_id, None)
+        if inicio is None:
+            return
+        t0, modelo = inicio
+        metrics.llm_duracion.observar(time.perf_counter() - t0, modelo)
+        metrics.llm_llamadas.inc(modelo, "error")
+        metrics.llm_errores.inc(modelo, type(error).__name__)
+
+    # --- Tools ---
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any) -> None:
+        nombre = (serialized or {}).get("name") or kwargs.get("name") or "desconocida"
+        self._en_curso[run_id] = (time.perf_counter(), nombre)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar_tool(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar_tool(run_id, "error")
+
+    def _cerrar_tool(self, run_id: UUID, estado: str) -> None:
+        inicio = self._en_curso.pop(run_id, None)
+        if inicio is None:
+            return
+        t0, nombre = inicio
+        metrics.tool_duracion.observar(time.perf_counter() - t0, nombre)
+        metrics.tool_llamadas.inc(nombre, estado)
+
+
+class TrazasCallbackHandler(BaseCallbackHandler):
+    """
+    Abre un span por ejecución del agente (raíz de LangGraph), por paso (nodo
+    del grafo), por llamada al modelo y por tool. Los runs internos de
+    LangChain (secuencias, parsers) no generan span: sus hijos cuelgan del
+    span más cercano.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        # run_id -> span propio del run (se cierra al terminar el run)
+        self._propios: Dict[UUID, Span] = {}
+        # run_id -> span del que cuelgan los hijos del run (propio o heredado)
+        self._efectivos: Dict[UUID, Optional[Span]] = {}
+
+    def _abrir(self, run_id: UUID, parent_run_id: Optional[UUID], nombre: Optional[str], tipo: Optional[str], **atributos):
+        padre = self._efectivos.get(parent_run_id) if parent_run_id is not None else None
+        if nombre is None:
+            self._efectivos[run_id] = padre
+            return
+        span = trazador.iniciar(nombre, tipo, padre=padre, **atributos)
+        self._propios[run_id] = span
+        self._efectivos[run_id] = span
+
+    def _cerrar(self, run_id: UUID, error: Optional[BaseException] = None, **atributos) -> None:
+        self._efectivos.pop(run_id, None)
+        span = self._propios.pop(run_id, None)
+        if span is not None:
+            span.atributos.update(atributos)
+            trazador.finalizar(span, error)
+
+    # --- Agente y pasos ---
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id=None, metadata=None, **kwargs: Any) -> None:
+        nombre = kwargs.get("name") or (serialized or {}).get("name")
+        metadata = metadata or {}
+        if parent_run_id is None:
+            self._abrir(run_id, None, f"agente {nombre or 'cadena'}", "agente")
+        elif nombre and nombre == metadata.get("langgraph_node"):
+            paso = metadata.get("langgraph_step")
+            self._abrir(run_id, parent_run_id, f"paso {paso} {nombre}", "paso", step=paso, node=nombre)
+        else:
+            self._abrir(run_id, parent_run_id, None, None)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar(run_id, error)
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id=None, metadata=None, **kwargs: Any) -> None:
+        modelo = _modelo(metadata, kwargs)
+        self._abrir(run_id, parent_run_id, f"llm {modelo}", "llm", model=modelo)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id=None, metadata=None, **kwargs: Any) -> None:
+        modelo = _modelo(metadata, kwargs)
+        self._abrir(run_id, parent_run_id, f"llm {modelo}", "llm", model=modelo)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar(run_id, **{f"tokens_{tipo}": n for tipo, n in uso_de_tokens(response).items()})
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar(run_id, error)
+
+    # --- Tools ---
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id=None, **kwargs: Any) -> None:
+        nombre = (serialized or {}).get("name") or kwargs.get("name") or "desconocida"
+        self._abrir(run_id, parent_run_id, nombre, "tool", input=str(input_str)[:MAX_INPUT_TOOL])
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._cerrar(run_id, error)
+
+
+class CostosCallbackHandler(BaseCallbackHandler):
+    """
+    Valoriza y registra cada llamada al modelo (ver `costos.registrar_uso`).
+
+    El contexto de costo (tenant, sesión, endpoint) se toma del ContextVar al
+    iniciar el run raíz y se hereda por parent_run_id: los nodos de LangGraph
+    pueden correr en otros hilos.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        # run_id -> contexto de costo heredado del run raíz
+        self._contextos: Dict[UUID, Optional[ContextoCosto]] = {}
+        # run_id -> modelo de las llamadas al LLM en curso
+        self._modelos: Dict[UUID, str] = {}
+
+    def _abrir(self, run_id: UUID, parent_run_id: Optional[UUID]) -> None:
+        ctx = self._contextos.get(parent_run_id) if parent_run_id is not None else None
+        self._contextos[run_id] = ctx or contexto_costo()
+
+    # --- Cadenas y agente (solo propagan el contexto) ---
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id=None, **kwargs: Any) -> None:
+        self._abrir(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._contextos.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._contextos.pop(run_id, None)
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id=None, metadata=None, **kwargs: Any) -> None:
+        self._abrir(run_id, parent_run_id)
+        self._modelos[run_id] = _modelo(metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id=None, metadata=None, **kwargs: Any) -> None:
+        self._abrir(run_id, parent_run_id)
+        self._modelos[run_id] = _modelo(metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        ctx = self._contextos.pop(run_id, None)
+        modelo = self._modelos.pop(run_id, None)
+        uso = uso_de_tokens(response)
+        if modelo is not None and uso:
+            registrar_uso(modelo, uso, ctx)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._contextos.pop(run_id, None)
+        self._modelos.pop(run_id, None)
+
+
+# Sin estado por request (solo run_ids en curso): una instancia por proceso
+metricas_callback = MetricasCallbackHandler()
+trazas_callback = TrazasCallbackHandler()
+costos_callback = CostosCallbackHandler()
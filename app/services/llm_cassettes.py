@@ -0,0 +1,234 @@
+"""
+Cassettes de tráfico LLM: grabar y reproducir llamadas al modelo sin red.
+
+Modos (LLM_CASSETTE_MODE):
+- off: sin cassettes (producción),
+- record: cada llamada va al modelo real y se guarda su respuesta,
+- replay: las respuestas salen del cassette; una llamada sin grabar falla
+  con CassetteNoEncontrado (no se usa la API ni hace falta ANTHROPIC_API_KEY),
+- auto: replay si existe, si no graba.
+
+Cada llamada se identifica por el hash de (modelo, parámetros, mensajes,
+tools y opciones de la llamada) y se guarda en LLM_CASSETTE_DIR/<hash>.json
+junto con la latencia original. Las tool calls del modelo quedan en el
+mensaje grabado, así un turno completo del agente se reproduce paso a paso.
+
+Latencia en replay (LLM_CASSETTE_LATENCY): "original" (la grabada), "0" o
+un valor fijo en ms.
+
+Con todo grabado, el servicio completo corre sin red:
+    LLM_CASSETTE_MODE=record uvicorn main:app     # una pasada con la API real
+    LLM_CASSETTE_MODE=replay uvicorn main:app     # benchmarks offline
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, PrivateAttr
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+MODO_OFF = "off"
+MODO_RECORD = "record"
+MODO_REPLAY = "replay"
+MODO_AUTO = "auto"
+MODOS = (MODO_OFF, MODO_RECORD, MODO_REPLAY, MODO_AUTO)
+
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", MODO_OFF).lower()
+LLM_CASSETTE_DIR = Path(os.getenv("LLM_CASSETTE_DIR") or BASE_DIR / "cache" / "cassettes")
+LLM_CASSETTE_LATENCY = os.getenv("LLM_CASSETTE_LATENCY", "original")
+
+# Campos de los mensajes que cambian entre ejecuciones y no definen la llamada
+_CAMPOS_VOLATILES = ("id", "response_metadata", "usage_metadata")
+# Opciones internas de LangChain que no llegan al proveedor
+_OPCIONES_INTERNAS = ("ls_structured_output_format",)
+
+VERSION_CASSETTE = 1
+
+
+class CassetteNoEncontrado(KeyError):
+    """Replay de una llamada que no fue grabada."""
+
+
+def _mensaje_para_clave(mensaje: BaseMessage) -> Dict[str, Any]:
+    data = message_to_dict(mensaje)
+    data["data"] = {k: v for k, v in data["data"].items() if k not in _CAMPOS_VOLATILES}
+    return data
+
+
+def _tool_para_clave(tool: Any) -> Any:
+    try:
+        return convert_to_openai_tool(tool)
+    except Exception:
+        return str(tool)
+
+
+def clave_llamada(
+    modelo: str, parametros: Dict[str, Any], mensajes: Sequence[BaseMessage], opciones: Dict[str, Any]
+) -> str:
+    """Hash estable de una llamada al modelo."""
+    opciones = dict(opciones)
+    tools = [_tool_para_clave(t) for t in opciones.pop("tools", None) or []]
+    contenido = {
+        "modelo": modelo,
+        "parametros": parametros,
+        "mensajes": [_mensaje_para_clave(m) for m in mensajes],
+        "tools": tools,
+        "opciones": {k: v for k, v in opciones.items() if k not in _OPCIONES_INTERNAS},
+    }
+    texto = json.dumps(contenido, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class AlmacenCassettes:
+    """Un JSON por llamada: grabaciones concurrentes sin locks ni archivos compartidos."""
+
+    def __init__(self, directorio: Path):
+        self.directorio = Path(directorio)
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / f"{clave}.json"
+
+    def leer(self, clave: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._ruta(clave).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, clave: str, registro: Dict[str, Any]) -> None:
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        tmp = self._ruta(clave).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(registro, ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+        os.replace(tmp, self._ruta(clave))
+
+
+def _resultado_a_dict(resultado: ChatResult) -> Dict[str, Any]:
+    return {
+        "generaciones": [
+            {"mensaje": message_to_dict(g.message), "info": g.generation_info} for g in resultado.generations
+        ],
+        "llm_output": resultado.llm_output,
+    }
+
+
+def _resultado_desde_dict(data: Dict[str, Any]) -> ChatResult:
+    mensajes = messages_from_dict([g["mensaje"] for g in data["generaciones"]])
+    return ChatResult(
+        generations=[
+            ChatGeneration(message=m, generation_info=g.get("info")) for m, g in zip(mensajes, data["generaciones"])
+        ],
+        llm_output=data.get("llm_output"),
+    )
+
+
+def latencia_replay(original_ms: float, configuracion: str = LLM_CASSETTE_LATENCY) -> float:
+    """Segundos a esperar en replay: la latencia grabada o un valor fijo en ms."""
+    if configuracion == "original":
+        return original_ms / 1000
+    return float(configuracion) / 1000
+
+
+class ChatCassette(BaseChatModel):
+    """
+    Modelo de chat que graba o reproduce las llamadas de otro modelo.
+
+    `bind_tools` se resuelve aquí (las tools quedan en las opciones de la
+    llamada, que forman parte de la clave); al grabar se delega en el
+    `bind_tools` del modelo real para que reciba el formato de su proveedor.
+    El modelo real se crea recién cuando hay que llamarlo.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: str
+    parametros: Dict[str, Any] = {}
+    modo: str = MODO_REPLAY
+    directorio: Path = LLM_CASSETTE_DIR
+    latencia: str = LLM_CASSETTE_LATENCY
+    fabrica: Optional[Callable[[], BaseChatModel]] = None
+
+    _real: Optional[BaseChatModel] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _almacen(self) -> AlmacenCassettes:
+        return AlmacenCassettes(self.directorio)
+
+    def _modelo_real(self) -> BaseChatModel:
+        if self._real is None:
+            if self.fabrica is None:
+                raise RuntimeError("ChatCassette sin modelo real: no se puede grabar")
+            self._real = self.fabrica()
+        return self._real
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=list(tools), **kwargs)
+
+    def _opciones_reales(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Opciones de la llamada en el formato del modelo real (tools convertidas por su bind_tools)."""
+        kwargs = {k: v for k, v in kwargs.items() if k not in _OPCIONES_INTERNAS}
+        tools = kwargs.pop("tools", None)
+        if not tools:
+            return kwargs
+        return dict(self._modelo_real().bind_tools(tools, **kwargs).kwargs)
+
+    def _buscar(self, mensajes: List[BaseMessage], kwargs: Dict[str, Any]):
+        clave = clave_llamada(self.model, self.parametros, mensajes, kwargs)
+        registro = self._almacen().leer(clave) if self.modo in (MODO_REPLAY, MODO_AUTO) else None
+        if registro is None and self.modo == MODO_REPLAY:
+            raise CassetteNoEncontrado(
+                f"Llamada a {self.model} sin grabar (clave {clave[:12]}). Grabar con LLM_CASSETTE_MODE=record."
+            )
+        return clave, registro
+
+    def _guardar(self, clave: str, resultado: ChatResult, mensajes: List[BaseMessage], inicio: float) -> None:
+        self._almacen().guardar(clave, {
+            "version": VERSION_CASSETTE,
+            "modelo": self.model,
+            "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            "grabado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "mensajes": len(mensajes),
+            "respuesta": _resultado_a_dict(resultado),
+        })
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        clave, registro = self._buscar(messages, kwargs)
+        if registro is not None:
+            time.sleep(latencia_replay(registro.get("latencia_ms", 0), self.latencia))
+            return _resultado_desde_dict(registro["respuesta"])
+        inicio = time.perf_counter()
+        resultado = self._modelo_real()._generate(messages, stop=stop, **self._opciones_reales(kwargs))
+        self._guardar(clave, resultado, messages, inicio)
+        return resultado
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        clave, registro = self._buscar(messages, kwargs)
+        if registro is not None:
+            await asyncio.sleep(latencia_replay(registro.get("latencia_ms", 0), self.latencia))
+            return _resultado_desde_dict(registro["respuesta"])
+        inicio = time.perf_counter()
+        resultado = await self._modelo_real()._agenerate(messages, stop=stop, **self._opciones_reales(kwargs))
+        self._guardar(clave, resultado, messages, inicio)
+        return resultado
+
+
+def envolver_en_cassette(
+    modelo: str, fabrica: Callable[[], BaseChatModel], parametros: Optional[Dict[str, Any]] = None,
+    modo: str = LLM_CASSETTE_MODE,
+):
+    """El modelo real (modo off) o un ChatCassette que lo crea solo si tiene que grabar."""
+    if modo not in MODOS:
+        raise ValueError(f"LLM_CASSETTE_MODE inválido: {modo} (opciones: {', '.join(MODOS)})")
+    if modo == MODO_OFF:
+        return fabrica()
+    return ChatCassette(model=modelo, parametros=parametros or {}, modo=modo, fabrica=fabrica)
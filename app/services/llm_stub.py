@@ -0,0 +1,230 @@
+"""
+Backend stub de LLM para pruebas de carga (LLM_BACKEND=stub).
+
+`ChatStub` es un modelo de chat de LangChain que responde según los guiones
+de config/llm_stub.yaml: texto, tool calls (preguntar_con_opciones,
+finalizar_estandarizacion, ...) y salida estructurada (IncidentAnalysisResponse,
+DocumentoAnalizado). Simula latencia con una distribución configurable e
+inyecta errores 429 / 529 / timeout con las mismas excepciones del SDK de
+Anthropic, así los reintentos y el manejo de errores se ejercitan igual que
+en producción. Reporta tokens aproximados (≈ 4 caracteres por token) para
+que métricas y costos tengan datos.
+
+Se construye en `llm_utils.crear_modelo_chat`: los agentes no cambian.
+"""
+import asyncio
+import math
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import yaml
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from app.services.archivo_recargable import ArchivoRecargable
+from app.services.costos import contexto_costo
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+LLM_STUB_CONFIG_PATH = Path(os.getenv("LLM_STUB_CONFIG_PATH") or BASE_DIR / "config" / "llm_stub.yaml")
+LLM_STUB_SEED = os.getenv("LLM_STUB_SEED")
+
+DISTRIBUCIONES = ("fija", "uniforme", "normal", "lognormal")
+TEXTO_POR_DEFECTO = ({"texto": "Respuesta simulada."},)
+
+
+@dataclass(frozen=True)
+class Latencia:
+    distribucion: str = "fija"
+    parametros: Mapping[str, float] = field(default_factory=dict)
+
+    def muestrear(self, azar: random.Random) -> float:
+        """Segundos de latencia (nunca negativa)."""
+        p = self.parametros
+        if self.distribucion == "uniforme":
+            ms = azar.uniform(p.get("min_ms", 0), p.get("max_ms", 0))
+        elif self.distribucion == "normal":
+            ms = azar.gauss(p.get("media_ms", 0), p.get("desvio_ms", 0))
+        elif self.distribucion == "lognormal":
+            ms = azar.lognormvariate(math.log(max(p.get("mediana_ms", 1), 1e-3)), p.get("sigma", 0))
+        else:
+            ms = p.get("ms", 0)
+        return max(ms, 0) / 1000
+
+
+@dataclass(frozen=True)
+class Errores:
+    tasa_429: float = 0.0
+    tasa_529: float = 0.0
+    tasa_timeout: float = 0.0
+    timeout_ms: float = 5000
+
+
+@dataclass(frozen=True)
+class GuionStub:
+    latencia: Latencia
+    errores: Errores
+    estructuradas: Mapping[str, Mapping[str, Any]]
+    endpoints: Mapping[str, Tuple[Tuple[Dict[str, Any], ...], ...]]
+    latencia_endpoint: Mapping[str, Latencia]
+    por_defecto: Tuple[Dict[str, Any], ...]
+
+
+def _latencia(data: Any) -> Latencia:
+    data = dict(data or {})
+    distribucion = data.pop("distribucion", "fija")
+    if distribucion not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución de latencia inválida: {distribucion} (opciones: {', '.join(DISTRIBUCIONES)})")
+    return Latencia(distribucion, {k: float(v) for k, v in data.items()})
+
+
+def _pasos(data: Any) -> Tuple[Dict[str, Any], ...]:
+    pasos = tuple(dict(p) for p in data or ())
+    for paso in pasos:
+        if "texto" not in paso and "tool" not in paso:
+            raise ValueError(f"Paso de guion sin 'texto' ni 'tool': {paso}")
+    return pasos
+
+
+def _compilar_guion(contenido: Optional[bytes], anterior: Optional[GuionStub]) -> GuionStub:
+    data = (yaml.safe_load(contenido) if contenido is not None else None) or {}
+    endpoints = data.get("endpoints") or {}
+    return GuionStub(
+        latencia=_latencia(data.get("latencia")),
+        errores=Errores(**{k: float(v) for k, v in (data.get("errores") or {}).items()}),
+        estructuradas={str(k): dict(v or {}) for k, v in (data.get("estructuradas") or {}).items()},
+        endpoints={
+            str(ruta): tuple(_pasos(turno) for turno in (conf or {}).get("turnos") or ())
+            for ruta, conf in endpoints.items()
+        },
+        latencia_endpoint={
+            str(ruta): _latencia(conf["latencia"]) for ruta, conf in endpoints.items() if (conf or {}).get("latencia")
+        },
+        por_defecto=_pasos(data.get("por_defecto")) or TEXTO_POR_DEFECTO,
+    )
+
+
+_guion: ArchivoRecargable[GuionStub] = ArchivoRecargable(LLM_STUB_CONFIG_PATH, _compilar_guion)
+
+
+def obtener_guion_stub() -> GuionStub:
+    return _guion.obtener()
+
+
+def _tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+
+def _nombre_tool(tool: Any) -> str:
+    return convert_to_openai_tool(tool)["function"]["name"]
+
+
+def _error(tipo: str, modelo: str) -> Exception:
+    """Excepción equivalente a la del SDK de Anthropic para el error inyectado."""
+    import anthropic
+    import httpx
+
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    if tipo == "timeout":
+        return anthropic.APITimeoutError(request=request)
+    status, clase, mensaje = {
+        "429": (429, anthropic.RateLimitError, "rate_limit_error"),
+        "529": (529, anthropic.OverloadedError, "overloaded_error"),
+    }[tipo]
+    body = {"type": "error", "error": {"type": mensaje, "message": f"{mensaje} simulado ({modelo})"}}
+    return clase(f"Error code: {status} - {body}", response=httpx.Response(status, request=request), body=body)
+
+
+class ChatStub(BaseChatModel):
+    """Modelo de chat guionado (ver config/llm_stub.yaml)."""
+
+    model: str
+    guion: Optional[GuionStub] = None
+    semilla: Optional[int] = int(LLM_STUB_SEED) if LLM_STUB_SEED else None
+
+    _azar: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._azar = random.Random(self.semilla)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=list(tools), **kwargs)
+
+    def _guion_actual(self) -> GuionStub:
+        return self.guion or obtener_guion_stub()
+
+    def _planificar(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> Tuple[float, Optional[str], AIMessage]:
+        """(latencia en s, error a inyectar o None, respuesta) de una llamada."""
+        guion = self._guion_actual()
+        ctx = contexto_costo()
+        endpoint = ctx.endpoint if ctx is not None else None
+        latencia = guion.latencia_endpoint.get(endpoint, guion.latencia).muestrear(self._azar)
+
+        sorteo = self._azar.random()
+        errores = guion.errores
+        for tipo, tasa in (("429", errores.tasa_429), ("529", errores.tasa_529), ("timeout", errores.tasa_timeout)):
+            if sorteo < tasa:
+                return (errores.timeout_ms / 1000 if tipo == "timeout" else latencia), tipo, None
+            sorteo -= tasa
+
+        return latencia, None, self._respuesta(guion, endpoint, messages, kwargs)
+
+    def _respuesta(
+        self, guion: GuionStub, endpoint: Optional[str], messages: List[BaseMessage], kwargs: Dict[str, Any]
+    ) -> AIMessage:
+        tools = [_nombre_tool(t) for t in kwargs.get("tools") or ()]
+        forzada = kwargs.get("tool_choice")
+        # Salida estructurada: tool_choice obligatorio sobre un esquema con respuesta configurada
+        estructurada = next((t for t in tools if t in guion.estructuradas), None)
+        if estructurada and (forzada in ("any", "required", estructurada) or len(tools) == 1):
+            paso = {"tool": estructurada, "args": guion.estructuradas[estructurada]}
+        else:
+            humanos = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+            ultimo = humanos[-1] if humanos else -1
+            llamadas = sum(1 for m in messages[ultimo + 1:] if isinstance(m, AIMessage))
+            turnos = guion.endpoints.get(endpoint) or (guion.por_defecto,)
+            pasos = turnos[min(max(len(humanos) - 1, 0), len(turnos) - 1)]
+            paso = pasos[min(llamadas, len(pasos) - 1)]
+            # Un tool call a una tool que no está disponible se degrada a texto
+            if "tool" in paso and paso["tool"] not in tools:
+                paso = {"texto": paso.get("texto") or f"(stub) {paso['tool']} no disponible"}
+
+        entrada = sum(_tokens(str(m.content)) for m in messages) + 50 * len(tools)
+        if "tool" in paso:
+            args = dict(paso.get("args") or {})
+            salida = _tokens(str(args)) + 10
+            mensaje = AIMessage(
+                content="",
+                tool_calls=[{"name": paso["tool"], "args": args, "id": f"toolu_stub_{uuid.uuid4().hex[:16]}"}],
+            )
+        else:
+            salida = _tokens(paso["texto"])
+            mensaje = AIMessage(content=paso["texto"])
+        mensaje.usage_metadata = {"input_tokens": entrada, "output_tokens": salida, "total_tokens": entrada + salida}
+        mensaje.response_metadata = {"model_name": self.model, "stop_reason": "tool_use" if "tool" in paso else "end_turn"}
+        return mensaje
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        latencia, error, mensaje = self._planificar(messages, kwargs)
+        time.sleep(latencia)
+        if error is not None:
+            raise _error(error, self.model)
+        return ChatResult(generations=[ChatGeneration(message=mensaje)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        latencia, error, mensaje = self._planificar(messages, kwargs)
+        await asyncio.sleep(latencia)
+        if error is not None:
+            raise _error(error, self.model)
+        return ChatResult(generations=[ChatGeneration(message=mensaje)])
@@ -1,24 +1,153 @@
+import asyncio
 import os
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Optional
 from dotenv import load_dotenv
-from langchain_anthropic import ChatAnthropic
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
 
-def get_llm_model(model_name: str = "claude-sonnet-4-5-20250929", temperature: float = 0.1) -> ChatAnthropic:
+BACKEND_ANTHROPIC = "anthropic"
+BACKEND_STUB = "stub"
+BACKENDS = (BACKEND_ANTHROPIC, BACKEND_STUB)
+
+
+def crear_modelo_chat(modelo: str, temperature: Optional[float] = None) -> "BaseChatModel":
     """
-    Retorna una instancia de ChatAnthropic configurada.
+    Modelo de chat para agentes y cadenas del servicio (punto único de
+    construcción). LLM_BACKEND elige el proveedor: anthropic (producción) o
+    stub (respuestas guionadas para pruebas de carga, ver llm_stub). Según
+    LLM_CASSETTE_MODE se envuelve para grabar o reproducir sus llamadas (ver
+    llm_cassettes). No exige la API key al crearse: en replay no se usa.
     """
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("CRITICAL ERROR: ANTHROPIC_API_KEY no encontrada en variables de entorno.")
+    from app.services.llm_cassettes import envolver_en_cassette
+
+    backend = os.getenv("LLM_BACKEND", BACKEND_ANTHROPIC).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"LLM_BACKEND inválido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+    def fabrica():
+        if backend == BACKEND_STUB:
+            from app.services.llm_stub import ChatStub
+            return ChatStub(model=modelo)
+        from langchain_anthropic import ChatAnthropic
+        return ChatAnthropic(model=modelo, temperature=temperature)
+
+    return envolver_en_cassette(modelo, fabrica, parametros={"temperature": temperature})
+
+
+def construir_run_config(**config) -> dict:
+    """
+    RunnableConfig para invocar agentes y cadenas con los callbacks de
+    observabilidad del servicio (métricas, trazas y costo de LLM y tools).
+    Los callbacks se propagan a todas las llamadas internas.
+    """
+    from app.services.llm_callbacks import costos_callback, metricas_callback, trazas_callback
+    from app.services.tracing import trazador
+
+    callbacks = [metricas_callback, costos_callback]
+    if trazador.habilitado:
+        callbacks.append(trazas_callback)
+    callbacks += list(config.pop("callbacks", None) or [])
+    return {**config, "callbacks": callbacks}
+
+
+class _Espera:
+    """Un turno en la cola del limitador; `avisar` entrega el cupo (False si ya no lo quiere)."""
+
+    __slots__ = ("avisar", "cancelada")
+
+    def __init__(self, avisar: Callable[[], None]):
+        self.avisar = avisar
+        self.cancelada = False
+
+
+class LLMLimiter:
+    """
+    Limitador global de llamadas concurrentes al LLM (por proceso).
+
+    Sirve tanto para código síncrono (`with llm_limiter:`, turnos de los
+    agentes de chat y HSE vía `invocar_agente`) como asíncrono (`async with
+    llm_limiter:`, llamadas del analista de documentos), compartiendo el mismo
+    cupo. Así un análisis map-reduce con muchos fragmentos no puede acaparar
+    la cuota de la API frente a los chats en curso. Un turno de agente ocupa
+    un cupo durante todo el turno (pasos de LLM y tools).
+
+    Los que esperan hacen fila (FIFO) y quien libera entrega el cupo
+    directamente al siguiente: un hilo despierta con un Event y una corrutina
+    con un Future de su event loop, sin sondeo ni hilos del executor ocupados.
+    """
+
+    def __init__(self, max_concurrencia: int):
+        self.max_concurrencia = max_concurrencia
+        self._libres = max_concurrencia
+        self._cola: Deque[_Espera] = deque()
+        self._lock = threading.Lock()
+
+    def _tomar(self, espera: _Espera) -> bool:
+        """Toma un cupo libre o deja `espera` en la fila. True si lo tomó."""
+        with self._lock:
+            if self._libres > 0 and not self._cola:
+                self._libres -= 1
+                return True
+            self._cola.append(espera)
+            return False
+
+    def _liberar(self) -> None:
+        with self._lock:
+            while self._cola:
+                espera = self._cola.popleft()
+                if not espera.cancelada:
+                    espera.avisar()
+                    return
+            self._libres += 1
+
+    def __enter__(self):
+        evento = threading.Event()
+        if not self._tomar(_Espera(evento.set)):
+            evento.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._liberar()
+        return False
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+
+        def entregar():
+            if not futuro.done():
+                futuro.set_result(None)
+
+        espera = _Espera(lambda: loop.call_soon_threadsafe(entregar))
+        if self._tomar(espera):
+            return self
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            with self._lock:
+                # Si el cupo ya se entregó (futuro resuelto o en camino) se devuelve
+                entregado = espera not in self._cola
+                espera.cancelada = True
+            if entregado:
+                self._liberar()
+            raise
+        return self
 
-    return ChatAnthropic(
-        api_key=api_key,
-        model=model_name,
-        temperature=temperature
-    )
+    async def __aexit__(self, *exc):
+        self._liberar()
+        return False
 
 
+llm_limiter = LLMLimiter(int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
 
 
+def invocar_agente(agente, entrada: dict) -> dict:
+    """Turno completo de un agente bajo el limitador global, con los callbacks del servicio."""
+    with llm_limiter:
+        return agente.invoke(entrada, config=construir_run_config())
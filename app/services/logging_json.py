@@ -0,0 +1,168 @@
+"""
+Logging estructurado (JSON, una línea por evento) que no bloquea el event loop.
+
+Los eventos se encolan con un QueueHandler sobre una cola acotada (si se
+llena se descartan y se cuentan) y un QueueListener los formatea y escribe
+desde su propio hilo. Cada línea lleva el request_id del contexto actual.
+
+Request ID: se toma del header X-Request-ID (si es válido) o se genera, se
+devuelve en la respuesta y se propaga a las trazas, al registro de costos y a
+las llamadas salientes (ver `cabeceras_correlacion`).
+
+Muestreo: las requests exitosas se registran con probabilidad
+LOG_SAMPLE_RATE; errores (status >= 400, excepciones) y requests lentas
+(>= LOG_SLOW_MS) se registran siempre.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.services.metrics import registro
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SLOW_MS = float(os.getenv("LOG_SLOW_MS", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Archivo de destino (por defecto stdout, lo recoge el process manager)
+LOG_PATH = os.getenv("LOG_PATH") or None
+
+HEADER_REQUEST_ID = "X-Request-ID"
+# Un ID entrante se acepta solo si es corto y sin caracteres raros (va a logs y headers)
+_REQUEST_ID_VALIDO = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+logs_descartados = registro.contador(
+    "log_records_dropped_total", "Eventos de log descartados por cola llena", ("logger",)
+)
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def request_id_actual() -> Optional[str]:
+    return _request_id.get()
+
+
+def asignar_request_id(entrante: Optional[str] = None):
+    """Fija el request_id del contexto (el entrante si es válido, si no uno nuevo). Retorna (id, token)."""
+    request_id = entrante if entrante and _REQUEST_ID_VALIDO.match(entrante) else uuid.uuid4().hex
+    return request_id, _request_id.set(request_id)
+
+
+def liberar_request_id(token) -> None:
+    _request_id.reset(token)
+
+
+def cabeceras_correlacion() -> Dict[str, str]:
+    """Headers para llamadas salientes (Defontana, etc.) con el request_id actual."""
+    request_id = _request_id.get()
+    return {HEADER_REQUEST_ID: request_id} if request_id else {}
+
+
+def muestrear(status: int, duracion_ms: float, tasa: float = LOG_SAMPLE_RATE) -> bool:
+    """Si se registra la request: errores y lentas siempre, exitosas según la tasa."""
+    if status >= 400 or duracion_ms >= LOG_SLOW_MS or tasa >= 1:
+        return True
+    return random.random() < tasa
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por evento: ts, level, logger, msg, request_id y los campos extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            evento["request_id"] = request_id
+        evento.update(getattr(record, "campos", None) or {})
+        if record.exc_info:
+            evento["error"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class QueueHandlerNoBloqueante(logging.handlers.QueueHandler):
+    """
+    QueueHandler sobre cola acotada: con la cola llena descarta el evento en
+    vez de bloquear. Captura el request_id aquí (en el hilo del request),
+    porque el listener formatea en otro hilo sin ese contexto.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = getattr(record, "request_id", None) or _request_id.get()
+        # El mensaje se formatea en el listener: solo se resuelven los args aquí
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logs_descartados.inc(record.name)
+
+
+class LoggingJSON:
+    """Configura el logger del servicio y administra el hilo del listener."""
+
+    def __init__(self, nombre: str = "controlworld", max_cola: int = LOG_QUEUE_SIZE):
+        self.logger = logging.getLogger(nombre)
+        self.logger.setLevel(LOG_LEVEL)
+        # Los eventos no suben al root (uvicorn): el formato JSON es propio
+        self.logger.propagate = False
+        self.cola: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max_cola)
+        self.logger.addHandler(QueueHandlerNoBloqueante(self.cola))
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def iniciar(self, destino: Optional[logging.Handler] = None) -> None:
+        if self._listener is not None:
+            return
+        if destino is None:
+            destino = logging.FileHandler(LOG_PATH, encoding="utf-8") if LOG_PATH else logging.StreamHandler(sys.stdout)
+        destino.setFormatter(FormateadorJSON())
+        self._listener = logging.handlers.QueueListener(self.cola, destino, respect_handler_level=True)
+        self._listener.start()
+
+    def detener(self) -> None:
+        """Escribe los eventos pendientes y detiene el hilo (shutdown del worker)."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def hijo(self, nombre: str) -> logging.Logger:
+        return self.logger.getChild(nombre)
+
+
+logging_json = LoggingJSON()
+logger_requests = logging_json.hijo("requests")
+
+
+def registrar_request(
+    metodo: str, ruta: str, route: str, status: int, inicio: float, error: Optional[BaseException] = None, **campos: Any
+) -> None:
+    """Evento de fin de request (con muestreo). `inicio` es de time.perf_counter()."""
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    if error is None and not muestrear(status, duracion_ms):
+        return
+    nivel = logging.ERROR if error is not None or status >= 500 else (logging.WARNING if status >= 400 else logging.INFO)
+    logger_requests.log(
+        nivel,
+        f"{metodo} {ruta} {status}",
+        exc_info=(type(error), error, error.__traceback__) if error is not None else None,
+        extra={"campos": {
+            "method": metodo, "path": ruta, "route": route, "status": status,
+            "duration_ms": round(duracion_ms, 1), **campos,
+        }},
+    )
@@ -0,0 +1,220 @@
+"""
+Métricas del servicio en formato de exposición de Prometheus (texto 0.0.4).
+
+Registro propio y mínimo (contadores e histogramas con labels) para no sumar
+dependencias: registrar una observación es un `bisect` + incrementos de dict
+bajo un lock, del orden de 1 µs. Las métricas de caches no tocan el camino
+caliente: se leen de los contadores de cada cache al momento del scrape.
+
+Las métricas son por proceso (cada worker expone las suyas); Prometheus las
+agrega por instancia.
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Buckets de latencia en segundos (de requests locales a llamadas LLM largas)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BUCKETS_PASOS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_labels(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class Contador:
+    """Contador monótono con labels (los valores de labels se pasan en orden)."""
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, labels: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.labels = tuple(labels)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, valor: float = 1.0) -> None:
+        with self._lock:
+            self._valores[labels] = self._valores.get(labels, 0.0) + valor
+
+    def valor(self, *labels: str) -> float:
+        return self._valores.get(labels, 0.0)
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._valores.items())
+        return [f"{self.nombre}{_formatear_labels(self.labels, k)} {_numero(v)}" for k, v in items]
+
+
+class Histograma:
+    """Histograma con buckets fijos y labels."""
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, labels: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [conteos por bucket (no acumulados, último = +Inf), suma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *labels: str) -> None:
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def conteo(self, *labels: str) -> int:
+        serie = self._series.get(labels)
+        return sum(serie[0]) if serie else 0
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        lineas = []
+        for labels, (conteos, suma) in items:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = _formatear_labels(self.labels, labels, f'le="{_numero(limite)}"')
+                lineas.append(f"{self.nombre}_bucket{le} {acumulado}")
+            base = _formatear_labels(self.labels, labels)
+            lineas.append(f"{self.nombre}_sum{base} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{base} {acumulado}")
+        return lineas
+
+
+# Recolector: función sin argumentos -> [(nombre, tipo, ayuda, [(labels_dict, valor)])]
+Recolector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: List = []
+        self._recolectores: List[Recolector] = []
+
+    def contador(self, nombre: str, ayuda: str, labels: Sequence[str] = ()) -> Contador:
+        metrica = Contador(nombre, ayuda, labels)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(self, nombre: str, ayuda: str, labels: Sequence[str] = (), buckets=BUCKETS_LATENCIA) -> Histograma:
+        metrica = Histograma(nombre, ayuda, labels, buckets)
+        self._metricas.append(metrica)
+        return metrica
+
+    def recolector(self, funcion: Recolector) -> Recolector:
+        """Registra una función que calcula métricas al momento del scrape (decorador)."""
+        self._recolectores.append(funcion)
+        return funcion
+
+    def exponer(self) -> str:
+        lineas: List[str] = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.exponer())
+        for recolector in self._recolectores:
+            try:
+                familias = list(recolector())
+            except Exception as e:
+                print(f"⚠️ [METRICS] Recolector {getattr(recolector, '__name__', recolector)} falló: {e}")
+                continue
+            for nombre, tipo, ayuda, muestras in familias:
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                for labels, valor in muestras:
+                    lineas.append(f"{nombre}{_formatear_labels(list(labels), list(labels.values()))} {_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+registro = RegistroMetricas()
+
+# --- HTTP ---
+http_duracion = registro.histograma(
+    "http_request_duration_seconds", "Latencia de requests HTTP por ruta (hasta enviar headers)",
+    ("method", "route", "status"),
+)
+
+# --- LLM ---
+llm_duracion = registro.histograma(
+    "llm_request_duration_seconds", "Latencia de llamadas al LLM por modelo", ("model",)
+)
+llm_llamadas = registro.contador(
+    "llm_requests_total", "Llamadas al LLM por modelo y resultado (ok/error)", ("model", "status")
+)
+llm_errores = registro.contador(
+    "llm_errors_total", "Errores de llamadas al LLM por modelo y tipo de excepción", ("model", "error")
+)
+llm_tokens = registro.contador(
+    "llm_tokens_total", "Tokens por modelo y tipo (input, output, cache_read, cache_creation)", ("model", "type")
+)
+
+# --- Agentes y tools ---
+tool_llamadas = registro.contador(
+    "agent_tool_calls_total", "Llamadas a tools del agente por tool y resultado", ("tool", "status")
+)
+tool_duracion = registro.histograma(
+    "agent_tool_duration_seconds", "Latencia de tools del agente", ("tool",)
+)
+agente_pasos = registro.histograma(
+    "agent_steps_per_turn", "Pasos del modelo (llamadas al LLM) por turno de conversación", ("agent",),
+    buckets=BUCKETS_PASOS,
+)
+
+
+# --- Ruteo de modelos ---
+ruteo_decisiones = registro.contador(
+    "llm_route_decisions_total", "Decisiones del ruteo de modelos por endpoint, ruta y motivo", ("endpoint", "route", "reason")
+)
+ruteo_duracion = registro.histograma(
+    "llm_route_turn_duration_seconds", "Latencia del turno por endpoint, ruta y modelo efectivo", ("endpoint", "route", "model")
+)
+ruteo_costo = registro.contador(
+    "llm_route_cost_usd_total", "Costo USD de LLM por endpoint, ruta y modelo efectivo", ("endpoint", "route", "model")
+)
+
+
+def _info_lru(funcion) -> Tuple[int, int]:
+    info = funcion.cache_info()
+    return info.hits, info.misses
+
+
+@registro.recolector
+def recolectar_caches():
+    """Hits/misses y ratio de los caches del servicio (leídos al momento del scrape)."""
+    # Imports locales: solo módulos livianos del propio servicio
+    from app.services.chatbot_solicitud_articulos import dimensiones, fuzzy_matcher, normalizacion_utils
+    from app.services.document_cache import document_cache
+
+    caches = {
+        "documentos": (document_cache.hits, document_cache.misses),
+        "normalizacion": _info_lru(normalizacion_utils._normalizar_memo),
+        "dimensiones": _info_lru(dimensiones._canonicalizar_memo),
+        "fuzzy": _info_lru(fuzzy_matcher._buscar_memo),
+    }
+    hits = [({"cache": c}, h) for c, (h, _) in caches.items()]
+    misses = [({"cache": c}, m) for c, (_, m) in caches.items()]
+    ratios = [({"cache": c}, h / (h + m) if h + m else 0.0) for c, (h, m) in caches.items()]
+    return [
+        ("cache_hits_total", "counter", "Aciertos por cache", hits),
+        ("cache_misses_total", "counter", "Fallos por cache", misses),
+        ("cache_hit_ratio", "gauge", "Proporción de aciertos por cache", ratios),
+    ]
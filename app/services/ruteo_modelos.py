@@ -0,0 +1,279 @@
+"""
+Ruteo de modelos por turno: modelo barato para los turnos rutinarios y
+escalamiento al modelo grande solo cuando las señales lo piden.
+
+Las reglas por endpoint están en config/ruteo_modelos.yaml (recarga en
+caliente). Señales:
+- fast path: slots pre-llenados con nombre propuesto o respuesta corta a una
+  pregunta en curso (se queda en el rutinario),
+- confianza de `inferir_categoria` sobre el primer mensaje,
+- largo del historial (turno del usuario),
+- fallos de validación seguidos de `construir_nombre_estandar` en la sesión.
+
+La decisión viaja en el ContextoCosto (`ruta`), de modo que el costo queda
+registrado por ruta (GET /costos/totales?agrupar=ruta), y la latencia y el
+costo del turno se exponen en /metrics por endpoint, ruta y modelo. Si el
+presupuesto soft cambia el modelo decidido, el turno queda en la ruta
+`degradado` (con el motivo original), no en la que se pidió.
+
+Los modelos salen solo del YAML: no hay modelos por defecto en el código.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Mapping, Optional
+
+import yaml
+
+from app.services.archivo_recargable import ArchivoRecargable
+from app.services.metrics import ruteo_costo, ruteo_decisiones, ruteo_duracion
+
+if TYPE_CHECKING:
+    from app.services.costos import EstadoPresupuesto
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+RUTEO_CONFIG_PATH = Path(os.getenv("LLM_RUTEO_CONFIG_PATH") or BASE_DIR / "config" / "ruteo_modelos.yaml")
+
+# Rutas
+RUTINARIO = "rutinario"
+ESCALADO = "escalado"
+DEGRADADO = "degradado"   # el presupuesto soft cambió el modelo decidido
+
+# Niveles de confianza de inferir_categoria, de menor a mayor
+# (SIN_CATEGORIA: ninguna keyword coincidió, inferir_categoria no propone categoría)
+SIN_CATEGORIA = "SIN_CATEGORIA"
+CONFIANZAS = (SIN_CATEGORIA, "BAJA", "MEDIA", "ALTA")
+
+TOOL_VALIDACION = "construir_nombre_estandar"
+
+
+# --- Configuración ---
+
+@dataclass(frozen=True)
+class ReglasRuteo:
+    """Modelos y umbrales de escalamiento de un endpoint (None = señal deshabilitada)."""
+    rutinario: str = ""
+    escalado: Optional[str] = None
+    confianza_minima: Optional[str] = None
+    max_turnos: Optional[int] = None
+    max_fallos_validacion: Optional[int] = None
+    palabras_respuesta_corta: int = 0
+
+
+@dataclass(frozen=True)
+class ConfigRuteo:
+    por_defecto: ReglasRuteo = ReglasRuteo()
+    endpoints: Mapping[str, ReglasRuteo] = field(default_factory=dict)
+
+    def reglas(self, endpoint: str) -> ReglasRuteo:
+        return self.endpoints.get(endpoint) or self.por_defecto
+
+
+_CAMPOS_ENTEROS = ("max_turnos", "max_fallos_validacion")
+
+
+def _reglas(data: Any, base: ReglasRuteo) -> ReglasRuteo:
+    data = dict(data or {})
+    desconocidos = set(data) - set(ReglasRuteo.__dataclass_fields__)
+    if desconocidos:
+        raise ValueError(f"Campos de ruteo desconocidos: {sorted(desconocidos)}")
+    if data.get("confianza_minima") is not None:
+        data["confianza_minima"] = str(data["confianza_minima"]).upper()
+        if data["confianza_minima"] not in CONFIANZAS:
+            raise ValueError(f"confianza_minima inválida: {data['confianza_minima']} (opciones: {', '.join(CONFIANZAS)})")
+    for campo in _CAMPOS_ENTEROS:
+        if data.get(campo) is not None:
+            data[campo] = int(data[campo])
+    if "palabras_respuesta_corta" in data:
+        data["palabras_respuesta_corta"] = int(data["palabras_respuesta_corta"] or 0)
+    reglas = replace(base, **data)
+    if not reglas.rutinario:
+        raise ValueError("El modelo rutinario es obligatorio (por_defecto.rutinario en el YAML)")
+    return reglas
+
+
+def _compilar(contenido: Optional[bytes], anterior: Optional[ConfigRuteo]) -> ConfigRuteo:
+    data = yaml.safe_load(contenido) if contenido is not None else {}
+    data = data or {}
+    por_defecto = _reglas(data.get("por_defecto"), ReglasRuteo())
+    return ConfigRuteo(
+        por_defecto=por_defecto,
+        endpoints={str(e): _reglas(r, por_defecto) for e, r in (data.get("endpoints") or {}).items()},
+    )
+
+
+_config: ArchivoRecargable[ConfigRuteo] = ArchivoRecargable(RUTEO_CONFIG_PATH, _compilar)
+
+
+def obtener_config_ruteo() -> ConfigRuteo:
+    return _config.obtener()
+
+
+def modelo_rutinario(endpoint: str) -> str:
+    """Modelo rutinario del endpoint (warm-up, simuladores y pruebas)."""
+    return obtener_config_ruteo().reglas(endpoint).rutinario
+
+
+# --- Decisión ---
+
+@dataclass
+class SenalesRuteo:
+    """Señales de un turno (None = no aplica a este endpoint)."""
+    turno: int = 1                          # turno del usuario (1 = primer mensaje)
+    prellenado_completo: bool = False       # slots del documento con nombre propuesto
+    palabras: Optional[int] = None          # largo del mensaje del usuario
+    confianza: Optional[str] = None         # inferir_categoria sobre el primer mensaje
+    fallos_validacion: int = 0              # fallos seguidos de construir_nombre_estandar
+
+
+@dataclass(frozen=True)
+class DecisionRuteo:
+    endpoint: str
+    ruta: str        # rutinario | escalado | degradado
+    modelo: str      # modelo efectivo del turno
+    motivo: str      # fast_path | fallos_validacion | confianza_baja | historial_largo | rutinario | sin_escalado
+
+
+def _fast_path(senales: SenalesRuteo, reglas: ReglasRuteo) -> bool:
+    if senales.prellenado_completo:
+        return True
+    # Respuesta corta (ej: una opción de preguntar_con_opciones) en una conversación en curso
+    return (
+        senales.turno > 1
+        and senales.palabras is not None
+        and senales.palabras <= reglas.palabras_respuesta_corta
+    )
+
+
+def _confianza_baja(confianza: Optional[str], minima: Optional[str]) -> bool:
+    if confianza is None or minima is None or confianza not in CONFIANZAS:
+        return False
+    return CONFIANZAS.index(confianza) < CONFIANZAS.index(minima)
+
+
+def _motivo(senales: SenalesRuteo, reglas: ReglasRuteo) -> str:
+    if reglas.max_fallos_validacion is not None and senales.fallos_validacion >= reglas.max_fallos_validacion:
+        return "fallos_validacion"
+    if _fast_path(senales, reglas):
+        return "fast_path"
+    if _confianza_baja(senales.confianza, reglas.confianza_minima):
+        return "confianza_baja"
+    if reglas.max_turnos is not None and senales.turno > reglas.max_turnos:
+        return "historial_largo"
+    return "rutinario"
+
+
+def decidir_modelo(
+    endpoint: str,
+    senales: Optional[SenalesRuteo] = None,
+    config: Optional[ConfigRuteo] = None,
+    presupuesto: Optional["EstadoPresupuesto"] = None,
+) -> DecisionRuteo:
+    """
+    Modelo del turno según las reglas del endpoint y el presupuesto. Registra
+    la decisión en /metrics.
+    """
+    reglas = (config or obtener_config_ruteo()).reglas(endpoint)
+    if reglas.escalado is None:
+        decision = DecisionRuteo(endpoint, RUTINARIO, reglas.rutinario, "sin_escalado")
+    else:
+        motivo = _motivo(senales or SenalesRuteo(), reglas)
+        if motivo in ("fast_path", "rutinario"):
+            decision = DecisionRuteo(endpoint, RUTINARIO, reglas.rutinario, motivo)
+        else:
+            decision = DecisionRuteo(endpoint, ESCALADO, reglas.escalado, motivo)
+    if presupuesto is not None:
+        modelo = presupuesto.modelo(decision.modelo)
+        if modelo != decision.modelo:
+            decision = DecisionRuteo(endpoint, DEGRADADO, modelo, decision.motivo)
+    ruteo_decisiones.inc(endpoint, decision.ruta, decision.motivo)
+    return decision
+
+
+def registrar_turno(decision: DecisionRuteo, duracion_s: float, costo_usd: float) -> None:
+    """Latencia y costo del turno (también si falló) por ruta y modelo efectivo."""
+    ruteo_duracion.observar(duracion_s, decision.endpoint, decision.ruta, decision.modelo)
+    ruteo_costo.inc(decision.endpoint, decision.ruta, decision.modelo, valor=costo_usd)
+
+
+# --- Fallos de validación por sesión ---
+
+def _resultado_validacion(mensaje: Any) -> Optional[bool]:
+    """`valido` de un ToolMessage de construir_nombre_estandar (None si es otro mensaje)."""
+    if getattr(mensaje, "type", None) != "tool" or getattr(mensaje, "name", None) != TOOL_VALIDACION:
+        return None
+    try:
+        resultado = json.loads(mensaje.content)
+    except (TypeError, ValueError):
+        return False
+    return bool(resultado.get("valido")) if isinstance(resultado, dict) else False
+
+
+class FallosValidacion:
+    """
+    Fallos seguidos de construir_nombre_estandar por sesión (LRU acotado, por
+    proceso como `conversaciones` del router). Una validación exitosa reinicia
+    el conteo: se escala por fallos repetidos, no por uno aislado.
+
+    La clave es la sesión del turno: `sesion_id` del body o, si no viene, la
+    X-Session-ID del proxy confiable (ver costos.identidad_request). Sin
+    ninguna de las dos la señal queda deshabilitada: no hay cómo unir los
+    turnos de una misma conversación.
+    """
+
+    def __init__(self, max_sesiones: int = 10_000):
+        self.max_sesiones = max_sesiones
+        self._fallos: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, sesion: Optional[str]) -> int:
+        if not sesion:
+            return 0
+        with self._lock:
+            return self._fallos.get(sesion, 0)
+
+    def actualizar(self, sesion: Optional[str], mensajes: Iterable[Any]) -> int:
+        """Suma los resultados de validación de un turno (en orden) y retorna el conteo vigente."""
+        if not sesion:
+            return 0
+        with self._lock:
+            fallos = self._fallos.pop(sesion, 0)
+            for mensaje in mensajes:
+                valido = _resultado_validacion(mensaje)
+                if valido is not None:
+                    fallos = 0 if valido else fallos + 1
+            self._fallos[sesion] = fallos
+            while len(self._fallos) > self.max_sesiones:
+                self._fallos.popitem(last=False)
+            return fallos
+
+
+fallos_validacion = FallosValidacion(int(os.getenv("LLM_RUTEO_MAX_SESIONES", "10000")))
+
+
+def senales_estandarizacion(
+    mensaje: str,
+    contexto_conversacion: Optional[Iterable[Mapping[str, Any]]] = None,
+    prellenado: Optional[Dict[str, Any]] = None,
+    sesion: Optional[str] = None,
+) -> SenalesRuteo:
+    """Señales de un turno del chatbot de estandarización."""
+    from app.services.chatbot_solicitud_articulos.categorias_service import inferir_categoria
+
+    turno = 1 + sum(1 for m in contexto_conversacion or [] if m.get("rol") == "usuario")
+    prellenado_completo = bool(prellenado and prellenado.get("nombre_propuesto"))
+    # La categoría se decide en el primer turno; después la conversación ya la fijó
+    confianza = None
+    if turno == 1 and not prellenado:
+        inferencia = inferir_categoria(mensaje)
+        confianza = inferencia.confianza if inferencia.categoria_inferida else SIN_CATEGORIA
+    return SenalesRuteo(
+        turno=turno,
+        prellenado_completo=prellenado_completo,
+        palabras=len(mensaje.split()),
+        confianza=confianza,
+        fallos_validacion=fallos_validacion.obtener(sesion),
+    )
@@ -0,0 +1,106 @@
+"""
+Perfil de arranque y estado de warm-up del servicio (para `/ready`).
+
+Los módulos pesados (langchain, anthropic, pypdf) y los clientes LLM se cargan
+de forma diferida. Al arrancar, `calentar` los inicializa en segundo plano
+mientras el worker ya acepta conexiones; `/ready` responde 503 hasta que
+termina. Cada etapa (imports de main y pasos de warm-up) queda medida con
+su tiempo y los paquetes que cargó por primera vez, para ver qué cuesta un
+reinicio.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Paquetes listados por etapa en el reporte (los que más módulos cargaron)
+MAX_PAQUETES_POR_ETAPA = 5
+
+
+@dataclass
+class EtapaArranque:
+    """Una etapa medida del arranque."""
+    nombre: str
+    ms: float
+    modulos_nuevos: int
+    paquetes: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class PerfilArranque:
+    """Registro de etapas de arranque y del estado de warm-up (por proceso)."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas: List[EtapaArranque] = []
+        self.listo = False
+        self.listo_ms: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def medir(self, nombre: str) -> Iterator[None]:
+        """Mide el bloque: tiempo y módulos importados por primera vez dentro de él."""
+        antes = set(sys.modules)
+        t0 = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            nuevos = set(sys.modules) - antes
+            paquetes = Counter(m.split(".", 1)[0] for m in nuevos)
+            etapa = EtapaArranque(
+                nombre=nombre,
+                ms=round(ms, 1),
+                modulos_nuevos=len(nuevos),
+                paquetes=[p for p, _ in paquetes.most_common(MAX_PAQUETES_POR_ETAPA)],
+                error=error,
+            )
+            with self._lock:
+                self.etapas.append(etapa)
+
+    def calentar(self, pasos: Sequence[Tuple[str, Callable[[], Any]]]) -> None:
+        """
+        Ejecuta los pasos de warm-up en orden y marca el servicio como listo.
+        Un paso que falla se registra y no bloquea a los demás: la inicialización
+        diferida lo reintentará (y reportará el error) en la primera request.
+        """
+        for nombre, paso in pasos:
+            try:
+                with self.medir(nombre):
+                    paso()
+            except Exception as e:
+                print(f"⚠️ [ARRANQUE] Warm-up '{nombre}' falló: {e}")
+        self.listo_ms = round((time.perf_counter() - self.inicio) * 1000, 1)
+        self.listo = True
+        self.imprimir()
+
+    def reporte(self) -> Dict[str, Any]:
+        with self._lock:
+            etapas = [asdict(e) for e in self.etapas]
+        return {
+            "listo": self.listo,
+            "listo_ms": self.listo_ms,
+            "uptime_s": round(time.perf_counter() - self.inicio, 1),
+            "etapas": etapas,
+        }
+
+    def imprimir(self) -> None:
+        """Reporte de arranque en consola, etapas más costosas primero."""
+        with self._lock:
+            etapas = sorted(self.etapas, key=lambda e: -e.ms)
+        print(f"\n⏱️  PERFIL DE ARRANQUE (listo en {self.listo_ms} ms)")
+        for e in etapas:
+            estado = f"  ❌ {e.error}" if e.error else ""
+            paquetes = f"  [{', '.join(e.paquetes)}]" if e.paquetes else ""
+            print(f" - {e.nombre:<48} {e.ms:>9.1f} ms  {e.modulos_nuevos:>5} módulos{paquetes}{estado}")
+        print()
+
+
+perfil_arranque = PerfilArranque()
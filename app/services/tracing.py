@@ -0,0 +1,233 @@
+"""
+Trazas por request: spans de HTTP, agente, pasos del agente, llamadas al
+modelo y tools, exportados a un JSONL local.
+
+Cada línea del archivo es un span terminado con los nombres de campo de
+OTLP/JSON (traceId, spanId, parentSpanId, startTimeUnixNano, ...), así que
+puede reenviarse a un colector OpenTelemetry sin transformar. La escritura va
+por un hilo propio en lotes (`escritor_jsonl.EscritorJSONL`, el mismo del
+historial): el request solo encola el span, y el archivo rota por tamaño o
+período (gzip) conservando TRACE_MAX_ROTADOS rotados, así el disco usado queda
+acotado.
+
+El span del request vive en un ContextVar; los spans de LangChain cuelgan de
+él vía el callback de `llm_callbacks` (ver `construir_run_config`).
+Análisis: `python -m app.cli.trazas`.
+"""
+import gzip
+import json
+import os
+import random
+import secrets
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.escritor_jsonl import FSYNC_NUNCA, EscritorJSONL
+from app.services.metrics import registro
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1").lower() not in ("0", "false", "no")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_EXPORT_PATH = Path(os.getenv("TRACE_EXPORT_PATH") or BASE_DIR / "cache" / "trazas" / "spans.jsonl")
+TRACE_MAX_MB = int(os.getenv("TRACE_MAX_MB", "100"))
+TRACE_ROTACION_SEGUNDOS = float(os.getenv("TRACE_ROTACION_SEGUNDOS", "86400"))
+TRACE_MAX_ROTADOS = int(os.getenv("TRACE_MAX_ROTADOS", "7"))
+TRACE_MAX_COLA = int(os.getenv("TRACE_MAX_COLA", "10000"))
+
+trazas_spans = registro.contador(
+    "trace_spans_total", "Spans exportados por resultado (escrito/descartado/error)", ("status",)
+)
+
+
+@dataclass
+class Span:
+    """Un tramo medido de un trace."""
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    nombre: str
+    tipo: str                      # http | agente | paso | llm | tool
+    inicio_ns: int
+    fin_ns: Optional[int] = None
+    atributos: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    muestreado: bool = True
+
+    @property
+    def duracion_ms(self) -> float:
+        return ((self.fin_ns or time.time_ns()) - self.inicio_ns) / 1e6
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.nombre,
+            "kind": self.tipo,
+            "startTimeUnixNano": self.inicio_ns,
+            "endTimeUnixNano": self.fin_ns,
+            "attributes": self.atributos,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+
+_span_actual: ContextVar[Optional[Span]] = ContextVar("span_actual", default=None)
+
+
+class ExportadorJSONL(EscritorJSONL):
+    """Escribe spans en JSONL desde un hilo daemon, en lotes, con rotación y retención."""
+
+    def __init__(self, ruta: Path, **opciones):
+        opciones.setdefault("fsync", FSYNC_NUNCA)
+        super().__init__(ruta, nombre="trazas", metrica=trazas_spans, **opciones)
+
+    def exportar(self, span: Span) -> None:
+        self.registrar(span.a_dict())
+
+
+class Trazador:
+    def __init__(self, exportador: ExportadorJSONL, habilitado: bool = True, muestreo: float = 1.0):
+        self.exportador = exportador
+        self.habilitado = habilitado
+        self.muestreo = muestreo
+
+    def iniciar(self, nombre: str, tipo: str, padre: Optional[Span] = None, **atributos: Any) -> Span:
+        """Abre un span hijo de `padre` (o del span actual del contexto; si no hay, un trace nuevo)."""
+        padre = padre or _span_actual.get()
+        if padre is not None:
+            trace_id, parent_id, muestreado = padre.trace_id, padre.span_id, padre.muestreado
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+            muestreado = self.muestreo >= 1 or random.random() < self.muestreo
+        return Span(
+            trace_id=trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent_id,
+            nombre=nombre,
+            tipo=tipo,
+            inicio_ns=time.time_ns(),
+            atributos=atributos,
+            muestreado=muestreado,
+        )
+
+    def finalizar(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.fin_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"[:500]
+        if span.muestreado:
+            self.exportador.exportar(span)
+
+    @contextmanager
+    def span(self, nombre: str, tipo: str, **atributos: Any) -> Iterator[Span]:
+        """Span como contexto: los spans abiertos dentro (y los de LangChain) cuelgan de él."""
+        actual = self.iniciar(nombre, tipo, **atributos)
+        token = _span_actual.set(actual)
+        error = None
+        try:
+            yield actual
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _span_actual.reset(token)
+            self.finalizar(actual, error)
+
+
+def span_actual() -> Optional[Span]:
+    return _span_actual.get()
+
+
+trazador = Trazador(
+    ExportadorJSONL(
+        TRACE_EXPORT_PATH,
+        max_cola=TRACE_MAX_COLA,
+        max_bytes=TRACE_MAX_MB * 1024 * 1024,
+        rotacion_segundos=TRACE_ROTACION_SEGUNDOS,
+        max_rotados=TRACE_MAX_ROTADOS,
+    ),
+    habilitado=TRACING_ENABLED,
+    muestreo=TRACE_SAMPLE_RATE,
+)
+
+
+def leer_spans(ruta: Path) -> Iterator[Dict[str, Any]]:
+    """Spans de un archivo JSONL o rotado .gz (ignora líneas corruptas, ej: una escritura cortada)."""
+    abrir = gzip.open if str(ruta).endswith(".gz") else open
+    with abrir(ruta, "rt", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+
+
+def agrupar_por_trace(spans: Iterator[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        traces.setdefault(span["traceId"], []).append(span)
+    return traces
+
+
+def _categoria(span: Dict[str, Any]) -> str:
+    """Agrupación del desglose: 'llm <modelo>', 'tool <nombre>' o el tipo del span."""
+    atributos = span.get("attributes") or {}
+    if span.get("kind") == "llm":
+        return f"llm {atributos.get('model', '?')}"
+    if span.get("kind") == "tool":
+        return f"tool {span.get('name')}"
+    return f"propio {span.get('kind', '?')}"
+
+
+def ruta_critica(spans: Iterable[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float]]:
+    """
+    Tramos de la ruta crítica de un trace como (span, ms exclusivos en la ruta).
+
+    Se recorre desde el final de la raíz hacia atrás: en cada span, el hijo que
+    termina último antes del cursor está en la ruta (y se recorre igual); el
+    tiempo sin un hijo en la ruta es tiempo propio del span. Con hijos en
+    paralelo solo cuenta el que marca el final.
+    """
+    spans = [s for s in spans if s.get("endTimeUnixNano")]
+    if not spans:
+        return []
+    ids = {s["spanId"] for s in spans}
+    hijos: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    raices = []
+    for s in spans:
+        if s.get("parentSpanId") in ids:
+            hijos[s["parentSpanId"]].append(s)
+        else:
+            raices.append(s)
+    raiz = min(raices, key=lambda s: (s["startTimeUnixNano"], -s["endTimeUnixNano"]))
+
+    exclusivo: Dict[str, float] = defaultdict(float)
+
+    def recorrer(span: Dict[str, Any], limite: int) -> None:
+        cursor = min(span["endTimeUnixNano"], limite)
+        for hijo in sorted(hijos[span["spanId"]], key=lambda h: h["endTimeUnixNano"], reverse=True):
+            if hijo["startTimeUnixNano"] >= cursor:
+                continue
+            fin_hijo = min(hijo["endTimeUnixNano"], cursor)
+            exclusivo[span["spanId"]] += (cursor - fin_hijo) / 1e6
+            recorrer(hijo, fin_hijo)
+            cursor = max(hijo["startTimeUnixNano"], span["startTimeUnixNano"])
+        exclusivo[span["spanId"]] += max(cursor - span["startTimeUnixNano"], 0) / 1e6
+
+    recorrer(raiz, raiz["endTimeUnixNano"])
+    por_id = {s["spanId"]: s for s in spans}
+    tramos = [(por_id[i], ms) for i, ms in exclusivo.items() if ms > 0]
+    return sorted(tramos, key=lambda t: t[0]["startTimeUnixNano"])
+
+
+def desglose_ruta_critica(spans: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    """ms de la ruta crítica por categoría (llm <modelo>, tool <nombre>, propio <tipo>), mayor primero."""
+    totales: Dict[str, float] = defaultdict(float)
+    for span, ms in ruta_critica(spans):
+        totales[_categoria(span)] += ms
+    return dict(sorted(totales.items(), key=lambda t: -t[1]))
@@ -4,6 +4,7 @@ Cada tool es un wrapper delgado que llama a los servicios correspondientes.
 """
 from langchain.tools import tool
 from typing import List, Dict, Any
+import os
 import httpx
 
 from app.services.chatbot_solicitud_articulos.categorias_service import (
@@ -11,8 +12,11 @@ from app.services.chatbot_solicitud_articulos.categorias_service import (
     obtener_reglas_categoria,
     inferir_categoria as _inferir_categoria,
 )
-from app.services.chatbot_solicitud_articulos.normalizacion_utils import normalizar_valor
+from app.services.chatbot_solicitud_articulos.estandarizacion_service import construir_nombre
+from app.services.logging_json import cabeceras_correlacion
 
+# Configurable para apuntar a un stub en pruebas de carga (ver tests/benchmarks/bench_carga.py)
+DEFONTANA_API_URL = os.getenv("DEFONTANA_API_URL", "http://controlworldms.cl/api/articulos-defontana")
 
 @tool
 def buscar_articulos_defontana(termino: str) -> List[dict]:
@@ -22,8 +26,9 @@ def buscar_articulos_defontana(termino: str) -> List[dict]:
     """
     try:
         response = httpx.get(
-            "http://controlworldms.cl/api/articulos-defontana",
+            DEFONTANA_API_URL,
             params={"busqueda": termino},
+            headers=cabeceras_correlacion(),
             timeout=30
         )
         if response.status_code == 200:
@@ -46,59 +51,9 @@ def construir_nombre_estandar(tipo: str, atributos: Dict[str, Any]) -> Dict[str,
     
     Returns:
         Dict con 'valido', 'nombre' (si es válido), 'errores' (si hay errores)
+        y 'correcciones' (typos ajustados al valor estándar, si los hubo)
     """
-    config_tipo = obtener_reglas_categoria(tipo)
-    
-    if not config_tipo:
-        categorias = obtener_categorias()
-        tipos_validos = [c["id"] for c in categorias]
-        return {
-            "valido": False, 
-            "errores": [f"Tipo '{tipo}' no encontrado. Válidos: {tipos_validos}"]
-        }
-    
-    formato = config_tipo['formato']
-    campos_config = config_tipo['campos']
-    
-    errores = []
-    valores_usados = {}
-    campos_faltantes = []
-    
-    for campo, reglas in campos_config.items():
-        valor = atributos.get(campo, "")
-        
-        # Normalizar valor usando el servicio
-        if valor:
-            valor = normalizar_valor(valor, campo)
-        
-        # Validar campo requerido
-        if reglas.get('requerido') and not valor:
-            errores.append(f"Campo requerido faltante: '{campo}'")
-            campos_faltantes.append(campo)
-            valores_usados[campo] = f"[{campo.upper()}]"
-            continue
-            
-        # Validar contra lista cerrada
-        if valor and reglas.get('tipo') == 'lista_cerrada':
-            valores_permitidos = reglas.get('valores_estandar', [])
-            if valor not in valores_permitidos:
-                errores.append(f"'{valor}' no válido para '{campo}'. Permitidos: {valores_permitidos}")
-        
-        valores_usados[campo] = valor if valor else ""
-
-    if errores:
-        return {
-            "valido": False, 
-            "errores": errores, 
-            "campos_faltantes": campos_faltantes,
-            "nombre_parcial": formato.format(**valores_usados)
-        }
-    
-    try:
-        nombre = " ".join(formato.format(**valores_usados).split())
-        return {"valido": True, "nombre": nombre}
-    except Exception as e:
-        return {"valido": False, "errores": [f"Error formateando: {str(e)}"]}
+    return construir_nombre(tipo, atributos)
 
 
 @tool
@@ -1,8 +1,36 @@
+import asyncio
 import os
-from dotenv import load_dotenv
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from app.routers import hse, chatbot_solicitud_articulos
+import time
+from typing import Dict
+from contextlib import nullcontext
+from app.services.startup_profile import perfil_arranque
+
+# Cada bloque de imports queda medido en el perfil de arranque (ver /ready)
+with perfil_arranque.medir("import fastapi + dotenv"):
+    from dotenv import load_dotenv
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, PlainTextResponse
+with perfil_arranque.medir("import app.routers.hse"):
+    from app.routers import hse
+with perfil_arranque.medir("import app.routers.chatbot_solicitud_articulos"):
+    from app.routers import chatbot_solicitud_articulos
+from app.routers import costos
+from app.services.document_jobs import document_job_runner
+from app.services.chatbot_solicitud_articulos.categorias_service import obtener_config, vigilar_configuracion
+from app.services.chatbot_solicitud_articulos.sinonimos_service import expandir_sinonimos
+from app.agents.chatbot_solicitud_articulos_agent import get_estandarizacion_agent
+from app.agents.hse_agent import get_hse_agent
+from app.agents.document_analyst import obtener_llm_analyst
+from app.services.metrics import http_duracion, registro as registro_metricas
+from app.services.tracing import trazador
+from app.services import costos as servicio_costos
+from app.services.costos import contexto_request, identidad_request
+from app.services.historial import escritor_historial
+from app.services.ruteo_modelos import modelo_rutinario, obtener_config_ruteo
+from app.services.logging_json import (
+    HEADER_REQUEST_ID, asignar_request_id, liberar_request_id, logging_json, registrar_request,
+)
 # from app.routers import rrhh  <-- Descomentarás esto cuando crees el módulo de RRHH
 
 # Cargar variables de entorno
@@ -38,23 +66,74 @@ app.add_middleware(
 )
 
 # 3. Registro de Rutas (Routers)
+# Plantilla con prefijo de cada ruta de los routers (métricas y logs, ver plantilla_ruta)
+plantillas_ruta: Dict[int, str] = {}
+
+def incluir_router(router, prefix: str, **opciones) -> None:
+    app.include_router(router, prefix=prefix, **opciones)
+    for ruta in router.routes:
+        plantillas_ruta[id(ruta)] = prefix + ruta.path
+
 # Aquí le dices a FastAPI: "Todo lo que esté en hse.py, ponlo bajo la url /hse"
-app.include_router(hse.router, prefix="/hse", tags=["HSE"])
-app.include_router(chatbot_solicitud_articulos.router, prefix="/chatbot-solicitud-articulos", tags=["Chatbot Solicitud Artículos"])
+incluir_router(hse.router, prefix="/hse", tags=["HSE"])
+incluir_router(chatbot_solicitud_articulos.router, prefix="/chatbot-solicitud-articulos", tags=["Chatbot Solicitud Artículos"])
+incluir_router(costos.router, prefix="/costos", tags=["Costos LLM"])
+
+# incluir_router(rrhh.router, prefix="/rrhh", tags=["RRHH"]) <-- Futuro módulo
+
+# Endpoints de infraestructura (scrapes, probes) que no generan trazas
+RUTAS_SIN_TRAZA = {"/metrics", "/ready", "/"}
 
-# app.include_router(rrhh.router, prefix="/rrhh", tags=["RRHH"]) <-- Futuro módulo
+def plantilla_ruta(request: Request) -> str:
+    """Plantilla de la ruta con el prefijo del router (ej: /costos/totales)."""
+    # Con routers incluidos, scope["route"] es la ruta del router (sin prefijo): se
+    # busca en las plantillas registradas por incluir_router
+    ruta = request.scope.get("route")
+    if ruta is None:
+        return "<sin_ruta>"
+    return plantillas_ruta.get(id(ruta), ruta.path)
 
-# Middleware de logging visible
+# Middleware de observabilidad: request ID, log JSON (con muestreo), métricas, traza y costo
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    print(f"👉 [REQUEST] {request.method} {request.url}")
-    try:
-        response = await call_next(request)
-        print(f"👈 [RESPONSE] {response.status_code}")
-        return response
-    except Exception as e:
-        print(f"❌ [ERROR] {e}")
-        raise e
+    inicio = time.perf_counter()
+    status = "500"
+    error = None
+    # Request ID del header (o nuevo): se devuelve y se propaga a trazas, costos y Defontana
+    request_id, token_request_id = asignar_request_id(request.headers.get(HEADER_REQUEST_ID))
+    # Span raíz del trace: agente, pasos, LLM y tools cuelgan de él (ver tracing.py)
+    trazar = trazador.habilitado and request.url.path not in RUTAS_SIN_TRAZA
+    # Costo de LLM cargado al tenant / sesión de los headers del proxy, o a la IP del cliente (ver costos.py)
+    tenant, sesion = identidad_request(request.headers, request.client.host if request.client else None)
+    costo = contexto_request(request.url.path, tenant=tenant, sesion=sesion, request_id=request_id)
+    with costo as ctx_costo, trazador.span(f"{request.method} {request.url.path}", "http", request_id=request_id) if trazar else nullcontext() as span:
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            response.headers[HEADER_REQUEST_ID] = request_id
+            if ctx_costo.llamadas:
+                response.headers["X-LLM-Cost-USD"] = f"{ctx_costo.costo_usd:.6f}"
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Plantilla de la ruta (no la URL) para acotar la cardinalidad de labels
+            route = plantilla_ruta(request)
+            http_duracion.observar(time.perf_counter() - inicio, request.method, route, status)
+            if span is not None:
+                span.nombre = f"{request.method} {route}"
+                span.atributos.update(route=route, status=status)
+            campos = {"llm_cost_usd": round(ctx_costo.costo_usd, 6), "llm_calls": ctx_costo.llamadas} if ctx_costo.llamadas else {}
+            if span is not None:
+                campos["trace_id"] = span.trace_id
+            registrar_request(request.method, request.url.path, route, int(status), inicio, error, **campos)
+            liberar_request_id(token_request_id)
+
+@app.on_event("startup")
+def iniciar_logging():
+    # El hilo del listener escribe los logs JSON; el event loop solo encola
+    logging_json.iniciar()
 
 @app.on_event("startup")
 def print_routes():
@@ -64,6 +143,63 @@ def print_routes():
             print(f" - {route.methods} {route.path}")
     print("\n")
 
+@app.on_event("startup")
+def compilar_configuracion():
+    # Falla al arrancar (no en el primer chat) si el YAML no existe o no cumple el esquema
+    with perfil_arranque.medir("configuración de estandarización"):
+        config = obtener_config()
+    print(f"⚙️  Configuración de estandarización: {len(config.categorias)} categorías ({config.origen}, versión {config.version})")
+    # Los modelos salen solo de config/ruteo_modelos.yaml: sin él no hay agentes
+    with perfil_arranque.medir("configuración de ruteo de modelos"):
+        obtener_config_ruteo()
+
+@app.on_event("startup")
+async def calentar_servicio():
+    # El worker ya acepta conexiones: /ready responde 503 hasta que esto termine
+    pasos = [
+        ("índice de sinónimos", lambda: expandir_sinonimos("")),
+        ("agente estandarización (langchain + anthropic)",
+         lambda: get_estandarizacion_agent(modelo_rutinario(chatbot_solicitud_articulos.ENDPOINT_ESTANDARIZAR))),
+        ("agente HSE", lambda: get_hse_agent(modelo_rutinario(hse.ENDPOINT_5_PORQUES))),
+        ("cliente LLM analista de documentos", obtener_llm_analyst),
+    ]
+    app.state.calentamiento = asyncio.create_task(asyncio.to_thread(perfil_arranque.calentar, pasos))
+
+@app.on_event("startup")
+async def iniciar_vigilancia_configuracion():
+    # Cada worker detecta cambios en los YAML y recompila sin reiniciar (ver app/services/archivo_recargable.py)
+    app.state.vigilancia_config = asyncio.create_task(vigilar_configuracion())
+
+@app.on_event("shutdown")
+async def finalizar_jobs_documentos():
+    # Dejar terminar los análisis en curso antes de cerrar el worker
+    await document_job_runner.esperar_pendientes()
+
+@app.on_event("shutdown")
+def cerrar_exportador_trazas():
+    # Escribe los spans pendientes antes de cerrar el worker
+    trazador.exportador.cerrar()
+
+@app.on_event("shutdown")
+def detener_logging():
+    logging_json.detener()
+
+@app.on_event("shutdown")
+def cerrar_escritor_historial():
+    # Vacía la cola del historial del chatbot (con fsync) antes de cerrar el worker
+    escritor_historial.cerrar()
+
+@app.on_event("shutdown")
+def cerrar_escritor_costos():
+    # Escribe los usos de LLM encolados antes de cerrar el worker
+    servicio_costos.cost_store.cerrar()
+
+@app.on_event("shutdown")
+async def detener_vigilancia_configuracion():
+    tarea = getattr(app.state, "vigilancia_config", None)
+    if tarea is not None:
+        tarea.cancel()
+
 # 4. Ruta de prueba (Health Check)
 @app.get("/")
 def root():
@@ -73,6 +209,18 @@ def root():
         "version": "1.0.0"
     }
 
+# Readiness: solo 200 cuando terminó el warm-up (el balanceador no envía tráfico antes)
+@app.get("/ready")
+def ready():
+    reporte = perfil_arranque.reporte()
+    reporte["status"] = "ready" if reporte["listo"] else "warming_up"
+    return JSONResponse(reporte, status_code=200 if reporte["listo"] else 503)
+
+# Métricas Prometheus del worker (rutas, LLM, tools, pasos del agente, caches)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registro_metricas.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Nota: No necesitas poner 'if __name__ == "__main__"' porque usaremos Gunicorn/Uvicorn para correrlo.
 # Pero si quieres ejecutarlo con "python main.py" y que lea el .env:
 if __name__ == "__main__":
@@ -0,0 +1,511 @@
+"""
+Prueba de carga: throughput y percentiles de latencia por endpoint.
+===================================================================
+Generador de carga asyncio (usuarios virtuales en lazo cerrado) que mezcla:
+- /chatbot-solicitud-articulos/estandarizar: sesiones multi-turno (el
+  segundo turno elige la primera opción sugerida, con el historial),
+- /hse/5-porques,
+- /chatbot-solicitud-articulos/analizar-documento con PDFs de muestra
+  generados aquí (los repetidos salen del cache de documentos),
+- /chatbot-solicitud-articulos/validar-duplicado.
+
+Por defecto levanta el servicio en proceso (uvicorn en un hilo, puerto
+libre) con LLM_BACKEND=stub, un Defontana stub local y todo el estado
+(costos, historial, cache, jobs, trazas, logs) en un directorio temporal.
+Con --url se apunta a un servicio ya corriendo (que debería usar el stub).
+
+Reporta solicitudes/s y p50/p95/p99 por endpoint. Con un baseline guardado
+(--guardar-baseline) falla con código 1 si algún endpoint empeora más que
+la tolerancia: p95/p99 más altos, menos solicitudes/s o más errores.
+Los baselines dependen de la máquina: regenerarlos en la máquina de CI.
+
+Uso:
+    python tests/benchmarks/bench_carga.py --duracion 30 --usuarios 16
+    python tests/benchmarks/bench_carga.py --latencia-llm-ms 20 --guardar-baseline
+    python tests/benchmarks/bench_carga.py --latencia-llm-ms 20 --tolerancia 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.append(str(BASE_DIR))
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "bench_carga.json"
+PREFIJO_CHATBOT = "/chatbot-solicitud-articulos"
+ESCENARIOS = ("estandarizar", "hse", "documento", "duplicado")
+PERCENTILES = (50, 95, 99)
+
+DESCRIPCIONES = [
+    "necesito guantes de nitrilo talla M",
+    "zapatos de seguridad con punta de acero numero 42",
+    "valvula de bola de bronce 1/2 pulgada",
+    "detergente industrial 5 litros",
+    "casco de seguridad blanco con barbiquejo",
+    "lentes de seguridad claros antiempañante",
+]
+PRODUCTOS_PDF = [
+    ("GUANTE NITRILO", ["Material: Nitrilo", "Talla: M", "Largo: 24 cm", "Norma: EN 388"]),
+    ("ZAPATO DE SEGURIDAD", ["Material: Cuero", "Puntera: Acero", "Talla: 42", "Norma: ISO 20345"]),
+    ("VALVULA DE BOLA", ["Material: Bronce", "Diametro: 1/2 pulgada", "Presion: 600 WOG"]),
+    ("CASCO DE SEGURIDAD", ["Material: HDPE", "Color: Blanco", "Clase: E", "Norma: ANSI Z89.1"]),
+]
+
+
+# ---------------------------------------------------------------------------
+# Estadística y gates
+# ---------------------------------------------------------------------------
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, -(-len(ordenados) * p // 100) - 1))
+    return ordenados[int(indice)]
+
+
+@dataclass
+class Muestras:
+    latencias_ms: List[float] = field(default_factory=list)
+    errores: int = 0
+    codigos: Dict[str, int] = field(default_factory=dict)
+
+    def registrar(self, ms: float, codigo: str, ok: bool) -> None:
+        self.latencias_ms.append(ms)
+        self.codigos[codigo] = self.codigos.get(codigo, 0) + 1
+        if not ok:
+            self.errores += 1
+
+    def resumen(self, segundos: float) -> Dict[str, float]:
+        ordenadas = sorted(self.latencias_ms)
+        n = len(ordenadas)
+        resumen = {
+            "solicitudes": n,
+            "errores": self.errores,
+            "tasa_error": round(self.errores / n, 4) if n else 0.0,
+            "rps": round(n / segundos, 3) if segundos else 0.0,
+            "media_ms": round(sum(ordenadas) / n, 1) if n else 0.0,
+            "max_ms": round(ordenadas[-1], 1) if n else 0.0,
+            "codigos": dict(sorted(self.codigos.items())),
+        }
+        for p in PERCENTILES:
+            resumen[f"p{p}_ms"] = round(percentil(ordenadas, p), 1)
+        return resumen
+
+
+def comparar_con_baseline(
+    actual: Dict[str, Dict], baseline: Dict[str, Dict], tolerancia: float, holgura_ms: float = 5.0,
+) -> List[str]:
+    """Regresiones de `actual` frente al baseline (lista vacía = sin regresiones)."""
+    regresiones = []
+    for endpoint, base in baseline.items():
+        medido = actual.get(endpoint)
+        if not medido or not medido["solicitudes"]:
+            regresiones.append(f"{endpoint}: sin solicitudes (baseline {base['solicitudes']})")
+            continue
+        for p in PERCENTILES:
+            clave = f"p{p}_ms"
+            limite = base[clave] * (1 + tolerancia) + holgura_ms
+            if medido[clave] > limite:
+                regresiones.append(f"{endpoint}: {clave} {medido[clave]} > {limite:.1f} (baseline {base[clave]})")
+        minimo_rps = base["rps"] * (1 - tolerancia)
+        if medido["rps"] < minimo_rps:
+            regresiones.append(f"{endpoint}: rps {medido['rps']} < {minimo_rps:.3f} (baseline {base['rps']})")
+        maximo_error = base["tasa_error"] + 0.01
+        if medido["tasa_error"] > maximo_error:
+            regresiones.append(f"{endpoint}: tasa_error {medido['tasa_error']} > {maximo_error:.4f}")
+    return regresiones
+
+
+# ---------------------------------------------------------------------------
+# Datos de prueba: PDFs de muestra y Defontana stub
+# ---------------------------------------------------------------------------
+
+def _escapar_pdf(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_muestra(titulo: str, lineas: List[str]) -> bytes:
+    """PDF mínimo de una página con texto extraíble (Helvetica, ASCII)."""
+    texto = "".join(f"({_escapar_pdf(linea)}) Tj T* " for linea in [titulo, ""] + lineas)
+    contenido = f"BT /F1 12 Tf 14 TL 72 720 Td {texto}ET".encode("latin-1")
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length " + str(len(contenido)).encode() + b" >>\nstream\n" + contenido + b"\nendstream",
+    ]
+    salida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, cuerpo in enumerate(objetos, start=1):
+        offsets.append(len(salida))
+        salida += f"{i} 0 obj\n".encode() + cuerpo + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    salida += b"".join(f"{o:010d} 00000 n \n".encode() for o in offsets)
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    return bytes(salida)
+
+
+def generar_pdfs(n: int, azar: random.Random) -> List[tuple]:
+    """(nombre, contenido) de n fichas técnicas distintas."""
+    pdfs = []
+    for i in range(n):
+        producto, specs = PRODUCTOS_PDF[i % len(PRODUCTOS_PDF)]
+        lineas = ["FICHA TECNICA"] + specs + [f"Codigo proveedor: {azar.randint(10000, 99999)}-{i}"]
+        pdfs.append((f"ficha_{i}.pdf", pdf_muestra(producto, lineas)))
+    return pdfs
+
+
+class _HandlerDefontana(BaseHTTPRequestHandler):
+    latencia_s = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latencia_s)
+        termino = parse_qs(urlparse(self.path).query).get("busqueda", [""])[0].upper()
+        articulos = [
+            {"codigo": f"ART-{i:04d}", "nombre": f"{termino} VARIANTE {i}", "similitud": round(0.9 - i * 0.1, 2)}
+            for i in range(3)
+        ] if termino else []
+        cuerpo = json.dumps({"articulos": articulos}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_defontana_stub(latencia_ms: float) -> ThreadingHTTPServer:
+    handler = type("HandlerDefontana", (_HandlerDefontana,), {"latencia_s": latencia_ms / 1000})
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+# ---------------------------------------------------------------------------
+# Servicio en proceso
+# ---------------------------------------------------------------------------
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def preparar_entorno(directorio: Path, args) -> None:
+    """Variables de entorno del servicio en proceso (antes de importar main)."""
+    guion = Path(args.guion)
+    if args.latencia_llm_ms is not None:
+        # Guion derivado: misma respuesta, latencia fija
+        data = yaml.safe_load(guion.read_text(encoding="utf-8")) or {}
+        data["latencia"] = {"distribucion": "fija", "ms": args.latencia_llm_ms}
+        for conf in (data.get("endpoints") or {}).values():
+            (conf or {}).pop("latencia", None)
+        guion = directorio / "llm_stub.yaml"
+        guion.write_text(yaml.safe_dump(data, allow_unicode=True), encoding="utf-8")
+    os.environ.update({
+        "LLM_BACKEND": "stub",
+        "LLM_STUB_CONFIG_PATH": str(guion),
+        "LLM_STUB_SEED": str(args.semilla),
+        "LLM_CASSETTE_MODE": "off",
+        "LLM_COSTOS_DB": str(directorio / "costos.sqlite3"),
+        "HISTORIAL_CHATBOT_PATH": str(directorio / "historial.jsonl"),
+        "DOCUMENT_CACHE_DIR": str(directorio / "documentos"),
+        "DOCUMENT_JOBS_DB": str(directorio / "jobs.sqlite3"),
+        "TRACE_EXPORT_PATH": str(directorio / "spans.jsonl"),
+        "LOG_PATH": str(directorio / "requests.log"),
+        # Las sesiones se aceptan solo con el secreto del proxy (ver app/services/costos.py)
+        "PROXY_SECRET": os.getenv("PROXY_SECRET") or "bench-carga",
+    })
+
+
+class ServicioEnProceso:
+    """main:app servido por uvicorn en un hilo (con startup/shutdown reales)."""
+
+    def __init__(self):
+        import uvicorn
+        from main import app
+
+        self.puerto = _puerto_libre()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.puerto, log_level="warning", access_log=False)
+        self.servidor = uvicorn.Server(config)
+        self.hilo = threading.Thread(target=self.servidor.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}"
+
+    def iniciar(self, timeout: float = 60) -> None:
+        self.hilo.start()
+        limite = time.monotonic() + timeout
+        while not self.servidor.started:
+            if time.monotonic() > limite or not self.hilo.is_alive():
+                raise RuntimeError("El servicio no arrancó")
+            time.sleep(0.05)
+
+    def detener(self) -> None:
+        self.servidor.should_exit = True
+        self.hilo.join(timeout=30)
+
+
+# ---------------------------------------------------------------------------
+# Generador de carga
+# ---------------------------------------------------------------------------
+
+class GeneradorCarga:
+    def __init__(self, cliente: httpx.AsyncClient, pdfs: List[tuple], semilla: int, turnos: int, pausa_ms: float):
+        self.cliente = cliente
+        self.pdfs = pdfs
+        self.semilla = semilla
+        self.turnos = turnos
+        self.pausa_s = pausa_ms / 1000
+        self.muestras: Dict[str, Muestras] = {}
+        self.sesiones = {"iniciadas": 0, "completadas": 0}
+        self.registrando = True
+
+    async def _solicitud(self, endpoint: str, metodo: str, ruta: str, **kwargs) -> Optional[httpx.Response]:
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.cliente.request(metodo, ruta, **kwargs)
+            codigo, ok = str(respuesta.status_code), respuesta.status_code < 400
+        except httpx.HTTPError as e:
+            respuesta, codigo, ok = None, type(e).__name__, False
+        if self.registrando:
+            ms = (time.perf_counter() - inicio) * 1000
+            self.muestras.setdefault(endpoint, Muestras()).registrar(ms, codigo, ok)
+        return respuesta if ok else None
+
+    async def estandarizar(self, azar: random.Random) -> None:
+        sesion = uuid.uuid4().hex
+        mensaje = azar.choice(DESCRIPCIONES)
+        contexto: List[dict] = []
+        headers = {"X-Session-ID": sesion, "X-Proxy-Secret": os.getenv("PROXY_SECRET", "")}
+        if self.registrando:
+            self.sesiones["iniciadas"] += 1
+        for _ in range(self.turnos):
+            respuesta = await self._solicitud(
+                "estandarizar", "POST", f"{PREFIJO_CHATBOT}/estandarizar", headers=headers,
+                json={"mensaje": mensaje, "contexto_conversacion": contexto or None, "sesion_id": sesion},
+            )
+            if respuesta is None:
+                return
+            data = respuesta.json()
+            contexto += [{"rol": "usuario", "contenido": mensaje}, {"rol": "asistente", "contenido": data["mensaje"]}]
+            if data.get("listo_para_crear"):
+                break
+            mensaje = data["opciones"][0] if data.get("opciones") else "sí, eso"
+        if self.registrando:
+            self.sesiones["completadas"] += 1
+
+    async def hse(self, azar: random.Random) -> None:
+        await self._solicitud("hse", "POST", "/hse/5-porques", json={
+            "tipo_evento": azar.choice(["Incidente", "Accidente", "Casi accidente"]),
+            "descripcion": f"Trabajador resbala en pasillo húmedo del turno {azar.randint(1, 3)}",
+            "area_proceso": azar.choice(["Bodega", "Mantención", "Producción"]),
+            "origen": "Inspección",
+            "impacto": azar.choice(["Bajo", "Medio", "Alto"]),
+        })
+
+    async def documento(self, azar: random.Random) -> None:
+        nombre, contenido = azar.choice(self.pdfs)
+        await self._solicitud(
+            "documento", "POST", f"{PREFIJO_CHATBOT}/analizar-documento",
+            files={"file": (nombre, contenido, "application/pdf")},
+        )
+
+    async def duplicado(self, azar: random.Random) -> None:
+        await self._solicitud(
+            "duplicado", "POST", f"{PREFIJO_CHATBOT}/validar-duplicado",
+            params={"nombre": azar.choice(DESCRIPCIONES).upper()},
+        )
+
+    async def usuario(self, indice: int, mezcla: Dict[str, float], fin: float) -> None:
+        # Semilla por usuario virtual: la secuencia de escenarios es reproducible
+        azar = random.Random(f"{self.semilla}-{indice}")
+        escenarios, pesos = list(mezcla), list(mezcla.values())
+        while time.monotonic() < fin:
+            await getattr(self, azar.choices(escenarios, pesos)[0])(azar)
+            if self.pausa_s:
+                await asyncio.sleep(self.pausa_s)
+
+    async def calentar(self) -> None:
+        """Una pasada de cada escenario sin registrar (imports, caches de agentes, conexiones)."""
+        self.registrando = False
+        azar = random.Random(self.semilla)
+        for escenario in ESCENARIOS:
+            await getattr(self, escenario)(azar)
+        self.registrando = True
+
+    async def ejecutar(self, usuarios: int, mezcla: Dict[str, float], duracion: float) -> float:
+        inicio = time.monotonic()
+        await asyncio.gather(*(self.usuario(i, mezcla, inicio + duracion) for i in range(usuarios)))
+        return time.monotonic() - inicio
+
+
+async def _esperar_listo(cliente: httpx.AsyncClient, timeout: float = 120) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            if (await cliente.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("El servicio no quedó listo (/ready)")
+
+
+async def correr(url: str, args, mezcla: Dict[str, float]) -> Dict:
+    pdfs = generar_pdfs(args.documentos, random.Random(args.semilla))
+    limites = httpx.Limits(max_connections=args.usuarios * 2, max_keepalive_connections=args.usuarios * 2)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limites) as cliente:
+        await _esperar_listo(cliente)
+        generador = GeneradorCarga(cliente, pdfs, args.semilla, args.turnos, args.pausa_ms)
+        if not args.sin_calentamiento:
+            await generador.calentar()
+        segundos = await generador.ejecutar(args.usuarios, mezcla, args.duracion)
+
+    endpoints = {nombre: m.resumen(segundos) for nombre, m in sorted(generador.muestras.items())}
+    total = Muestras()
+    for m in generador.muestras.values():
+        total.latencias_ms += m.latencias_ms
+        total.errores += m.errores
+        for codigo, n in m.codigos.items():
+            total.codigos[codigo] = total.codigos.get(codigo, 0) + n
+    return {
+        "parametros": _parametros(args, mezcla),
+        "duracion_s": round(segundos, 2),
+        "sesiones_estandarizar": generador.sesiones,
+        "total": total.resumen(segundos),
+        "endpoints": endpoints,
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parsear_mezcla(texto: str) -> Dict[str, float]:
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in ESCENARIOS:
+            raise argparse.ArgumentTypeError(f"Escenario inválido: {nombre} (opciones: {', '.join(ESCENARIOS)})")
+        mezcla[nombre] = float(peso or 1)
+    return {k: v for k, v in mezcla.items() if v > 0}
+
+
+def _parametros(args, mezcla: Dict[str, float]) -> Dict:
+    """Lo que define la carga: un baseline solo es comparable con los mismos parámetros."""
+    return {
+        "usuarios": args.usuarios, "duracion": args.duracion, "mezcla": mezcla, "turnos": args.turnos,
+        "pausa_ms": args.pausa_ms, "latencia_llm_ms": args.latencia_llm_ms,
+        "latencia_defontana_ms": args.latencia_defontana_ms, "documentos": args.documentos,
+        "semilla": args.semilla, "url": args.url,
+    }
+
+
+def imprimir(reporte: Dict) -> None:
+    cols = ("solicitudes", "errores", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    print(f"\n{'endpoint':<14} | " + " | ".join(f"{c:>11}" for c in cols))
+    print("-" * (17 + 14 * len(cols)))
+    for nombre, r in list(reporte["endpoints"].items()) + [("TOTAL", reporte["total"])]:
+        print(f"{nombre:<14} | " + " | ".join(f"{r[c]:>11}" for c in cols))
+    sesiones = reporte["sesiones_estandarizar"]
+    print(f"\nDuración: {reporte['duracion_s']} s | sesiones estandarizar: "
+          f"{sesiones['completadas']}/{sesiones['iniciadas']} completadas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="servicio ya corriendo (por defecto: en proceso con el stub)")
+    parser.add_argument("--usuarios", type=int, default=8, help="usuarios virtuales concurrentes")
+    parser.add_argument("--duracion", type=float, default=20, help="segundos de carga medida")
+    parser.add_argument("--mezcla", type=parsear_mezcla, default="estandarizar=4,hse=2,documento=1,duplicado=2",
+                        help="pesos por escenario (estandarizar, hse, documento, duplicado)")
+    parser.add_argument("--turnos", type=int, default=2, help="turnos por sesión de /estandarizar")
+    parser.add_argument("--pausa-ms", type=float, default=0, help="pausa entre escenarios de un usuario")
+    parser.add_argument("--documentos", type=int, default=4, help="PDFs distintos de muestra")
+    parser.add_argument("--guion", default=str(BASE_DIR / "config" / "llm_stub.yaml"), help="guion del LLM stub")
+    parser.add_argument("--latencia-llm-ms", type=float, default=None,
+                        help="latencia fija del LLM stub (por defecto la del guion)")
+    parser.add_argument("--latencia-defontana-ms", type=float, default=50, help="latencia del Defontana stub")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60, help="timeout por solicitud (s)")
+    parser.add_argument("--sin-calentamiento", action="store_true")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--guardar-baseline", action="store_true", help="guardar este resultado como baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="empeoramiento relativo permitido")
+    parser.add_argument("--holgura-ms", type=float, default=5, help="margen absoluto para percentiles pequeños")
+    parser.add_argument("--json", type=Path, default=None, help="escribir el reporte completo en este archivo")
+    args = parser.parse_args()
+    mezcla = args.mezcla
+
+    with tempfile.TemporaryDirectory(prefix="bench_carga_") as tmp:
+        servicio = defontana = None
+        url = args.url
+        if url is None:
+            defontana = iniciar_defontana_stub(args.latencia_defontana_ms)
+            os.environ["DEFONTANA_API_URL"] = f"http://127.0.0.1:{defontana.server_port}/api/articulos-defontana"
+            preparar_entorno(Path(tmp), args)
+            servicio = ServicioEnProceso()
+            servicio.iniciar()
+            url = servicio.url
+        try:
+            reporte = asyncio.run(correr(url, args, mezcla))
+        finally:
+            if servicio is not None:
+                servicio.detener()
+            if defontana is not None:
+                defontana.shutdown()
+
+    imprimir(reporte)
+    if args.json:
+        args.json.write_text(json.dumps(reporte, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.guardar_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(reporte, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\n💾 Baseline guardado en {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"\nSin baseline en {args.baseline} (crear con --guardar-baseline)")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("parametros") != reporte["parametros"]:
+        print("\n⚠️  El baseline se generó con otros parámetros; la comparación puede no ser válida:")
+        print(f"   baseline: {json.dumps(baseline.get('parametros'), ensure_ascii=False)}")
+    regresiones = comparar_con_baseline(reporte["endpoints"], baseline["endpoints"], args.tolerancia, args.holgura_ms)
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} regresión(es) frente al baseline (tolerancia {args.tolerancia:.0%}):")
+        for r in regresiones:
+            print(f"   - {r}")
+        sys.exit(1)
+    print(f"\n✅ Sin regresiones frente al baseline (tolerancia {args.tolerancia:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: validación con dicts crudos vs configuración compilada.
+=================================================================
+Mide el throughput de la validación de atributos (requeridos + lista cerrada
++ armado del nombre) sobre combinaciones generadas desde el propio YAML:
+- crudo: como antes, `in` lineal sobre listas y `formato.format(**valores)`,
+- compilado: frozensets, tupla de requeridos y plantilla pre-parseada.
+
+Ambas variantes deben producir exactamente los mismos nombres y errores.
+También reporta el tiempo de compilación del YAML y construir_nombre completo
+(con normalización, sinónimos y fuzzy) como referencia.
+
+Uso:
+    python tests/benchmarks/bench_config.py -n 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.chatbot_solicitud_articulos.categorias_service import cargar_config, obtener_config
+from app.services.chatbot_solicitud_articulos.config_model import compilar_config
+from app.services.chatbot_solicitud_articulos.estandarizacion_service import construir_nombre
+
+
+def validar_crudo(config: dict, tipo: str, atributos: dict):
+    reglas_tipo = config.get(tipo)
+    errores, valores = [], {}
+    for campo, reglas in reglas_tipo["campos"].items():
+        valor = atributos.get(campo, "")
+        if reglas.get("requerido") and not valor:
+            errores.append(campo)
+            valores[campo] = f"[{campo.upper()}]"
+            continue
+        if valor and reglas.get("tipo") == "lista_cerrada":
+            if valor not in [str(v) for v in reglas.get("valores_estandar", [])]:
+                errores.append(campo)
+        valores[campo] = valor or ""
+    return errores, " ".join(reglas_tipo["formato"].format(**valores).split())
+
+
+def validar_compilado(config, tipo: str, atributos: dict):
+    categoria = config.categoria(tipo)
+    errores, valores = [], {}
+    for campo, regla in categoria.campos_orden:
+        valor = atributos.get(campo, "")
+        if regla.requerido and not valor:
+            errores.append(campo)
+            valores[campo] = f"[{campo.upper()}]"
+            continue
+        if valor and regla.es_lista_cerrada and valor not in regla.valores_set:
+            errores.append(campo)
+        valores[campo] = valor or ""
+    return errores, " ".join(categoria.formatear(valores).split())
+
+
+def generar_casos(n: int, seed: int = 42):
+    """(tipo, atributos) con valores estándar, vacíos e inválidos mezclados."""
+    rng = random.Random(seed)
+    config = obtener_config()
+    tipos = list(config.categorias)
+    casos = []
+    for _ in range(n):
+        tipo = rng.choice(tipos)
+        atributos = {}
+        for campo, regla in config.categorias[tipo].campos.items():
+            r = rng.random()
+            if r < 0.1:
+                continue
+            if r < 0.2 or not regla.valores_estandar:
+                atributos[campo] = f"VALOR {rng.randint(1, 50)}"
+            else:
+                atributos[campo] = rng.choice(regla.valores_estandar)
+        casos.append((tipo, atributos))
+    return casos
+
+
+def _medir(fn):
+    inicio = time.perf_counter()
+    resultado = fn()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de validación con configuración compilada")
+    parser.add_argument("-n", "--casos", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    crudo = cargar_config()
+    t_compilar, compilado = _medir(lambda: compilar_config(crudo))
+    casos = generar_casos(args.casos, args.seed)
+
+    t_crudo, salida_crudo = _medir(lambda: [validar_crudo(crudo, t, a) for t, a in casos])
+    t_comp, salida_comp = _medir(lambda: [validar_compilado(compilado, t, a) for t, a in casos])
+    n_completo = min(len(casos), 20_000)
+    t_total, _ = _medir(lambda: [construir_nombre(t, a) for t, a in casos[:n_completo]])
+
+    iguales = sum(1 for a, b in zip(salida_crudo, salida_comp) if a == b)
+    print(f"\nCompilación del YAML: {t_compilar * 1000:.2f} ms ({len(compilado.categorias)} categorías)")
+    print(f"Equivalencia: {iguales}/{len(casos)} resultados idénticos\n")
+    print(f"{'VARIANTE':<32} | {'µs/caso':>8} | {'casos/s':>11} | {'SPEEDUP':>7}")
+    print("-" * 68)
+    for nombre, segundos, n in [
+        ("validación dict crudo", t_crudo, len(casos)),
+        ("validación compilada", t_comp, len(casos)),
+        ("construir_nombre completo", t_total, n_completo),
+    ]:
+        print(f"{nombre:<32} | {segundos * 1e6 / n:>8.2f} | {n / segundos:>11,.0f} | "
+              f"{(t_crudo / len(casos)) / (segundos / n):>6.1f}x")
+    print()
+    sys.exit(0 if iguales == len(casos) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: parser de dimensiones vs normalización por sufijos.
+==============================================================
+Genera variantes de escritura de cada diámetro nominal (fracciones, mixtos,
+decimales, pulg/in/", DN, NPS, diámetro exterior en mm) y mide:
+- aciertos: cuántas quedan exactamente en la forma del YAML (1-1/2"),
+- throughput de canonicalizar_dimension (frío / memo) y del batch.
+
+La línea base es normalizar_valor (reglas de sufijo de normalizar_unidades):
+todo lo que no acierta ahí termina en otra vuelta de aclaración con el LLM.
+
+Uso:
+    python tests/benchmarks/bench_dimensiones.py -n 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from fractions import Fraction
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.chatbot_solicitud_articulos import dimensiones
+from app.services.chatbot_solicitud_articulos.dimensiones import (
+    DIAMETRO_EXTERIOR_MM,
+    DN_A_NPS,
+    canonicalizar_dimension,
+    canonicalizar_dimensiones_batch,
+)
+from app.services.chatbot_solicitud_articulos.normalizacion_utils import normalizar_valor
+
+OD_POR_NPS = {nps: od for od, nps in DIAMETRO_EXTERIOR_MM}
+SUFIJOS_PULGADA = ['"', ' "', " pulg", " pulg.", " pulgadas", " in", " inch", "''", ""]
+
+
+def _canonico(nps: Fraction) -> str:
+    entero, resto = divmod(nps, 1)
+    if not resto:
+        return f'{entero}"'
+    return f'{entero}-{resto.numerator}/{resto.denominator}"' if entero else f'{resto.numerator}/{resto.denominator}"'
+
+
+def variantes(nps: Fraction, rng: random.Random) -> str:
+    """Una forma de escribir el diámetro nominal `nps`."""
+    entero, resto = divmod(nps, 1)
+    fraccion = f"{resto.numerator}/{resto.denominator}" if resto else ""
+    opciones = []
+    if resto and entero:
+        opciones += [f"{entero} {fraccion}", f"{entero}-{fraccion}", f"{entero}.{resto.numerator}/{resto.denominator}"]
+    elif resto:
+        opciones.append(fraccion)
+    else:
+        opciones.append(str(entero))
+    decimal = f"{float(nps):g}"
+    opciones += [decimal, decimal.replace(".", ",")]
+
+    forma = rng.random()
+    if forma < 0.6:
+        return rng.choice(opciones) + rng.choice(SUFIJOS_PULGADA)
+    dn = next((d for d, n in DN_A_NPS.items() if n == nps), None)
+    if forma < 0.8 and dn:
+        return rng.choice([f"DN{dn}", f"DN {dn}", f"dn{dn}", f"{dn} mm", f"{dn}mm"])
+    if nps in OD_POR_NPS:
+        od = OD_POR_NPS[nps]
+        return rng.choice([f"{od}mm", f"{od} mm", f"{od:.1f}".replace(".", ",") + " mm", f"Ø{od}mm"])
+    return rng.choice(opciones) + '"'
+
+
+def generar_corpus(n: int, seed: int = 42):
+    """Lista de (texto, esperado)."""
+    rng = random.Random(seed)
+    tamanos = [n for n in DN_A_NPS.values() if n in OD_POR_NPS]
+    corpus = []
+    for _ in range(n):
+        nps = rng.choice(tamanos)
+        corpus.append((variantes(nps, rng), _canonico(nps)))
+    return corpus
+
+
+def _medir(fn):
+    inicio = time.perf_counter()
+    resultado = fn()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser de dimensiones")
+    parser.add_argument("-n", "--valores", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = generar_corpus(args.valores, args.seed)
+    textos = [t for t, _ in corpus]
+    esperados = [e for _, e in corpus]
+
+    dimensiones._canonicalizar_memo.cache_clear()
+    filas = []
+    t, salida = _medir(lambda: [normalizar_valor(x, "diametro") for x in textos])
+    filas.append(("normalizar_valor (sufijos)", t, salida))
+    t, salida = _medir(lambda: [dimensiones.parsear_dimension(x) for x in textos])
+    filas.append(("parser sin memo", t, [dimensiones._formatear_pulgadas(p) if p else None for p in salida]))
+    t, salida = _medir(lambda: [canonicalizar_dimension(x) for x in textos])
+    filas.append(("canonicalizar (memo)", t, salida))
+    dimensiones._canonicalizar_memo.cache_clear()
+    t, salida = _medir(lambda: canonicalizar_dimensiones_batch(textos))
+    filas.append(("batch (frío)", t, salida))
+
+    print(f"\n{'VARIANTE':<28} | {'ACIERTOS':>8} | {'µs/valor':>9} | {'valores/s':>11}")
+    print("-" * 66)
+    for nombre, segundos, salida in filas:
+        aciertos = sum(1 for s, e in zip(salida, esperados) if s == e)
+        print(f"{nombre:<28} | {100 * aciertos / len(corpus):>7.1f}% | "
+              f"{segundos * 1e6 / len(corpus):>9.2f} | {len(corpus) / segundos:>11,.0f}")
+
+    fallos = [(t, e, s) for (t, e), s in zip(corpus, filas[-1][2]) if s != e]
+    for texto, esperado, obtenido in fallos[:10]:
+        print(f"  {texto!r} -> {obtenido!r} (esperado {esperado!r})")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: tokens enviados vs campos recuperados.
+=================================================
+Compara el recorte histórico (text[:8000]) contra la pre-selección por
+densidad de especificaciones sobre fichas técnicas sintéticas con portada,
+texto legal, encabezados repetidos y tablas de specs al final.
+
+Un "campo recuperado" es un valor técnico conocido de la ficha que aparece
+en el texto que finalmente se enviaría al LLM (proxy local, sin costo).
+
+Uso:
+    python tests/benchmarks/bench_document_selection.py -n 200 -b 500 1000 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.document_selection import PAGE_BREAK, estimar_tokens, seleccionar_contenido
+
+LEGAL = (
+    "Términos y condiciones generales de venta. La garantía cubre defectos de fabricación "
+    "por un período de doce meses. Todos los derechos reservados. Documento confidencial, "
+    "prohibida su reproducción total o parcial sin autorización escrita del fabricante. "
+    "Para consultas comerciales contáctenos al teléfono o por e-mail. www.proveedor.cl"
+)
+MARKETING = (
+    "Somos líderes en soluciones industriales con más de treinta años de experiencia, "
+    "comprometidos con la excelencia, la innovación y la satisfacción de nuestros clientes "
+    "en la minería, la construcción y la industria en general."
+)
+
+PRODUCTOS = [
+    ("VALVULA BOLA", {"Diámetro": ['1/2"', '3/4"', '1"', '2"'], "Material": ["INOX 316", "BRONCE", "ACERO CARBONO"],
+                      "Conexión": ["NPT", "BSP"], "Presión": ["1000 PSI", "600 PSI", "150 PSI"]}),
+    ("GUANTE NITRILO", {"Talla": ["S", "M", "L", "XL"], "Espesor": ["0.38 MM", "0.56 MM"],
+                        "Largo": ["33 CM", "45 CM"], "Norma": ["EN 388", "EN 374"]}),
+    ("CABLE THHN", {"Sección": ["2.5 MM2", "4 MM2", "10 MM2"], "Tensión": ["600 V", "1000 V"],
+                    "Temperatura": ["90 °C", "75 °C"], "Largo": ["100 M", "500 M"]}),
+    ("GENERADOR", {"Potencia": ["5 KVA", "10 KVA", "20 KVA"], "Motor": ["13 HP", "20 HP"],
+                   "Frecuencia": ["50 HZ", "60 HZ"], "Estanque": ["25 L", "40 L"]}),
+]
+
+
+def generar_documento(rng: random.Random):
+    """Genera (texto, valores_esperados) para una ficha sintética."""
+    producto, specs = rng.choice(PRODUCTOS)
+    valores = {attr: rng.choice(opts) for attr, opts in specs.items()}
+    encabezado = "PROVEEDOR INDUSTRIAL LTDA. - Ficha Técnica Rev. 3"
+    paginas = []
+    n_paginas = rng.randint(4, 8)
+    spec_pagina = rng.randint(2, n_paginas - 1)
+    for p in range(n_paginas):
+        cuerpo = [encabezado, ""]
+        if p == 0:
+            cuerpo += [f"{producto}", "", MARKETING, "", LEGAL]
+        elif p == spec_pagina:
+            cuerpo += ["ESPECIFICACIONES TÉCNICAS", ""]
+            cuerpo += [f"{attr}: {val}" for attr, val in valores.items()]
+        else:
+            cuerpo += [LEGAL if rng.random() < 0.5 else MARKETING for _ in range(rng.randint(3, 6))]
+        cuerpo += ["", f"Página {p + 1} de {n_paginas}"]
+        paginas.append("\n".join(cuerpo))
+    return PAGE_BREAK.join(paginas), list(valores.values())
+
+
+def recuperados(texto: str, esperados) -> int:
+    return sum(1 for v in esperados if v in texto)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de selección por densidad de especificaciones")
+    parser.add_argument("-n", "--documentos", type=int, default=200)
+    parser.add_argument("-b", "--budgets", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [generar_documento(rng) for _ in range(args.documentos)]
+    total_campos = sum(len(esp) for _, esp in corpus)
+
+    print(f"\n{'ESTRATEGIA':<22} | {'BUDGET':>6} | {'TOKENS/DOC':>10} | {'CAMPOS':>8} | {'RECALL':>7} | {'MS/DOC':>7}")
+    print("-" * 76)
+    for budget in args.budgets:
+        for nombre, fn in [
+            ("truncado text[:N]", lambda t, b: t[:b * 4]),
+            ("densidad (selección)", lambda t, b: seleccionar_contenido(t, b)),
+        ]:
+            tokens = campos = 0
+            inicio = time.perf_counter()
+            for texto, esperados in corpus:
+                enviado = fn(texto, budget)
+                tokens += estimar_tokens(enviado)
+                campos += recuperados(enviado, esperados)
+            ms = (time.perf_counter() - inicio) * 1000 / len(corpus)
+            print(f"{nombre:<22} | {budget:>6} | {tokens / len(corpus):>10.0f} | "
+                  f"{campos:>8} | {100 * campos / total_campos:>6.1f}% | {ms:>7.3f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: costo de registrar métricas en el camino caliente.
+==============================================================
+Mide el costo por evento de las primitivas (Histograma.observar,
+Contador.inc), del callback completo de una llamada LLM / tool y de la
+exposición de /metrics. Sirve para verificar que la instrumentación es
+despreciable frente a una llamada al LLM (cientos de ms).
+
+Uso:
+    python tests/benchmarks/bench_metrics.py -n 200000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app.services import metrics
+from app.services.llm_callbacks import MetricasCallbackHandler
+
+
+def medir(nombre: str, funcion, n: int) -> None:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        funcion()
+    us = (time.perf_counter() - t0) / n * 1e6
+    print(f"{nombre:<36} | {us:>8.2f} µs/evento")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200_000, help="eventos por variante")
+    args = parser.parse_args()
+
+    registro = metrics.RegistroMetricas()
+    hist = registro.histograma("bench_seconds", "bench", ("route",))
+    cont = registro.contador("bench_total", "bench", ("tool", "status"))
+
+    handler = MetricasCallbackHandler()
+    mensaje = AIMessage(content="ok", usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120})
+    respuesta = LLMResult(generations=[[ChatGeneration(message=mensaje)]])
+    metadata = {"ls_model_name": "bench-model"}
+
+    def llamada_llm():
+        run_id = uuid.uuid4()
+        handler.on_chat_model_start({}, [], run_id=run_id, metadata=metadata)
+        handler.on_llm_end(respuesta, run_id=run_id)
+
+    def llamada_tool():
+        run_id = uuid.uuid4()
+        handler.on_tool_start({"name": "bench_tool"}, "", run_id=run_id)
+        handler.on_tool_end("ok", run_id=run_id)
+
+    print(f"{'VARIANTE':<36} | COSTO")
+    print("-" * 56)
+    medir("Histograma.observar", lambda: hist.observar(0.123, "/estandarizar"), args.n)
+    medir("Contador.inc", lambda: cont.inc("buscar_articulos_defontana", "ok"), args.n)
+    medir("callback LLM (start + end + tokens)", llamada_llm, args.n // 4)
+    medir("callback tool (start + end)", llamada_tool, args.n // 4)
+    medir("exposición /metrics completa", metrics.registro.exponer, 200)
+
+
+if __name__ == "__main__":
+    main()
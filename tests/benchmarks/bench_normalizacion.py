@@ -0,0 +1,205 @@
+"""
+Benchmark: normalizar_valor compilado vs implementación original.
+=================================================================
+Genera un corpus grande de valores "sucios" (prefijos, unidades, SKUs, tallas,
+sinónimos de conexión, repuestos, " DE ", espacios y casos borde) y verifica
+que la salida del pipeline compilado sea idéntica a la de la implementación
+original, copiada abajo como referencia congelada. Luego mide el throughput
+de la referencia, de normalizar_valor (memo frío y caliente) y del batch.
+
+Uso:
+    python tests/benchmarks/bench_normalizacion.py -n 200000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.chatbot_solicitud_articulos import normalizacion_utils as nu
+from app.services.chatbot_solicitud_articulos.normalizacion_utils import (
+    PREFIJOS_REDUNDANTES,
+    SIN_INFO_VALORES,
+    TALLAS_NORMALIZE,
+    normalizar_valor,
+    normalizar_valores_batch,
+)
+
+
+# --- Referencia: implementación original (no modificar) ---
+
+def _ref_normalizar_talla(valor):
+    valor = valor.strip().upper()
+    valor = re.sub(r'^\((.+)\)$', r'\1', valor).strip()
+    return TALLAS_NORMALIZE.get(valor, valor)
+
+
+def _ref_formatear_talla_parentesis(valor):
+    valor = valor.strip()
+    if not valor:
+        return ""
+    if valor.startswith("(") and valor.endswith(")"):
+        return valor
+    return f"({valor})"
+
+
+def _ref_normalizar_unidades(texto):
+    texto = re.sub(r'(\d+)\s*(LITROS?|LTS?)\b', r'\1L', texto)
+    texto = re.sub(r'(\d+)\s*(KILOS?|KGS?)\b', r'\1KG', texto)
+    texto = re.sub(r'(\d+)\s*(PULGADAS?|PULG\.?)\b', r'\1"', texto)
+    texto = re.sub(r'(\d+)\s*(METROS?|MTS?)\b', r'\1M', texto)
+    texto = re.sub(r'(\d+)\s*(MILIMETROS?)\b', r'\1MM', texto)
+    return texto
+
+
+def _ref_limpiar_codigo_sku(texto):
+    texto = re.sub(r'\s*SKU\s*\d+', '', texto)
+    texto = re.sub(r'\s*COD\.?\s*\d+', '', texto)
+    return texto
+
+
+def _ref_eliminar_prefijos_redundantes(texto):
+    for prefix in PREFIJOS_REDUNDANTES:
+        if texto.startswith(prefix):
+            texto = texto[len(prefix):].strip()
+    return texto
+
+
+def normalizar_valor_referencia(valor, campo=None):
+    if not valor or not isinstance(valor, str):
+        return ""
+    valor = valor.strip().upper()
+    valor = _ref_eliminar_prefijos_redundantes(valor)
+    if campo == "talla":
+        valor = _ref_normalizar_talla(valor)
+    if valor in SIN_INFO_VALORES:
+        if campo == "talla":
+            return _ref_formatear_talla_parentesis("UNICA")
+        return ""
+    valor = _ref_normalizar_unidades(valor)
+    valor = _ref_limpiar_codigo_sku(valor)
+    valor = ' '.join(valor.split())
+    if " DE " in valor:
+        if valor not in ["CABO DE VIDA", "LINEA DE VIDA", "ACEITE DE MOTOR"]:
+            valor = valor.replace(" DE ", " ")
+            valor = ' '.join(valor.split())
+    if campo == "conexion":
+        if valor in ["ROSCA", "ROSCADA", "CON ROSCA", "HILO", "CON HILO"]:
+            return "ROSCADA NPT"
+        if valor in ["BRIDA", "CON BRIDA", "FLANGE"]:
+            return "BRIDADA"
+        if valor in ["SOLDAR", "SOLDABLE", "A SOLDAR"]:
+            return "SOLDADA SW"
+    if campo == "repuesto":
+        if valor == "FILTRO": return "FILTRO AIRE"
+        if "BOMBA" in valor and "AGUA" in valor: return "BOMBA AGUA"
+        if "PASTILLA" in valor: return "PASTILLA FRENO"
+        if "DISCO" in valor and "FRENO" in valor: return "DISCO FRENO"
+        if valor in ["SOLDAR", "SOLDABLE", "A SOLDAR"]:
+            return "SOLDADA SW"
+    if campo == "talla" and valor:
+        valor = _ref_formatear_talla_parentesis(valor)
+    return valor
+
+
+# --- Corpus sintético ---
+
+CAMPOS = [None, "talla", "conexion", "repuesto", "material", "marca", "diametro", "subtipo"]
+
+PALABRAS = [
+    "valvula", "bola", "codo", "90", "filtro", "aire", "de", "DE", "bomba", "agua", "pastilla",
+    "disco", "freno", "guante", "nitrilo", "casco", "3m", "inox", "316", "cabo de vida",
+    "linea de vida", "aceite de motor", "rosca", "con brida", "soldar", "hilo", "flange",
+    "small", "grande", "(m)", "(xl)", "t/s", "xxlarge", "sin talla", "n/a", "na", "-",
+    "cod", "sku", "sku123", "cod.45", "t.", "t-", "lts2", "pulg.", "kilosx", "milimetrosa",
+]
+UNIDADES = ["litros", "litro", "lts", "lt", "L", "kilos", "kgs", "kg", "pulgadas", "pulg", "pulg.",
+            "metros", "mts", "mt", "milimetros", "milimetro", "mm", "cm", "v", "hp"]
+ESPACIOS = ["", " ", "  ", "\t", "  "]
+
+
+def generar_valor(rng: random.Random) -> str:
+    partes = []
+    if rng.random() < 0.3:
+        partes.append(rng.choice(PREFIJOS_REDUNDANTES + [p.lower() for p in PREFIJOS_REDUNDANTES]))
+    for _ in range(rng.randint(0, 5)):
+        r = rng.random()
+        if r < 0.35:
+            numero = rng.choice([str(rng.randint(0, 999)), f"{rng.randint(1, 9)}/{rng.choice([2, 4, 8])}",
+                                 f"{rng.randint(0, 9)}.{rng.randint(0, 9)}"])
+            partes.append(numero + rng.choice(ESPACIOS) + rng.choice(UNIDADES))
+        elif r < 0.45:
+            partes.append(rng.choice(["SKU", "sku", "COD", "cod.", "Cod"]) + rng.choice(ESPACIOS)
+                          + str(rng.randint(0, 99999)))
+        elif r < 0.55:
+            partes.append(rng.choice(SIN_INFO_VALORES + list(TALLAS_NORMALIZE)))
+        else:
+            partes.append(rng.choice(PALABRAS))
+    separador = rng.choice([" ", " ", "  ", " de "])
+    valor = separador.join(partes)
+    if rng.random() < 0.1:
+        valor = f"({valor})"
+    return rng.choice(ESPACIOS) + valor + rng.choice(ESPACIOS)
+
+
+def generar_corpus(n: int, seed: int = 42):
+    """Lista de (valor, campo). Incluye repetidos, como en un catálogo real."""
+    rng = random.Random(seed)
+    unicos = [(generar_valor(rng), rng.choice(CAMPOS)) for _ in range(max(1, n // 20))]
+    return [rng.choice(unicos) if rng.random() < 0.8 else (generar_valor(rng), rng.choice(CAMPOS))
+            for _ in range(n)]
+
+
+def diferencias(corpus):
+    return [(v, c, normalizar_valor_referencia(v, c), normalizar_valor(v, c))
+            for v, c in corpus if normalizar_valor_referencia(v, c) != normalizar_valor(v, c)]
+
+
+def _medir(fn) -> float:
+    inicio = time.perf_counter()
+    fn()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de normalizar_valor compilado")
+    parser.add_argument("-n", "--valores", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = generar_corpus(args.valores, args.seed)
+    nu._normalizar_memo.cache_clear()
+
+    malos = diferencias(corpus)
+    print(f"\nEquivalencia: {len(corpus) - len(malos)}/{len(corpus)} idénticos")
+    for v, c, esperado, obtenido in malos[:10]:
+        print(f"  {v!r} [{c}] -> ref={esperado!r} nuevo={obtenido!r}")
+
+    por_campo = {}
+    for v, c in corpus:
+        por_campo.setdefault(c, []).append(v)
+
+    nu._normalizar_memo.cache_clear()
+    resultados = [
+        ("referencia (original)", _medir(lambda: [normalizar_valor_referencia(v, c) for v, c in corpus])),
+        ("compilado sin memo", _medir(lambda: [nu.obtener_normalizador(c)(v) for v, c in corpus])),
+        ("normalizar_valor (frío)", _medir(lambda: [normalizar_valor(v, c) for v, c in corpus])),
+        ("normalizar_valor (caliente)", _medir(lambda: [normalizar_valor(v, c) for v, c in corpus])),
+        ("normalizar_valores_batch", _medir(lambda: [normalizar_valores_batch(vs, c) for c, vs in por_campo.items()])),
+    ]
+
+    base = resultados[0][1]
+    print(f"\n{'VARIANTE':<28} | {'µs/valor':>9} | {'valores/s':>11} | {'SPEEDUP':>7}")
+    print("-" * 66)
+    for nombre, segundos in resultados:
+        print(f"{nombre:<28} | {segundos * 1e6 / len(corpus):>9.2f} | {len(corpus) / segundos:>11,.0f} | "
+              f"{base / segundos:>6.1f}x")
+    print()
+    sys.exit(1 if malos else 0)
+
+
+if __name__ == "__main__":
+    main()
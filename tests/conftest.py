@@ -0,0 +1,59 @@
+"""
+Fixtures compartidas: backend stub con guion y costos en una base temporal.
+
+`cost_store` se crea al importar app.services.costos, así que además de
+LLM_COSTOS_DB se reemplaza la instancia: las pruebas nunca valorizan uso en
+cache/costos_llm.sqlite3.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def _limpiar_caches_llm() -> None:
+    """Agentes y cadenas compilados con el backend anterior (lru_cache por proceso)."""
+    from app.agents import document_analyst
+    from app.agents.chatbot_solicitud_articulos_agent import get_estandarizacion_agent
+    from app.agents.hse_agent import get_hse_agent
+
+    get_estandarizacion_agent.cache_clear()
+    get_hse_agent.cache_clear()
+    document_analyst.obtener_llm_analyst.cache_clear()
+    document_analyst._cadena.cache_clear()
+
+
+@pytest.fixture
+def costos_temporales(tmp_path, monkeypatch):
+    """CostStore en tmp_path (env y singleton); retorna el store."""
+    from app.services import costos
+
+    db = tmp_path / "costos.sqlite3"
+    monkeypatch.setenv("LLM_COSTOS_DB", str(db))
+    store = costos.CostStore(db)
+    monkeypatch.setattr(costos, "cost_store", store)
+    yield store
+    store.cerrar()
+
+
+@pytest.fixture
+def guion_stub(costos_temporales, monkeypatch):
+    """
+    Activa LLM_BACKEND=stub con el guion que se pase (bytes YAML):
+    `guion_stub(GUION)`. Limpia los agentes cacheados antes y después.
+    """
+    from app.services import llm_stub
+
+    def usar(contenido: bytes):
+        guion = llm_stub._compilar_guion(contenido, None)
+        monkeypatch.setattr(llm_stub, "obtener_guion_stub", lambda: guion)
+        return guion
+
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    _limpiar_caches_llm()
+    try:
+        yield usar
+    finally:
+        _limpiar_caches_llm()
@@ -3,16 +3,75 @@ LLM-as-a-Judge Module
 =====================
 Juez experto por categoría que evalúa si el artículo estandarizado es válido,
 coherente y representa un producto real/existente en la industria.
+
+Los veredictos se guardan en un cache persistente (un JSON por juicio en
+JUDGE_CACHE_DIR, por defecto <proyecto>/cache/juicios) indexado por
+(categoría, nombre estandarizado, datos originales) y la versión del prompt:
+volver a correr un barrido no vuelve a pagar los artículos ya juzgados, y
+cambiar el prompt, los criterios de la categoría o el modelo los invalida.
+
+`judge_batch` evalúa muchos artículos de una misma categoría en una sola
+llamada con salida estructurada (el prompt de sistema de la categoría se
+envía una vez por lote en vez de una vez por artículo).
 """
 
-from langchain_anthropic import ChatAnthropic
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
-from typing import Optional
+from pathlib import Path
+from typing import Dict, List, Optional
+import hashlib
+import json
+import threading
+import time
 import yaml
 import os
 
+from app.services.llm_utils import crear_modelo_chat
+
+# Subir al cambiar los criterios del juez de forma que los veredictos guardados ya no sirvan
+# (los cambios de texto del prompt, del formato de la categoría o del modelo se detectan solos)
+JUDGE_PROMPT_VERSION = "1"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[2] / "cache" / "juicios"
+DEFAULT_BATCH_SIZE = 10
+
+HUMAN_TEMPLATE = """
+EVALUACIÓN SOLICITADA:
+======================
+
+**Categoría:** {category}
+**Formato esperado:** {format_info}
+
+**Datos originales del usuario:**
+{original_input}
+
+**Nombre estandarizado resultante:**
+"{standardized_name}"
+
+**Historial de conversación (si aplica):**
+{conversation_history}
+
+Por favor, evalúa este resultado y proporciona tu veredicto como JSON.
+
+{format_instructions}
+"""
+
+BATCH_TEMPLATE = """
+EVALUACIÓN EN LOTE:
+===================
+
+**Categoría:** {category}
+**Formato esperado:** {format_info}
+
+Evalúa CADA artículo por separado, con los mismos criterios que usarías para
+uno solo. Cada artículo trae su índice entre corchetes, los datos originales
+del usuario y el nombre estandarizado resultante:
+
+{items}
+
+Entrega exactamente un veredicto por artículo, con su `indice`.
+"""
+
 
 class JudgmentResult(BaseModel):
     """Esquema estructurado del veredicto del juez."""
@@ -25,6 +84,91 @@ class JudgmentResult(BaseModel):
     sugerencia: Optional[str] = Field(default=None, description="Sugerencia de mejora si aplica")
 
 
+class JudgmentItem(JudgmentResult):
+    """Veredicto de un artículo dentro de un lote."""
+    indice: int = Field(description="Índice del artículo evaluado (el número entre corchetes)")
+
+
+class JudgmentBatch(BaseModel):
+    """Veredictos de un lote de artículos de la misma categoría."""
+    veredictos: List[JudgmentItem] = Field(description="Un veredicto por artículo")
+
+
+def _is_retryable(error: Exception) -> bool:
+    """429 / 529 / timeout: se propagan para que retry_with_backoff aplique el backoff compartido."""
+    from anthropic import APIStatusError, APITimeoutError, RateLimitError
+
+    return isinstance(error, (RateLimitError, APITimeoutError)) or (
+        isinstance(error, APIStatusError) and error.status_code == 529
+    )
+
+
+def _error_result(error: Exception) -> JudgmentResult:
+    return JudgmentResult(
+        valido=False,
+        puntuacion=0,
+        existe_en_industria=False,
+        formato_correcto=False,
+        campos_coherentes=False,
+        razonamiento=f"Error al evaluar: {str(error)}",
+        sugerencia="Revisar el formato de salida del juez."
+    )
+
+
+class JudgmentCache:
+    """
+    Cache persistente de veredictos: un JSON por juicio con escritura atómica
+    (varios procesos o hilos pueden compartir el directorio). Los veredictos
+    de error no se guardan.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir or os.getenv("JUDGE_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(category: str, standardized_name: str, original_input: dict, prompt_version: str) -> str:
+        contenido = json.dumps(
+            [category, standardized_name, original_input, prompt_version], sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[JudgmentResult]:
+        try:
+            data = json.loads(self._path(key).read_text(encoding="utf-8"))
+            result = JudgmentResult(**data["veredicto"])
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def set(self, key: str, result: JudgmentResult, **meta) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(
+                json.dumps({"veredicto": result.model_dump(), "creado": time.time(), **meta}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            os.replace(tmp, path)
+        except OSError as e:
+            # El cache es una optimización: un fallo de disco no invalida el juicio
+            print(f"Error guardando cache del juez: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
 class ExpertJudgeAgent:
     """
     Juez LLM experto por categoría que evalúa la calidad de la estandarización.
@@ -34,14 +178,24 @@ class ExpertJudgeAgent:
     producto real de la industria.
     """
     
-    def __init__(self, model: str = "claude-3-haiku-20240307"):
+    def __init__(
+        self,
+        model: str = "claude-3-haiku-20240307",
+        cache: Optional[JudgmentCache] = None,
+        use_cache: bool = True,
+    ):
         """
         Args:
             model: Modelo de Anthropic a usar. Por defecto usamos Haiku que es rápido y suele estar disponible.
                    Para juicios más profundos usar 'claude-3-opus-20240229' o 'claude-3-5-sonnet-20240620'.
+            cache: Cache de veredictos (por defecto uno en JUDGE_CACHE_DIR)
+            use_cache: False para juzgar siempre con el modelo (ej: comparar prompts)
         """
-        self.llm = ChatAnthropic(model=model, temperature=0)
+        self.model = model
+        # Respeta LLM_BACKEND / LLM_CASSETTE_MODE (igual que el simulador de usuario)
+        self.llm = crear_modelo_chat(model, temperature=0)
         self.parser = JsonOutputParser(pydantic_object=JudgmentResult)
+        self.cache = (cache or JudgmentCache()) if use_cache else None
         self._category_config = self._load_category_config()
         
     def _load_category_config(self) -> dict:
@@ -61,7 +215,8 @@ class ExpertJudgeAgent:
         category: str, 
         standardized_name: str, 
         original_input: dict,
-        conversation_history: str = ""
+        conversation_history: str = "",
+        callbacks: list = None,
     ) -> JudgmentResult:
         """
         Evalúa si el artículo estandarizado es válido.
@@ -70,61 +225,147 @@ class ExpertJudgeAgent:
             category: Categoría del artículo (EPP, WOG, ELECTRICIDAD, etc.)
             standardized_name: Nombre final estandarizado (ej: "OVEROL CABRITILLA (44)")
             original_input: Datos originales proporcionados por el usuario simulado
-            conversation_history: Historial de la conversación (opcional)
+            conversation_history: Historial de la conversación (opcional, no forma parte de la clave del cache)
+            callbacks: Callbacks de LangChain para la llamada (ej: conteo de tokens)
             
         Returns:
             JudgmentResult con el veredicto estructurado
         """
-        system_prompt = self._get_expert_system_prompt(category)
-        format_info = self._get_format_info(category)
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", """
-EVALUACIÓN SOLICITADA:
-======================
-
-**Categoría:** {category}
-**Formato esperado:** {format_info}
-
-**Datos originales del usuario:**
-{original_input}
+        key = None
+        if self.cache is not None:
+            version = self._prompt_version(category, HUMAN_TEMPLATE)
+            key = JudgmentCache.key(category, standardized_name, original_input, version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
 
-**Nombre estandarizado resultante:**
-"{standardized_name}"
+        try:
+            judgment = self._invoke_single(category, standardized_name, original_input, conversation_history, callbacks)
+        except Exception as e:
+            if _is_retryable(e):
+                raise
+            # Fallback en caso de error de parsing (no se guarda en cache)
+            return _error_result(e)
 
-**Historial de conversación (si aplica):**
-{conversation_history}
+        if key is not None:
+            self.cache.set(key, judgment, categoria=category, nombre=standardized_name, modelo=self.model)
+        return judgment
 
-Por favor, evalúa este resultado y proporciona tu veredicto como JSON.
+    def _invoke_single(
+        self, category: str, standardized_name: str, original_input: dict, conversation_history: str, callbacks: list,
+    ) -> JudgmentResult:
+        """Una llamada al modelo para un artículo (sin cache ni fallback)."""
+        system_prompt = self._get_expert_system_prompt(category)
+        format_info = self._get_format_info(category)
 
-{format_instructions}
-""")
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("human", HUMAN_TEMPLATE)
         ])
         
         chain = prompt | self.llm | self.parser
         
-        try:
-            result = chain.invoke({
-                "category": category,
-                "format_info": format_info,
-                "original_input": str(original_input),
-                "standardized_name": standardized_name,
-                "conversation_history": conversation_history or "N/A",
-                "format_instructions": self.parser.get_format_instructions()
-            })
-            return JudgmentResult(**result)
-        except Exception as e:
-            # Fallback en caso de error de parsing
-            return JudgmentResult(
-                valido=False,
-                puntuacion=0,
-                existe_en_industria=False,
-                formato_correcto=False,
-                campos_coherentes=False,
-                razonamiento=f"Error al evaluar: {str(e)}",
-                sugerencia="Revisar el formato de salida del juez."
+        result = chain.invoke({
+            "category": category,
+            "format_info": format_info,
+            "original_input": str(original_input),
+            "standardized_name": standardized_name,
+            "conversation_history": conversation_history or "N/A",
+            "format_instructions": self.parser.get_format_instructions()
+        }, config={"callbacks": callbacks or []})
+        return JudgmentResult(**result)
+
+    def judge_batch(
+        self,
+        category: str,
+        items: List[dict],
+        callbacks: list = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> List[JudgmentResult]:
+        """
+        Evalúa varios artículos de la misma categoría con una llamada por lote
+        (salida estructurada JudgmentBatch). Los que ya están en cache no se
+        envían; los duplicados dentro del lote se juzgan una vez.
+
+        Args:
+            category: Categoría común de los artículos
+            items: Dicts con 'standardized_name' y 'original_input'
+            callbacks: Callbacks de LangChain para las llamadas
+            batch_size: Máximo de artículos por llamada
+
+        Returns:
+            Un JudgmentResult por item, en el mismo orden. Si el modelo omite
+            un artículo del lote, ese artículo se juzga individualmente.
+        """
+        version = self._prompt_version(category, BATCH_TEMPLATE)
+        keys = [
+            JudgmentCache.key(category, item["standardized_name"], item["original_input"], version) for item in items
+        ]
+        results: List[Optional[JudgmentResult]] = [None] * len(items)
+        pending: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            if key in pending:
+                pending[key].append(i)
+                continue
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending[key] = [i]
+
+        structured = ChatPromptTemplate.from_messages([
+            ("system", self._get_expert_system_prompt(category)),
+            ("human", BATCH_TEMPLATE),
+        ]) | self.llm.with_structured_output(JudgmentBatch)
+        pending_keys = list(pending)
+        for start in range(0, len(pending_keys), max(1, batch_size)):
+            chunk = pending_keys[start:start + max(1, batch_size)]
+            listing = "\n\n".join(
+                f"[{n}] Datos originales: {items[pending[key][0]]['original_input']}\n"
+                f"    Nombre estandarizado: \"{items[pending[key][0]]['standardized_name']}\""
+                for n, key in enumerate(chunk)
             )
+            try:
+                batch = structured.invoke({
+                    "category": category,
+                    "format_info": self._get_format_info(category),
+                    "items": listing,
+                }, config={"callbacks": callbacks or []})
+                verdicts = {v.indice: v for v in batch.veredictos}
+            except Exception as e:
+                if _is_retryable(e):
+                    raise
+                verdicts = {}
+
+            for n, key in enumerate(chunk):
+                item = items[pending[key][0]]
+                verdict = verdicts.get(n)
+                cacheable = True
+                if verdict is not None:
+                    judgment = JudgmentResult(**verdict.model_dump(exclude={"indice"}))
+                else:
+                    # Omitido por el modelo o lote fallido: juicio individual
+                    try:
+                        judgment = self._invoke_single(
+                            category, item["standardized_name"], item["original_input"], "", callbacks
+                        )
+                    except Exception as e:
+                        if _is_retryable(e):
+                            raise
+                        judgment, cacheable = _error_result(e), False
+                if cacheable and self.cache is not None:
+                    self.cache.set(key, judgment, categoria=category, nombre=item["standardized_name"], modelo=self.model)
+                for i in pending[key]:
+                    results[i] = judgment
+        return results
+
+    def _prompt_version(self, category: str, template: str) -> str:
+        """Versión corta del prompt efectivo: invalida el cache al cambiar prompt, formato o modelo."""
+        partes = [
+            JUDGE_PROMPT_VERSION, self.model, template,
+            self._get_expert_system_prompt(category), self._get_format_info(category),
+        ]
+        return hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()[:12]
     
     def _get_format_info(self, category: str) -> str:
         """Obtiene el formato esperado de la categoría desde el YAML."""
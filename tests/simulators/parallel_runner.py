@@ -0,0 +1,356 @@
+"""
+Runner paralelo de simulaciones multi-agente
+============================================
+Ejecuta `run_simulation` (tests/test_multi_agent_simulation.py) para cada
+categoría × perfil × iteración con un tope de simulaciones concurrentes.
+Cada turno bloquea en dos llamadas al LLM (chatbot y usuario simulado), así
+que un barrido completo secuencial toma horas; en paralelo el límite pasa a
+ser el rate limit de la API, que se respeta con el backoff compartido
+(simulators/shared_backoff.py): un 429/529 pausa a todos los hilos.
+
+Reproducible: los datos del artículo de cada simulación salen de una semilla
+derivada de (--seed, categoría, perfil, iteración), independiente del orden
+en que terminan los hilos. Las respuestas del LLM no son deterministas salvo
+con LLM_BACKEND=stub o cassettes en replay.
+
+Reporte JSON con tasa de éxito, turnos, tiempo (wall-clock) y tokens por
+categoría, por perfil y por categoría × perfil, más el detalle por simulación.
+
+Con --juez, al terminar las simulaciones los éxitos se evalúan con el juez
+experto agrupados por categoría (--juez-lote artículos por llamada; 1 =
+una llamada por artículo con su conversación). Los veredictos ya juzgados
+en corridas anteriores salen del cache del juez.
+
+Uso:
+    python -m tests.simulators.parallel_runner -p all -n 2 -j 6 --reporte cache/simulacion.json
+    python -m tests.simulators.parallel_runner -c EPP -p standard -n 5 -j 5 --juez
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.services.costos import calcular_costo
+from app.services.llm_callbacks import _modelo, uso_de_tokens
+from tests.simulators.shared_backoff import shared_backoff
+
+VALID_PROFILES = ["standard", "confused", "impatient", "expert", "typo_king"]
+
+
+class TokenCounter(BaseCallbackHandler):
+    """Tokens y costo estimado de las llamadas al LLM de una simulación (por modelo)."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[UUID, str] = {}
+        self.by_model: Dict[str, Dict[str, int]] = {}
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        with self._lock:
+            self._models[run_id] = _modelo(metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = uso_de_tokens(response)
+        with self._lock:
+            model = self._models.pop(run_id, "desconocido")
+            self.calls += 1
+            total = self.by_model.setdefault(model, {})
+            for key, value in usage.items():
+                total[key] = total.get(key, 0) + value
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._models.pop(run_id, None)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            input_tokens = sum(u.get("input", 0) for u in self.by_model.values())
+            output_tokens = sum(u.get("output", 0) for u in self.by_model.values())
+            cost = sum(calcular_costo(model, usage) for model, usage in self.by_model.items())
+            return {
+                "llamadas": self.calls,
+                "input": input_tokens,
+                "output": output_tokens,
+                "total": input_tokens + output_tokens,
+                "costo_usd": round(cost, 6),
+            }
+
+
+@dataclass(frozen=True)
+class SimulationCase:
+    category: str
+    profile: str
+    iteration: int
+    seed: str
+    details: Dict[str, Any]
+
+    @property
+    def sim_id(self) -> str:
+        return f"{self.category} | {self.profile} | It.{self.iteration}"
+
+
+def build_cases(
+    full_config: dict, categories: List[str], profiles: List[str], iterations: int, seed: int,
+) -> List[SimulationCase]:
+    """Casos del barrido con datos de artículo deterministas por (seed, categoría, perfil, iteración)."""
+    from tests.test_multi_agent_simulation import generate_article_details
+
+    cases = []
+    for category in categories:
+        for profile in profiles:
+            for iteration in range(1, iterations + 1):
+                case_seed = f"{seed}:{category}:{profile}:{iteration}"
+                details = generate_article_details(full_config[category], rng=random.Random(case_seed))
+                cases.append(SimulationCase(category, profile, iteration, case_seed, details))
+    return cases
+
+
+def run_case(case: SimulationCase, max_turns: int, verbose: bool = False) -> Dict[str, Any]:
+    """Una simulación con sus métricas. Nunca lanza: los errores quedan en el registro."""
+    from tests.test_multi_agent_simulation import run_simulation
+
+    counter = TokenCounter()
+    metrics: Dict[str, Any] = {}
+    record: Dict[str, Any] = {
+        "categoria": case.category,
+        "perfil": case.profile,
+        "iteracion": case.iteration,
+        "semilla": case.seed,
+        "detalles": case.details,
+    }
+    start = time.perf_counter()
+    try:
+        success, name, conversation = run_simulation(
+            case.category, case.profile, article_details=case.details, max_turns=max_turns,
+            verbose=verbose, callbacks=[counter], metrics=metrics,
+        )
+    except Exception as e:
+        success, name, conversation = False, None, ""
+        metrics["error"] = f"{type(e).__name__}: {e}"
+    record.update(
+        exito=success,
+        nombre=name,
+        turnos=metrics.get("turnos", 0),
+        duracion_s=round(time.perf_counter() - start, 3),
+        tokens=counter.summary(),
+        error=metrics.get("error"),
+        conversacion=conversation,
+    )
+    return record
+
+
+def run_parallel(
+    cases: List[SimulationCase], concurrency: int, max_turns: int, verbose: bool = False, on_done=None,
+) -> tuple:
+    """(registros en el orden de `cases`, segundos de wall-clock)."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="simulacion") as pool:
+        futures = [pool.submit(run_case, case, max_turns, verbose) for case in cases]
+        if on_done is not None:
+            for future in futures:
+                future.add_done_callback(lambda f: on_done(f.result()))
+        records = [future.result() for future in futures]
+    return records, time.perf_counter() - start
+
+
+def judge_records(
+    records: List[Dict[str, Any]], judge, concurrency: int, batch_size: int = 10,
+) -> Dict[str, Any]:
+    """
+    Evalúa los éxitos con nombre, agrupados por categoría (una tarea por
+    categoría, en paralelo). Agrega `juez` a cada registro evaluado y retorna
+    tokens por categoría y aciertos del cache del juez.
+    """
+    from tests.test_multi_agent_simulation import retry_with_backoff
+
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    for r in records:
+        if r["exito"] and r["nombre"]:
+            by_category.setdefault(r["categoria"], []).append(r)
+
+    def judge_category(category: str, group: List[Dict[str, Any]]) -> Dict[str, Any]:
+        counter = TokenCounter()
+        try:
+            if batch_size > 1:
+                items = [{"standardized_name": r["nombre"], "original_input": r["detalles"]} for r in group]
+                judgments = retry_with_backoff(lambda: judge.judge_batch(
+                    category, items, callbacks=[counter], batch_size=batch_size,
+                ))
+            else:
+                judgments = [
+                    retry_with_backoff(lambda r=r: judge.judge(
+                        category, r["nombre"], r["detalles"], conversation_history=r["conversacion"],
+                        callbacks=[counter],
+                    ))
+                    for r in group
+                ]
+        except Exception as e:
+            for r in group:
+                r["juez"] = {"error": f"{type(e).__name__}: {e}"}
+            return counter.summary()
+        for r, judgment in zip(group, judgments):
+            r["juez"] = {"valido": judgment.valido, "puntuacion": judgment.puntuacion}
+        return counter.summary()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="juez") as pool:
+        futures = {category: pool.submit(judge_category, category, group) for category, group in by_category.items()}
+        tokens = {category: future.result() for category, future in futures.items()}
+    return {
+        "lote": batch_size,
+        "duracion_s": round(time.perf_counter() - start, 2),
+        "cache": judge.cache.stats() if judge.cache is not None else None,
+        "tokens_por_categoria": tokens,
+        "tokens_total": sum(t["total"] for t in tokens.values()),
+    }
+
+
+def _aggregate(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    n = len(records)
+    successes = sum(1 for r in records if r["exito"])
+    turns = sorted(r["turnos"] for r in records)
+    durations = [r["duracion_s"] for r in records]
+    tokens = {k: sum(r["tokens"][k] for r in records) for k in ("llamadas", "input", "output", "total")}
+    tokens["costo_usd"] = round(sum(r["tokens"]["costo_usd"] for r in records), 6)
+    summary = {
+        "simulaciones": n,
+        "exitos": successes,
+        "tasa_exito": round(successes / n, 4) if n else 0.0,
+        "errores": sum(1 for r in records if r.get("error")),
+        "turnos": {
+            "promedio": round(sum(turns) / n, 2) if n else 0.0,
+            "mediana": turns[n // 2] if n else 0,
+            "max": turns[-1] if n else 0,
+        },
+        "duracion_s": {
+            "total": round(sum(durations), 2),
+            "promedio": round(sum(durations) / n, 2) if n else 0.0,
+            "max": round(max(durations), 2) if n else 0.0,
+        },
+        "tokens": {**tokens, "promedio_por_simulacion": round(tokens["total"] / n, 1) if n else 0.0},
+    }
+    judged = [r["juez"] for r in records if r.get("juez") and "error" not in r["juez"]]
+    if judged:
+        summary["juez"] = {
+            "evaluados": len(judged),
+            "validos": sum(1 for j in judged if j["valido"]),
+            "puntuacion_promedio": round(sum(j["puntuacion"] for j in judged) / len(judged), 2),
+        }
+    return summary
+
+
+def build_report(
+    records: List[Dict[str, Any]], wall_clock: float, params: Dict[str, Any], judging: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    by_category: Dict[str, list] = {}
+    by_profile: Dict[str, list] = {}
+    by_pair: Dict[str, Dict[str, list]] = {}
+    for r in records:
+        by_category.setdefault(r["categoria"], []).append(r)
+        by_profile.setdefault(r["perfil"], []).append(r)
+        by_pair.setdefault(r["categoria"], {}).setdefault(r["perfil"], []).append(r)
+    report = {
+        "parametros": params,
+        "wall_clock_s": round(wall_clock, 2),
+        "backoff": shared_backoff.stats(),
+        "total": _aggregate(records),
+        "por_categoria": {k: _aggregate(v) for k, v in by_category.items()},
+        "por_perfil": {k: _aggregate(v) for k, v in by_profile.items()},
+        "por_categoria_perfil": {
+            cat: {prof: _aggregate(v) for prof, v in profiles.items()} for cat, profiles in by_pair.items()
+        },
+        "simulaciones": [{k: v for k, v in r.items() if k != "conversacion"} for r in records],
+    }
+    if judging is not None:
+        report["juez"] = judging
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--category", type=str, help="Categoría específica (ej: EPP). Si se omite, todas.")
+    parser.add_argument("-p", "--profile", type=str, default="standard",
+                        help=f"Perfil del usuario simulado ({', '.join(VALID_PROFILES)}) o 'all'.")
+    parser.add_argument("-n", "--iterations", type=int, default=1, help="Iteraciones por categoría/perfil.")
+    parser.add_argument("-j", "--concurrency", type=int, default=4, help="Simulaciones concurrentes (tope).")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos de cada simulación.")
+    parser.add_argument("--max-turns", type=int, default=12)
+    parser.add_argument("--juez", action="store_true", help="Evaluar los éxitos con el juez experto.")
+    parser.add_argument("--juez-lote", type=int, default=10,
+                        help="Artículos por llamada al juez (1 = uno por llamada, con la conversación).")
+    parser.add_argument("--sin-cache-juez", action="store_true", help="Juzgar todo de nuevo (ignora el cache).")
+    parser.add_argument("--verbose", action="store_true", help="Imprimir las conversaciones (se intercalan).")
+    parser.add_argument("--reporte", type=Path, default=None, help="Archivo JSON del reporte (por defecto stdout).")
+    args = parser.parse_args(argv)
+
+    from tests.simulators.expert_judge import ExpertJudgeAgent
+    from tests.test_multi_agent_simulation import expert_judge, load_categories_config
+
+    full_config = load_categories_config()
+    all_categories = [k for k in full_config.keys() if k.isupper()]
+    if args.category and args.category.upper() not in all_categories:
+        parser.error(f"Categoría '{args.category}' no encontrada. Disponibles: {', '.join(all_categories)}")
+    categories = [args.category.upper()] if args.category else all_categories
+    if args.profile.lower() == "all":
+        profiles = VALID_PROFILES
+    elif args.profile.lower() in VALID_PROFILES:
+        profiles = [args.profile.lower()]
+    else:
+        parser.error(f"Perfil '{args.profile}' no válido. Disponibles: {', '.join(VALID_PROFILES)}")
+
+    cases = build_cases(full_config, categories, profiles, args.iterations, args.seed)
+    print(f"🚀 {len(cases)} simulaciones ({len(categories)} categorías × {len(profiles)} perfiles × "
+          f"{args.iterations}) con {args.concurrency} en paralelo")
+
+    done = []
+    lock = threading.Lock()
+
+    def progress(record):
+        with lock:
+            done.append(record)
+            status = "✅" if record["exito"] else "❌"
+            print(f"  [{len(done)}/{len(cases)}] {status} {record['categoria']} | {record['perfil']} | "
+                  f"It.{record['iteracion']} | {record['turnos']} turnos | {record['duracion_s']:.1f}s"
+                  + (f" | {record['error']}" if record.get("error") else ""))
+
+    records, wall_clock = run_parallel(cases, args.concurrency, args.max_turns, verbose=args.verbose, on_done=progress)
+    judging = None
+    if args.juez:
+        judge = ExpertJudgeAgent(use_cache=False) if args.sin_cache_juez else expert_judge
+        judging = judge_records(records, judge, args.concurrency, batch_size=args.juez_lote)
+        print(f"🧑‍⚖️ Juez: {judging['tokens_total']} tokens en {judging['duracion_s']}s | cache: {judging['cache']}")
+    params = {
+        "categorias": categories, "perfiles": profiles, "iteraciones": args.iterations,
+        "concurrencia": args.concurrency, "seed": args.seed, "max_turns": args.max_turns,
+        "juez": args.juez, "juez_lote": args.juez_lote if args.juez else None,
+    }
+    report = build_report(records, wall_clock, params, judging)
+    total = report["total"]
+    print(f"\n📊 Éxito {total['exitos']}/{total['simulaciones']} ({total['tasa_exito']:.0%}) | "
+          f"wall-clock {report['wall_clock_s']}s (secuencial ≈ {total['duracion_s']['total']}s) | "
+          f"{total['tokens']['total']} tokens | backoff: {report['backoff']['eventos']} pausas")
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.reporte:
+        args.reporte.parent.mkdir(parents=True, exist_ok=True)
+        args.reporte.write_text(text, encoding="utf-8")
+        print(f"💾 Reporte en {args.reporte}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Backoff compartido entre simulaciones concurrentes.
+===================================================
+Cuando una llamada recibe 429 / 529, la pausa se aplica a todos los hilos
+(no solo al que falló): los demás dejan de enviar llamadas hasta que pase la
+ventana, en vez de seguir golpeando la API y alargar el rate limit.
+"""
+import threading
+import time
+
+
+class SharedBackoff:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+        self.events = 0
+        self.total_wait = 0.0
+
+    def wait(self) -> float:
+        """Bloquea hasta que termine la pausa vigente. Retorna los segundos esperados."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                remaining = self._resume_at - time.monotonic()
+            if remaining <= 0:
+                return waited
+            time.sleep(remaining)
+            waited += remaining
+
+    def penalize(self, seconds: float) -> None:
+        """Extiende la pausa global (nunca la acorta)."""
+        with self._lock:
+            self.events += 1
+            self.total_wait += seconds
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"eventos": self.events, "pausa_total_s": round(self.total_wait, 2)}
+
+
+shared_backoff = SharedBackoff()
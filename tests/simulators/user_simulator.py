@@ -1,11 +1,13 @@
-from langchain_anthropic import ChatAnthropic
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import random
 
+from app.services.llm_utils import crear_modelo_chat
+
 class UserSimulatorAgent:
     def __init__(self, role_profile: str = "standard"):
-        self.llm = ChatAnthropic(model="claude-3-haiku-20240307", temperature=0.7)
+        # Respeta LLM_BACKEND / LLM_CASSETTE_MODE (simulaciones offline con el stub o cassettes)
+        self.llm = crear_modelo_chat("claude-3-haiku-20240307", temperature=0.7)
         self.role_profile = role_profile
         self.goal = ""
         self.article_details = {}
@@ -29,7 +31,7 @@ class UserSimulatorAgent:
 
         self.complexity = complexity
 
-    def generate_response(self, chatbot_history: list) -> str:
+    def generate_response(self, chatbot_history: list, callbacks: list = None) -> str:
         """Genera la respuesta del usuario basada en lo que dijo el chatbot"""
         
         # Usamos placeholders {variable} para que LangChain los rellene de forma segura.
@@ -65,7 +67,7 @@ class UserSimulatorAgent:
             "article_details": str(self.article_details),
             "profile_instruction": self._get_profile_instruction(),
             "conversation_text": conversation_text
-        })
+        }, config={"callbacks": callbacks or []})
 
     def _get_profile_instruction(self) -> str:
         profiles = {
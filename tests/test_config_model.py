@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chatbot_solicitud_articulos.categorias_service import cargar_config, obtener_config
+from app.services.chatbot_solicitud_articulos.config_model import ConfigError, compilar_config
+from tests.benchmarks.bench_config import generar_casos, validar_compilado, validar_crudo
+
+
+def test_config_real_compila_y_es_inmutable():
+    config = obtener_config()
+    assert config.categorias
+    categoria = next(iter(config.categorias.values()))
+    with pytest.raises(TypeError):
+        categoria.campos["nuevo"] = None
+    with pytest.raises(AttributeError):
+        categoria.formato = "{x}"
+
+
+def test_formatear_equivale_a_str_format():
+    crudo = cargar_config()
+    for tipo, categoria in obtener_config().categorias.items():
+        valores = {campo: f"V{i}%" for i, campo in enumerate(crudo[tipo]["campos"])}
+        assert categoria.formatear(valores) == crudo[tipo]["formato"].format(**valores)
+
+
+def test_validacion_compilada_equivale_a_crudo():
+    crudo, compilado = cargar_config(), obtener_config()
+    for tipo, atributos in generar_casos(2_000, seed=7):
+        assert validar_compilado(compilado, tipo, atributos) == validar_crudo(crudo, tipo, atributos)
+
+
+def test_errores_de_esquema_se_reportan_juntos():
+    data = {
+        "MALA": {
+            "formato": "{nombre} {falta}",
+            "campos": {
+                "nombre": {"requerido": "si", "tipo": "lista_cerrada"},
+                "otro": {"tipo": "desconocido"},
+            },
+        },
+        "SIN_CAMPOS": {"formato": "{x}"},
+    }
+    with pytest.raises(ConfigError) as e:
+        compilar_config(data)
+    mensaje = str(e.value)
+    for fragmento in ["'requerido'", "necesita valores_estandar", "'tipo'", "{falta}", "SIN_CAMPOS"]:
+        assert fragmento in mensaje
+    with pytest.raises(ConfigError):
+        compilar_config({})
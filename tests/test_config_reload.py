@@ -0,0 +1,66 @@
+import os
+import sys
+
+import yaml
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.archivo_recargable import ArchivoRecargable, version_contenido
+from app.services.chatbot_solicitud_articulos.config_model import compilar_config
+
+BASE = {
+    "A": {"formato": "{tipo} {talla}", "campos": {
+        "tipo": {"requerido": True, "tipo": "lista_cerrada", "valores_estandar": ["GUANTE"]},
+        "talla": {"requerido": False, "tipo": "lista_abierta"},
+    }},
+    "B": {"formato": "{nombre}", "campos": {"nombre": {"requerido": True, "tipo": "texto_libre"}}},
+}
+
+
+def _recargable(ruta):
+    def compilar(contenido, anterior):
+        return compilar_config(yaml.safe_load(contenido), version=version_contenido(contenido), anterior=anterior)
+    return ArchivoRecargable(ruta, compilar, intervalo=0)
+
+
+def _escribir(ruta, data, mtime):
+    ruta.write_text(yaml.safe_dump(data), encoding="utf-8")
+    os.utime(ruta, (mtime, mtime))
+
+
+def test_recarga_incremental_y_rechazo_de_version_invalida(tmp_path):
+    ruta = tmp_path / "config.yaml"
+    _escribir(ruta, BASE, 1_000)
+    archivo = _recargable(ruta)
+    v1 = archivo.obtener()
+    assert archivo.obtener() is v1
+
+    # Cambia solo la categoría A: B se reutiliza tal cual
+    nueva = {**BASE, "A": {**BASE["A"], "formato": "{tipo} T-{talla}"}}
+    _escribir(ruta, nueva, 2_000)
+    v2 = archivo.obtener()
+    assert v2 is not v1 and v2.version != v1.version
+    assert v2.categorias["B"] is v1.categorias["B"]
+    assert v2.categoria("A").formatear({"tipo": "GUANTE", "talla": "M"}) == "GUANTE T-M"
+    assert archivo.recargas == 1
+
+    # Un YAML que no cumple el esquema no reemplaza la versión vigente
+    _escribir(ruta, {"A": {"formato": "{x}", "campos": {}}}, 3_000)
+    assert archivo.obtener() is v2
+    assert archivo.ultimo_error
+
+    # Mismo contenido con otro mtime (touch): sin recompilar
+    _escribir(ruta, nueva, 4_000)
+    assert archivo.obtener() is v2
+    assert archivo.recargas == 1
+
+
+def test_intervalo_evita_stat_en_cada_acceso(tmp_path):
+    ruta = tmp_path / "config.yaml"
+    _escribir(ruta, BASE, 1_000)
+    archivo = _recargable(ruta)
+    archivo.intervalo = 3600
+    v1 = archivo.obtener()
+    _escribir(ruta, {"B": BASE["B"]}, 2_000)
+    assert archivo.obtener() is v1
+    assert set(archivo.revisar(forzar=True).categorias) == {"B"}
@@ -0,0 +1,172 @@
+import os
+import sys
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import costos
+from app.services.costos import CostStore, ContextoCosto, _compilar_tabla, calcular_costo, contexto_request, evaluar_presupuesto
+from app.services.llm_utils import construir_run_config
+
+TABLA_YAML = b"""
+precios:
+  barato: {input: 1.0, output: 2.0, cache_read: 0.1, cache_creation: 1.25}
+por_defecto: {input: 10.0, output: 20.0}
+presupuestos:
+  modelo_economico: barato
+  tenant_diario: {soft: 1.0, hard: 2.0}
+  sesion: {soft: 0.5}
+  tenants:
+    grande: {soft: 100, hard: 200}
+"""
+
+
+@pytest.fixture
+def entorno(costos_temporales, monkeypatch):
+    tabla = _compilar_tabla(TABLA_YAML, None)
+    monkeypatch.setattr(costos, "obtener_tabla_costos", lambda: tabla)
+    return tabla, costos_temporales
+
+
+def test_calcular_costo_descuenta_cache_del_input(entorno):
+    tabla, _ = entorno
+    # 1M input de los cuales 400k leídos y 100k escritos en cache
+    uso = {"input": 1_000_000, "output": 500_000, "cache_read": 400_000, "cache_creation": 100_000}
+    assert calcular_costo("barato", uso, tabla) == pytest.approx(0.5 + 1.0 + 0.04 + 0.125)
+    # Modelo sin precio: se cobra por_defecto
+    assert calcular_costo("otro", {"input": 1_000_000}, tabla) == pytest.approx(10.0)
+
+
+def test_totales_agrupados_y_filtrados(entorno):
+    _, store = entorno
+    a = ContextoCosto(endpoint="/hse/5-porques", tenant="t1", sesion="s1")
+    b = ContextoCosto(endpoint="/chatbot-solicitud-articulos/estandarizar", tenant="t2")
+    store.registrar(a, "barato", {"input": 10, "output": 5}, 0.2)
+    store.registrar(a, "barato", {"input": 20, "output": 5}, 0.3)
+    store.registrar(b, "otro", {"input": 1, "output": 1}, 1.0)
+
+    por_tenant = {f["clave"]: f for f in store.totales("tenant")}
+    assert por_tenant["t1"]["llamadas"] == 2
+    assert por_tenant["t1"]["input_tokens"] == 30
+    assert por_tenant["t1"]["costo_usd"] == pytest.approx(0.5)
+    assert [f["clave"] for f in store.totales("modelo")] == ["otro", "barato"]
+    assert store.totales("endpoint", tenant="t1")[0]["clave"] == "/hse/5-porques"
+    # Sin sesión explícita, la request es su propia sesión
+    assert {f["clave"] for f in store.totales("sesion")} == {"s1", b.request_id}
+
+
+def test_niveles_de_presupuesto(entorno):
+    _, store = entorno
+    ctx = ContextoCosto(endpoint="/x", tenant="t1", sesion="s1")
+    assert evaluar_presupuesto(ctx).nivel == costos.OK
+
+    store.registrar(ctx, "barato", {}, 0.6)
+    estado = evaluar_presupuesto(ctx)
+    assert estado.nivel == costos.SOFT and "sesión" in estado.motivo
+    assert estado.modelo("caro") == "barato"
+
+    otra_sesion = ContextoCosto(endpoint="/x", tenant="t1", sesion="s2")
+    store.registrar(otra_sesion, "barato", {}, 1.5)
+    estado = evaluar_presupuesto(otra_sesion)
+    assert estado.nivel == costos.HARD and "tenant" in estado.motivo
+
+    # Override por tenant
+    grande = ContextoCosto(endpoint="/x", tenant="grande")
+    store.registrar(grande, "barato", {}, 50)
+    assert evaluar_presupuesto(grande).nivel == costos.OK
+    assert evaluar_presupuesto(grande).modelo("caro") == "caro"
+
+
+def test_callback_registra_costo_en_el_contexto(entorno):
+    _, store = entorno
+    uso = {"input_tokens": 1000, "output_tokens": 100, "total_tokens": 1100, "input_token_details": {"cache_read": 500}}
+    modelo = GenericFakeChatModel(messages=iter([AIMessage(content="hola", usage_metadata=uso)]))
+    with contexto_request("/demo", tenant="t9", sesion="s9") as ctx:
+        modelo.invoke("x", config=construir_run_config())
+    # El insert va por el hilo escritor
+    store.vaciar()
+    # "desconocido" no tiene precio: por_defecto (500 input + 500 cache_read + 100 output)
+    esperado = (500 * 10.0 + 100 * 20.0) / 1_000_000
+    assert ctx.llamadas == 1
+    assert ctx.costo_usd == pytest.approx(esperado)
+    fila = store.totales("sesion", tenant="t9")[0]
+    assert fila["clave"] == "s9" and fila["cache_read_tokens"] == 500
+
+    # Fuera de un contexto no se registra nada
+    GenericFakeChatModel(messages=iter([AIMessage(content="x", usage_metadata=uso)])).invoke(
+        "x", config=construir_run_config()
+    )
+    store.vaciar()
+    assert sum(f["llamadas"] for f in store.totales("tenant")) == 1
+
+
+def test_tenant_solo_desde_el_proxy_y_costos_protegido(entorno, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.services.costos import identidad_request
+    import main
+
+    headers = {"X-Tenant-ID": "t1", "X-Session-ID": "s1"}
+    # Sin secreto configurado o con uno incorrecto los headers se ignoran: bucket por IP
+    assert identidad_request(headers, "10.0.0.7") == ("ip:10.0.0.7", None)
+    monkeypatch.setenv("PROXY_SECRET", "secreto")
+    assert identidad_request({**headers, "X-Proxy-Secret": "otro"}, "10.0.0.7") == ("ip:10.0.0.7", None)
+    assert identidad_request({**headers, "X-Proxy-Secret": "secreto"}, "10.0.0.7") == ("t1", "s1")
+
+    client = TestClient(main.app)
+    assert client.get("/costos/totales").status_code == 403
+    assert client.get("/costos/presupuesto", headers={"X-Proxy-Secret": "otro"}).status_code == 403
+    respuesta = client.get("/costos/totales", headers={"X-Proxy-Secret": "secreto"})
+    assert respuesta.status_code == 200 and respuesta.json()["llamadas"] == 0
+
+
+GUION_STUB = """
+latencia: {ms: 0}
+estructuradas:
+  IncidentAnalysisResponse: {analisis_5_porque: "1..5", causa_raiz: "piso mojado"}
+por_defecto:
+  - {texto: "¿Qué material necesitas?"}
+""".encode("utf-8")
+
+
+def test_routers_rechazan_en_hard_y_degradan_el_modelo_en_soft(entorno, guion_stub, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.routers import chatbot_solicitud_articulos
+    from app.services import ruteo_modelos
+    import main
+
+    _, store = entorno
+    guion_stub(GUION_STUB)
+    # El ruteo pide un modelo caro: sobre soft se reemplaza por el económico ("barato")
+    config = ruteo_modelos._compilar(b"por_defecto: {rutinario: caro, escalado: null}", None)
+    registros = []
+    monkeypatch.setenv("PROXY_SECRET", "secreto")
+    monkeypatch.setattr(ruteo_modelos, "obtener_config_ruteo", lambda: config)
+    monkeypatch.setattr(chatbot_solicitud_articulos.escritor_historial, "registrar", registros.append)
+    client = TestClient(main.app)
+    proxy = {"X-Proxy-Secret": "secreto"}
+    store.registrar(ContextoCosto(endpoint="/x", tenant="t1", sesion="s1"), "barato", {}, 0.6)
+    respuesta = client.post(
+        "/chatbot-solicitud-articulos/estandarizar",
+        json={"mensaje": "necesito guantes", "sesion_id": "s1"}, headers={**proxy, "X-Tenant-ID": "t1"},
+    )
+    assert respuesta.status_code == 200
+    # El turno queda en la ruta "degradado", no en la que pidió el ruteo
+    assert (registros[-1]["modelo"], registros[-1]["ruta"]) == ("barato", "degradado")
+
+    client.post("/chatbot-solicitud-articulos/estandarizar", json={"mensaje": "necesito guantes", "sesion_id": "s2"},
+                headers={**proxy, "X-Tenant-ID": "t2"})
+    assert (registros[-1]["modelo"], registros[-1]["ruta"]) == ("caro", "rutinario")
+
+    # Tenant sobre el hard diario: 402 en los endpoints que llaman al LLM
+    store.registrar(ContextoCosto(endpoint="/x", tenant="t1"), "barato", {}, 2.0)
+    incidente = {"tipo_evento": "Incidente", "descripcion": "resbalón", "area_proceso": "Bodega",
+                 "origen": "Inspección", "impacto": "Bajo"}
+    hse = client.post("/hse/5-porques", json=incidente, headers={**proxy, "X-Tenant-ID": "t1"})
+    assert hse.status_code == 402 and "tenant" in hse.json()["detail"]
+    chat = client.post("/chatbot-solicitud-articulos/estandarizar", json={"mensaje": "hola"},
+                       headers={**proxy, "X-Tenant-ID": "t1"})
+    assert chat.status_code == 402
+    assert client.post("/hse/5-porques", json=incidente, headers={**proxy, "X-Tenant-ID": "t3"}).status_code == 200
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chatbot_solicitud_articulos.dimensiones import (
+    canonicalizar_dimension,
+    canonicalizar_dimensiones_batch,
+)
+from tests.benchmarks.bench_dimensiones import generar_corpus
+
+
+def test_variantes_de_la_misma_medida():
+    for texto in ['1 1/2', '1-1/2"', 'DN40', '48.3mm', '1.5 pulg', '1,5"', '1.1/2', 'NPS 1-1/2', 'Ø 48,3 mm']:
+        assert canonicalizar_dimension(texto) == '1-1/2"', texto
+    assert canonicalizar_dimension('3/4 pulg') == '3/4"'
+    assert canonicalizar_dimension('2') == '2"'
+    assert canonicalizar_dimension('25 mm') == '1"'
+
+
+def test_no_medidas():
+    for texto in ['1/2 x 2', 'SCH40', '150#', '40', 'DN 41', '5/3', '', None]:
+        assert canonicalizar_dimension(texto) is None, texto
+
+
+def test_corpus_generado_y_batch():
+    corpus = generar_corpus(5_000, seed=3)
+    salida = canonicalizar_dimensiones_batch([t for t, _ in corpus] + [None])
+    assert salida[:-1] == [e for _, e in corpus]
+    assert salida[-1] is None
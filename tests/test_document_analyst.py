@@ -0,0 +1,223 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.agents import document_analyst
+from app.agents.document_analyst import construir_esquema_candidatas
+from app.schemas.chatbot_solicitud_articulos_schemas import DocumentoAnalizado
+from app.services.llm_utils import LLMLimiter
+
+
+class ChatFalso(BaseChatModel):
+    """Modelo falso: el map responde por fragmento y el reduce devuelve lo que recibió."""
+
+    llamadas: list = []
+    concurrentes: int = 0
+    max_concurrentes: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "falso"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        self.llamadas.append(("map", prompt))
+        self.concurrentes += 1
+        self.max_concurrentes = max(self.max_concurrentes, self.concurrentes)
+        await asyncio.sleep(0.01)
+        self.concurrentes -= 1
+        fragmento = prompt.split("# FRAGMENTO:")[-1]
+        texto = "SIN ESPECIFICACIONES" if "LEGAL" in fragmento else f"Producto: GUANTE\n- {fragmento.split()[0]}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=texto))])
+
+    def with_structured_output(self, schema, **kwargs):
+        async def reducir(prompt_value):
+            prompt = prompt_value.to_string()
+            self.llamadas.append(("reduce", prompt))
+            parciales = prompt.split("# RESÚMENES PARCIALES:")[-1]
+            return DocumentoAnalizado(producto="GUANTE", especificaciones=[parciales.strip()])
+        return RunnableLambda(reducir)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Analista con ChatFalso y fragmentos de 50 tokens (200 caracteres)."""
+    llm = ChatFalso()
+    monkeypatch.setattr(document_analyst, "obtener_llm_analyst", lambda: llm)
+    monkeypatch.setattr(document_analyst, "TOKEN_BUDGET", 50)
+    monkeypatch.setattr(document_analyst, "TOTAL_TOKEN_BUDGET", 1000)
+    document_analyst._cadena.cache_clear()
+    yield llm
+    document_analyst._cadena.cache_clear()
+
+
+def _lineas(*claves: str) -> str:
+    # Líneas de ~150 caracteres: dos no caben en un mismo fragmento
+    return "\n".join(f"{clave} " + "x" * 130 for clave in claves)
+
+
+def test_esquema_candidatas_acota_las_categorias():
+    esquema = construir_esquema_candidatas("Guante de nitrilo talla L resistente a quimicos")
+    lineas = esquema.splitlines()
+    # Categoría inferida primero y alternativas después, con campos requeridos y valores estándar
+    assert lineas[0].startswith("- EPP: subtipo* [") and "GUANTE" in lineas[0]
+    assert all(not l.startswith("- Sin inferencia") for l in lineas) and len(lineas) <= 3
+    # Sin pistas locales solo van los IDs válidos
+    sin_pistas = construir_esquema_candidatas("zzz qqq")
+    assert sin_pistas.startswith("- Sin inferencia local. IDs válidos:") and "EPP" in sin_pistas
+
+
+def test_map_reduce_divide_resume_en_paralelo_y_fusiona(llm):
+    texto = _lineas("MATERIAL:NITRILO", "TALLA:L", "TEXTO LEGAL", "NORMA:EN374")
+    documento = asyncio.run(document_analyst.analyze_document_long(texto))
+
+    maps = [p for tipo, p in llm.llamadas if tipo == "map"]
+    reduces = [p for tipo, p in llm.llamadas if tipo == "reduce"]
+    assert len(maps) == 4 and len(reduces) == 1
+    assert all("FRAGMENTO" in p and "de 4" in p for p in maps)
+    assert llm.max_concurrentes > 1
+    # El reduce recibe solo los fragmentos con especificaciones, numerados
+    fusion = documento.especificaciones[0]
+    assert fusion.count("--- Fragmento") == 3 and "LEGAL" not in fusion
+    assert "MATERIAL:NITRILO" in fusion and "NORMA:EN374" in fusion
+
+
+def test_documento_solo_prosa_no_llama_al_llm(llm):
+    prosa = ("Las partes acuerdan que el presente contrato se rige por la legislación vigente "
+             "y que toda controversia será resuelta por los tribunales ordinarios.\n\n") * 60
+    assert asyncio.run(document_analyst.analyze_document_long(prosa)) is None
+    assert asyncio.run(document_analyst.analyze_document_long(prosa, economico=True)) is None
+    assert llm.llamadas == []
+
+
+def test_router_inyecta_candidatas_y_marca_documento_sin_especificaciones(llm, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.services import costos, document_service
+    from app.services.document_cache import DocumentCache
+    import main
+
+    cache = DocumentCache(tmp_path / "cache")
+    monkeypatch.setattr(document_service, "document_cache", cache)
+    monkeypatch.setattr(document_analyst, "document_cache", cache)
+    monkeypatch.setattr(costos, "cost_store", costos.CostStore(tmp_path / "costos.sqlite3"))
+    client = TestClient(main.app)
+    url = "/chatbot-solicitud-articulos/analizar-documento"
+
+    # Documento corto: una sola llamada estructurada con el esquema de las candidatas
+    ficha = "Ficha técnica: guante de nitrilo talla L, resistente a químicos".encode("utf-8")
+    respuesta = client.post(url, files={"file": ("ficha.txt", ficha)}).json()
+    assert respuesta["sin_especificaciones"] is False and respuesta["analisis"]["producto"] == "GUANTE"
+    (_, prompt), = llm.llamadas
+    assert "- EPP: subtipo* [" in prompt.split("# REGLAS")[0]
+
+    # Documento largo sin especificaciones: flag explícito, sin sentinela en `producto`, y cacheado
+    legal = _lineas("TEXTO LEGAL", "TEXTO LEGAL").encode("utf-8")
+    for desde_cache in (False, True):
+        llm.llamadas.clear()
+        respuesta = client.post(url, files={"file": ("legal.txt", legal)}).json()
+        assert respuesta["sin_especificaciones"] is True and respuesta["desde_cache"] is desde_cache
+        assert respuesta["analisis"] is None and respuesta["prellenado"] is None
+    assert llm.llamadas == []
+
+
+def test_limitador_comparte_el_cupo_entre_hilos_y_corrutinas():
+    limitador = LLMLimiter(1)
+    orden = []
+    liberar = threading.Event()
+
+    def sincrono():
+        with limitador:
+            orden.append("hilo")
+            liberar.wait(1)
+
+    async def principal():
+        hilo = threading.Thread(target=sincrono)
+        hilo.start()
+        while not orden:
+            await asyncio.sleep(0.001)
+        # El cupo lo tiene el hilo: la corrutina espera sin bloquear el loop
+        tarea = asyncio.create_task(limitador.__aenter__())
+        cancelada = asyncio.create_task(limitador.__aenter__())
+        await asyncio.sleep(0.02)
+        assert not tarea.done()
+        cancelada.cancel()
+        liberar.set()
+        await tarea
+        orden.append("corrutina")
+        await limitador.__aexit__(None, None, None)
+        hilo.join()
+
+    asyncio.run(principal())
+    assert orden == ["hilo", "corrutina"]
+    # La espera cancelada no se quedó con el cupo
+    assert limitador._libres == 1
+
+
+def test_turno_de_chat_ocupa_el_limitador(costos_temporales, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.routers import chatbot_solicitud_articulos
+    from app.services import llm_utils
+    import main
+
+    limitador = LLMLimiter(1)
+    libres_durante_el_turno = []
+
+    class Agente:
+        def invoke(self, entrada, config=None):
+            libres_durante_el_turno.append(limitador._libres)
+            return {"messages": entrada["messages"] + [AIMessage(content="¿Qué talla?")]}
+
+    monkeypatch.setattr(llm_utils, "llm_limiter", limitador)
+    monkeypatch.setattr(chatbot_solicitud_articulos, "get_estandarizacion_agent", lambda modelo: Agente())
+    monkeypatch.setattr(chatbot_solicitud_articulos.escritor_historial, "registrar", lambda registro: True)
+    respuesta = TestClient(main.app).post("/chatbot-solicitud-articulos/estandarizar", json={"mensaje": "guantes"})
+    assert respuesta.status_code == 200
+    assert libres_durante_el_turno == [0] and limitador._libres == 1
+
+
+def test_turnos_de_agente_no_bloquean_el_event_loop(costos_temporales, monkeypatch):
+    import httpx
+    import time
+    from app.routers import chatbot_solicitud_articulos
+    import main
+
+    class AgenteLento:
+        def invoke(self, entrada, config=None):
+            time.sleep(0.3)
+            return {"messages": entrada["messages"] + [AIMessage(content="¿Qué talla?")]}
+
+    monkeypatch.setattr(chatbot_solicitud_articulos, "get_estandarizacion_agent", lambda modelo: AgenteLento())
+    monkeypatch.setattr(chatbot_solicitud_articulos.escritor_historial, "registrar", lambda registro: True)
+
+    async def dos_turnos_y_un_probe():
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as client:
+            async def turno():
+                return await client.post("/chatbot-solicitud-articulos/estandarizar", json={"mensaje": "guantes"})
+
+            async def probe():
+                await asyncio.sleep(0.05)
+                inicio = time.perf_counter()
+                await client.get("/")
+                return time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            a, b, espera_probe = await asyncio.gather(turno(), turno(), probe())
+            return a.status_code, b.status_code, time.perf_counter() - inicio, espera_probe
+
+    estado_a, estado_b, total, espera_probe = asyncio.run(dos_turnos_y_un_probe())
+    assert estado_a == estado_b == 200
+    # Los dos turnos corren en paralelo y el probe responde mientras tanto
+    assert total < 0.55 and espera_probe < 0.2
@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.document_cache import DocumentCache, hash_contenido, version_analisis
+
+
+def test_hash_es_estable_por_contenido():
+    assert hash_contenido(b"ficha tecnica") == hash_contenido(b"ficha tecnica")
+    assert hash_contenido(b"ficha tecnica") != hash_contenido(b"ficha tecnica 2")
+
+
+def test_texto_y_resumen_se_versionan_por_separado(tmp_path):
+    cache = DocumentCache(cache_dir=tmp_path)
+    doc_hash = hash_contenido(b"%PDF datasheet")
+
+    cache.set_texto(doc_hash, "v1", "VALVULA BOLA 1/2\"")
+    cache.set_resumen(doc_hash, "v1-a", "Producto: VALVULA BOLA")
+
+    assert cache.get_texto(doc_hash, "v1") == "VALVULA BOLA 1/2\""
+    assert cache.get_resumen(doc_hash, "v1-a") == "Producto: VALVULA BOLA"
+    # Un prompt/modelo distinto no reutiliza el resumen anterior
+    assert cache.get_resumen(doc_hash, "v1-b") is None
+    assert cache.get_texto(doc_hash, "v2") is None
+
+
+def test_persistencia_en_disco_entre_instancias(tmp_path):
+    doc_hash = hash_contenido(b"cotizacion")
+    DocumentCache(cache_dir=tmp_path).set_resumen(doc_hash, "v1", "resumen")
+
+    # Un worker nuevo (memoria vacía) lee desde disco
+    otro = DocumentCache(cache_dir=tmp_path)
+    assert otro.get_resumen(doc_hash, "v1") == "resumen"
+    assert otro.hits == 1
+
+
+def test_lru_en_memoria_acotado(tmp_path):
+    cache = DocumentCache(cache_dir=tmp_path, max_memoria=2)
+    for i in range(5):
+        cache.set_texto(f"{i:064d}", "v1", str(i))
+    assert len(cache._memoria) == 2
+
+
+def test_version_analisis_cambia_con_el_prompt():
+    assert version_analisis("prompt A", "haiku") != version_analisis("prompt B", "haiku")
+    assert version_analisis("prompt A", "haiku") == version_analisis("prompt A", "haiku")
+
+
+def test_poda_en_disco_por_edad_y_por_tamano(tmp_path):
+    cache = DocumentCache(cache_dir=tmp_path, max_edad_segundos=350, max_bytes=2 * 1100)
+    cache._proxima_poda = float("inf")  # la poda se llama a mano (sin hilo en segundo plano)
+    ahora = time.time()
+    hashes = [hash_contenido(str(i).encode()) for i in range(4)]
+    for i, doc_hash in enumerate(hashes):
+        cache.set_texto(doc_hash, "v1", "x" * 1000)
+        # Más viejo cuanto menor el índice; el 0 venció
+        ruta = cache._ruta("texto", doc_hash, "v1")
+        os.utime(ruta, (ahora - 100 * (4 - i), ahora - 100 * (4 - i)))
+    cache.limpiar_memoria()
+    # Un hit en disco renueva el mtime: el 1 pasa a ser el más reciente
+    assert cache.get_texto(hashes[1], "v1") is not None
+
+    assert cache.podar(ahora) == 2
+    cache.limpiar_memoria()
+    # Se borró el vencido (0) y, por tamaño, el de mtime más antiguo (2)
+    assert [cache.get_texto(h, "v1") is not None for h in hashes] == [False, True, False, True]
+    assert not (tmp_path / hashes[0][:2] / hashes[0]).exists()
@@ -0,0 +1,101 @@
+import io
+import os
+import sys
+import zipfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from openpyxl import Workbook
+
+from app.services import document_extractors
+from app.services.document_extractors import CARACTERES_POR_BLOQUE, TxtExtractor, detectar_extractor
+from app.services.document_service import extract_text_from_bytes
+
+
+def _xlsx(filas):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Cotizacion"
+    for fila in filas:
+        ws.append(fila)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _docx(cuerpo_xml):
+    ns = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("[Content_Types].xml", "<Types/>")
+        zf.writestr("word/document.xml", f"<w:document {ns}><w:body>{cuerpo_xml}</w:body></w:document>")
+    return buffer.getvalue()
+
+
+def test_xlsx_se_detecta_por_contenido_aunque_la_extension_mienta():
+    content = _xlsx([["Item", "Descripción", "Cantidad"], [1, 'VALVULA BOLA 1/2" INOX 316', 4]])
+    assert detectar_extractor(content, "cotizacion.pdf").nombre == "xlsx"
+
+    texto = extract_text_from_bytes(content, "cotizacion.pdf")
+    assert "Hoja: Cotizacion" in texto
+    assert 'Descripción: VALVULA BOLA 1/2" INOX 316' in texto
+
+
+def test_xlsx_grande_respeta_presupuesto_de_paginas(monkeypatch):
+    import app.services.document_service as document_service
+    monkeypatch.setattr(document_service, "MAX_PAGES", 2)
+
+    content = _xlsx([["Codigo", "Descripcion"]] + [[i, f"PERNO M{i}X40"] for i in range(1000)])
+    texto = extract_text_from_bytes(content, "grande.xlsx")
+    assert texto.count("\f") == 1
+    assert "PERNO M99X40" in texto
+    assert "PERNO M999X40" not in texto
+
+
+def test_docx_incluye_parrafos_y_filas_de_tabla():
+    cuerpo = (
+        "<w:p><w:r><w:t>Ficha técnica guante</w:t></w:r></w:p>"
+        "<w:tbl><w:tr>"
+        "<w:tc><w:p><w:r><w:t>Material</w:t></w:r></w:p></w:tc>"
+        "<w:tc><w:p><w:r><w:t>NITRILO</w:t></w:r></w:p></w:tc>"
+        "</w:tr></w:tbl>"
+    )
+    content = _docx(cuerpo)
+    assert detectar_extractor(content, "ficha").nombre == "docx"
+    assert extract_text_from_bytes(content, "ficha") == "Ficha técnica guante\nMaterial | NITRILO"
+
+
+def test_csv_sniffing_sin_extension():
+    content = "codigo;descripcion;unidad\n1;CABLE THHN 2.5MM2;ROLLO\n2;AUTOMATICO 16A;UN\n".encode("utf-8")
+    assert detectar_extractor(content, "archivo").nombre == "csv"
+    texto = extract_text_from_bytes(content, "archivo")
+    assert "descripcion: CABLE THHN 2.5MM2" in texto
+
+
+def test_texto_plano_y_binario_no_soportado():
+    assert extract_text_from_bytes("Casco de seguridad blanco".encode("utf-8"), "nota") == "Casco de seguridad blanco"
+    with pytest.raises(ValueError):
+        extract_text_from_bytes(b"\xd0\xcf\x11\xe0\x00\x00binario", "viejo.xls")
+
+
+def test_binario_con_bytes_de_control_no_pasa_por_texto():
+    # Sin NUL, cp1252 lo decodificaría igual: los caracteres de control lo delatan
+    content = b"\x89\x01\x02\x03cabecera\x1b\x7fdatos\x04" * 50
+    with pytest.raises(ValueError):
+        extract_text_from_bytes(content, "adjunto")
+    # Un byte binario más allá de la cabecera también se rechaza
+    with pytest.raises(ValueError):
+        list(TxtExtractor().iterar(b"linea de texto\n" * 500 + b"\x01\x02\x03"))
+
+
+def test_texto_grande_se_lee_por_bloques_y_con_tope(monkeypatch):
+    monkeypatch.setattr(document_extractors, "MAX_CARACTERES_TEXTO", 10 * CARACTERES_POR_BLOQUE)
+    linea = "Guante de nitrilo talla L caja x 100\n"
+    content = (linea * 100_000).encode("utf-8")
+
+    bloques = TxtExtractor().iterar(content)
+    primero = next(bloques)
+    assert primero.startswith("Guante de nitrilo") and CARACTERES_POR_BLOQUE <= len(primero) < CARACTERES_POR_BLOQUE + len(linea)
+    # El tope corta la lectura aunque el archivo siga
+    assert sum(len(b) for b in bloques) + len(primero) < 11 * CARACTERES_POR_BLOQUE
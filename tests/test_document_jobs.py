@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.document_jobs import COMPLETADO, ERROR, PROCESANDO, DocumentJobRunner, DocumentJobStore
+
+
+def test_job_completo_queda_disponible(tmp_path):
+    store = DocumentJobStore(db_path=tmp_path / "jobs.sqlite3", ttl_segundos=60)
+    runner = DocumentJobRunner(store, workers=2)
+
+    async def procesador(content, filename, reportar_etapa):
+        await reportar_etapa("analizando")
+        return {"filename": filename, "largo": len(content)}
+
+    async def escenario():
+        job_id = await runner.enviar(b"contenido", "ficha.txt", procesador)
+        await runner.esperar_pendientes()
+        return job_id
+
+    job = store.obtener(asyncio.run(escenario()))
+    assert job["estado"] == COMPLETADO
+    assert job["resultado"] == {"filename": "ficha.txt", "largo": 9}
+
+
+def test_job_con_error_registra_detalle(tmp_path):
+    store = DocumentJobStore(db_path=tmp_path / "jobs.sqlite3", ttl_segundos=60)
+    runner = DocumentJobRunner(store, workers=1)
+
+    async def procesador(content, filename, reportar_etapa):
+        raise ValueError("Formato no soportado")
+
+    async def escenario():
+        job_id = await runner.enviar(b"x", "a.doc", procesador)
+        await runner.esperar_pendientes()
+        return job_id
+
+    job = store.obtener(asyncio.run(escenario()))
+    assert job["estado"] == ERROR
+    assert "Formato no soportado" in job["error"]
+
+
+class Reloj:
+    def __init__(self, ahora=1_000.0):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_jobs_expirados_se_purgan(tmp_path):
+    reloj = Reloj()
+    store = DocumentJobStore(db_path=tmp_path / "jobs.sqlite3", ttl_segundos=1, reloj=reloj)
+    job_id = store.crear("a.pdf")
+    store.actualizar(job_id, estado=COMPLETADO, resultado={"ok": True})
+    assert store.obtener(job_id) is not None
+
+    reloj.ahora += 1.1
+    assert store.obtener(job_id) is None
+    assert store.purgar_expirados() == 1
+
+
+def test_job_sin_latido_se_da_por_interrumpido(tmp_path):
+    reloj = Reloj()
+    store = DocumentJobStore(db_path=tmp_path / "jobs.sqlite3", ttl_segundos=3600, lease_segundos=30, reloj=reloj)
+    vivo, caido = store.crear("a.pdf"), store.crear("b.pdf")
+    store.actualizar(vivo, estado=PROCESANDO)
+    store.actualizar(caido, estado=PROCESANDO)
+
+    # Solo el worker de "vivo" sigue renovando el lease
+    reloj.ahora += 20
+    store.latir(vivo)
+    reloj.ahora += 20
+    assert store.obtener(vivo)["estado"] == PROCESANDO
+    job = store.obtener(caido)
+    assert job["estado"] == ERROR and "interrumpido" in job["error"]
@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.document_selection import (
+    PAGE_BREAK,
+    dividir_en_chunks,
+    eliminar_encabezados_repetidos,
+    estimar_tokens,
+    puntuar_segmento,
+    seleccionar_contenido,
+)
+
+LEGAL = ("Términos y condiciones. La garantía no cubre mal uso. Todos los derechos reservados. "
+         "Documento confidencial del proveedor. ") * 6
+
+
+def _documento():
+    paginas = [
+        "ACME LTDA\nVALVULA BOLA\n\n" + LEGAL + "\nPágina 1 de 3",
+        "ACME LTDA\n" + LEGAL + "\n\n" + LEGAL + "\nPágina 2 de 3",
+        "ACME LTDA\nDiámetro: 1/2\"\nMaterial: INOX 316\nConexión: NPT\nPresión: 1000 PSI\nPágina 3 de 3",
+    ]
+    return PAGE_BREAK.join(paginas)
+
+
+def test_elimina_encabezados_y_pies_repetidos():
+    paginas = _documento().split(PAGE_BREAK)
+    limpias = eliminar_encabezados_repetidos(paginas)
+    assert all("ACME LTDA" not in p for p in limpias)
+    assert all("Página" not in p for p in limpias)
+    assert "Diámetro" in limpias[2]
+
+
+def test_specs_puntuan_mas_que_texto_legal():
+    assert puntuar_segmento("Diámetro: 1/2\"\nPresión: 1000 PSI") > puntuar_segmento(LEGAL)
+
+
+def test_seleccion_respeta_presupuesto_y_conserva_specs():
+    texto = _documento()
+    seleccion = seleccionar_contenido(texto, presupuesto_tokens=60)
+    assert estimar_tokens(seleccion) <= 60
+    assert "1000 PSI" in seleccion
+    assert "INOX 316" in seleccion
+    assert "VALVULA BOLA" in seleccion
+    # El truncado ciego del mismo tamaño pierde la tabla
+    assert "1000 PSI" not in texto[:60 * 4]
+
+
+def test_prosa_sin_especificaciones_no_selecciona_nada():
+    prosa = ("Las partes acuerdan que el presente contrato se rige por la legislación vigente "
+             "y que toda controversia será resuelta por los tribunales ordinarios.\n\n") * 60
+    assert seleccionar_contenido(prosa, presupuesto_tokens=200) == ""
+
+
+def test_texto_corto_se_envia_completo():
+    assert seleccionar_contenido("GUANTE NITRILO L", presupuesto_tokens=100) == "GUANTE NITRILO L"
+
+
+def test_chunks_respetan_tamano_y_no_pierden_lineas():
+    lineas = [f"Atributo {i}: {i} MM" for i in range(200)]
+    texto = "\n".join(lineas)
+    chunks = dividir_en_chunks(texto, tokens_por_chunk=50)
+    assert len(chunks) > 1
+    assert all(len(c) <= 50 * 4 for c in chunks)
+    assert "\n".join(chunks).splitlines() == lineas
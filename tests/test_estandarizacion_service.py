@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chatbot_solicitud_articulos.estandarizacion_service import (
+    construir_nombre,
+    prellenar_campos,
+)
+
+
+def test_prellenar_descarta_campos_desconocidos_y_calcula_faltantes():
+    resultado = prellenar_campos("wog", {"subtipo": "valvula bola", "color": "rojo"})
+    assert resultado["tipo"] == "WOG"
+    assert resultado["campos"] == {"subtipo": "VALVULA BOLA"}
+    assert "diametro" in resultado["campos_faltantes"]
+    assert resultado["nombre_propuesto"] is None
+
+
+def test_prellenar_completo_propone_nombre():
+    campos = {"subtipo": "VALVULA BOLA", "diametro": '1/2"', "material": "INOX 316", "conexion": "ROSCADA NPT"}
+    resultado = prellenar_campos("WOG", campos)
+    assert resultado["campos_faltantes"] == []
+    assert resultado["nombre_propuesto"] == construir_nombre("WOG", campos)["nombre"]
+
+
+def test_prellenar_categoria_invalida():
+    assert prellenar_campos(None, {}) is None
+    assert prellenar_campos("NO_EXISTE", {"x": "y"}) is None
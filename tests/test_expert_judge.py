@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.simulators import expert_judge as modulo_juez
+from tests.simulators.expert_judge import ExpertJudgeAgent, JudgmentCache
+from tests.simulators.parallel_runner import TokenCounter
+
+VEREDICTO = (
+    '{"valido": true, "puntuacion": 9, "existe_en_industria": true, "formato_correcto": true, '
+    '"campos_coherentes": true, "razonamiento": "individual"}'
+)
+# El lote responde solo los índices 0 y 1: el resto se juzga individualmente
+GUION = f"""
+latencia: {{ms: 0}}
+estructuradas:
+  JudgmentBatch:
+    veredictos:
+      - {{indice: 0, valido: true, puntuacion: 8, existe_en_industria: true, formato_correcto: true, campos_coherentes: true, razonamiento: lote}}
+      - {{indice: 1, valido: false, puntuacion: 3, existe_en_industria: true, formato_correcto: false, campos_coherentes: true, razonamiento: lote}}
+por_defecto:
+  - {{texto: '{VEREDICTO}'}}
+""".encode("utf-8")
+
+
+@pytest.fixture
+def juez(guion_stub, tmp_path):
+    guion_stub(GUION)
+    return ExpertJudgeAgent(cache=JudgmentCache(tmp_path))
+
+
+def test_cache_persistente_por_entradas_y_version_del_prompt(juez, tmp_path, monkeypatch):
+    contador = TokenCounter()
+    primero = juez.judge("EPP", "GUANTE NITRILO L", {"material": "NITRILO"}, callbacks=[contador])
+    assert primero.puntuacion == 9 and contador.calls == 1
+
+    # Otra instancia (otra corrida) sobre el mismo directorio: sin llamada al modelo
+    otro = ExpertJudgeAgent(cache=JudgmentCache(tmp_path))
+    assert otro.judge("EPP", "GUANTE NITRILO L", {"material": "NITRILO"}, callbacks=[contador]) == primero
+    assert contador.calls == 1 and otro.cache.stats()["hits"] == 1
+
+    # Cambian los datos originales o la versión del prompt: se juzga de nuevo
+    otro.judge("EPP", "GUANTE NITRILO L", {"material": "LATEX"}, callbacks=[contador])
+    monkeypatch.setattr(modulo_juez, "JUDGE_PROMPT_VERSION", "2")
+    otro.judge("EPP", "GUANTE NITRILO L", {"material": "NITRILO"}, callbacks=[contador])
+    assert contador.calls == 3
+
+
+def test_lote_una_llamada_con_cache_y_fallback_individual(juez):
+    items = [
+        {"standardized_name": "GUANTE NITRILO L", "original_input": {"talla": "L"}},
+        {"standardized_name": "CASCO BLANCO", "original_input": {"color": "BLANCO"}},
+        {"standardized_name": "GUANTE NITRILO L", "original_input": {"talla": "L"}},  # duplicado
+        {"standardized_name": "LENTE CLARO", "original_input": {"color": "CLARO"}},
+    ]
+    contador = TokenCounter()
+    resultados = juez.judge_batch("EPP", items, callbacks=[contador])
+    # 1 llamada de lote (3 artículos únicos) + 1 individual para el índice omitido por el modelo
+    assert contador.calls == 2
+    assert [r.puntuacion for r in resultados] == [8, 3, 8, 9]
+    assert resultados[0].razonamiento == "lote" and resultados[3].razonamiento == "individual"
+
+    # Segunda corrida: todo desde el cache
+    contador = TokenCounter()
+    assert juez.judge_batch("EPP", items, callbacks=[contador]) == resultados
+    assert contador.calls == 0
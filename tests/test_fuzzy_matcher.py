@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chatbot_solicitud_articulos.fuzzy_matcher import ajustar_a_estandar, distancia_acotada
+
+MATERIALES = ["INOX 304", "INOX 316", "ACERO CARBONO", "GALVANIZADO", "BRONCE", "PVC", "CPVC"]
+
+
+def test_corrige_typos_y_acentos():
+    assert ajustar_a_estandar("galbanizado", MATERIALES).valor == "GALVANIZADO"
+    assert ajustar_a_estandar("canería", ["CAÑERIA", "CODO 90"]).confianza == 1.0
+    assert ajustar_a_estandar("cabritiya", ["CABRITILLA", "NITRILO"]).valor == "CABRITILLA"
+
+
+def test_no_corrige_medidas_ni_valores_cortos_ni_ambiguos():
+    assert ajustar_a_estandar("INOX 318", MATERIALES) is None
+    assert ajustar_a_estandar('1/3"', ['1/2"', '3/4"']) is None
+    assert ajustar_a_estandar("PVX", MATERIALES) is None
+    assert ajustar_a_estandar("BRONZE", MATERIALES).valor == "BRONCE"
+    assert ajustar_a_estandar("TORNILLO", MATERIALES) is None
+
+
+def test_distancia_acotada():
+    assert distancia_acotada("GALBANIZADO", "GALVANIZADO", 2) == 1
+    assert distancia_acotada("ABCDEF", "UVWXYZ", 2) == 3
@@ -0,0 +1,102 @@
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.historial import FSYNC_SIEMPRE, EscritorHistorial
+
+
+def _lineas(ruta):
+    abrir = gzip.open if str(ruta).endswith(".gz") else open
+    with abrir(ruta, "rt", encoding="utf-8") as f:
+        return [json.loads(l) for l in f]
+
+
+def test_escribe_por_lotes_y_vacia_al_cerrar(tmp_path):
+    ruta = tmp_path / "historial.jsonl"
+    escritor = EscritorHistorial(ruta, fsync=FSYNC_SIEMPRE)
+    for i in range(500):
+        assert escritor.registrar({"i": i, "texto": "ñandú"})
+    escritor.cerrar()
+    assert [r["i"] for r in _lineas(ruta)] == list(range(500))
+    assert escritor.escritos == 500
+
+
+def test_cola_llena_descarta_sin_bloquear(tmp_path):
+    escritor = EscritorHistorial(tmp_path / "h.jsonl", max_cola=2)
+    # El hilo aún no existe: la cola no se consume
+    escritor._hilo = object()
+    resultados = [escritor.registrar({"i": i}) for i in range(5)]
+    assert resultados == [True, True, False, False, False]
+    assert escritor.descartados == 3
+
+
+def test_rotacion_por_tamano_y_periodo_comprime(tmp_path):
+    ruta = tmp_path / "historial.jsonl"
+    escritor = EscritorHistorial(ruta, max_bytes=200, rotacion_segundos=0, max_rotados=2)
+    for i in range(7):
+        escritor._escribir_lote([json.dumps({"i": i, "relleno": "x" * 60}) + "\n"])
+    rotados = escritor.rotados()
+    # Líneas de ~80 bytes con tope de 200: dos por archivo, tres rotaciones y se conservan 2
+    assert len(rotados) == 2 and all(p.name.endswith(".jsonl.gz") for p in rotados)
+    assert [r["i"] for p in rotados for r in _lineas(p)] + [r["i"] for r in _lineas(ruta)] == [2, 3, 4, 5, 6]
+
+    # Rotación por período: la última escritura fue en un período anterior
+    periodico = EscritorHistorial(tmp_path / "p.jsonl", rotacion_segundos=3600, max_bytes=0)
+    periodico._escribir_lote(['{"dia": 1}\n'])
+    ayer = time.time() - 86400
+    os.utime(periodico.ruta, (ayer, ayer))
+    periodico._escribir_lote(['{"dia": 2}\n'])
+    assert len(periodico.rotados()) == 1
+    assert _lineas(periodico.ruta) == [{"dia": 2}]
+
+
+def _turno(ts, sesion, turno, estado="en_proceso", opciones=(), usuario="x", duracion=100.0, tipo=None):
+    return {
+        "timestamp": ts, "sesion_id": sesion, "turno": turno, "duracion_ms": duracion, "tipo": tipo,
+        "usuario": usuario, "opciones_mostradas": list(opciones), "accion_sugerida": "preguntar",
+        "estado_final": estado,
+    }
+
+
+def test_cli_analiza_rotados_y_rango_con_indice(tmp_path):
+    from app.cli.historial import analizar
+
+    ruta = tmp_path / "historial.jsonl"
+    rotado = tmp_path / "historial.20250130-235959-000000.jsonl.gz"
+    with gzip.open(rotado, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(_turno("2025-01-30T10:00:00", "a", 1, opciones=["NITRILO", "LATEX"])) + "\n")
+        f.write(json.dumps(_turno("2025-01-30T10:01:00", "a", 2, "listo", usuario="nitrilo", tipo="EPP")) + "\n")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(json.dumps(_turno("2025-01-31T09:00:00", "b", 1, duracion=900.0)) + "\n")
+        f.write("{corrupta\n")
+        f.write(json.dumps(_turno("2025-01-31T09:30:00", "b", 2, opciones=["A"])) + "\n")
+        f.write(json.dumps(_turno("2025-01-31T09:31:00", "b", 3, "listo", usuario="otra", tipo="EPP")) + "\n")
+    indice = tmp_path / "indice.json"
+
+    reporte = analizar(ruta, ruta_indice=indice)
+    assert reporte["turnos"] == 5 and reporte["lineas_invalidas"] == 1
+    conversaciones = reporte["conversaciones"]
+    assert conversaciones["iniciadas"] == 2 and conversaciones["tasa_completado"] == 1.0
+    assert conversaciones["turnos_hasta_completar"]["distribucion"] == {"2": 1, "3": 1}
+    assert conversaciones["por_tipo"]["EPP"] == {"completadas": 2, "turnos_promedio": 2.5}
+    assert reporte["opciones"]["respuestas_a_opciones"] == 2
+    assert reporte["opciones"]["tasa_eleccion"] == 0.5
+    assert reporte["opciones"]["mas_elegidas"] == {"NITRILO": 1}
+    assert reporte["throughput"]["pico"] == {"hora": "2025-01-31T09", "turnos": 3}
+    assert reporte["patrones_lentos"][0]["max_ms"] == 900.0
+
+    # El rango salta el rotado completo sin abrirlo (según el índice)
+    del_dia = analizar(ruta, desde="2025-01-31", ruta_indice=indice)
+    assert del_dia["turnos"] == 3
+    assert [a["leido"] for a in del_dia["archivos"]] == [False, True]
+
+    # Índice incremental: el archivo activo solo creció
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write(json.dumps(_turno("2025-02-01T00:10:00", "c", 1)) + "\n")
+    assert analizar(ruta, desde="2025-02-01", ruta_indice=indice)["turnos"] == 1
+    entrada = json.loads(indice.read_text())["archivos"]["historial.jsonl"]
+    assert entrada["lineas"] == 4 and set(entrada["dias"]) == {"2025-01-31", "2025-02-01"}
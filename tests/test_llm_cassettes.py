@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.llm_cassettes import (
+    MODO_RECORD, MODO_REPLAY, CassetteNoEncontrado, ChatCassette, envolver_en_cassette, latencia_replay,
+)
+
+
+class FakeConTools(GenericFakeChatModel):
+    """Modelo real simulado: registra las opciones en formato de proveedor que recibe."""
+    recibidas: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.recibidas.append(kwargs)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+@tool
+def consultar_stock(codigo: str) -> str:
+    """Stock de un artículo."""
+    return f"{codigo}: 12 unidades"
+
+
+def _agente(modelo):
+    from langchain.agents import create_agent
+    return create_agent(model=modelo, tools=[consultar_stock], system_prompt="Eres un asistente.")
+
+
+def _respuestas():
+    return iter([
+        AIMessage(content="", tool_calls=[{"name": "consultar_stock", "args": {"codigo": "A1"}, "id": "call_1"}]),
+        AIMessage(content="Hay 12 unidades de A1.", usage_metadata={"input_tokens": 50, "output_tokens": 8, "total_tokens": 58}),
+    ])
+
+
+def test_graba_y_reproduce_un_turno_con_tool_calls(tmp_path):
+    real = FakeConTools(messages=_respuestas())
+    grabador = ChatCassette(model="claude-demo", modo=MODO_RECORD, directorio=tmp_path, fabrica=lambda: real)
+    entrada = {"messages": [HumanMessage(content="¿stock de A1?")]}
+    grabado = _agente(grabador).invoke(entrada)
+
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    # El modelo real recibió las tools convertidas por su propio bind_tools
+    assert real.recibidas[0]["tools"][0]["function"]["name"] == "consultar_stock"
+
+    # Replay sin modelo real (sin red ni API key)
+    reproductor = ChatCassette(model="claude-demo", modo=MODO_REPLAY, directorio=tmp_path, latencia="0")
+    reproducido = _agente(reproductor).invoke(entrada)
+    assert [m.content for m in reproducido["messages"]] == [m.content for m in grabado["messages"]]
+    assert reproducido["messages"][1].tool_calls[0]["args"] == {"codigo": "A1"}
+    assert reproducido["messages"][-1].usage_metadata["input_tokens"] == 50
+
+    with pytest.raises(CassetteNoEncontrado):
+        _agente(reproductor).invoke({"messages": [HumanMessage(content="otra pregunta")]})
+
+
+async def _ainvocar(modelo, texto):
+    return await modelo.ainvoke([HumanMessage(content=texto)])
+
+
+def test_async_auto_y_latencia(tmp_path):
+    import asyncio
+
+    real = FakeConTools(messages=iter([AIMessage(content="uno")]))
+    auto = ChatCassette(model="m", modo="auto", directorio=tmp_path, fabrica=lambda: real, latencia="0")
+    assert asyncio.run(_ainvocar(auto, "hola")).content == "uno"
+    # La segunda vez sale del cassette: el modelo real ya no tiene respuestas
+    assert asyncio.run(_ainvocar(auto, "hola")).content == "uno"
+
+    assert latencia_replay(1500, "original") == 1.5
+    assert latencia_replay(1500, "250") == 0.25
+    assert envolver_en_cassette("m", lambda: real, modo="off") is real
+    with pytest.raises(ValueError):
+        envolver_en_cassette("m", lambda: real, modo="grabar")
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import anthropic
+import pytest
+from langchain_core.messages import HumanMessage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.llm_stub import ChatStub, Latencia, _compilar_guion
+
+GUION = b"""
+latencia: {distribucion: fija, ms: 0}
+estructuradas:
+  IncidentAnalysisResponse: {analisis_5_porque: "1..5", causa_raiz: "falta de inspeccion"}
+endpoints:
+  /chatbot-solicitud-articulos/estandarizar:
+    turnos:
+      - - {tool: preguntar_con_opciones, args: {mensaje: "Material?", opciones: [NITRILO, LATEX]}}
+        - {texto: "Material?"}
+      - - {tool: finalizar_estandarizacion, args: {tipo: EPP, nombre_estandarizado: GUANTE NITRILO, campos_extraidos: {}}}
+        - {texto: "Listo."}
+"""
+
+
+@pytest.fixture
+def stub(guion_stub, monkeypatch):
+    """Backend stub sin latencia (ver conftest) y sin escribir el historial."""
+    from app.routers import chatbot_solicitud_articulos
+
+    guion_stub(GUION)
+    registros = []
+    monkeypatch.setattr(chatbot_solicitud_articulos.escritor_historial, "registrar", registros.append)
+    return registros
+
+
+def test_latencias_y_salida_estructurada(stub):
+    import random
+    azar = random.Random(1)
+    muestras = [Latencia("lognormal", {"mediana_ms": 100, "sigma": 0.5}).muestrear(azar) for _ in range(2000)]
+    assert 0.08 < sorted(muestras)[1000] < 0.12
+    assert Latencia("normal", {"media_ms": -50, "desvio_ms": 1}).muestrear(azar) == 0
+
+    from app.agents.hse_agent import get_hse_agent
+    resultado = get_hse_agent("stub").invoke({"messages": [HumanMessage(content="incidente")]})
+    assert resultado["structured_response"].causa_raiz == "falta de inspeccion"
+
+
+def test_estandarizar_con_guion_por_turno(stub):
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    primero = client.post("/chatbot-solicitud-articulos/estandarizar", json={"mensaje": "necesito guantes"}).json()
+    assert primero["opciones"] == ["NITRILO", "LATEX"] and not primero["listo_para_crear"]
+
+    contexto = [{"rol": "usuario", "contenido": "necesito guantes"}, {"rol": "asistente", "contenido": primero["mensaje"]}]
+    respuesta = client.post(
+        "/chatbot-solicitud-articulos/estandarizar", json={"mensaje": "NITRILO", "contexto_conversacion": contexto}
+    )
+    segundo = respuesta.json()
+    assert segundo["listo_para_crear"] and segundo["articulo_identificado"]["nombre_estandarizado"] == "GUANTE NITRILO"
+    # Tokens simulados: el costo se contabiliza igual que con el modelo real
+    assert float(respuesta.headers["X-LLM-Cost-USD"]) > 0
+    assert [r["turno"] for r in stub] == [1, 2]
+
+
+def test_errores_inyectados_con_excepciones_del_sdk():
+    guion = _compilar_guion(b"latencia: {ms: 0}\nerrores: {tasa_429: 1}", None)
+    with pytest.raises(anthropic.RateLimitError) as error:
+        ChatStub(model="m", guion=guion).invoke("hola")
+    assert error.value.status_code == 429
+
+    guion = _compilar_guion(b"errores: {tasa_529: 1}", None)
+    with pytest.raises(anthropic.OverloadedError):
+        ChatStub(model="m", guion=guion).invoke("hola")
+
+    guion = _compilar_guion(b"errores: {tasa_timeout: 1, timeout_ms: 1}", None)
+    with pytest.raises(anthropic.APITimeoutError):
+        ChatStub(model="m", guion=guion, semilla=3).invoke("hola")
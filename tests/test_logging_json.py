@@ -0,0 +1,74 @@
+import io
+import json
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import logging_json
+from app.services.logging_json import LoggingJSON, asignar_request_id, cabeceras_correlacion, liberar_request_id, muestrear
+
+
+def test_eventos_json_con_request_id_desde_otro_hilo():
+    salida = io.StringIO()
+    config = LoggingJSON("prueba_json")
+    config.iniciar(logging.StreamHandler(salida))
+    request_id, token = asignar_request_id("abc-123")
+    try:
+        assert cabeceras_correlacion() == {"X-Request-ID": "abc-123"}
+        config.logger.info("hola %s", "mundo", extra={"campos": {"status": 200}})
+    finally:
+        liberar_request_id(token)
+    config.logger.info("sin request")
+    config.detener()
+
+    eventos = [json.loads(l) for l in salida.getvalue().splitlines()]
+    assert eventos[0]["msg"] == "hola mundo" and eventos[0]["request_id"] == "abc-123"
+    assert eventos[0]["status"] == 200 and eventos[0]["level"] == "INFO"
+    assert "request_id" not in eventos[1]
+
+
+def test_request_id_invalido_se_reemplaza_y_cola_llena_descarta():
+    request_id, token = asignar_request_id("malo\nX-Inyectado: 1")
+    liberar_request_id(token)
+    assert len(request_id) == 32 and "\n" not in request_id
+
+    config = LoggingJSON("prueba_llena", max_cola=2)
+    antes = logging_json.logs_descartados.valor("prueba_llena")
+    for i in range(5):
+        config.logger.info("evento %d", i)  # sin listener: la cola no se consume
+    assert logging_json.logs_descartados.valor("prueba_llena") - antes == 3
+
+
+def test_muestreo_conserva_errores_y_lentas():
+    assert not muestrear(200, 10, tasa=0.0)
+    assert muestrear(404, 10, tasa=0.0)
+    assert muestrear(200, logging_json.LOG_SLOW_MS, tasa=0.0)
+
+
+def test_middleware_devuelve_y_propaga_request_id():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    respuesta = client.get("/", headers={"X-Request-ID": "req-42"})
+    assert respuesta.headers["X-Request-ID"] == "req-42"
+    assert len(client.get("/").headers["X-Request-ID"]) == 32
+
+
+def test_plantilla_ruta_incluye_prefijo_del_router(costos_temporales, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    from app.services.metrics import http_duracion
+
+    monkeypatch.setenv("PROXY_SECRET", "secreto")
+    client = TestClient(main.app)
+    antes = http_duracion.conteo("GET", "/costos/presupuesto", "200")
+    client.get("/costos/presupuesto", headers={"X-Proxy-Secret": "secreto"})
+    assert http_duracion.conteo("GET", "/costos/presupuesto", "200") - antes == 1
+    # Con parámetros de ruta se registra la plantilla, no el path concreto
+    plantilla = "/chatbot-solicitud-articulos/analizar-documento/jobs/{job_id}"
+    antes = http_duracion.conteo("GET", plantilla, "404")
+    client.get("/chatbot-solicitud-articulos/analizar-documento/jobs/no-existe")
+    assert http_duracion.conteo("GET", plantilla, "404") - antes == 1
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import metrics
+from app.services.llm_utils import construir_run_config
+from app.services.metrics import RegistroMetricas
+
+
+def test_exposicion_histograma_acumulado_y_escape():
+    registro = RegistroMetricas()
+    latencia = registro.histograma("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0))
+    contador = registro.contador("demo_total", "Demo", ("tool",))
+    for valor in (0.05, 0.1, 0.5, 3.0):
+        latencia.observar(valor, "/x")
+    contador.inc('a"b', valor=2)
+
+    texto = registro.exponer()
+    assert 'demo_seconds_bucket{route="/x",le="0.1"} 2' in texto
+    assert 'demo_seconds_bucket{route="/x",le="1"} 3' in texto
+    assert 'demo_seconds_bucket{route="/x",le="+Inf"} 4' in texto
+    assert 'demo_seconds_count{route="/x"} 4' in texto
+    assert 'demo_total{tool="a\\"b"} 2' in texto
+    assert "# TYPE demo_seconds histogram" in texto
+
+
+def test_callbacks_registran_tokens_llm_y_tools():
+    uso = {"input_tokens": 10, "output_tokens": 3, "total_tokens": 13, "input_token_details": {"cache_read": 4}}
+    modelo = GenericFakeChatModel(messages=iter([AIMessage(content="hola", usage_metadata=uso)]))
+    antes = {t: metrics.llm_tokens.valor("desconocido", t) for t in ("input", "output", "cache_read")}
+    modelo.invoke("x", config=construir_run_config())
+    assert metrics.llm_tokens.valor("desconocido", "input") - antes["input"] == 10
+    assert metrics.llm_tokens.valor("desconocido", "output") - antes["output"] == 3
+    assert metrics.llm_tokens.valor("desconocido", "cache_read") - antes["cache_read"] == 4
+
+    @tool
+    def herramienta_demo(texto: str) -> str:
+        """Eco."""
+        if texto == "falla":
+            raise ValueError("x")
+        return texto
+
+    antes = {e: metrics.tool_llamadas.valor("herramienta_demo", e) for e in ("ok", "error")}
+    antes_duracion = metrics.tool_duracion.conteo("herramienta_demo")
+    herramienta_demo.invoke({"texto": "a"}, config=construir_run_config())
+    with pytest.raises(ValueError):
+        herramienta_demo.invoke({"texto": "falla"}, config=construir_run_config())
+    assert metrics.tool_llamadas.valor("herramienta_demo", "ok") - antes["ok"] == 1
+    assert metrics.tool_llamadas.valor("herramienta_demo", "error") - antes["error"] == 1
+    assert metrics.tool_duracion.conteo("herramienta_demo") - antes_duracion == 2
+
+
+def test_recolector_de_caches():
+    texto = metrics.registro.exponer()
+    for cache in ("documentos", "normalizacion", "dimensiones", "fuzzy"):
+        assert f'cache_hit_ratio{{cache="{cache}"}}' in texto
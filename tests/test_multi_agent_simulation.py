@@ -2,6 +2,7 @@ import sys
 import os
 import yaml
 import random
+import time
 from dotenv import load_dotenv
 
 # Cargar variables de entorno (API Keys)
@@ -12,11 +13,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
 from app.agents.chatbot_solicitud_articulos_agent import get_estandarizacion_agent
+from app.routers.chatbot_solicitud_articulos import ENDPOINT_ESTANDARIZAR
+from app.services.ruteo_modelos import modelo_rutinario
 from tests.simulators.user_simulator import UserSimulatorAgent
+from tests.simulators.shared_backoff import shared_backoff
 from langchain_core.messages import HumanMessage, AIMessage
 
 # Preparamos el agente a testear (Chatbot)
-chatbot_agent = get_estandarizacion_agent()
+chatbot_agent = get_estandarizacion_agent(modelo_rutinario(ENDPOINT_ESTANDARIZAR))
 
 def load_categories_config():
     """Carga y parsea el archivo de configuración YAML."""
@@ -24,8 +28,11 @@ def load_categories_config():
     with open(config_path, 'r', encoding='utf-8') as f:
         return yaml.safe_load(f)
 
-def generate_article_details(category_config):
-    """Genera datos de ejemplo válidos para una categoría basados en su config."""
+def generate_article_details(category_config, rng=random):
+    """
+    Genera datos de ejemplo válidos para una categoría basados en su config.
+    `rng` permite una semilla por simulación (corridas reproducibles en paralelo).
+    """
     details = {}
     if 'campos' not in category_config:
         return {"descripcion": "Articulo generico de prueba"}
@@ -33,7 +40,7 @@ def generate_article_details(category_config):
     for field_name, rules in category_config['campos'].items():
         # Si tiene valores estándar, elegimos uno al azar
         if 'valores_estandar' in rules and rules['valores_estandar']:
-            val = random.choice(rules['valores_estandar'])
+            val = rng.choice(rules['valores_estandar'])
             details[field_name] = val
         # Si es texto libre o no tiene lista, inventamos algo genérico
         elif rules.get('tipo') == 'texto_libre':
@@ -114,18 +121,37 @@ def is_success_message_heuristic(text: str) -> bool:
     return any(k in text_lower for k in keywords)
 
 
-def run_simulation(category: str, user_profile: str, article_details: dict = None, max_turns: int = 20):
+def run_simulation(
+    category: str,
+    user_profile: str,
+    article_details: dict = None,
+    max_turns: int = 20,
+    verbose: bool = True,
+    callbacks: list = None,
+    metrics: dict = None,
+):
     """
     Ejecuta una simulación completa de conversación entre:
     1. Chatbot (Sistema real)
     2. User Simulator (Agente de prueba)
+
+    Args:
+        verbose: Imprimir la conversación (en paralelo conviene desactivarlo)
+        callbacks: Callbacks de LangChain para las llamadas del chatbot y del simulador
+        metrics: Si se entrega, se completa con 'turnos' (turnos del chatbot ejecutados)
+                 y 'error' si la simulación se cortó por una excepción
     
     Returns:
         tuple: (success: bool, standardized_name: str or None, conversation: str)
     """
-    print(f"\n\n{'='*60}")
-    print(f"   SIMULACIÓN: CATEGORÍA '{category}' | PERFIL '{user_profile.upper()}'")
-    print(f"{'='*60}")
+    log = print if verbose else (lambda *args, **kwargs: None)
+    metrics = metrics if metrics is not None else {}
+    metrics["turnos"] = 0
+    config = {"callbacks": callbacks or []}
+
+    log(f"\n\n{'='*60}")
+    log(f"   SIMULACIÓN: CATEGORÍA '{category}' | PERFIL '{user_profile.upper()}'")
+    log(f"{'='*60}")
     
     # Inicializar simulador con detalles específicos
     user_sim = UserSimulatorAgent(role_profile=user_profile)
@@ -139,19 +165,20 @@ def run_simulation(category: str, user_profile: str, article_details: dict = Non
     last_detected_name = None
     
     # El usuario sim siempre inicia
-    initial_message = user_sim.generate_response([])
-    print(f"\n[USUARIO - {user_profile}]: {initial_message}")
+    initial_message = retry_with_backoff(lambda: user_sim.generate_response([], callbacks=callbacks))
+    log(f"\n[USUARIO - {user_profile}]: {initial_message}")
     
     chat_history_for_bot.append(HumanMessage(content=initial_message))
     chat_history_for_sim.append({"role": "user", "content": initial_message})
     
     for i in range(max_turns):
-        print(f"\n--- Turno {i+1} ---")
+        log(f"\n--- Turno {i+1} ---")
+        metrics["turnos"] = i + 1
         
         # 1. Turno del Chatbot
         try:
             def call_chatbot():
-                return chatbot_agent.invoke({"messages": chat_history_for_bot})
+                return chatbot_agent.invoke({"messages": chat_history_for_bot}, config=config)
                 
             response = retry_with_backoff(call_chatbot)
             bot_msg_full = response["messages"][-1]
@@ -169,9 +196,9 @@ def run_simulation(category: str, user_profile: str, article_details: dict = Non
             possible_name = extract_standardized_name(bot_text)
             if possible_name:
                 last_detected_name = possible_name
-                print(f"   [DEBUG] Nombre detectado: '{last_detected_name}'")
+                log(f"   [DEBUG] Nombre detectado: '{last_detected_name}'")
                 
-            print(f"[BOT]: {bot_text}")
+            log(f"[BOT]: {bot_text}")
             
             # Guardar en historiales
             chat_history_for_bot.append(AIMessage(content=bot_msg_full.content))
@@ -185,7 +212,7 @@ def run_simulation(category: str, user_profile: str, article_details: dict = Non
                         tc_name = tc['args'].get('nombre_estandarizado')
                         final_name = tc_name if tc_name else last_detected_name
                         
-                        print(f"\n>>> ¡ÉXITO! El chatbot finalizó: {final_name}\n")
+                        log(f"\n>>> ¡ÉXITO! El chatbot finalizó: {final_name}\n")
                         conversation = "\n".join([f"{m['role']}: {m['content']}" for m in chat_history_for_sim])
                         return True, final_name, conversation
             
@@ -198,27 +225,28 @@ def run_simulation(category: str, user_profile: str, article_details: dict = Non
                 # Usar el nombre que acabamos de extraer o el último visto
                 final_name = possible_name if possible_name else last_detected_name
                 
-                print(f"\n>>> ÉXITO IMPLÍCITO (Detectado por heurística). Nombre: {final_name}\n")
+                log(f"\n>>> ÉXITO IMPLÍCITO (Detectado por heurística). Nombre: {final_name}\n")
                 conversation = "\n".join([f"{m['role']}: {m['content']}" for m in chat_history_for_sim])
                 return True, final_name, conversation
 
         except Exception as e:
-            print(f">>> ERROR en el chatbot: {e}")
+            log(f">>> ERROR en el chatbot: {e}")
+            metrics["error"] = f"chatbot: {e}"
             conversation = "\n".join([f"{m['role']}: {m['content']}" for m in chat_history_for_sim])
             return False, None, conversation
             
         # 2. Turno del Usuario Simulado
         try:
             def call_simulator():
-                return user_sim.generate_response(chat_history_for_sim)
+                return user_sim.generate_response(chat_history_for_sim, callbacks=callbacks)
                 
             user_response = retry_with_backoff(call_simulator)
-            print(f"[USUARIO - {user_profile}]: {user_response}")
+            log(f"[USUARIO - {user_profile}]: {user_response}")
             
             # FAILSAFE 1: Detección explícita de fin de simulación por palabra clave
             if "TERMINAR_SIMULACION" in user_response:
                 final_name = last_detected_name if last_detected_name else "NOMBRE_NO_DETECTADO"
-                print(f"\n>>> ÉXITO: Usuario finalizó voluntariamente. Nombre: {final_name}\n")
+                log(f"\n>>> ÉXITO: Usuario finalizó voluntariamente. Nombre: {final_name}\n")
                 conversation = "\n".join([f"{m['role']}: {m['content']}" for m in chat_history_for_sim])
                 
                 # Si terminamos pero no tenemos nombre, marcamos como éxito parcial (pero éxito al fin) para avanzar
@@ -227,27 +255,33 @@ def run_simulation(category: str, user_profile: str, article_details: dict = Non
             # FAILSAFE 2: Si el usuario dice GRACIAS/CONFIRMO repetidamente (Legacy support)
             if user_response.strip().upper().startswith(("GRACIAS", "¡GRACIAS", "CONFIRMO", "PERFECTO", "MUCHAS GRACIAS")):
                  if last_detected_name:
-                     print(f"\n>>> ÉXITO: Usuario confirmó cierre y tenemos nombre ({last_detected_name}). Finalizando.\n")
+                     log(f"\n>>> ÉXITO: Usuario confirmó cierre y tenemos nombre ({last_detected_name}). Finalizando.\n")
                      conversation = "\n".join([f"{m['role']}: {m['content']}" for m in chat_history_for_sim])
                      return True, last_detected_name, conversation
             
             chat_history_for_bot.append(HumanMessage(content=user_response))
             chat_history_for_sim.append({"role": "user", "content": user_response})
         except Exception as e:
-             print(f">>> ERROR en el simulador: {e}")
+             log(f">>> ERROR en el simulador: {e}")
+             metrics["error"] = f"simulador: {e}"
              conversation = "\n".join([f"{m['role']}: {m['content']}" for m in chat_history_for_sim])
              return False, None, conversation
 
-    print(f"\n>>> FALLO: Se alcanzaron los {max_turns} turnos sin estandarización.\n")
+    log(f"\n>>> FALLO: Se alcanzaron los {max_turns} turnos sin estandarización.\n")
     conversation = "\n".join([f"{m['role']}: {m['content']}" for m in chat_history_for_sim])
     return False, None, conversation
 
 
 def retry_with_backoff(func, max_retries=3):
-    """Ejecuta una función con reintentos exponenciales para errores de sobrecarga."""
+    """
+    Ejecuta una función con reintentos exponenciales para errores de sobrecarga.
+    La espera es compartida (ver simulators/shared_backoff.py): con simulaciones
+    en paralelo, un 429/529 pausa a todos los hilos, no solo al que falló.
+    """
     from anthropic import APIStatusError, APITimeoutError, RateLimitError
     
     for attempt in range(max_retries):
+        shared_backoff.wait()
         try:
             return func()
         except (APIStatusError, APITimeoutError, RateLimitError) as e:
@@ -262,7 +296,7 @@ def retry_with_backoff(func, max_retries=3):
                 raise e
             wait_time = (2 ** attempt) + random.uniform(0, 1)
             print(f"⚠️ API sobrecargada (Status {e.status_code}). Reintentando en {wait_time:.1f}s...")
-            time.sleep(wait_time)
+            shared_backoff.penalize(wait_time)
         except Exception as e:
             # Si es otro error, propagar inmediatamente
             raise e
@@ -270,8 +304,6 @@ def retry_with_backoff(func, max_retries=3):
 
 if __name__ == "__main__":
     import argparse
-    import random
-    import time
     
     # Configuración de argumentos por línea de comandos
     parser = argparse.ArgumentParser(description="Simulación de Estandarización de Artículos con Agentes AI")
@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chatbot_solicitud_articulos.normalizacion_utils import (
+    normalizar_valor,
+    normalizar_valores_batch,
+)
+from tests.benchmarks.bench_normalizacion import generar_corpus, normalizar_valor_referencia
+
+CASOS_BORDE = [
+    ("COD SKU 12 34", None), ("T.  MARCA 3M", "marca"), ("(  m )", "talla"), ("sin talla", "talla"),
+    ("7 pulg. x 2 mts", None), ("filtro de aire", "repuesto"), ("cabo de vida", None),
+    ("con hilo", "conexion"), ("5 lts2 kg", None), ("", None), (None, "talla"),
+]
+
+
+def test_equivalente_a_implementacion_original():
+    corpus = generar_corpus(20_000, seed=7) + CASOS_BORDE
+    for valor, campo in corpus:
+        assert normalizar_valor(valor, campo) == normalizar_valor_referencia(valor, campo), (valor, campo)
+
+
+def test_batch_preserva_orden_y_resultados():
+    valores = ["  talla small", "(XL)", "", "sin talla", "talla small"]
+    assert normalizar_valores_batch(valores, "talla") == [normalizar_valor(v, "talla") for v in valores]
+    assert normalizar_valores_batch(["20 litros", None], None) == ["20L", ""]
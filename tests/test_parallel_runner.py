@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.simulators.shared_backoff import SharedBackoff
+
+# Chatbot: finaliza en cada turno; el usuario simulado recibe el texto degradado
+GUION = b"""
+latencia: {distribucion: fija, ms: 5}
+por_defecto:
+  - {tool: finalizar_estandarizacion, args: {tipo: EPP, nombre_estandarizado: GUANTE NITRILO M, campos_extraidos: {}}}
+  - {texto: "Listo, estandarizado exitosamente. Nombre final: GUANTE NITRILO M"}
+"""
+
+
+@pytest.fixture
+def simulacion_stub(guion_stub, monkeypatch):
+    from app.agents.chatbot_solicitud_articulos_agent import get_estandarizacion_agent
+    import tests.test_multi_agent_simulation as simulacion
+
+    guion_stub(GUION)
+    monkeypatch.setattr(simulacion, "chatbot_agent", get_estandarizacion_agent(simulacion.modelo_rutinario(simulacion.ENDPOINT_ESTANDARIZAR)))
+    return simulacion
+
+
+def test_runner_paralelo_reporte_por_categoria_y_perfil(simulacion_stub):
+    from tests.simulators.parallel_runner import build_cases, build_report, run_parallel
+
+    config = simulacion_stub.load_categories_config()
+    casos = build_cases(config, ["EPP", "WOG"], ["standard", "expert"], 2, seed=7)
+    # Datos deterministas por (seed, categoría, perfil, iteración)
+    assert casos == build_cases(config, ["EPP", "WOG"], ["standard", "expert"], 2, seed=7)
+    assert [c.details for c in casos] != [c.details for c in build_cases(config, ["EPP", "WOG"], ["standard", "expert"], 2, seed=8)]
+
+    inicio = time.perf_counter()
+    registros, wall_clock = run_parallel(casos, concurrency=4, max_turns=4)
+    assert [r["semilla"] for r in registros] == [c.seed for c in casos]
+    assert all(r["exito"] and r["nombre"] == "GUANTE NITRILO M" and r["turnos"] == 2 for r in registros)
+    # Cada simulación hace ~6 llamadas de 5 ms: en paralelo el total es menor que la suma
+    assert wall_clock <= time.perf_counter() - inicio
+    assert wall_clock < sum(r["duracion_s"] for r in registros)
+
+    reporte = build_report(registros, wall_clock, {"concurrencia": 4})
+    assert reporte["total"]["simulaciones"] == 8 and reporte["total"]["tasa_exito"] == 1.0
+    assert reporte["total"]["tokens"]["total"] > 0 and reporte["total"]["tokens"]["llamadas"] == 8 * 6
+    assert set(reporte["por_categoria_perfil"]["EPP"]) == {"standard", "expert"}
+    assert reporte["por_perfil"]["expert"]["simulaciones"] == 4
+    assert reporte["por_categoria"]["WOG"]["turnos"]["promedio"] == 2
+
+
+def test_backoff_compartido_pausa_a_todos():
+    backoff = SharedBackoff()
+    assert backoff.wait() == 0
+    backoff.penalize(0.05)
+    backoff.penalize(0.01)  # no acorta la pausa vigente
+    inicio = time.perf_counter()
+    backoff.wait()
+    assert time.perf_counter() - inicio >= 0.04
+    assert backoff.stats()["eventos"] == 2
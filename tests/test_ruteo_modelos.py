@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import ruteo_modelos
+from app.services.costos import ContextoCosto, CostStore, EstadoPresupuesto
+from app.services.metrics import ruteo_duracion
+from app.services.ruteo_modelos import FallosValidacion, SenalesRuteo, _compilar, decidir_modelo
+
+CONFIG = b"""
+por_defecto:
+  rutinario: barato
+  escalado: caro
+endpoints:
+  /estandarizar:
+    confianza_minima: baja
+    max_turnos: 4
+    max_fallos_validacion: 2
+    palabras_respuesta_corta: 2
+  /informe:
+    escalado: null
+"""
+
+# Cada turno el agente valida un tipo inexistente (falla) y responde con texto
+GUION = b"""
+latencia: {ms: 0}
+por_defecto:
+  - {tool: construir_nombre_estandar, args: {tipo: NO_EXISTE, atributos: {}}}
+  - {texto: "Revisemos los datos."}
+"""
+
+
+def _validacion(valido: bool) -> ToolMessage:
+    return ToolMessage(content='{"valido": %s}' % ("true" if valido else "false"), name="construir_nombre_estandar", tool_call_id="1")
+
+
+def test_decision_por_senales():
+    config = _compilar(CONFIG, None)
+
+    def ruta(endpoint="/estandarizar", **senales):
+        decision = decidir_modelo(endpoint, SenalesRuteo(**senales), config)
+        return decision.ruta, decision.modelo, decision.motivo
+
+    assert ruta(confianza="ALTA") == ("rutinario", "barato", "rutinario")
+    assert ruta(confianza="BAJA") == ("rutinario", "barato", "rutinario")
+    assert ruta(confianza="SIN_CATEGORIA") == ("escalado", "caro", "confianza_baja")
+    assert ruta(turno=5, palabras=10) == ("escalado", "caro", "historial_largo")
+    # Fast path: respuesta corta o slots completos se quedan en el rutinario...
+    assert ruta(turno=5, palabras=1) == ("rutinario", "barato", "fast_path")
+    assert ruta(prellenado_completo=True, confianza="SIN_CATEGORIA") == ("rutinario", "barato", "fast_path")
+    # ...salvo fallos de validación repetidos
+    assert ruta(turno=5, palabras=1, fallos_validacion=2) == ("escalado", "caro", "fallos_validacion")
+    # Endpoint sin escalado y endpoint sin reglas propias (hereda por_defecto, sin señales)
+    assert ruta("/informe", fallos_validacion=9) == ("rutinario", "barato", "sin_escalado")
+    assert ruta("/otro", turno=50, confianza="SIN_CATEGORIA") == ("rutinario", "barato", "rutinario")
+
+    # Sobre el presupuesto soft el turno queda en "degradado" con el motivo original
+    soft = EstadoPresupuesto(nivel="soft", modelo_economico="economico")
+    degradado = decidir_modelo("/estandarizar", SenalesRuteo(confianza="SIN_CATEGORIA"), config, presupuesto=soft)
+    assert (degradado.ruta, degradado.modelo, degradado.motivo) == ("degradado", "economico", "confianza_baja")
+    igual = EstadoPresupuesto(nivel="soft", modelo_economico="barato")
+    assert decidir_modelo("/estandarizar", SenalesRuteo(), config, presupuesto=igual).ruta == "rutinario"
+
+    # Sin modelos en el YAML no hay ruteo (no hay modelos por defecto en el código)
+    with pytest.raises(ValueError):
+        _compilar(b"por_defecto: {escalado: caro}", None)
+    with pytest.raises(ValueError):
+        _compilar(b"por_defecto: {rutinario: barato, confianza_minima: CASI}", None)
+    with pytest.raises(ValueError):
+        _compilar(b"por_defecto: {rutinario: barato}\nendpoints: {/x: {umbral: 3}}", None)
+
+
+def test_fallos_validacion_seguidos_por_sesion():
+    fallos = FallosValidacion(max_sesiones=2)
+    assert fallos.actualizar("a", [AIMessage(content="hola"), _validacion(False)]) == 1
+    assert fallos.actualizar("a", [_validacion(False)]) == 2
+    # Una validación exitosa reinicia el conteo
+    assert fallos.actualizar("a", [_validacion(False), _validacion(True)]) == 0
+    assert fallos.actualizar(None, [_validacion(False)]) == 0
+
+    fallos.actualizar("b", [_validacion(False)])
+    fallos.actualizar("c", [_validacion(False)])
+    assert fallos.obtener("a") == 0 and fallos.obtener("c") == 1  # "a" salió del LRU
+
+
+def test_costos_por_ruta_y_migracion(tmp_path):
+    db = tmp_path / "costos.sqlite3"
+    # Base creada antes del ruteo (sin columna ruta)
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE llm_uso (ts REAL, tenant TEXT, sesion TEXT, endpoint TEXT, request_id TEXT, modelo TEXT, "
+        "input INTEGER, output INTEGER, cache_read INTEGER, cache_creation INTEGER, costo_usd REAL)"
+    )
+    conn.execute("INSERT INTO llm_uso VALUES (1, 't', 's', '/e', 'r', 'barato', 1, 1, 0, 0, 0.5)")
+    conn.commit()
+    conn.close()
+
+    store = CostStore(db)
+    store.registrar(ContextoCosto(endpoint="/e", ruta="escalado"), "caro", {}, 2.0)
+    store.registrar(ContextoCosto(endpoint="/e", ruta="rutinario"), "barato", {}, 0.25)
+    por_ruta = {f["clave"]: f["costo_usd"] for f in store.totales("ruta")}
+    assert por_ruta == {"escalado": 2.0, "rutinario": 0.25, None: 0.5}
+    assert [f["clave"] for f in store.totales("modelo", ruta="escalado")] == ["caro"]
+
+
+def test_estandarizar_escala_tras_fallos_de_validacion(guion_stub, costos_temporales, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.routers import chatbot_solicitud_articulos
+    import main
+
+    config = _compilar(CONFIG.replace(b"/estandarizar", b"/chatbot-solicitud-articulos/estandarizar"), None)
+    guion_stub(GUION)
+    store = costos_temporales
+    registros = []
+    monkeypatch.setattr(ruteo_modelos, "obtener_config_ruteo", lambda: config)
+    monkeypatch.setattr(ruteo_modelos, "fallos_validacion", FallosValidacion())
+    monkeypatch.setattr(chatbot_solicitud_articulos, "fallos_validacion", ruteo_modelos.fallos_validacion)
+    monkeypatch.setattr(chatbot_solicitud_articulos.escritor_historial, "registrar", registros.append)
+
+    client = TestClient(main.app)
+    contexto = []
+    for mensaje in ("guante de nitrilo para manipular quimicos", "el que sea mas resistente", "talla grande por favor"):
+        body = {"mensaje": mensaje, "contexto_conversacion": contexto, "sesion_id": "s1"}
+        respuesta = client.post("/chatbot-solicitud-articulos/estandarizar", json=body).json()
+        contexto = contexto + [{"rol": "usuario", "contenido": mensaje}, {"rol": "asistente", "contenido": respuesta["mensaje"]}]
+    store.vaciar()
+
+    # Dos turnos con validación fallida: el tercero va al modelo escalado
+    assert [(r["ruta"], r["modelo"], r["motivo_ruta"]) for r in registros] == [
+        ("rutinario", "barato", "rutinario"),
+        ("rutinario", "barato", "rutinario"),
+        ("escalado", "caro", "fallos_validacion"),
+    ]
+    por_ruta = {f["clave"]: f["llamadas"] for f in store.totales("ruta", sesion="s1")}
+    assert por_ruta == {"rutinario": 4, "escalado": 2}
+
+
+def test_turno_fallido_tambien_registra_latencia_y_costo(costos_temporales, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.routers import chatbot_solicitud_articulos
+    import main
+
+    class AgenteRoto:
+        def invoke(self, *args, **kwargs):
+            raise RuntimeError("timeout del proveedor")
+
+    config = _compilar(CONFIG.replace(b"/estandarizar", b"/chatbot-solicitud-articulos/estandarizar"), None)
+    monkeypatch.setattr(ruteo_modelos, "obtener_config_ruteo", lambda: config)
+    monkeypatch.setattr(chatbot_solicitud_articulos, "get_estandarizacion_agent", lambda modelo: AgenteRoto())
+    etiquetas = ("/chatbot-solicitud-articulos/estandarizar", "rutinario", "barato")
+    antes = ruteo_duracion.conteo(*etiquetas)
+
+    respuesta = TestClient(main.app).post(
+        "/chatbot-solicitud-articulos/estandarizar", json={"mensaje": "guante de nitrilo", "sesion_id": "s1"}
+    )
+    assert respuesta.status_code == 500
+    assert ruteo_duracion.conteo(*etiquetas) == antes + 1
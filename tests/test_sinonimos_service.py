@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chatbot_solicitud_articulos.categorias_service import inferir_categoria
+from app.services.chatbot_solicitud_articulos.estandarizacion_service import construir_nombre
+from app.services.chatbot_solicitud_articulos.sinonimos_service import expandir_sinonimos, traducir_valor
+
+
+def test_traduce_segun_valores_del_campo():
+    assert traducir_valor("Check") == "VALVULA CHECK"
+    assert traducir_valor("brida", ["FLANGE", "TEE"]) == "FLANGE"
+    assert traducir_valor("brida", ["BRIDADA", "RANURADA"]) == "BRIDADA"
+    assert traducir_valor("stainless", ["ACERO", "INOX"]) == "INOX"
+    # Término genérico fuera del YAML sí se traduce; uno de otra categoría no
+    assert traducir_valor("gasket", ["CODO 90"]) == "EMPAQUETADURA"
+    assert traducir_valor("hose", ["CASCO", "GUANTE"]) is None
+    assert traducir_valor("valvula", ["CODO 90"]) is None
+
+
+def test_construir_nombre_con_terminos_en_ingles():
+    resultado = construir_nombre("WOG", {
+        "subtipo": "gate valve", "diametro": '2"', "material": "carbon steel", "conexion": "flanged",
+    })
+    assert resultado["nombre"] == 'VALVULA COMPUERTA 2" ACERO CARBONO BRIDADA'
+    assert resultado["correcciones"]["subtipo"]["original"] == "GATE VALVE"
+
+
+def test_expansion_en_texto_libre():
+    assert "VALVULA CHECK" in expandir_sinonimos("swing check valve 1/2")
+    assert inferir_categoria("safety gloves nitrile").categoria_inferida == "EPP"
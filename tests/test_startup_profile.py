@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.startup_profile import PerfilArranque
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_calentar_mide_etapas_y_tolera_fallos():
+    perfil = PerfilArranque()
+
+    def falla():
+        raise RuntimeError("sin API key")
+
+    perfil.calentar([("importa json", lambda: __import__("json.tool")), ("falla", falla)])
+    reporte = perfil.reporte()
+    assert reporte["listo"] and reporte["listo_ms"] is not None
+    etapas = {e["nombre"]: e for e in reporte["etapas"]}
+    assert "falla" in etapas and "sin API key" in etapas["falla"]["error"]
+    assert etapas["importa json"]["error"] is None
+
+
+def test_importar_routers_no_carga_clientes_llm():
+    # Los clientes y langchain (incluido langchain_core) se cargan en el warm-up, no al importar la app
+    codigo = (
+        "import sys; import app.routers.chatbot_solicitud_articulos, app.routers.hse; "
+        "print(','.join(m for m in ('anthropic', 'langchain', 'langchain_core', 'langchain_anthropic', 'langgraph', 'pypdf') "
+        "if m in sys.modules))"
+    )
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == ""
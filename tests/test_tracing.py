@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.cli.trazas import analizar
+from app.services import tracing
+from app.services.llm_utils import construir_run_config
+from app.services.tracing import ExportadorJSONL, agrupar_por_trace, desglose_ruta_critica, leer_spans
+
+MS = 1_000_000
+
+
+def _span(span_id, padre, kind, nombre, inicio, fin, **atributos):
+    return {
+        "traceId": "t", "spanId": span_id, "parentSpanId": padre, "kind": kind, "name": nombre,
+        "startTimeUnixNano": inicio * MS, "endTimeUnixNano": fin * MS, "attributes": atributos,
+    }
+
+
+def test_ruta_critica_ignora_hijos_en_paralelo():
+    spans = [
+        _span("r", "", "http", "POST /x", 0, 100),
+        _span("a", "r", "agente", "agente", 5, 95),
+        _span("l", "a", "llm", "llm haiku", 5, 65, model="haiku"),
+        _span("p", "a", "tool", "paralela", 10, 20),     # solapada con el LLM: fuera de la ruta
+        _span("t", "a", "tool", "buscar_articulos_defontana", 65, 90),
+    ]
+    desglose = desglose_ruta_critica(spans)
+    assert desglose == {"llm haiku": 60.0, "tool buscar_articulos_defontana": 25.0, "propio http": 10.0, "propio agente": 5.0}
+    assert sum(desglose.values()) == 100.0
+
+
+class _ModeloFalso(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@tool
+def buscar_demo(q: str) -> str:
+    """Busca."""
+    return "ok"
+
+
+def test_agente_genera_spans_anidados_bajo_el_request(tmp_path):
+    exportador_original = tracing.trazador.exportador
+    tracing.trazador.exportador = ExportadorJSONL(tmp_path / "spans.jsonl")
+    try:
+        respuestas = iter([
+            AIMessage(content="", tool_calls=[{"name": "buscar_demo", "args": {"q": "valvula"}, "id": "1"}]),
+            AIMessage(content="listo"),
+        ])
+        agente = create_agent(model=_ModeloFalso(messages=respuestas), tools=[buscar_demo])
+        with tracing.trazador.span("POST /estandarizar", "http"):
+            agente.invoke({"messages": [("user", "hola")]}, config=construir_run_config())
+        tracing.trazador.exportador.cerrar()
+    finally:
+        tracing.trazador.exportador = exportador_original
+
+    traces = agrupar_por_trace(leer_spans(tmp_path / "spans.jsonl"))
+    assert len(traces) == 1
+    spans = next(iter(traces.values()))
+    por_tipo = {}
+    for s in spans:
+        por_tipo.setdefault(s["kind"], []).append(s)
+    assert len(por_tipo["http"]) == 1 and len(por_tipo["agente"]) == 1
+    assert len(por_tipo["paso"]) == 3 and len(por_tipo["llm"]) == 2 and len(por_tipo["tool"]) == 1
+
+    ids = {s["spanId"]: s for s in spans}
+    herramienta = por_tipo["tool"][0]
+    assert ids[herramienta["parentSpanId"]]["attributes"]["node"] == "tools"
+    assert ids[por_tipo["agente"][0]["parentSpanId"]]["kind"] == "http"
+
+    [reporte] = analizar(traces, top=5)
+    assert reporte["nombre"] == "POST /estandarizar"
+    assert "tool buscar_demo" in reporte["desglose_ms"]
+
+
+def test_exportador_rota_y_conserva_rotados_acotados(tmp_path):
+    from app.cli.trazas import main
+
+    ruta = tmp_path / "spans.jsonl"
+    exportador = ExportadorJSONL(ruta, max_bytes=600, rotacion_segundos=0, max_rotados=2)
+    for i in range(8):
+        span = tracing.trazador.iniciar(f"POST /x{i}", "http")
+        tracing.trazador.finalizar(span)
+        exportador._escribir_lote([json.dumps(span.a_dict()) + "\n"])
+    rotados = exportador.rotados()
+    assert len(rotados) == 2 and all(p.name.endswith(".jsonl.gz") for p in rotados)
+    # El CLI lee el activo y los rotados comprimidos
+    spans = [s for p in rotados + [ruta] for s in leer_spans(p)]
+    assert 2 < len(spans) < 8
+    assert main(["--archivo", str(ruta), "--json"]) == 0